@@ -1,29 +1,100 @@
 # ai_analyser_widget.py
 
+import threading
+
 from PyQt5.QtWidgets import (
-    QWidget, QVBoxLayout, QLabel, QTextEdit, QPushButton, QApplication
+    QWidget, QVBoxLayout, QHBoxLayout, QLabel, QTextEdit, QPushButton, QLineEdit,
+    QTableWidget, QTableWidgetItem, QHeaderView, QCheckBox
 )
 from PyQt5.QtCore import QTimer, pyqtSignal
-import threading
-import requests
-import json
+from PyQt5.QtGui import QTextCursor
+
+from ai_client import AIClient, BatchAnalyser, DEFAULT_ENDPOINT, DEFAULT_RATE_PER_MINUTE, DEFAULT_WORKERS
+from ai_prompt import DEFAULT_PROMPT_BUDGET, estimate_tokens, minimize_request
+from endpoints import endpoint_key, format_endpoint_key
+from http_parser import HttpParseError, parse_request_text
+
+PREVIEW_CHARS = 200
+# Streamed text is buffered and painted at most once per frame.
+FLUSH_INTERVAL_MS = 16
+ANSWER_SEPARATOR = "\n\n--- Analysis Result ---\n\n"
+STATUS_COLUMN = 3
+RESULT_COLUMN = 4
 
 
 class AIAnalyserWidget(QWidget):
     # Signals for thread-safe UI updates
     show_answer_signal = pyqtSignal(str)
     show_log_signal = pyqtSignal(str)
+    job_done_signal = pyqtSignal(int, str, bool, str)
 
     def __init__(self, get_api_key_callback):
         super().__init__()
         layout = QVBoxLayout(self)
+
+        # --- API settings ---
+        settings_layout = QHBoxLayout()
+        self.endpoint_input = QLineEdit(DEFAULT_ENDPOINT)
+        self.endpoint_input.setToolTip("Chat completions URL; point it at a local stand-in server for testing")
+        self.workers_input = QLineEdit(str(DEFAULT_WORKERS))
+        self.workers_input.setFixedWidth(40)
+        self.rate_input = QLineEdit(str(DEFAULT_RATE_PER_MINUTE))
+        self.rate_input.setFixedWidth(50)
+        settings_layout.addWidget(QLabel("Endpoint:"))
+        settings_layout.addWidget(self.endpoint_input)
+        settings_layout.addWidget(QLabel("Workers:"))
+        settings_layout.addWidget(self.workers_input)
+        settings_layout.addWidget(QLabel("Requests/min:"))
+        settings_layout.addWidget(self.rate_input)
+        self.budget_input = QLineEdit(str(DEFAULT_PROMPT_BUDGET))
+        self.budget_input.setFixedWidth(60)
+        self.budget_input.setToolTip("Requests are trimmed to fit this many (estimated) prompt tokens")
+        settings_layout.addWidget(QLabel("Token budget:"))
+        settings_layout.addWidget(self.budget_input)
+        layout.addLayout(settings_layout)
+
         layout.addWidget(QLabel("Paste an HTTP request below to analyse:"))
 
         self.req_editor = QTextEdit()
         layout.addWidget(self.req_editor)
 
+        analyze_layout = QHBoxLayout()
         self.analyze_btn = QPushButton("Analyze with Perplexity")
-        layout.addWidget(self.analyze_btn)
+        self.stop_btn = QPushButton("Stop")
+        self.stop_btn.setEnabled(False)
+        self.stop_btn.clicked.connect(self.stop_analysis)
+        self.stream_checkbox = QCheckBox("Stream answer")
+        self.stream_checkbox.setChecked(True)
+        analyze_layout.addWidget(self.analyze_btn)
+        analyze_layout.addWidget(self.stop_btn)
+        analyze_layout.addWidget(self.stream_checkbox)
+        layout.addLayout(analyze_layout)
+
+        # --- Batch results, one row per flow sent from the logger ---
+        batch_header = QHBoxLayout()
+        self.batch_label = QLabel("Batch: no requests queued")
+        self.cancel_batch_btn = QPushButton("Cancel Batch")
+        self.cancel_batch_btn.clicked.connect(self.cancel_batch)
+        self.clear_batch_btn = QPushButton("Clear Batch")
+        self.clear_batch_btn.setToolTip("Cancel the batch and empty the table; endpoints can then be analysed again")
+        self.clear_batch_btn.clicked.connect(self.clear_batch)
+        batch_header.addWidget(self.batch_label)
+        batch_header.addStretch()
+        batch_header.addWidget(self.cancel_batch_btn)
+        batch_header.addWidget(self.clear_batch_btn)
+        layout.addLayout(batch_header)
+
+        self.batch_table = QTableWidget()
+        self.batch_table.setColumnCount(5)
+        self.batch_table.setHorizontalHeaderLabels(["Request ID", "Endpoint", "Tokens", "Status", "Result"])
+        header = self.batch_table.horizontalHeader()
+        header.setSectionResizeMode(0, QHeaderView.ResizeToContents)
+        header.setSectionResizeMode(1, QHeaderView.Stretch)
+        header.setSectionResizeMode(2, QHeaderView.ResizeToContents)
+        header.setSectionResizeMode(STATUS_COLUMN, QHeaderView.ResizeToContents)
+        header.setSectionResizeMode(RESULT_COLUMN, QHeaderView.Stretch)
+        self.batch_table.currentCellChanged.connect(self.on_batch_row_selected)
+        layout.addWidget(self.batch_table)
 
         self.result_label = QLabel("Result will appear below.")
         self.result_box = QTextEdit()
@@ -34,9 +105,61 @@ class AIAnalyserWidget(QWidget):
         self.analyze_btn.clicked.connect(self.analyze_request)
         self.get_api_key_callback = get_api_key_callback
 
+        self.client = None
+        self.batch = None
+        self._client_config = None
+        # Full answers for batch rows, indexed by row.
+        self.batch_answers = []
+        self.batch_done = 0
+        # One analysis per endpoint template: template -> analysed row, and
+        # analysed row -> rows waiting to share its answer.
+        self.template_rows = {}
+        self.template_followers = {}
+        # Batch jobs use batch_base + table row as job id, and batch_base moves
+        # past every id handed out when the table is cleared. Pasted-request
+        # analyses count down from -1. Either way, late pieces of a cancelled
+        # answer can be told apart.
+        self.batch_base = 0
+        self.single_job = 0
+        self.answer_started = False
+
+        # Pieces of the streamed answer, filled by a worker thread and
+        # drained by flush_timer on the main thread.
+        self._stream_buffer = []
+        self._stream_lock = threading.Lock()
+        self.flush_timer = QTimer(self)
+        self.flush_timer.setInterval(FLUSH_INTERVAL_MS)
+        self.flush_timer.timeout.connect(self._flush_stream)
+
         # Connect signals to slots that update the UI safely on the main thread
         self.show_answer_signal.connect(self._show_answer_on_main)
         self.show_log_signal.connect(self._append_log_on_main)
+        self.job_done_signal.connect(self._job_done_on_main)
+
+    def _get_batch(self, api_key):
+        # The session, rate limiter and pool live as long as the settings do.
+        try:
+            workers = max(1, int(self.workers_input.text().strip()))
+        except ValueError:
+            workers = DEFAULT_WORKERS
+        try:
+            rate = float(self.rate_input.text().strip())
+        except ValueError:
+            rate = DEFAULT_RATE_PER_MINUTE
+        config = (api_key, self.endpoint_input.text().strip() or DEFAULT_ENDPOINT, workers, rate)
+        if self.batch is None or config != self._client_config or self.batch.cancel_event.is_set():
+            if self.batch is not None:
+                self.batch.shutdown()
+            self.client = AIClient(api_key, config[1], workers=workers, rate_per_minute=rate)
+            self.batch = BatchAnalyser(self.client, self.job_done_signal.emit, workers, self._on_stream_delta)
+            self._client_config = config
+        return self.batch
+
+    def _prompt_budget(self):
+        try:
+            return max(50, int(self.budget_input.text().strip()))
+        except ValueError:
+            return DEFAULT_PROMPT_BUDGET
 
     def analyze_request(self):
         req_text = self.req_editor.toPlainText().strip()
@@ -48,65 +171,170 @@ class AIAnalyserWidget(QWidget):
             self.show_log_signal.emit("Paste an HTTP request first.")
             return
 
+        batch = self._get_batch(api_key)
+        if self.single_job:
+            batch.cancel_job(self.single_job)
+        self.single_job -= 1
+        with self._stream_lock:
+            self._stream_buffer = []
+        self.answer_started = False
         self.result_box.clear()
+        try:
+            prompt_text, tokens = minimize_request(parse_request_text(req_text), self._prompt_budget())
+            self.show_log_signal.emit(
+                f"Request trimmed from ~{estimate_tokens(req_text)} to ~{tokens} tokens for the prompt."
+            )
+        except HttpParseError:
+            prompt_text = req_text  # not parseable as HTTP; send as pasted
         self.show_log_signal.emit("Starting analysis with Perplexity...")
+        stream = self.stream_checkbox.isChecked()
+        batch.submit(self.single_job, prompt_text, stream=stream)
+        self.stop_btn.setEnabled(True)
+        if stream:
+            self.flush_timer.start()
 
-        threading.Thread(target=self._call_perplexity_api, args=(api_key, req_text), daemon=True).start()
-
-    def _call_perplexity_api(self, api_key, req_text):
-        url = "https://api.perplexity.ai/chat/completions"
-        headers = {
-            "Authorization": f"Bearer {api_key}",
-            "Content-Type": "application/json"
-        }
-        prompt = (
-            "Analyze the following HTTP request for web application security vulnerabilities. "
-            "Identify any risks (e.g. injection, authentication, sensitive data, etc.) and suggest mitigations. "
-            "HTTP request:\n\n" + req_text
-        )
-        payload = {
-            "model": "sonar-pro",
-            "messages": [
-                {"role": "system", "content": "You are a security analyst."},
-                {"role": "user", "content": prompt}
-            ],
-            "max_tokens": 1000,
-            "temperature": 0.2,
-            "stream": False
-        }
-        try:
-            self.show_log_signal.emit("Sending request to Perplexity API...")
-            resp = requests.post(url, headers=headers, data=json.dumps(payload), timeout=60)
-            self.show_log_signal.emit(f"HTTP {resp.status_code} response received from Perplexity.")
-            if resp.status_code == 200:
-                data = resp.json()
-                answer = ""
-                if "choices" in data and data["choices"]:
-                    answer = data["choices"][0]["message"]["content"]
-                    print(answer)
-                if not answer:
-                    answer = json.dumps(data, indent=2)
-                self.show_answer_signal.emit(answer)
-                self.show_log_signal.emit("Analysis completed successfully.")
+    def stop_analysis(self):
+        if self.batch is not None and self.single_job:
+            self.batch.cancel_job(self.single_job)
+        self.stop_btn.setEnabled(False)
+
+    def _on_stream_delta(self, job_id, text):
+        # Worker thread: only buffer; painting happens on the flush timer.
+        if job_id == self.single_job:
+            with self._stream_lock:
+                self._stream_buffer.append(text)
+
+    def _flush_stream(self):
+        with self._stream_lock:
+            pieces, self._stream_buffer = self._stream_buffer, []
+        if not pieces:
+            return
+        if not self.answer_started:
+            self.answer_started = True
+            pieces.insert(0, ANSWER_SEPARATOR)
+        self._insert_text("".join(pieces))
+
+    def analyze_batch(self, flows):
+        """Queue logger flows for analysis; results fill the batch table as they arrive."""
+        api_key = self.get_api_key_callback()
+        if not api_key:
+            self.show_log_signal.emit("Please configure your Perplexity API key in the Proxy Config tab.")
+            return
+        batch = self._get_batch(api_key)
+        budget = self._prompt_budget()
+        for flow in flows:
+            key = endpoint_key(flow.request)
+            row = self.batch_table.rowCount()
+            self.batch_table.insertRow(row)
+            self.batch_table.setItem(row, 0, QTableWidgetItem(flow.id))
+            self.batch_table.setItem(row, 1, QTableWidgetItem(format_endpoint_key(key)))
+            self.batch_answers.append("")
+            analysed_row = self.template_rows.get(key)
+            if analysed_row is not None:
+                # Same endpoint template as an earlier row: reuse its answer.
+                self.batch_table.setItem(row, 2, QTableWidgetItem("-"))
+                if self.batch_answers[analysed_row]:
+                    self._set_batch_result(row, self.batch_answers[analysed_row], f"Same as row {analysed_row + 1}")
+                else:
+                    self.template_followers.setdefault(analysed_row, []).append(row)
+                    self.batch_table.setItem(row, STATUS_COLUMN, QTableWidgetItem(f"Waiting for row {analysed_row + 1}"))
+                continue
+            self.template_rows[key] = row
+            prompt_text, tokens = minimize_request(flow.request, budget)
+            self.batch_table.setItem(row, 2, QTableWidgetItem(str(tokens)))
+            self.batch_table.setItem(row, STATUS_COLUMN, QTableWidgetItem("Queued"))
+            batch.submit(self.batch_base + row, prompt_text)
+        self._update_batch_label()
+
+    def cancel_batch(self):
+        if self.batch is not None:
+            self.batch.cancel()
+            self.show_log_signal.emit("Batch cancelled; requests already sent will still complete.")
+
+    def clear_batch(self):
+        if self.batch is not None:
+            for row in range(len(self.batch_answers)):
+                self.batch.cancel_job(self.batch_base + row)
+        self.batch_base += len(self.batch_answers)
+        self.batch_table.setRowCount(0)
+        self.batch_answers = []
+        self.batch_done = 0
+        self.template_rows = {}
+        self.template_followers = {}
+        self.batch_label.setText("Batch: no requests queued")
+
+    def _job_done_on_main(self, job_id, answer, from_cache, error):
+        if job_id < 0:
+            if job_id != self.single_job:
+                return  # superseded by a newer analysis
+            streamed = self.flush_timer.isActive()
+            self.flush_timer.stop()
+            self._flush_stream()
+            self.stop_btn.setEnabled(False)
+            if error == "cancelled":
+                self._append_log_on_main("Analysis stopped.")
+            elif error:
+                self.show_log_signal.emit(f"Error calling Perplexity API:\n{error}")
+                self.show_answer_signal.emit(f"Error calling Perplexity API:\n{error}")
             else:
-                self.show_log_signal.emit(f"API Error {resp.status_code}: {resp.text}")
-                self.show_answer_signal.emit(f"API Error {resp.status_code}: {resp.text}")
-        except Exception as e:
-            self.show_log_signal.emit(f"Error calling Perplexity API:\n{str(e)}")
-            self.show_answer_signal.emit(f"Error calling Perplexity API:\n{str(e)}")
+                if not streamed:
+                    self._show_answer_on_main(answer)
+                if from_cache:
+                    self._append_log_on_main("Answer served from the local result cache.")
+                self._append_log_on_main("Analysis completed successfully.")
+            return
+        job_row = job_id - self.batch_base
+        if not 0 <= job_row < len(self.batch_answers):
+            return  # table was cleared while the job ran
+        followers = self.template_followers.pop(job_row, [])
+        if error:
+            # Let a later batch retry this endpoint.
+            self.template_rows = {k: r for k, r in self.template_rows.items() if r != job_row}
+        self._set_batch_result(job_row, answer or error, "Error" if error else ("Cached" if from_cache else "Done"))
+        for row in followers:
+            self._set_batch_result(row, answer or error, "Error" if error else f"Same as row {job_row + 1}")
+        self._update_batch_label()
+
+    def _set_batch_result(self, row, text, status):
+        self.batch_answers[row] = text
+        self.batch_table.setItem(row, STATUS_COLUMN, QTableWidgetItem(status))
+        self.batch_table.setItem(row, RESULT_COLUMN, QTableWidgetItem(text[:PREVIEW_CHARS]))
+        self.batch_done += 1
+        if self.batch_table.currentRow() == row:
+            self.on_batch_row_selected(row, 0, -1, -1)
+
+    def _update_batch_label(self):
+        total = len(self.batch_answers)
+        self.batch_label.setText(
+            f"Batch: {self.batch_done} of {total} analysed, {len(self.template_rows)} distinct endpoints"
+        )
+
+    def on_batch_row_selected(self, row, column, prev_row, prev_column):
+        if 0 <= row < len(self.batch_answers) and self.batch_answers[row]:
+            self.result_box.setPlainText(self.batch_answers[row])
+
+    def shutdown(self):
+        if self.batch is not None:
+            self.batch.shutdown()
+            self.batch = None
+
+    def _insert_text(self, text):
+        # Append at the end without re-setting the whole document; follow the
+        # output only if the view was already scrolled to the bottom.
+        scrollbar = self.result_box.verticalScrollBar()
+        at_bottom = scrollbar.value() >= scrollbar.maximum() - 4
+        cursor = self.result_box.textCursor()
+        cursor.movePosition(QTextCursor.End)
+        cursor.insertText(text)
+        if at_bottom:
+            scrollbar.setValue(scrollbar.maximum())
 
     def _append_log_on_main(self, text):
-        current_text = self.result_box.toPlainText()
-        new_text = current_text + ("\n" if current_text else "") + text
-        self.result_box.setPlainText(new_text)
-        self.result_box.verticalScrollBar().setValue(self.result_box.verticalScrollBar().maximum())
+        self._insert_text(("\n" if not self.result_box.document().isEmpty() else "") + text)
 
     def _show_answer_on_main(self, text):
-        current_text = self.result_box.toPlainText()
-        separator = "\n\n--- Analysis Result ---\n\n"
-        if separator not in current_text:
-            new_text = current_text + separator + text
+        if not self.answer_started:
+            self.answer_started = True
+            self._insert_text(ANSWER_SEPARATOR + text)
         else:
-            new_text = current_text + "\n" + text
-        self.result_box.setPlainText(new_text)
-        self.result_box.verticalScrollBar().setValue(self.result_box.verticalScrollBar().maximum())
+            self._insert_text("\n" + text)
@@ -0,0 +1,341 @@
+# ai_client.py
+#
+# Client for the chat-completions API used by the AI Analyser. One
+# requests.Session is shared by every call so connections are reused, a
+# token bucket caps the request rate, and answers are cached on disk keyed
+# by a normalized form of the analysed request, so re-analysing the same
+# request (or one differing only in volatile headers) costs no API call.
+#
+# The endpoint is configurable; benchmarks/mock_ai_server.py is a local
+# stand-in that speaks the same protocol.
+
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from http_parser import HttpParseError, parse_request_text
+
+DEFAULT_ENDPOINT = "https://api.perplexity.ai/chat/completions"
+DEFAULT_MODEL = "sonar-pro"
+CACHE_DIR = os.path.join(os.path.expanduser("~"), ".anvesha", "ai_cache")
+REQUEST_TIMEOUT = 60
+# Longest pause allowed between two streamed events.
+STREAM_READ_TIMEOUT = 60
+DEFAULT_WORKERS = 4
+DEFAULT_RATE_PER_MINUTE = 30
+
+SYSTEM_PROMPT = "You are a security analyst."
+PROMPT_PREFIX = (
+    "Analyze the following HTTP request for web application security vulnerabilities. "
+    "Identify any risks (e.g. injection, authentication, sensitive data, etc.) and suggest mitigations. "
+    "HTTP request:\n\n"
+)
+
+# Headers that change between otherwise identical requests and carry no
+# signal for the analysis; they are left out of the cache key.
+VOLATILE_HEADERS = {
+    "date", "content-length", "connection", "keep-alive", "if-none-match", "if-modified-since",
+    "x-request-id", "x-correlation-id", "traceparent", "tracestate",
+}
+# Credentials: their presence matters, their values do not.
+CREDENTIAL_HEADERS = {"cookie", "authorization", "x-api-key", "x-csrf-token", "x-xsrf-token"}
+
+
+def normalize_request_text(req_text):
+    """Canonical form of a raw request used as the cache key."""
+    try:
+        request = parse_request_text(req_text)
+    except HttpParseError:
+        return req_text.strip()
+    lines = [f"{request.method.upper()} {request.url}"]
+    fields = []
+    for name, value in request.headers:
+        lname = name.lower()
+        if lname in VOLATILE_HEADERS:
+            continue
+        fields.append((lname, "<set>" if lname in CREDENTIAL_HEADERS else value.strip()))
+    lines.extend(f"{k}: {v}" for k, v in sorted(fields))
+    return "\n".join(lines) + "\n\n" + request.body_text.strip()
+
+
+class AIError(Exception):
+    pass
+
+
+class AICancelled(AIError):
+    pass
+
+
+def iter_sse_data(lines):
+    """Yield the data payload of each server-sent event from an iterable of lines."""
+    data = []
+    for line in lines:
+        if isinstance(line, bytes):
+            line = line.decode("utf-8", errors="replace")
+        line = line.rstrip("\r")
+        if not line:
+            if data:
+                yield "\n".join(data)
+                data = []
+            continue
+        if line.startswith(":"):
+            continue  # comment / keep-alive
+        field, _, value = line.partition(":")
+        if field == "data":
+            data.append(value[1:] if value.startswith(" ") else value)
+    if data:
+        yield "\n".join(data)
+
+
+class RateLimiter:
+    """Token bucket shared by the worker threads; acquire() blocks until a slot frees."""
+
+    def __init__(self, rate_per_minute, burst=1):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = max(1, burst)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, cancel_event=None):
+        if self.rate <= 0:
+            return True
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return True
+                wait = (1 - self.tokens) / self.rate
+            if cancel_event is not None:
+                if cancel_event.wait(wait):
+                    return False
+            else:
+                time.sleep(wait)
+
+
+class ResultCache:
+    """Answers on disk, one JSON file per key."""
+
+    def __init__(self, directory=CACHE_DIR):
+        self.directory = directory
+
+    @staticmethod
+    def key(endpoint, model, req_text):
+        data = "\0".join((endpoint, model, normalize_request_text(req_text)))
+        return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], key + ".json")
+
+    def get(self, key):
+        try:
+            with open(self._path(key), "r", encoding="utf-8") as f:
+                return json.load(f).get("answer")
+        except (OSError, ValueError):
+            return None
+
+    def put(self, key, answer):
+        path = self._path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"answer": answer, "created": time.time()}, f)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"[AIClient] could not write cache entry: {e}")
+
+
+class AIClient:
+    def __init__(self, api_key, endpoint=DEFAULT_ENDPOINT, model=DEFAULT_MODEL, workers=DEFAULT_WORKERS,
+                 rate_per_minute=DEFAULT_RATE_PER_MINUTE, cache=None):
+        self.api_key = api_key
+        self.endpoint = endpoint or DEFAULT_ENDPOINT
+        self.model = model or DEFAULT_MODEL
+        self.cache = cache if cache is not None else ResultCache()
+        self.rate_limiter = RateLimiter(rate_per_minute)
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max(1, workers))
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.headers.update({
+            "Authorization": f"Bearer {api_key}",
+            "Content-Type": "application/json",
+        })
+
+    def build_payload(self, req_text, stream=False):
+        return {
+            "model": self.model,
+            "messages": [
+                {"role": "system", "content": SYSTEM_PROMPT},
+                {"role": "user", "content": PROMPT_PREFIX + req_text},
+            ],
+            "max_tokens": 1000,
+            "temperature": 0.2,
+            "stream": stream,
+        }
+
+    def analyze(self, req_text, use_cache=True, cancel_event=None, on_delta=None):
+        """Return (answer, from_cache). Raises AIError on API failures.
+
+        With on_delta, the answer is requested as a server-sent event stream
+        and on_delta(text) is called for each piece as it arrives (a cached
+        answer arrives as one piece).
+        """
+        key = ResultCache.key(self.endpoint, self.model, req_text)
+        if use_cache:
+            answer = self.cache.get(key)
+            if answer is not None:
+                if on_delta:
+                    on_delta(answer)
+                return answer, True
+        if not self.rate_limiter.acquire(cancel_event):
+            raise AICancelled("cancelled")
+        if on_delta is not None:
+            answer = self._analyze_stream(req_text, on_delta, cancel_event)
+            if answer:
+                self.cache.put(key, answer)
+            return answer, False
+        try:
+            resp = self.session.post(self.endpoint, data=json.dumps(self.build_payload(req_text)),
+                                     timeout=REQUEST_TIMEOUT)
+        except requests.RequestException as e:
+            raise AIError(str(e))
+        if resp.status_code != 200:
+            raise AIError(f"API Error {resp.status_code}: {resp.text}")
+        try:
+            data = resp.json()
+        except ValueError:
+            raise AIError(f"Invalid JSON from API: {resp.text[:200]}")
+        answer = ""
+        if data.get("choices"):
+            answer = data["choices"][0].get("message", {}).get("content", "")
+        if not answer:
+            answer = json.dumps(data, indent=2)
+        else:
+            self.cache.put(key, answer)
+        return answer, False
+
+    def _analyze_stream(self, req_text, on_delta, cancel_event):
+        payload = json.dumps(self.build_payload(req_text, stream=True))
+        try:
+            resp = self.session.post(self.endpoint, data=payload, stream=True,
+                                     headers={"Accept": "text/event-stream"},
+                                     timeout=(REQUEST_TIMEOUT, STREAM_READ_TIMEOUT))
+        except requests.RequestException as e:
+            raise AIError(str(e))
+        with resp:
+            if resp.status_code != 200:
+                raise AIError(f"API Error {resp.status_code}: {resp.text}")
+            if "text/event-stream" not in resp.headers.get("Content-Type", ""):
+                # The endpoint ignored "stream": treat it as a plain answer.
+                try:
+                    data = resp.json()
+                    answer = data["choices"][0]["message"]["content"]
+                except (ValueError, KeyError, IndexError, TypeError):
+                    raise AIError(f"Unexpected response from API: {resp.text[:200]}")
+                on_delta(answer)
+                return answer
+            parts = []
+            try:
+                # chunk_size=None hands over data as soon as each chunk arrives.
+                for data in iter_sse_data(resp.iter_lines(chunk_size=None)):
+                    if cancel_event is not None and cancel_event.is_set():
+                        raise AICancelled("cancelled")
+                    if data.strip() == "[DONE]":
+                        break
+                    try:
+                        event = json.loads(data)
+                    except ValueError:
+                        continue
+                    choices = event.get("choices") or [{}]
+                    delta = (choices[0].get("delta") or choices[0].get("message") or {}).get("content")
+                    if delta:
+                        parts.append(delta)
+                        on_delta(delta)
+            except requests.RequestException as e:
+                raise AIError(f"Stream interrupted: {e}")
+        return "".join(parts)
+
+    def close(self):
+        self.session.close()
+
+
+class BatchAnalyser:
+    """Runs analyses on a bounded thread pool.
+
+    on_result(job_id, answer, from_cache, error) is called from a worker
+    thread; error is None on success. Jobs submitted with stream=True also
+    get on_delta(job_id, text) calls as the answer streams in.
+    """
+
+    def __init__(self, client, on_result, workers=DEFAULT_WORKERS, on_delta=None):
+        self.client = client
+        self.on_result = on_result
+        self.on_delta = on_delta
+        self.executor = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="ai-batch")
+        self.cancel_event = threading.Event()
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def submit(self, job_id, req_text, stream=False):
+        """Queue a job; the returned Event cancels just this job when set."""
+        job_event = threading.Event()
+        with self._lock:
+            self._jobs[job_id] = job_event
+        self.executor.submit(self._run, job_id, req_text, job_event, stream)
+        return job_event
+
+    def _run(self, job_id, req_text, job_event, stream):
+        # on_delta(text) for the client, tagged with the job for the batch's callback.
+        on_delta = partial(self.on_delta, job_id) if stream and self.on_delta is not None else None
+        try:
+            if job_event.is_set() or self.cancel_event.is_set():
+                self.on_result(job_id, "", False, "cancelled")
+                return
+            try:
+                answer, cached = self.client.analyze(req_text, cancel_event=job_event, on_delta=on_delta)
+                if job_event.is_set() and not cached:
+                    raise AICancelled("cancelled")
+                self.on_result(job_id, answer, cached, None)
+            except AIError as e:
+                self.on_result(job_id, "", False, str(e))
+            except Exception as e:
+                self.on_result(job_id, "", False, f"Unexpected error: {e}")
+        finally:
+            with self._lock:
+                if self._jobs.get(job_id) is job_event:
+                    del self._jobs[job_id]
+
+    @property
+    def pending(self):
+        return len(self._jobs)
+
+    def cancel_job(self, job_id):
+        with self._lock:
+            job_event = self._jobs.get(job_id)
+        if job_event is not None:
+            job_event.set()
+
+    def cancel(self):
+        # Queued jobs finish immediately as cancelled; streams stop at the
+        # next event; non-streamed calls already sent still complete.
+        self.cancel_event.set()
+        with self._lock:
+            for job_event in self._jobs.values():
+                job_event.set()
+
+    def shutdown(self):
+        self.cancel()
+        self.executor.shutdown(wait=False)
+        self.client.close()
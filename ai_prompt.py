@@ -0,0 +1,178 @@
+# ai_prompt.py
+#
+# Shrinks an HTTP request before it goes into an AI Analyser prompt.
+# Browser noise headers are dropped and duplicates removed. Cookies and
+# tokens are summarized, long values truncated, and base64 blobs replaced
+# by placeholders. JSON bodies keep every key but only the first few array
+# items. The result is then shrunk in steps until its estimated token
+# count fits the configured budget.
+
+import base64
+import json
+import re
+from urllib.parse import parse_qsl, urlencode
+
+from flow_model import to_text
+
+DEFAULT_PROMPT_BUDGET = 1500
+
+# Headers that say nothing about the application's security.
+NOISE_HEADERS = {
+    "accept-encoding", "accept-language", "cache-control", "pragma", "dnt", "priority",
+    "upgrade-insecure-requests", "connection", "keep-alive", "te", "if-none-match",
+    "if-modified-since", "traceparent", "tracestate", "x-amzn-trace-id", "x-request-id",
+    "x-correlation-id", "sentry-trace", "baggage", "newrelic",
+}
+NOISE_PREFIXES = ("sec-ch-", "sec-fetch-", "x-datadog-", "x-b3-", "x-cloud-trace-")
+
+# (string length, array items, body chars) per step; later steps are harsher.
+SHRINK_STEPS = (
+    (200, 5, 8000),
+    (80, 3, 3000),
+    (40, 2, 1200),
+    (16, 1, 400),
+)
+MAX_HEADER_VALUE = 160
+MAX_OBJECT_KEYS = 40
+MAX_DEPTH = 8
+
+_PIECE_RE = re.compile(r"\w{1,4}|[^\w\s]")
+_BLOB_RE = re.compile(r"[A-Za-z0-9+/_\-]{100,}={0,2}")
+_JWT_RE = re.compile(r"^(?:Bearer\s+)?(eyJ[\w-]+)\.(eyJ[\w-]+)\.([\w-]*)$")
+
+
+def estimate_tokens(text):
+    """Rough local token count: one per punctuation mark or up-to-4-character word piece."""
+    return len(_PIECE_RE.findall(text))
+
+
+def _clip(value, limit):
+    if limit and len(value) > limit:
+        return f"{value[:limit]}...(+{len(value) - limit} chars)"
+    return value
+
+
+def _replace_blobs(text):
+    return _BLOB_RE.sub(lambda m: f"<blob {len(m.group(0))} chars>", text)
+
+
+def _decode_jwt_part(part):
+    try:
+        return json.loads(base64.urlsafe_b64decode(part + "=" * (-len(part) % 4)))
+    except (ValueError, TypeError):
+        return None
+
+
+def _summarize_credential(value, limit):
+    # JWT claims matter for the analysis; the signature does not.
+    match = _JWT_RE.match(value.strip())
+    if match:
+        header, claims = _decode_jwt_part(match.group(1)), _decode_jwt_part(match.group(2))
+        prefix = "Bearer " if value.strip().startswith("Bearer") else ""
+        summary = json.dumps({"jwt_header": header, "claims": claims}, separators=(",", ":"))
+        return prefix + _clip(summary, limit * 2)
+    return _clip(value, limit)
+
+
+def _summarize_cookies(value, string_limit):
+    cookies = []
+    seen = set()
+    for part in value.split(";"):
+        name, _, cookie_value = part.strip().partition("=")
+        if not name or name in seen:
+            continue
+        seen.add(name)
+        cookies.append(f"{name}={_clip(cookie_value, string_limit)}")
+    return "; ".join(cookies)
+
+
+def minimize_headers(headers, string_limit):
+    lines = []
+    seen = set()
+    for name, value in headers:
+        lname = name.lower()
+        if lname in NOISE_HEADERS or lname.startswith(NOISE_PREFIXES) or (lname, value) in seen:
+            continue
+        seen.add((lname, value))
+        if lname == "cookie":
+            value = _summarize_cookies(value, string_limit)
+        elif lname in ("authorization", "proxy-authorization"):
+            value = _summarize_credential(value, MAX_HEADER_VALUE)
+        else:
+            value = _clip(_replace_blobs(value), MAX_HEADER_VALUE)
+        lines.append(f"{name}: {value}")
+    return lines
+
+
+def _summarize_json(value, string_limit, array_items, depth=0):
+    if depth >= MAX_DEPTH:
+        return "<nested>"
+    if isinstance(value, dict):
+        items = list(value.items())
+        result = {k: _summarize_json(v, string_limit, array_items, depth + 1) for k, v in items[:MAX_OBJECT_KEYS]}
+        if len(items) > MAX_OBJECT_KEYS:
+            result["..."] = f"{len(items) - MAX_OBJECT_KEYS} more keys"
+        return result
+    if isinstance(value, list):
+        result = [_summarize_json(v, string_limit, array_items, depth + 1) for v in value[:array_items]]
+        if len(value) > array_items:
+            result.append(f"... {len(value) - array_items} more items")
+        return result
+    if isinstance(value, str):
+        if _BLOB_RE.fullmatch(value):
+            return f"<blob {len(value)} chars>"
+        return _clip(value, string_limit)
+    return value
+
+
+def minimize_body(request, string_limit, array_items, body_chars):
+    size = request.body_size
+    if not size:
+        return ""
+    content_type = (request.headers.get("content-type") or "").lower()
+    body = request.body
+    if "json" in content_type:
+        try:
+            data = json.loads(body)
+        except ValueError:
+            pass
+        else:
+            text = json.dumps(_summarize_json(data, string_limit, array_items), separators=(",", ":"))
+            return _clip(text, body_chars)
+    if "x-www-form-urlencoded" in content_type:
+        fields = parse_qsl(to_text(body), keep_blank_values=True)
+        text = urlencode([(k, _clip(v, string_limit)) for k, v in fields], safe="<>.()+")
+        return _clip(text, body_chars)
+    try:
+        text = body.decode("utf-8")
+    except UnicodeDecodeError:
+        return f"<binary body, {size} bytes, {content_type or 'unknown type'}>"
+    return _clip(_replace_blobs(text), body_chars)
+
+
+def _render(request, step):
+    string_limit, array_items, body_chars = step
+    lines = [f"{request.method} {_clip(request.url, MAX_HEADER_VALUE * 2)}"]
+    lines.extend(minimize_headers(request.headers, string_limit))
+    text = "\n".join(lines)
+    body = minimize_body(request, string_limit, array_items, body_chars)
+    if body:
+        text += "\n\n" + body
+    return text
+
+
+def minimize_request(request, budget=DEFAULT_PROMPT_BUDGET):
+    """Return (prompt text, estimated tokens) for an HttpRequest, fitted to budget tokens."""
+    text = ""
+    for step in SHRINK_STEPS:
+        text = _render(request, step)
+        tokens = estimate_tokens(text)
+        if tokens <= budget:
+            return text, tokens
+    # Still too big (huge header set or URL): cut to the budget's share.
+    full, limit = text, len(text)
+    while tokens > budget and limit > 0:
+        limit = max(0, limit * budget // tokens - 16)
+        text = _clip(full, limit)
+        tokens = estimate_tokens(text)
+    return text, tokens
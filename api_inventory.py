@@ -0,0 +1,281 @@
+# api_inventory.py
+#
+# Endpoint inventory built incrementally as flows arrive. Each flow is
+# folded into the statistics of its endpoint: method plus templated path,
+# e.g. /users/{id}. The statistics cover path, query, header and cookie
+# parameters, request and response body schemas (schema_infer.py), auth
+# schemes and response codes.
+# Nothing per-flow is kept, so an update costs O(parameters in the flow)
+# however many flows were seen, and memory grows with the number of
+# distinct endpoints and parameters, not with traffic. to_openapi() turns
+# the inventory into one OpenAPI 3 document.
+
+import re
+from urllib.parse import parse_qsl, urlsplit
+
+from endpoints import is_id_segment
+from schema_infer import BodySchemas, infer_scalar
+
+OPENAPI_VERSION = "3.0.3"
+MAX_EXAMPLES = 3
+MAX_PARAMS = 200
+MAX_EXAMPLE_CHARS = 200
+
+# Headers every client sends; they are not API parameters.
+STANDARD_HEADERS = {
+    "host", "content-length", "content-type", "connection", "keep-alive", "user-agent", "accept",
+    "accept-encoding", "accept-language", "cache-control", "pragma", "origin", "referer", "cookie",
+    "authorization", "dnt", "te", "upgrade-insecure-requests", "if-none-match", "if-modified-since",
+    "priority", "proxy-connection", "transfer-encoding", "expect",
+}
+_SKIP_HEADER_PREFIXES = ("sec-", ":")
+
+# Parameters whose values are credentials: their examples are not exported.
+_SECRET_NAME_RE = re.compile(r"key|token|secret|passw|auth|session|csrf|xsrf|signature|sig$", re.I)
+
+
+class ParamStats:
+    """What has been seen for one parameter: how often, which types, a few examples."""
+
+    __slots__ = ("count", "types", "formats", "examples")
+
+    def __init__(self):
+        self.count = 0
+        self.types = set()
+        self.formats = set()
+        self.examples = []
+
+    def add(self, type_name, fmt, example):
+        self.count += 1
+        self.types.add(type_name)
+        self.formats.add(fmt)
+        if example is not None and len(self.examples) < MAX_EXAMPLES and example not in self.examples:
+            if isinstance(example, str) and len(example) > MAX_EXAMPLE_CHARS:
+                example = example[:MAX_EXAMPLE_CHARS]
+            self.examples.append(example)
+
+    def schema(self):
+        types = self.types - {"null"}
+        if not types:
+            schema = {"type": "string", "nullable": True}
+        elif len(types) == 1:
+            schema = {"type": next(iter(types))}
+        elif types == {"integer", "number"}:
+            schema = {"type": "number"}
+        else:
+            schema = {"type": "string"}  # mixed: the widest common representation
+        if "null" in self.types and types:
+            schema["nullable"] = True
+        if schema["type"] == "string" and len(self.formats) == 1 and None not in self.formats:
+            schema["format"] = next(iter(self.formats))
+        if schema["type"] == "array":
+            schema["items"] = {}
+        if self.examples and schema["type"] not in ("object", "array"):
+            example = self.examples[0]
+            if isinstance(example, str) and schema["type"] in ("integer", "number", "boolean"):
+                # Query and header values arrive as text; export them typed.
+                try:
+                    example = {"integer": int, "number": float}[schema["type"]](example) \
+                        if schema["type"] != "boolean" else example == "true"
+                except ValueError:
+                    pass
+            schema["example"] = example
+        return schema
+
+
+def _add_param(params, name, type_name, fmt, example):
+    if example is not None and _SECRET_NAME_RE.search(name):
+        example = None
+    stats = params.get(name)
+    if stats is None:
+        if len(params) >= MAX_PARAMS:
+            return
+        stats = params[name] = ParamStats()
+    stats.add(type_name, fmt, example)
+
+
+class Endpoint:
+    __slots__ = (
+        "method", "path", "count", "first_seen", "last_seen", "servers", "path_params", "query",
+        "headers", "cookies", "request_bodies", "auth", "responses",
+    )
+
+    def __init__(self, method, path):
+        self.method = method
+        self.path = path
+        self.count = 0
+        self.first_seen = None
+        self.last_seen = None
+        self.servers = set()
+        self.path_params = [ParamStats() for seg in path.split("/") if seg == "{id}"]
+        self.query = {}
+        self.headers = {}
+        self.cookies = {}
+        self.request_bodies = BodySchemas()
+        self.auth = set()
+        # status code -> [count, BodySchemas]
+        self.responses = {}
+
+    def add(self, flow, origin, id_values, query):
+        request, response = flow.request, flow.response
+        self.count += 1
+        if self.first_seen is None:
+            self.first_seen = flow.timestamp
+        self.last_seen = flow.timestamp
+        self.servers.add(origin)
+        for stats, value in zip(self.path_params, id_values):
+            stats.add(*infer_scalar(value), value)
+        for name, value in query:
+            _add_param(self.query, name, *infer_scalar(value), value)
+        for name, value in request.headers:
+            lname = name.lower()
+            if lname == "cookie":
+                for part in value.split(";"):
+                    cname, _, cvalue = part.strip().partition("=")
+                    if cname:
+                        _add_param(self.cookies, cname, "string", None, None)
+            elif lname == "authorization":
+                self.auth.add(value.split(" ", 1)[0].lower())
+            elif lname not in STANDARD_HEADERS and not lname.startswith(_SKIP_HEADER_PREFIXES):
+                _add_param(self.headers, lname, *infer_scalar(value), value)
+        # Bodies are read before FlowStore packs them (see MainApp._on_new_flow).
+        self.request_bodies.add(request.headers.get("content-type"), request.body)
+        if response is not None:
+            status = str(response.status_code or "default")
+            entry = self.responses.get(status)
+            if entry is None:
+                entry = self.responses[status] = [0, BodySchemas()]
+            entry[0] += 1
+            entry[1].add(response.headers.get("content-type"), response.body)
+
+    def _parameters(self, path_names):
+        params = []
+        for name, stats in zip(path_names, self.path_params):
+            params.append({"name": name, "in": "path", "required": True, "schema": stats.schema()})
+        for location, group in (("query", self.query), ("header", self.headers), ("cookie", self.cookies)):
+            for name, stats in sorted(group.items()):
+                params.append({
+                    "name": name,
+                    "in": location,
+                    # Required if every sample of the endpoint carried it.
+                    "required": stats.count >= self.count,
+                    "schema": stats.schema(),
+                })
+        return params
+
+    def _request_body(self):
+        if not self.request_bodies.count:
+            return None
+        return {"required": self.request_bodies.count >= self.count, "content": self.request_bodies.to_content()}
+
+    def to_operation(self, path_names):
+        operation = {
+            "summary": f"{self.method} {self.path}",
+            "x-observed-count": self.count,
+            "parameters": self._parameters(path_names),
+            "responses": {},
+        }
+        body = self._request_body()
+        if body:
+            operation["requestBody"] = body
+        for status, (count, bodies) in sorted(self.responses.items()):
+            resp = {"description": f"Observed {count} time(s)"}
+            if bodies.count:
+                resp["content"] = bodies.to_content()
+            operation["responses"][status] = resp
+        if not operation["responses"]:
+            operation["responses"]["default"] = {"description": "No response captured"}
+        schemes = [SECURITY_SCHEMES[a][0] for a in sorted(self.auth) if a in SECURITY_SCHEMES]
+        if schemes:
+            operation["security"] = [{name: []} for name in schemes]
+        return operation
+
+
+SECURITY_SCHEMES = {
+    "bearer": ("bearerAuth", {"type": "http", "scheme": "bearer"}),
+    "basic": ("basicAuth", {"type": "http", "scheme": "basic"}),
+}
+
+
+def _singular(word):
+    if word.endswith("ies"):
+        return word[:-3] + "y"
+    if word.endswith("s") and not word.endswith("ss"):
+        return word[:-1]
+    return word
+
+
+def openapi_path(template):
+    """Give each {id} in a template a unique name: /users/{id}/posts/{id} -> /users/{userId}/posts/{postId}."""
+    segments = template.split("/")
+    names = []
+    for i, seg in enumerate(segments):
+        if seg != "{id}":
+            continue
+        prev = segments[i - 1] if i > 0 else ""
+        base = re.sub(r"[^A-Za-z0-9]", "", _singular(prev)) if prev and not prev.startswith("{") else ""
+        name = f"{base}Id" if base else "id"
+        unique, n = name, 2
+        while unique in names:
+            unique, n = f"{name}{n}", n + 1
+        names.append(unique)
+        segments[i] = "{" + unique + "}"
+    return "/".join(segments), names
+
+
+class EndpointInventory:
+    def __init__(self):
+        # (method, path template) -> Endpoint
+        self.endpoints = {}
+        self.flows_seen = 0
+
+    def add(self, flow):
+        request = flow.request
+        parts = urlsplit(request.url)
+        segments = (parts.path or "/").split("/")
+        id_values = []
+        for i, seg in enumerate(segments):
+            if is_id_segment(seg):
+                id_values.append(seg)
+                segments[i] = "{id}"
+        key = ((request.method or "GET").upper(), "/".join(segments))
+        endpoint = self.endpoints.get(key)
+        if endpoint is None:
+            endpoint = self.endpoints[key] = Endpoint(*key)
+        origin = f"{parts.scheme}://{parts.netloc}".lower()
+        endpoint.add(flow, origin, id_values, parse_qsl(parts.query, keep_blank_values=True))
+        self.flows_seen += 1
+        return endpoint
+
+    def clear(self):
+        self.endpoints = {}
+        self.flows_seen = 0
+
+    def __len__(self):
+        return len(self.endpoints)
+
+    def to_openapi(self, title="Captured API"):
+        paths = {}
+        servers = set()
+        schemes = {}
+        for (method, template), endpoint in sorted(self.endpoints.items(), key=lambda kv: (kv[0][1], kv[0][0])):
+            path, names = openapi_path(template)
+            paths.setdefault(path, {})[method.lower()] = endpoint.to_operation(names)
+            servers.update(endpoint.servers)
+            for auth in endpoint.auth:
+                if auth in SECURITY_SCHEMES:
+                    name, scheme = SECURITY_SCHEMES[auth]
+                    schemes[name] = scheme
+        document = {
+            "openapi": OPENAPI_VERSION,
+            "info": {
+                "title": title,
+                "version": "1.0.0",
+                "description": f"Inferred from {self.flows_seen} captured flows.",
+            },
+            "servers": [{"url": url} for url in sorted(servers)],
+            "paths": paths,
+        }
+        if schemes:
+            document["components"] = {"securitySchemes": schemes}
+        return document
@@ -0,0 +1,73 @@
+# bench_api_inventory.py
+#
+# Feeds synthetic flows into EndpointInventory and reports the update cost
+# per block of flows. With O(1) updates the per-flow time stays flat as
+# the inventory grows. Also times the final OpenAPI export.
+#
+# Usage: python benchmarks/bench_api_inventory.py [flows] [endpoints]
+
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api_inventory import EndpointInventory  # noqa: E402
+from flow_model import Flow, HttpRequest, HttpResponse  # noqa: E402
+
+BLOCK = 20000
+
+
+def make_flow(i, endpoints, rng):
+    resource = f"resource{i % endpoints}"
+    method = "POST" if i % 3 == 0 else "GET"
+    url = f"https://api.example.com/v1/{resource}/{rng.randint(1, 10 ** 6)}?page={i % 7}&sort=name"
+    headers = [("Host", "api.example.com"), ("X-Client", "bench"), ("Cookie", "sid=abc; theme=dark")]
+    body = b""
+    if method == "POST":
+        headers.append(("Content-Type", "application/json"))
+        body = json.dumps({"name": f"item {i}", "count": i, "active": bool(i % 2)}).encode()
+    response = HttpResponse(200, "OK", [("Content-Type", "application/json")], b'{"ok": true}')
+    return Flow(str(i), HttpRequest(method, url, headers, body), response, float(i))
+
+
+def run(total=50000, endpoints=500):
+    rng = random.Random(1)
+    flows = [make_flow(i, endpoints, rng) for i in range(total)]
+    inventory = EndpointInventory()
+    t0 = time.perf_counter()
+    for flow in flows:
+        inventory.add(flow)
+    add_us = (time.perf_counter() - t0) / total * 1e6
+    t0 = time.perf_counter()
+    inventory.to_openapi()
+    metrics = {"inventory_add_us": add_us, "openapi_export_ms": (time.perf_counter() - t0) * 1000}
+    return {"flows": total, "endpoints": endpoints}, metrics
+
+
+def main():
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    endpoints = int(sys.argv[2]) if len(sys.argv) > 2 else 500
+    rng = random.Random(1)
+    flows = [make_flow(i, endpoints, rng) for i in range(total)]
+    inventory = EndpointInventory()
+    print(f"{total} flows over ~{endpoints * 2} endpoints")
+    for start in range(0, total, BLOCK):
+        block = flows[start:start + BLOCK]
+        t0 = time.perf_counter()
+        for flow in block:
+            inventory.add(flow)
+        elapsed = time.perf_counter() - t0
+        print(f"flows {start:>7}-{start + len(block):>7}: {elapsed / len(block) * 1e6:6.1f} us/flow, "
+              f"{len(inventory)} endpoints")
+    t0 = time.perf_counter()
+    document = inventory.to_openapi()
+    elapsed = time.perf_counter() - t0
+    print(f"OpenAPI export: {elapsed * 1000:.1f} ms, {len(json.dumps(document)) / 1024:.0f} KB, "
+          f"{len(document['paths'])} paths")
+
+
+if __name__ == "__main__":
+    main()
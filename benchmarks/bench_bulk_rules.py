@@ -0,0 +1,90 @@
+# bench_bulk_rules.py
+#
+# Bulk Sender rule evaluation without the network: compiling match and
+# extract rules once and evaluating them on 100k responses the way a send
+# worker does, and what a run holds per value afterwards, a BulkResult
+# versus the whole response (body packed, as kept for the Sequencer).
+# Bodies are JSON documents of about 1 KB; one in 50 carries an error.
+#
+# Usage: python benchmarks/bench_bulk_rules.py [responses]
+
+import json
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_common import save_result  # noqa: E402
+from bulk_rules import BulkResult, RuleSet  # noqa: E402
+from flow_model import HttpResponse  # noqa: E402
+
+MATCH_RULES = "SQL syntax\n/ORA-\\d{5}/\n/stack ?trace/i\nunauthorized"
+EXTRACT_RULES = 'user = $.data.user.id\nrole = $.data.user.roles[0]\ncsrf = "csrf": "([0-9a-f]+)"'
+HEADERS = [("Content-Type", "application/json"), ("Server", "bench"), ("Cache-Control", "no-store")]
+
+
+def make_responses(total, rng):
+    responses = []
+    for i in range(total):
+        document = {"data": {"user": {"id": i, "name": f"user-{i}", "roles": ["reader", "writer"]},
+                             "items": [{"id": n, "title": "x" * 40} for n in range(12)]},
+                    "csrf": f"{rng.getrandbits(64):016x}"}
+        if i % 50 == 0:
+            document["error"] = "You have an error in your SQL syntax near ''' at line 1"
+        responses.append(HttpResponse(200, "OK", HEADERS, json.dumps(document).encode()))
+    return responses
+
+
+def _kept_copy(response):
+    # A fresh copy of the body, as a worker receives it, packed as BulkRun keeps it.
+    kept = HttpResponse(response.status_code, response.reason, response.headers.items(), bytes(bytearray(response.body)))
+    kept.pack_body()
+    return kept
+
+
+def _retained(build):
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    kept = build()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return kept, after - before
+
+
+def run(total=100000):
+    rng = random.Random(1)
+    responses = make_responses(total, rng)
+    t0 = time.perf_counter()
+    rules = RuleSet.parse(MATCH_RULES, EXTRACT_RULES)
+    metrics = {"compile_us": (time.perf_counter() - t0) * 1e6}
+    t0 = time.perf_counter()
+    evaluated = [rules.evaluate(response) for response in responses]
+    elapsed = time.perf_counter() - t0
+    metrics["evaluate_us"] = elapsed / total * 1e6
+    metrics["responses_per_s"] = total / elapsed
+    matched = sum(1 for flags, _ in evaluated if flags)
+    results, result_bytes = _retained(lambda: [
+        BulkResult(i, str(i), 200, responses[i].body_size, 0.01, flags, extracted)
+        for i, (flags, extracted) in enumerate(evaluated)])
+    kept, response_bytes = _retained(lambda: [_kept_copy(r) for r in responses])
+    metrics["result_bytes_each"] = result_bytes / total
+    metrics["response_bytes_each"] = response_bytes / total
+    print(f"  {matched:,} of {total:,} responses matched a rule; "
+          f"{result_bytes / 1048576:.1f} MB of results vs {response_bytes / 1048576:.1f} MB of responses")
+    return {"responses": total}, metrics
+
+
+def main():
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    print(f"{total} responses")
+    params, metrics = run(total)
+    for key, value in metrics.items():
+        print(f"  {key:<32} {value:10.2f}")
+    save_result("bulk_rules", metrics, params)
+
+
+if __name__ == "__main__":
+    main()
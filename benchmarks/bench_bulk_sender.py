@@ -0,0 +1,70 @@
+# bench_bulk_sender.py
+#
+# Bulk sender throughput against the local target server: building each
+# request from the template, then sending them one after another the way
+# BulkSenderWidget.send_bulk used to (a new connection per request), the
+# same with a keep-alive requests.Session, and a BulkRun on its worker pool
+# with match and extract rules evaluated on every response.
+#
+# Usage: python benchmarks/bench_bulk_sender.py [values]
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import requests  # noqa: E402
+
+from bench_common import TargetServer, save_result  # noqa: E402
+from bulk_rules import RuleSet  # noqa: E402
+from bulksender_widget import DEFAULT_WORKERS, BulkRun, build_request, send_request  # noqa: E402
+
+TEMPLATE = ("POST http://127.0.0.1:{port}/item?q={{fuzz}} HTTP/1.1\nHost: 127.0.0.1\n"
+            "Content-Type: application/json\nX-Trace: bench\n\n{{\"name\": \"{{fuzz}}\", \"count\": 1}}")
+
+
+def run(total=500):
+    target = TargetServer()
+    try:
+        template = TEMPLATE.format(port=target.http_port)
+        values = [f"value-{i}" for i in range(total)]
+        t0 = time.perf_counter()
+        built = [build_request(template, "fuzz", value) for value in values]
+        metrics = {"build_request_us": (time.perf_counter() - t0) / total * 1e6}
+        for label, session in (("new_connection", requests), ("session", requests.Session())):
+            t0 = time.perf_counter()
+            errors = 0
+            for _, req, url in built:
+                status, _ = send_request(req, url, session)
+                errors += status != 200
+            metrics[f"{label}_requests_per_s"] = total / (time.perf_counter() - t0)
+            metrics[f"{label}_errors"] = errors
+        rules = RuleSet.parse("error\n/\"status\": \"\\w+\"/", "status = $.status\nitems = $.items")
+        bulk_run = BulkRun(template, "fuzz", values, rules, DEFAULT_WORKERS)
+        t0 = time.perf_counter()
+        bulk_run.start()
+        results = []
+        while not bulk_run.done:
+            time.sleep(0.01)
+            results.extend(bulk_run.take_results())
+        results.extend(bulk_run.take_results())
+        bulk_run.shutdown()
+        metrics["workers_requests_per_s"] = total / (time.perf_counter() - t0)
+        metrics["workers_errors"] = sum(1 for r in results if r.status != 200)
+    finally:
+        target.close()
+    return {"values": total}, metrics
+
+
+def main():
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    params, metrics = run(total)
+    print(f"{total} values")
+    for key, value in metrics.items():
+        print(f"  {key:<32} {value:10.1f}")
+    save_result("bulk_sender", metrics, params)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,281 @@
+# bench_common.py
+#
+# Shared pieces of the benchmark suite: a local HTTP/HTTPS target server,
+# a load generator that can go direct or through a proxy, process CPU and
+# memory readings, and a results history for spotting regressions.
+#
+# Results are appended to benchmarks/results/history.jsonl, one JSON object
+# per benchmark run with the git commit, so runs can be compared over time
+# (see run_all.py). Metric names carry their direction: names ending in
+# _per_s or _mb_s are better when higher; anything else (times, sizes,
+# percentages, drop rates) is better when lower.
+
+import datetime
+import http.client
+import json
+import os
+import platform
+import resource
+import shutil
+import socket
+import ssl
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+RESULTS_FILE = os.path.join(BENCH_DIR, "results", "history.jsonl")
+HIGHER_IS_BETTER = ("_per_s", "_mb_s")
+REGRESSION_THRESHOLD = 0.10
+
+if REPO_DIR not in sys.path:
+    sys.path.insert(0, REPO_DIR)
+
+
+# --- target server ---------------------------------------------------------
+
+class TargetHandler(BaseHTTPRequestHandler):
+    """Answers every path; /size/<n> returns an n-byte JSON-ish body."""
+
+    protocol_version = "HTTP/1.1"
+    # Headers and body are separate writes; with Nagle on, keep-alive clients
+    # stall on delayed ACKs and measure the TCP stack instead of the proxy.
+    disable_nagle_algorithm = True
+    small_body = b'{"status": "ok", "items": [1, 2, 3]}'
+
+    def _reply(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        if length:
+            self.rfile.read(length)
+        body = self.small_body
+        if self.path.startswith("/size/"):
+            try:
+                size = int(self.path.split("/")[2].split("?")[0])
+            except ValueError:
+                size = 0
+            body = (b'{"k": "value", "n": 12345}, ' * (size // 27 + 1))[:size]
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    do_GET = do_POST = do_PUT = _reply
+
+    def log_message(self, *args):
+        pass
+
+
+def make_self_signed_cert(directory):
+    """Return (certfile, keyfile) for 127.0.0.1, or None without openssl."""
+    if shutil.which("openssl") is None:
+        return None
+    cert, key = os.path.join(directory, "target.crt"), os.path.join(directory, "target.key")
+    result = subprocess.run(
+        ["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-keyout", key, "-out", cert,
+         "-days", "1", "-subj", "/CN=127.0.0.1"],
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    return (cert, key) if result.returncode == 0 else None
+
+
+class TargetServer:
+    """HTTP and (when openssl is available) HTTPS servers on free local ports."""
+
+    def __init__(self):
+        self.http = ThreadingHTTPServer(("127.0.0.1", 0), TargetHandler)
+        self.https = None
+        self._tmp = tempfile.mkdtemp(prefix="anvesha-bench-")
+        pair = make_self_signed_cert(self._tmp)
+        if pair is not None:
+            self.https = ThreadingHTTPServer(("127.0.0.1", 0), TargetHandler)
+            context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+            context.load_cert_chain(*pair)
+            self.https.socket = context.wrap_socket(self.https.socket, server_side=True)
+        for server in (self.http, self.https):
+            if server is not None:
+                threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    @property
+    def http_port(self):
+        return self.http.server_address[1]
+
+    @property
+    def https_port(self):
+        return self.https.server_address[1] if self.https else None
+
+    def close(self):
+        for server in (self.http, self.https):
+            if server is not None:
+                server.shutdown()
+                server.server_close()
+        shutil.rmtree(self._tmp, ignore_errors=True)
+
+
+# --- load generator --------------------------------------------------------
+
+def _connection(scheme, target_port, proxy):
+    if proxy is None:
+        if scheme == "https":
+            return http.client.HTTPSConnection("127.0.0.1", target_port, timeout=30,
+                                               context=ssl._create_unverified_context())
+        return http.client.HTTPConnection("127.0.0.1", target_port, timeout=30)
+    if scheme == "https":
+        # CONNECT tunnel; the proxy's CA is not trusted here, so skip verification.
+        conn = http.client.HTTPSConnection(proxy[0], proxy[1], timeout=30, context=ssl._create_unverified_context())
+        conn.set_tunnel("127.0.0.1", target_port)
+        return conn
+    return http.client.HTTPConnection(proxy[0], proxy[1], timeout=30)
+
+
+def generate_load(target_port, total, concurrency, scheme="http", proxy=None, path="/item", body_size=0):
+    """Send `total` requests on `concurrency` keep-alive connections.
+
+    Returns {"latencies": [seconds], "errors": n, "elapsed": seconds}. Runs
+    happily in a separate process so the load does not count as receiver CPU.
+    """
+    counter = iter(range(total))
+    lock = threading.Lock()
+    latencies, errors = [], [0]
+    body = b"x" * body_size if body_size else None
+
+    def worker():
+        conn = _connection(scheme, target_port, proxy)
+        while True:
+            with lock:
+                i = next(counter, None)
+            if i is None:
+                break
+            url = f"{path}?i={i}"
+            if proxy is not None and scheme == "http":
+                url = f"http://127.0.0.1:{target_port}{url}"
+            t0 = time.perf_counter()
+            try:
+                conn.request("POST" if body else "GET", url, body=body)
+                conn.getresponse().read()
+            except (OSError, http.client.HTTPException):
+                with lock:
+                    errors[0] += 1
+                conn.close()
+                conn = _connection(scheme, target_port, proxy)
+                continue
+            elapsed = time.perf_counter() - t0
+            with lock:
+                latencies.append(elapsed)
+        conn.close()
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return {"latencies": latencies, "errors": errors[0], "elapsed": time.perf_counter() - start}
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def latency_summary(latencies):
+    """(median ms, p95 ms)"""
+    if not latencies:
+        return 0.0, 0.0
+    return statistics.median(latencies) * 1000, percentile(latencies, 0.95) * 1000
+
+
+# --- process readings ------------------------------------------------------
+
+def cpu_seconds():
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    return usage.ru_utime + usage.ru_stime
+
+
+def rss_bytes(pid=None):
+    """Current resident set size (Linux /proc), peak RSS elsewhere."""
+    try:
+        with open(f"/proc/{pid or 'self'}/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        if pid is not None:
+            return 0
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+
+
+def process_cpu_seconds(pid):
+    """CPU time of another process from /proc; 0.0 where unavailable."""
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            fields = f.read().rsplit(")", 1)[1].split()
+        return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+    except (OSError, ValueError, IndexError):
+        return 0.0
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+# --- results history -------------------------------------------------------
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_DIR, capture_output=True,
+                              text=True, timeout=10).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        return ""
+
+
+def save_result(name, metrics, params=None, path=RESULTS_FILE):
+    entry = {
+        "benchmark": name,
+        "time": datetime.datetime.now().isoformat(timespec="seconds"),
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "machine": f"{platform.system()} {platform.machine()} x{os.cpu_count()}",
+        "params": params or {},
+        "metrics": metrics,
+    }
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "a") as f:
+        f.write(json.dumps(entry) + "\n")
+    return entry
+
+
+def load_history(path=RESULTS_FILE):
+    if not os.path.exists(path):
+        return []
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def previous_result(name, params, history):
+    """Latest earlier run of the same benchmark with the same parameters."""
+    for entry in reversed(history):
+        if entry["benchmark"] == name and entry.get("params") == params:
+            return entry
+    return None
+
+
+def compare(metrics, previous, threshold=REGRESSION_THRESHOLD):
+    """Return [(metric, old, new, change, regressed)] against a previous entry."""
+    rows = []
+    for key, new in metrics.items():
+        old = previous["metrics"].get(key) if previous else None
+        if not isinstance(new, (int, float)) or not isinstance(old, (int, float)) or not old:
+            continue
+        change = (new - old) / abs(old)
+        worse = -change if key.endswith(HIGHER_IS_BETTER) else change
+        rows.append((key, old, new, change, worse > threshold))
+    return rows
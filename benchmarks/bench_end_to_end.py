@@ -0,0 +1,226 @@
+# bench_end_to_end.py
+#
+# End-to-end capture throughput: load generator -> mitmdump running
+# mitmproxy_addon_ipc.py (via ProxyRunner) -> UNIX socket IPC ->
+# FlowReceiverThread -> Qt signal -> LoggerWidget on an offscreen Qt
+# platform. Reports flows/s, the latency the proxy adds compared with
+# going direct, the capture-to-row delay, the IPC drop rate, CPU of this
+# process (receiver + UI) and of mitmdump, and RSS growth per flow.
+#
+# Without mitmdump on PATH (or with --ipc) the addon is simulated: a
+# separate process writes addon-format JSON lines to the IPC socket, so
+# the receiver and UI side can still be measured.
+#
+# The load generator runs in its own process, so its CPU does not count
+# as receiver CPU.
+#
+# Usage: python benchmarks/bench_end_to_end.py [requests] [concurrency] [body bytes] [--https] [--ipc]
+
+import json
+import os
+import shutil
+import socket
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_common import (  # noqa: E402
+    TargetServer, cpu_seconds, free_port, generate_load, latency_summary, percentile, process_cpu_seconds,
+    rss_bytes, save_result,
+)
+
+STARTUP_TIMEOUT = 30.0
+# Stop waiting for stragglers this long after the last flow arrived.
+DRAIN_TIMEOUT = 5.0
+
+
+def send_ipc_flows(total, concurrency, body_size):
+    """Play the addon: one connection and JSON line per flow, as mitmproxy_addon_ipc.py sends them."""
+    import threading
+    from proxy_runner import SOCKET_PATH
+
+    body = "x" * body_size
+    counter = iter(range(total))
+    lock = threading.Lock()
+    sent, errors = [0], [0]
+
+    def worker():
+        while True:
+            with lock:
+                i = next(counter, None)
+            if i is None:
+                return
+            data = {
+                "id": f"bench-{i}", "worker": 0, "timestamp": time.time(), "method": "GET",
+                "host": "127.0.0.1", "url": f"http://127.0.0.1/item?i={i}", "http_version": "HTTP/1.1",
+                "headers": [["Host", "127.0.0.1"], ["Accept", "*/*"]], "body": "",
+                "response_status": 200, "response_reason": "OK", "response_http_version": "HTTP/1.1",
+                "response_headers": [["Content-Type", "application/json"]], "response_body": body,
+            }
+            try:
+                with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+                    client.connect(SOCKET_PATH)
+                    client.sendall((json.dumps(data) + "\n").encode("utf-8"))
+                with lock:
+                    sent[0] += 1
+            except OSError:
+                with lock:
+                    errors[0] += 1
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return {"latencies": [], "sent": sent[0], "errors": errors[0], "elapsed": time.perf_counter() - start}
+
+
+def _wait(app, future, sink, expected_min=0):
+    """Run the Qt loop until the load is done and the flows stop coming."""
+    while not future.done():
+        app.processEvents()
+        time.sleep(0.001)
+    result = future.result()
+    expected = result.get("sent", len(result["latencies"]))
+    last_count, last_change = sink.count, time.monotonic()
+    while sink.count < max(expected, expected_min) and time.monotonic() - last_change < DRAIN_TIMEOUT:
+        app.processEvents()
+        time.sleep(0.001)
+        if sink.count != last_count:
+            last_count, last_change = sink.count, time.monotonic()
+    return result, expected
+
+
+def run(total=2000, concurrency=8, body_size=200, https=False, ipc=None):
+    from PyQt5.QtCore import QObject, pyqtSignal
+    from PyQt5.QtWidgets import QApplication
+
+    from logger_widget import LoggerWidget
+    from proxy_runner import FlowReceiverThread, ProxyRunner, health_check
+
+    if ipc is None:
+        ipc = shutil.which("mitmdump") is None
+    scheme = "https" if https else "http"
+
+    class Emitter(QObject):
+        new_flow = pyqtSignal(object)
+
+    class Sink:
+        # Runs on the Qt thread, as MainApp._on_new_flow does.
+        def __init__(self, logger):
+            self.logger = logger
+            self.count = 0
+            self.delays = []
+            self.first = self.last = None
+
+        def __call__(self, flow):
+            self.logger.log_flow(flow)
+            now = time.time()
+            if flow.timestamp:
+                self.delays.append(now - flow.timestamp)
+            self.count += 1
+            self.first = self.first or time.perf_counter()
+            self.last = time.perf_counter()
+
+    app = QApplication.instance() or QApplication([])
+    logger = LoggerWidget(lambda *a: None, lambda *a: None)
+    sink = Sink(logger)
+    emitter = Emitter()
+    emitter.new_flow.connect(sink)
+    target = TargetServer()
+    if https and target.https_port is None:
+        print("openssl not found; falling back to plain HTTP")
+        scheme = "http"
+    target_port = target.https_port if scheme == "https" else target.http_port
+    pool = ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn"))
+    runner = receiver = None
+    metrics = {}
+    try:
+        if not ipc:
+            direct = pool.submit(generate_load, target_port, min(total, 500), concurrency, scheme).result()
+            metrics["direct_latency_median_ms"], metrics["direct_latency_p95_ms"] = latency_summary(
+                direct["latencies"])
+            port = free_port()
+            runner = ProxyRunner(extra_args=["--set", "ssl_insecure=true"])
+            runner.set_flow_sink(emitter.new_flow.emit)
+            runner.start_proxy("127.0.0.1", port)
+            deadline = time.monotonic() + STARTUP_TIMEOUT
+            while not health_check("127.0.0.1", port, timeout=1.0):
+                if time.monotonic() > deadline:
+                    raise RuntimeError("mitmdump did not become healthy")
+                app.processEvents()
+                time.sleep(0.2)
+            proxy_pids = [w.proc.pid for w in runner.workers if w.proc]
+        else:
+            receiver = FlowReceiverThread(emitter.new_flow.emit)
+            receiver.start()
+            proxy_pids = []
+
+        rss0, cpu0 = rss_bytes(), cpu_seconds()
+        proxy_cpu0 = sum(process_cpu_seconds(pid) for pid in proxy_pids)
+        start = time.perf_counter()
+        if ipc:
+            future = pool.submit(send_ipc_flows, total, concurrency, body_size)
+        else:
+            path = f"/size/{body_size}" if body_size else "/item"
+            future = pool.submit(generate_load, target_port, total, concurrency, scheme, ("127.0.0.1", port), path)
+        result, expected = _wait(app, future, sink)
+        wall = (sink.last or time.perf_counter()) - start
+        cpu = cpu_seconds() - cpu0
+        proxy_cpu = sum(process_cpu_seconds(pid) for pid in proxy_pids) - proxy_cpu0
+        rss_growth = rss_bytes() - rss0
+    finally:
+        if runner is not None:
+            runner.stop_proxy()
+            runner.close()
+        if receiver is not None:
+            receiver.stop()
+        pool.shutdown()
+        target.close()
+
+    delivered = sink.count
+    metrics.update({
+        "flows_per_s": delivered / wall if wall > 0 else 0.0,
+        "load_errors": result["errors"],
+        "ipc_drop_pct": (expected - delivered) / expected * 100 if expected else 0.0,
+        "receiver_cpu_pct": cpu / wall * 100 if wall > 0 else 0.0,
+        "receiver_cpu_ms_per_flow": cpu / delivered * 1000 if delivered else 0.0,
+        "rss_growth_mb": rss_growth / 1048576,
+        "rss_growth_bytes_per_flow": rss_growth / delivered if delivered else 0.0,
+        "ui_delay_median_ms": percentile(sink.delays, 0.5) * 1000,
+        "ui_delay_p95_ms": percentile(sink.delays, 0.95) * 1000,
+    })
+    if not ipc:
+        median, p95 = latency_summary(result["latencies"])
+        metrics.update({
+            "proxy_latency_median_ms": median,
+            "proxy_latency_p95_ms": p95,
+            "added_latency_median_ms": median - metrics["direct_latency_median_ms"],
+            "added_latency_p95_ms": p95 - metrics["direct_latency_p95_ms"],
+            "proxy_cpu_ms_per_flow": proxy_cpu / delivered * 1000 if delivered else 0.0,
+        })
+    params = {"requests": total, "concurrency": concurrency, "body_size": body_size, "scheme": scheme,
+              "mode": "ipc" if ipc else "proxy"}
+    return params, metrics
+
+
+def main():
+    args = [a for a in sys.argv[1:] if not a.startswith("--")]
+    total = int(args[0]) if len(args) > 0 else 2000
+    concurrency = int(args[1]) if len(args) > 1 else 8
+    body_size = int(args[2]) if len(args) > 2 else 200
+    ipc = True if "--ipc" in sys.argv else None
+    params, metrics = run(total, concurrency, body_size, "--https" in sys.argv, ipc)
+    print(", ".join(f"{k}={v}" for k, v in params.items()))
+    for key, value in metrics.items():
+        print(f"  {key:<28} {value:12.2f}")
+    save_result("end_to_end", metrics, params)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+# bench_flow_columns.py
+#
+# Column store behind the logger sort and the Dashboard tab: appending
+# flows, sorting by each column and computing every dashboard aggregate,
+# with NumPy when it is installed and always with the pure-Python loops.
+#
+# Usage: python benchmarks/bench_flow_columns.py [flows]
+
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_common import save_result  # noqa: E402
+import flow_columns  # noqa: E402
+from flow_columns import FlowColumns  # noqa: E402
+from flow_model import Flow, HttpRequest, HttpResponse  # noqa: E402
+
+HOSTS = 200
+METHODS = ("GET", "GET", "GET", "POST", "PUT", "DELETE")
+STATUSES = (200, 200, 200, 200, 204, 301, 304, 400, 401, 404, 500, 503)
+
+
+def make_flows(total, rng):
+    flows = []
+    for i in range(total):
+        url = f"https://host{rng.randrange(HOSTS)}.example.com/api/{i}"
+        # Sizes come from truncated_size so a million flows need no bodies.
+        request = HttpRequest(rng.choice(METHODS), url, truncated_size=rng.randrange(2000))
+        response = None
+        if i % 50:
+            response = HttpResponse(rng.choice(STATUSES), "", truncated_size=int(rng.lognormvariate(8, 2)))
+        flows.append(Flow(str(i), request, response, 1.7e9 + i * 0.01, rng.random() if response else None))
+    return flows
+
+
+def _aggregates(columns):
+    columns.summary()
+    columns.host_stats()
+    columns.status_classes()
+    columns.method_counts()
+    columns.size_distribution()
+    columns.time_series()
+
+
+def run(total=1000000):
+    rng = random.Random(1)
+    flows = make_flows(total, rng)
+    columns = FlowColumns()
+    t0 = time.perf_counter()
+    for flow in flows:
+        columns.append(flow)
+    metrics = {"append_us": (time.perf_counter() - t0) / total * 1e6}
+    installed = flow_columns.numpy
+    backends = ["python"] + (["numpy"] if installed is not None else [])
+    try:
+        for backend in backends:
+            flow_columns.numpy = installed if backend == "numpy" else None
+            for key in ("timestamp", "host", "status", "duration"):
+                t0 = time.perf_counter()
+                columns.order(key, descending=True)
+                metrics[f"sort_{key}_{backend}_ms"] = (time.perf_counter() - t0) * 1000
+            t0 = time.perf_counter()
+            _aggregates(columns)
+            metrics[f"dashboard_{backend}_ms"] = (time.perf_counter() - t0) * 1000
+    finally:
+        flow_columns.numpy = installed
+    return {"flows": total, "numpy": installed is not None}, metrics
+
+
+def main():
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    print(f"{total} flows")
+    params, metrics = run(total)
+    for key, value in metrics.items():
+        print(f"  {key:<32} {value:10.2f}")
+    save_result("flow_columns", metrics, params)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+# bench_http_parser.py
+#
+# Compares http_parser against the ad-hoc parsers it replaced. The legacy
+# functions are kept here verbatim so the comparison stays reproducible.
+#
+# Usage: python benchmarks/bench_http_parser.py [iterations]
+
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from http_parser import MessageParser, parse_request, parse_request_text, serialize_request  # noqa: E402
+
+
+def legacy_utils_parse_request(req_text):
+    lines = req_text.strip().split('\n')
+    method, url = lines[0].split()[:2]
+    headers = {}
+    body = ''
+    body_started = False
+    for line in lines[1:]:
+        if not body_started and ':' in line:
+            k, v = line.split(':', 1)
+            headers[k.strip()] = v.strip()
+        elif line:
+            body_started = True
+            body += line + '\n'
+    return method, url, headers, body.strip()
+
+
+def legacy_logger_parse_req(req_str):
+    lines = req_str.strip().split("\n")
+    method_url = lines[0].split(" ", 1)
+    method = method_url[0] if len(method_url) > 0 else ""
+    url = method_url[1] if len(method_url) > 1 else ""
+    headers, body = {}, ""
+    parsing_headers = True
+    for line in lines[1:]:
+        if parsing_headers and ":" in line:
+            k, v = line.split(":", 1)
+            headers[k.strip()] = v.strip()
+        else:
+            parsing_headers = False
+            body += line + "\n"
+    return method, url, headers, body.strip()
+
+
+def legacy_bulk_parse(req_text):
+    lines = [l for l in req_text.strip().splitlines() if l.strip()]
+    parts = lines[0].strip().split()
+    method, url = parts[0], parts[1]
+    headers = {}
+    body_lines = []
+    in_headers = True
+    for line in lines[1:]:
+        if in_headers and ':' in line:
+            k, v = line.split(':', 1)
+            headers[k.strip()] = v.strip()
+        else:
+            in_headers = False
+            body_lines.append(line)
+    return method, url, headers, '\n'.join(body_lines).strip() or None
+
+
+def make_sample(n_headers, body_size):
+    headers = "".join(f"X-Header-{i}: value-{i}-" + "v" * 40 + "\n" for i in range(n_headers))
+    body = ('{"key": "value", "n": 1}\n' * (body_size // 25 + 1))[:body_size]
+    return f"POST https://example.com/api/items?id=1 HTTP/1.1\nHost: example.com\n{headers}\n{body}"
+
+
+def bench(label, func, arg, number):
+    seconds = timeit.timeit(lambda: func(arg), number=number)
+    print(f"  {label:<36} {seconds / number * 1e6:10.2f} us/op")
+    return seconds / number * 1e6
+
+
+def run(number=2000):
+    """Microseconds per call of the current parser on a 20-header, 2000-byte request."""
+    text = make_sample(20, 2000)
+    wire = serialize_request(parse_request_text(text))
+    timed = lambda func, arg, n=number: timeit.timeit(lambda: func(arg), number=n) / n * 1e6  # noqa: E731
+    metrics = {
+        "parse_request_text_us": timed(parse_request_text, text),
+        "parse_request_us": timed(parse_request, wire),
+        "feed_chunked_us": timed(_feed_chunked, wire, max(1, number // 10)),
+        "serialize_request_us": timed(serialize_request, parse_request(wire)),
+    }
+    return {"iterations": number}, metrics
+
+
+def main():
+    number = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    for n_headers, body_size in ((10, 0), (20, 2000), (20, 200000)):
+        text = make_sample(n_headers, body_size)
+        wire = serialize_request(parse_request_text(text))
+        print(f"{n_headers} headers, {body_size} byte body ({len(wire)} bytes on the wire):")
+        bench("legacy utils.parse_request", legacy_utils_parse_request, text, number)
+        bench("legacy logger parse_req_resp_to_dict", legacy_logger_parse_req, text, number)
+        bench("legacy bulk sender parsing", legacy_bulk_parse, text, number)
+        bench("http_parser.parse_request_text", parse_request_text, text, number)
+        bench("http_parser.parse_request (wire)", parse_request, wire, number)
+        bench("MessageParser.feed (4 KiB chunks)", _feed_chunked, wire, max(1, number // 10))
+        bench("http_parser.serialize_request", serialize_request, parse_request(wire), number)
+
+
+def _feed_chunked(data):
+    parser = MessageParser("request")
+    for i in range(0, len(data), 4096):
+        parser.feed(data[i:i + 4096])
+
+
+if __name__ == "__main__":
+    main()
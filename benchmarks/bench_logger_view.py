@@ -0,0 +1,85 @@
+# bench_logger_view.py
+#
+# The Logger tab on an offscreen Qt: logging flows into LoggerWidget, then
+# header clicks (sorting by status and by host, both directions), a search
+# and a sort of the filtered rows, collapsing repeats, and repainting the
+# visible rows. A selected row must stay on the same flow across a sort.
+#
+# Usage: python benchmarks/bench_logger_view.py [flows]
+
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from bench_common import save_result  # noqa: E402
+from bench_search import make_flow  # noqa: E402
+from logger_widget import HOST_COLUMN, STATUS_COLUMN  # noqa: E402
+
+STATUSES = (200, 200, 200, 201, 204, 301, 400, 404, 500)
+
+
+def _timed(app, action):
+    t0 = time.perf_counter()
+    action()
+    # Counts the repaint the action causes.
+    app.processEvents()
+    return (time.perf_counter() - t0) * 1000
+
+
+def run(total=20000):
+    from PyQt5.QtWidgets import QApplication
+    from logger_widget import LoggerWidget
+
+    app = QApplication.instance() or QApplication([])
+    rng = random.Random(1)
+    flows = [make_flow(i, rng) for i in range(total)]
+    for flow in flows:
+        flow.response.status_code = rng.choice(STATUSES)
+    logger = LoggerWidget(lambda *a: None, lambda *a: None)
+    logger.resize(1400, 900)
+    logger.show()
+    app.processEvents()
+
+    t0 = time.perf_counter()
+    for flow in flows:
+        logger.log_flow(flow)
+    app.processEvents()
+    metrics = {"log_flow_us": (time.perf_counter() - t0) / total * 1e6}
+
+    selected = total // 3
+    logger.table.selectRow(selected)
+    clicks = []
+    for col in (STATUS_COLUMN, STATUS_COLUMN, HOST_COLUMN, HOST_COLUMN):
+        clicks.append(_timed(app, lambda: logger.on_header_clicked(col)))
+    metrics["header_click_ms"] = sum(clicks) / len(clicks)
+    if logger.selected_flow() is not flows[selected]:
+        raise RuntimeError("the selected row moved to another flow after sorting")
+
+    logger.search_input.setText("needle")
+    metrics["search_ms"] = _timed(app, logger.refresh)
+    shown = logger.model.rowCount()
+    metrics["filtered_header_click_ms"] = _timed(app, lambda: logger.on_header_clicked(STATUS_COLUMN))
+    logger.search_input.setText("")
+    logger.refresh()
+    metrics["collapse_ms"] = _timed(app, lambda: logger.collapse_checkbox.setChecked(True))
+    metrics["repaint_ms"] = _timed(app, logger.table.viewport().repaint)
+    logger.close()
+    print(f"  {shown} rows match the search")
+    return {"flows": total}, metrics
+
+
+def main():
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    print(f"{total} flows")
+    params, metrics = run(total)
+    for key, value in metrics.items():
+        print(f"  {key:<32} {value:10.2f}")
+    save_result("logger_view", metrics, params)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+# bench_proxy_backends.py
+#
+# Compares the subprocess (mitmdump + UNIX socket IPC) and in-process
+# (DumpMaster thread) proxy backends: flows delivered per second and
+# end-to-end latency from sending a request until its Flow reaches the sink.
+# Needs mitmproxy installed; no Qt is involved, the sink is a plain callback.
+#
+# Usage: python benchmarks/bench_proxy_backends.py [requests] [concurrency]
+
+import http.client
+import os
+import statistics
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from proxy_engine import InProcessProxy  # noqa: E402
+from proxy_runner import ProxyRunner, health_check  # noqa: E402
+
+PROXY_HOST = "127.0.0.1"
+PROXY_PORT = 18480
+STARTUP_TIMEOUT = 30.0
+
+
+class TargetHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    body = b'{"status": "ok", "items": [1, 2, 3]}'
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(self.body)))
+        self.end_headers()
+        self.wfile.write(self.body)
+
+    def log_message(self, *args):
+        pass
+
+
+class LatencySink:
+    def __init__(self, expected):
+        self.expected = expected
+        self.sent_at = {}
+        self.latencies = []
+        self.done = threading.Event()
+        self._lock = threading.Lock()
+
+    def __call__(self, flow):
+        now = time.perf_counter()
+        query = parse_qs(urlsplit(flow.request.url).query)
+        key = query.get("i", [None])[0]
+        with self._lock:
+            sent = self.sent_at.pop(key, None)
+            if sent is not None:
+                self.latencies.append(now - sent)
+            if len(self.latencies) >= self.expected:
+                self.done.set()
+
+
+def drive(target_port, sink, total, concurrency):
+    counter = iter(range(total))
+    lock = threading.Lock()
+
+    def worker():
+        conn = http.client.HTTPConnection(PROXY_HOST, PROXY_PORT, timeout=30)
+        while True:
+            with lock:
+                i = next(counter, None)
+            if i is None:
+                break
+            key = str(i)
+            with sink._lock:
+                sink.sent_at[key] = time.perf_counter()
+            conn.request("GET", f"http://127.0.0.1:{target_port}/item?i={key}")
+            conn.getresponse().read()
+        conn.close()
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+
+def run_backend(backend, target_port, total, concurrency):
+    sink = LatencySink(total)
+    backend.set_flow_sink(sink)
+    backend.start_proxy(PROXY_HOST, PROXY_PORT)
+    try:
+        deadline = time.monotonic() + STARTUP_TIMEOUT
+        while not health_check(PROXY_HOST, PROXY_PORT, timeout=1.0):
+            if time.monotonic() > deadline:
+                raise RuntimeError(f"{backend.name} backend did not become healthy")
+            time.sleep(0.2)
+        start = time.perf_counter()
+        drive(target_port, sink, total, concurrency)
+        sink.done.wait(timeout=30)
+        elapsed = time.perf_counter() - start
+    finally:
+        backend.stop_proxy()
+        backend.close()
+    lat = sorted(sink.latencies)
+    if not lat:
+        print(f"{backend.name:<12} no flows delivered")
+        return
+    p95 = lat[int(len(lat) * 0.95) - 1] if len(lat) >= 20 else lat[-1]
+    print(
+        f"{backend.name:<12} {len(lat) / elapsed:9.1f} flows/s   "
+        f"latency median {statistics.median(lat) * 1000:7.2f} ms   p95 {p95 * 1000:7.2f} ms   "
+        f"delivered {len(lat)}/{total}"
+    )
+
+
+def main():
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    concurrency = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+    server = ThreadingHTTPServer(("127.0.0.1", 0), TargetHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    target_port = server.server_address[1]
+    print(f"{total} requests, concurrency {concurrency}, target 127.0.0.1:{target_port}")
+    for backend in (ProxyRunner(), InProcessProxy()):
+        run_backend(backend, target_port, total, concurrency)
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+# bench_remote_capture.py
+#
+# Remote capture over localhost: addon-format JSON lines are written to a
+# capture agent's IPC socket (capture_agent.py with no mitmdump), batched,
+# compressed and spooled by the agent, streamed over TCP and decoded by a
+# RemoteCaptureClient. The first half of the flows is sent while the
+# desktop is connected (live rate); the desktop is then stopped, the second
+# half is captured while it is away, and a new client started on the same
+# desktop spool resumes from its last message (catch-up rate). Every flow
+# must arrive exactly once. Agent, client and feeder share this process.
+#
+# Usage: python benchmarks/bench_remote_capture.py [flows] [body bytes]
+
+import json
+import os
+import random
+import shutil
+import socket
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_common import save_result  # noqa: E402
+from capture_agent import CaptureAgent  # noqa: E402
+from remote_capture import RemoteCaptureClient  # noqa: E402
+
+FEEDERS = 4
+TIMEOUT = 120.0
+
+
+def make_lines(first, total, body_size, rng):
+    words = ["id", "name", "price", "status", "items", "token", "user", "created", "ok", "error"]
+    lines = []
+    for i in range(first, first + total):
+        body = json.dumps([{"id": rng.randrange(10 ** 9), rng.choice(words): rng.choice(words),
+                            "value": rng.random()} for _ in range(body_size // 60 + 1)])
+        lines.append((json.dumps({
+            "id": f"remote-{i}", "worker": 0, "timestamp": time.time(), "method": "GET",
+            "host": "api.example.com", "url": f"https://api.example.com/v1/items/{i}?page={i % 7}",
+            "http_version": "HTTP/1.1", "headers": [["Host", "api.example.com"], ["Accept", "*/*"]], "body": "",
+            "response_status": 200, "response_reason": "OK", "response_http_version": "HTTP/1.1",
+            "response_headers": [["Content-Type", "application/json"]], "response_body": body[:body_size],
+        }) + "\n").encode("utf-8"))
+    return lines
+
+
+def feed(socket_path, lines):
+    """Play the addon: one connection per message, from a few threads."""
+    chunks = [lines[i::FEEDERS] for i in range(FEEDERS)]
+
+    def worker(chunk):
+        for line in chunk:
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+                client.connect(socket_path)
+                client.sendall(line)
+
+    threads = [threading.Thread(target=worker, args=(chunk,)) for chunk in chunks]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+
+def _wait_for(predicate):
+    deadline = time.monotonic() + TIMEOUT
+    while not predicate():
+        if time.monotonic() > deadline:
+            raise TimeoutError("flows did not arrive")
+        time.sleep(0.005)
+
+
+def run(total=20000, body_size=1000):
+    rng = random.Random(1)
+    half = total // 2
+    live_lines = make_lines(0, half, body_size, rng)
+    away_lines = make_lines(half, total - half, body_size, rng)
+    tmp = tempfile.mkdtemp(prefix="anvesha-remote-")
+    received = []
+    lock = threading.Lock()
+
+    def sink(flow):
+        with lock:
+            received.append(flow.id)
+
+    def client():
+        c = RemoteCaptureClient(token="bench", spool_root=os.path.join(tmp, "desktop"))
+        c.set_flow_sink(sink)
+        c.start_proxy("127.0.0.1", agent.port)
+        _wait_for(c.is_running)
+        return c
+
+    agent = CaptureAgent("127.0.0.1", 0, "bench", os.path.join(tmp, "agent"), os.path.join(tmp, "agent.sock"))
+    try:
+        agent.start()
+        desktop = client()
+        t0 = time.perf_counter()
+        feed(agent.socket_path, live_lines)
+        _wait_for(lambda: len(received) >= half)
+        live = time.perf_counter() - t0
+        wire, raw = desktop.wire_bytes, desktop.raw_bytes
+
+        desktop.stop_proxy()
+        feed(agent.socket_path, away_lines)
+        agent.flush()
+        spooled = agent.spool.size
+        t0 = time.perf_counter()
+        desktop = client()
+        _wait_for(lambda: len(received) >= total)
+        catch_up = time.perf_counter() - t0
+        wire += desktop.wire_bytes
+        raw += desktop.raw_bytes
+        # Anything late (a duplicate) would show up now.
+        time.sleep(0.2)
+        desktop.stop_proxy()
+        lost = desktop.stats()["remote"]["lost"]
+    finally:
+        agent.stop()
+        shutil.rmtree(tmp, ignore_errors=True)
+
+    duplicates = len(received) - len(set(received))
+    missing = total - len(set(received))
+    print(f"  {len(received):,} flows received, {duplicates} duplicates, {missing} missing, {lost} reported lost; "
+          f"{raw / wire:.1f}x compression, {spooled / 1048576:.1f} MB spooled while disconnected")
+    if duplicates or missing:
+        raise RuntimeError(f"{duplicates} duplicate and {missing} missing flows after the reconnect")
+    metrics = {
+        "live_flows_per_s": half / live,
+        "catch_up_flows_per_s": (total - half) / catch_up,
+        "wire_bytes_per_flow": wire / total,
+    }
+    return {"flows": total, "body_size": body_size}, metrics
+
+
+def main():
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    body_size = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+    print(f"{total} flows, {body_size}-byte bodies")
+    params, metrics = run(total, body_size)
+    for key, value in metrics.items():
+        print(f"  {key:<32} {value:10.2f}")
+    save_result("remote_capture", metrics, params)
+
+
+if __name__ == "__main__":
+    main()
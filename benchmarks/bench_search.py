@@ -0,0 +1,64 @@
+# bench_search.py
+#
+# Logger search speed: FlowStore.add (which builds the packed search index)
+# and a full FlowStore.matches pass over every stored flow for needles that
+# hit often, rarely and never.
+#
+# Usage: python benchmarks/bench_search.py [flows]
+
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_common import save_result  # noqa: E402
+from flow_model import Flow, HttpRequest, HttpResponse  # noqa: E402
+from flow_store import FlowStore  # noqa: E402
+
+WORDS = ("user", "name", "value", "items", "status", "created", "region", "price", "page", "results")
+NEEDLES = (("common", "application/json"), ("rare", "needle-0042"), ("missing", "no-such-text-anywhere"))
+
+
+def make_flow(i, rng):
+    url = f"https://api.example.com/v1/{rng.choice(WORDS)}/{rng.randint(1, 10 ** 6)}?page={i % 9}"
+    headers = [("Host", "api.example.com"), ("Accept", "application/json"), ("User-Agent", "bench")]
+    items = [{rng.choice(WORDS): f"{rng.choice(WORDS)} {rng.randint(0, 10 ** 6)}"} for _ in range(rng.randint(5, 60))]
+    if i % 500 == 42:
+        items.append({"marker": f"needle-{i:04d}"})
+    body = json.dumps({"results": items}).encode()
+    response = HttpResponse(200, "OK", [("Content-Type", "application/json")], body)
+    return Flow(str(i), HttpRequest("GET", url, headers, b""), response, float(i))
+
+
+def run(total=20000):
+    rng = random.Random(1)
+    flows = [make_flow(i, rng) for i in range(total)]
+    store = FlowStore()
+    t0 = time.perf_counter()
+    for flow in flows:
+        store.add(flow)
+    metrics = {"store_add_us": (time.perf_counter() - t0) / total * 1e6}
+    for label, needle in NEEDLES:
+        t0 = time.perf_counter()
+        hits = sum(1 for flow in store.flows if store.matches(flow, needle))
+        elapsed = time.perf_counter() - t0
+        metrics[f"search_{label}_ms"] = elapsed * 1000
+        metrics[f"search_{label}_flows_per_s"] = total / elapsed
+        print(f"  '{needle}': {hits} hits")
+    return {"flows": total}, metrics
+
+
+def main():
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    print(f"{total} flows")
+    params, metrics = run(total)
+    for key, value in metrics.items():
+        print(f"  {key:<32} {value:14.1f}")
+    save_result("search", metrics, params)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+# bench_sequencer.py
+#
+# Sequencer analysis time for a sample of random tokens (32 hex characters,
+# like a 128-bit session ID, and 32 base64url characters), with the NumPy
+# backend when NumPy is installed and always with the pure-Python one.
+#
+# Usage: python benchmarks/bench_sequencer.py [tokens]
+
+import os
+import random
+import string
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_common import save_result  # noqa: E402
+import sequencer  # noqa: E402
+
+ALPHABETS = (("hex", "0123456789abcdef"), ("base64", string.ascii_letters + string.digits + "-_"))
+TOKEN_LENGTH = 32
+
+
+def run(total=100000):
+    rng = random.Random(1)
+    backends = ["python"] + (["numpy"] if sequencer.numpy is not None else [])
+    metrics = {}
+    for label, alphabet in ALPHABETS:
+        tokens = ["".join(rng.choice(alphabet) for _ in range(TOKEN_LENGTH)) for _ in range(total)]
+        for backend in backends:
+            t0 = time.perf_counter()
+            report = sequencer.analyze(tokens, use_numpy=backend == "numpy")
+            metrics[f"{label}_{backend}_s"] = time.perf_counter() - t0
+            print(f"  {label} ({backend}): {report['effective_entropy_bits']:.1f} bits effective entropy")
+    return {"tokens": total, "numpy": sequencer.numpy is not None}, metrics
+
+
+def main():
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    print(f"{total} tokens")
+    params, metrics = run(total)
+    for key, value in metrics.items():
+        print(f"  {key:<32} {value:10.2f}")
+    save_result("sequencer", metrics, params)
+
+
+if __name__ == "__main__":
+    main()
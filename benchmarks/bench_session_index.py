@@ -0,0 +1,107 @@
+# bench_session_index.py
+#
+# Cross-session search: indexing a folder of saved sessions (Export All
+# files) into the SQLite index, re-checking it when nothing changed and
+# when one session changed, and searching every session for a rare token,
+# a common word, a prefix and a URL path. Each session has the given
+# number of flows with JSON responses of about 1 KB.
+#
+# Usage: python benchmarks/bench_session_index.py [sessions] [flows per session]
+
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_common import save_result  # noqa: E402
+from session_index import SessionIndex  # noqa: E402
+
+QUERIES = (
+    ("rare_token", "sk_live_7f3a0042"),
+    ("common_word", "application"),
+    ("prefix", "invoice*"),
+    ("url_path", "url:/api/v2/orders"),
+)
+
+
+def make_session(number, flows, rng):
+    items = []
+    for i in range(flows):
+        path = rng.choice(("/api/v2/orders", "/api/v2/users", "/login", "/static/app.js", "/api/v2/invoices"))
+        body = {"id": i, "session": number, "items": [{"sku": f"SKU-{rng.randrange(10 ** 6)}", "qty": n}
+                                                      for n in range(20)]}
+        if number == 7 and i == 42:
+            body["key"] = "sk_live_7f3a0042"
+        items.append({
+            "request": {"id": f"{number}-{i}", "timestamp": "2024-05-01 10:00:00", "method": "GET",
+                        "url": f"https://shop{number}.example.com{path}?page={i}",
+                        "headers": {"Host": f"shop{number}.example.com", "Cookie": f"sid={rng.getrandbits(64):x}"},
+                        "body": ""},
+            "response": {"status": 200, "reason": "OK", "headers": {"Content-Type": "application/json"},
+                         "body": json.dumps(body)},
+        })
+    return {"logger_requests": items, "replay_requests": []}
+
+
+def _timed(func, repeat=1):
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        result = func()
+    return result, (time.perf_counter() - t0) / repeat
+
+
+def run(sessions=300, flows=300):
+    rng = random.Random(1)
+    directory = tempfile.mkdtemp(prefix="anvesha-sessions-")
+    try:
+        folder = os.path.join(directory, "sessions")
+        os.makedirs(folder)
+        for number in range(sessions):
+            with open(os.path.join(folder, f"session-{number:04d}.json"), "w") as f:
+                json.dump(make_session(number, flows, rng), f)
+        index = SessionIndex(os.path.join(directory, "index.sqlite3"))
+        stats, initial = _timed(lambda: index.sync(folder))
+        metrics = {"initial_sync_s": initial, "flows_indexed_per_s": stats["flows"] / initial}
+        _, metrics["noop_sync_ms"] = _timed(lambda: index.sync(folder))
+        metrics["noop_sync_ms"] *= 1000
+        changed = os.path.join(folder, "session-0003.json")
+        with open(changed, "w") as f:
+            json.dump(make_session(3, flows, rng), f)
+        os.utime(changed, (time.time() + 10, time.time() + 10))
+        _, metrics["one_changed_sync_ms"] = _timed(lambda: index.sync(folder))
+        metrics["one_changed_sync_ms"] *= 1000
+        for label, query in QUERIES:
+            hits, elapsed = _timed(lambda: index.search(query), repeat=5)
+            metrics[f"search_{label}_ms"] = elapsed * 1000
+            print(f"  {query!r}: {len(hits)} hits")
+        hit = index.search("sk_live_7f3a0042")[0]
+        _, metrics["open_flow_ms"] = _timed(lambda: index.open_flow(hit))
+        metrics["open_flow_ms"] *= 1000
+        totals = index.stats()
+        metrics["index_mb"] = totals["index_bytes"] / 1048576
+        session_mb = sum(os.path.getsize(os.path.join(folder, n)) for n in os.listdir(folder)) / 1048576
+        print(f"  {totals['sessions']} sessions, {totals['flows']:,} flows, {session_mb:.0f} MB of sessions, "
+              f"{metrics['index_mb']:.0f} MB index")
+        index.close()
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+    return {"sessions": sessions, "flows": flows}, metrics
+
+
+def main():
+    sessions = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    flows = int(sys.argv[2]) if len(sys.argv) > 2 else 300
+    print(f"{sessions} sessions of {flows} flows")
+    params, metrics = run(sessions, flows)
+    for key, value in metrics.items():
+        print(f"  {key:<32} {value:10.2f}")
+    save_result("session_index", metrics, params)
+
+
+if __name__ == "__main__":
+    main()
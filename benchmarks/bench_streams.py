@@ -0,0 +1,73 @@
+# bench_streams.py
+#
+# WebSocket message capture on the UI side: decoding IPC events, applying
+# them to the StreamStore's bounded per-connection logs, and searching
+# every kept message. Messages are JSON text frames of about 200 bytes and
+# binary frames of 1 KB, spread over a few connections.
+#
+# Usage: python benchmarks/bench_streams.py [messages]
+
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_common import save_result  # noqa: E402
+from stream_capture import StreamStore, event_from_ipc, event_to_ipc  # noqa: E402
+
+CONNECTIONS = 4
+
+
+def make_events(total, rng):
+    lines = [json.dumps(event_to_ipc({"type": "websocket_start", "id": f"ws-{c}", "kind": "websocket",
+                                      "url": f"wss://example.com/socket/{c}", "timestamp": 0.0}))
+             for c in range(CONNECTIONS)]
+    for i in range(total):
+        if i % 4 == 3:
+            content = bytes(rng.randrange(256) for _ in range(1024))
+        else:
+            content = json.dumps({"seq": i, "type": "update", "price": rng.random(),
+                                  "symbol": rng.choice(("ABC", "XYZ", "QRS")), "note": "x" * 120}).encode()
+        lines.append(json.dumps(event_to_ipc({
+            "type": "websocket_message", "id": f"ws-{i % CONNECTIONS}", "timestamp": float(i),
+            "from_client": i % 5 == 0, "text": i % 4 != 3, "content": content, "size": len(content),
+        })))
+    return lines
+
+
+def run(total=100000):
+    rng = random.Random(1)
+    lines = make_events(total, rng)
+    store = StreamStore()
+    t0 = time.perf_counter()
+    for line in lines:
+        store.apply(event_from_ipc(json.loads(line)))
+    elapsed = time.perf_counter() - t0
+    stats = store.stats()
+    t0 = time.perf_counter()
+    hits = store.search('"symbol": "xyz"')
+    search = time.perf_counter() - t0
+    print(f"  {stats['messages']:,} messages kept, {stats['dropped']:,} dropped, "
+          f"{stats['stored_bytes'] / 1048576:.1f} MB stored, {sum(len(h) for h in hits.values()):,} search hits")
+    metrics = {
+        "apply_us": elapsed / total * 1e6,
+        "messages_per_s": total / elapsed,
+        "search_ms": search * 1000,
+    }
+    return {"messages": total, "connections": CONNECTIONS}, metrics
+
+
+def main():
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    print(f"{total} messages")
+    params, metrics = run(total)
+    for key, value in metrics.items():
+        print(f"  {key:<32} {value:10.2f}")
+    save_result("streams", metrics, params)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+# mock_ai_server.py
+#
+# Local stand-in for the chat-completions API, for exercising the AI
+# Analyser without an API key or network access. It answers every POST with
+# a canned analysis after a configurable delay and logs the concurrency it
+# sees, so the batch worker cap and rate limit can be checked. Requests with
+# "stream": true get the answer as server-sent events, one word per event,
+# token_ms apart, over chunked transfer encoding like the real API.
+#
+# Usage: python benchmarks/mock_ai_server.py [port] [latency_ms] [token_ms] [repeat]
+# repeat makes the answer that many times longer, for stress-testing the UI.
+# Then set the AI Analyser endpoint to http://127.0.0.1:<port>/chat/completions
+# (any API key is accepted).
+
+import json
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_PORT = 8765
+DEFAULT_LATENCY_MS = 500
+DEFAULT_TOKEN_MS = 20
+
+
+class MockState:
+    def __init__(self, latency, token_delay=DEFAULT_TOKEN_MS / 1000.0, repeat=1):
+        self.latency = latency
+        self.token_delay = token_delay
+        self.repeat = repeat
+        self.requests = 0
+        self.active = 0
+        self.max_active = 0
+        self.lock = threading.Lock()
+
+
+def make_answer(prompt, repeat=1):
+    first_line = prompt.split("HTTP request:", 1)[-1].strip().splitlines()[:1]
+    target = first_line[0] if first_line else "(empty request)"
+    findings = (
+        "- No real model was consulted; this answer comes from mock_ai_server.py.\n"
+        "- Check authentication, input validation and sensitive data exposure.\n"
+    )
+    return f"Mock analysis of: {target}\n\n" + findings * max(1, repeat)
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    state = None
+
+    def handle(self):
+        try:
+            super().handle()
+        except ConnectionResetError:
+            pass  # client dropped a kept-alive connection (e.g. a cancelled stream)
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        try:
+            payload = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            self._send_json(400, {"error": "invalid JSON"})
+            return
+        state = self.state
+        with state.lock:
+            state.requests += 1
+            state.active += 1
+            state.max_active = max(state.max_active, state.active)
+            count, active = state.requests, state.active
+        print(f"[mock] request {count}, {active} in flight (max {state.max_active})", flush=True)
+        try:
+            time.sleep(state.latency)
+            messages = payload.get("messages") or [{}]
+            answer = make_answer(messages[-1].get("content", ""), state.repeat)
+            if payload.get("stream"):
+                self._send_stream(count, answer)
+                return
+            self._send_json(200, {
+                "id": f"mock-{count}",
+                "model": payload.get("model", "mock"),
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": answer}}],
+            })
+        finally:
+            with state.lock:
+                state.active -= 1
+
+    def _send_json(self, status, data):
+        body = json.dumps(data).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_stream(self, count, answer):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        try:
+            self._write_chunk(b": mock stream\n\n")
+            # Split after each space so the pieces join back into the answer.
+            for token in answer.replace(" ", " \0").split("\0"):
+                event = {"id": f"mock-{count}", "choices": [{"index": 0, "delta": {"content": token}}]}
+                self._write_chunk(f"data: {json.dumps(event)}\n\n".encode("utf-8"))
+                time.sleep(self.state.token_delay)
+            self._write_chunk(b"data: [DONE]\n\n")
+            self._write_chunk(b"")
+        except (BrokenPipeError, ConnectionResetError):
+            print(f"[mock] client closed stream {count}", flush=True)
+            self.close_connection = True
+
+    def _write_chunk(self, data):
+        self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+        self.wfile.flush()
+
+    def log_message(self, *args):
+        pass
+
+
+def serve(port=DEFAULT_PORT, latency_ms=DEFAULT_LATENCY_MS, token_ms=DEFAULT_TOKEN_MS, repeat=1):
+    MockHandler.state = MockState(latency_ms / 1000.0, token_ms / 1000.0, repeat)
+    server = ThreadingHTTPServer(("127.0.0.1", port), MockHandler)
+    return server
+
+
+def main():
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_PORT
+    latency_ms = float(sys.argv[2]) if len(sys.argv) > 2 else DEFAULT_LATENCY_MS
+    token_ms = float(sys.argv[3]) if len(sys.argv) > 3 else DEFAULT_TOKEN_MS
+    repeat = int(sys.argv[4]) if len(sys.argv) > 4 else 1
+    server = serve(port, latency_ms, token_ms, repeat)
+    print(f"Mock AI API on http://127.0.0.1:{port}/chat/completions ({latency_ms:.0f} ms per answer)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
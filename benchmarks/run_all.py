@@ -0,0 +1,83 @@
+# run_all.py
+#
+# Runs every benchmark that has a run() entry point, appends the results to
+# benchmarks/results/history.jsonl and compares each metric with the last
+# run of the same benchmark and parameters. Changes for the worse beyond
+# REGRESSION_THRESHOLD are flagged; with --fail-on-regression the exit
+# status is 1 when any are found, for use in CI.
+#
+# Usage: python benchmarks/run_all.py [--quick] [--fail-on-regression] [name ...]
+
+import importlib
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from bench_common import REGRESSION_THRESHOLD, compare, load_history, previous_result, save_result  # noqa: E402
+
+# name -> (module, full-size kwargs, --quick kwargs)
+BENCHMARKS = (
+    ("http_parser", "bench_http_parser", {"number": 2000}, {"number": 200}),
+    ("search", "bench_search", {"total": 20000}, {"total": 2000}),
+    ("api_inventory", "bench_api_inventory", {"total": 50000}, {"total": 5000}),
+    ("secret_matcher", "bench_secret_matcher", {"megabytes": 10}, {"megabytes": 1}),
+    ("bulk_sender", "bench_bulk_sender", {"total": 500}, {"total": 50}),
+    ("bulk_rules", "bench_bulk_rules", {"total": 100000}, {"total": 10000}),
+    ("sequencer", "bench_sequencer", {"total": 100000}, {"total": 10000}),
+    ("flow_columns", "bench_flow_columns", {"total": 1000000}, {"total": 100000}),
+    ("logger_view", "bench_logger_view", {"total": 20000}, {"total": 2000}),
+    ("streams", "bench_streams", {"total": 100000}, {"total": 10000}),
+    ("session_index", "bench_session_index", {"sessions": 300, "flows": 300}, {"sessions": 30, "flows": 100}),
+    ("remote_capture", "bench_remote_capture", {"total": 20000}, {"total": 2000}),
+    ("end_to_end", "bench_end_to_end", {"total": 2000}, {"total": 300}),
+)
+
+_app = None
+
+
+def main():
+    quick = "--quick" in sys.argv
+    wanted = [a for a in sys.argv[1:] if not a.startswith("--")]
+    history = load_history()
+    regressions = []
+    # One QApplication for every Qt benchmark: each run() would otherwise
+    # create its own, and Qt objects kept between them die with the first.
+    global _app
+    from PyQt5.QtWidgets import QApplication
+    _app = QApplication.instance() or QApplication([])
+    for name, module_name, full, small in BENCHMARKS:
+        if wanted and name not in wanted:
+            continue
+        print(f"== {name}")
+        t0 = time.perf_counter()
+        try:
+            params, metrics = importlib.import_module(module_name).run(**(small if quick else full))
+        except Exception as e:
+            print(f"   failed: {e}")
+            continue
+        previous = previous_result(name, params, history)
+        save_result(name, metrics, params)
+        rows = {key: row for key, *row in compare(metrics, previous)}
+        for key, value in metrics.items():
+            line = f"   {key:<32} {value:12.2f}"
+            if key in rows:
+                old, _, change, regressed = rows[key]
+                line += f"   was {old:12.2f} ({change:+.0%})"
+                if regressed:
+                    line += "  REGRESSION"
+                    regressions.append((name, key))
+            print(line)
+        print(f"   ({time.perf_counter() - t0:.1f} s, "
+              f"{'compared with ' + previous['commit'] if previous else 'no previous run'})")
+    if regressions:
+        print(f"{len(regressions)} metric(s) worse by more than {REGRESSION_THRESHOLD:.0%}: "
+              + ", ".join(f"{name}.{key}" for name, key in regressions))
+        if "--fail-on-regression" in sys.argv:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+# body_codec.py
+#
+# Compressed storage for captured bodies. Text-heavy traffic (JSON, HTML,
+# JS) typically shrinks 5-10x, so the logger keeps bodies packed and only
+# unpacks them when a row is viewed, searched or exported.
+#
+# Small bodies are stored as-is: the compressor's framing would eat the
+# gain. Medium bodies use zlib; large ones use zstd when the optional
+# `zstandard` package is installed (faster at a better ratio), zlib at a
+# low level otherwise so ingest stays cheap on the UI thread.
+
+import zlib
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+COMPRESS_MIN_SIZE = 512
+LARGE_BODY_SIZE = 64 * 1024
+ZLIB_LEVEL = 6
+ZLIB_LARGE_LEVEL = 1
+ZSTD_LEVEL = 3
+# Keep the packed form only if it saves at least this fraction.
+MIN_SAVING = 0.1
+
+CODEC_ZLIB = "zlib"
+CODEC_ZSTD = "zstd"
+
+_zstd_compressor = None
+_zstd_decompressor = None
+
+
+def _zstd():
+    global _zstd_compressor, _zstd_decompressor
+    if _zstd_compressor is None:
+        _zstd_compressor = zstandard.ZstdCompressor(level=ZSTD_LEVEL)
+        _zstd_decompressor = zstandard.ZstdDecompressor()
+    return _zstd_compressor, _zstd_decompressor
+
+
+class PackedBytes:
+    """A compressed bytes value; size is the uncompressed length."""
+
+    __slots__ = ("codec", "data", "size")
+
+    def __init__(self, codec, data, size):
+        self.codec = codec
+        self.data = data
+        self.size = size
+
+    def unpack(self, limit=None):
+        """Return the original bytes, or only the first `limit` bytes of them."""
+        if self.codec == CODEC_ZLIB:
+            if limit is not None and limit < self.size:
+                # Stop inflating once the prefix is out; previews stay cheap.
+                return zlib.decompressobj().decompress(self.data, limit)
+            return zlib.decompress(self.data)
+        data = _zstd()[1].decompress(self.data, max_output_size=self.size)
+        return data[:limit] if limit is not None else data
+
+    def __len__(self):
+        return self.size
+
+    def __repr__(self):
+        return f"PackedBytes({self.codec}, {len(self.data)} of {self.size} bytes)"
+
+
+def pack(data):
+    """Compress bytes if worthwhile; returns a PackedBytes or the input unchanged."""
+    size = len(data)
+    if size < COMPRESS_MIN_SIZE:
+        return data
+    if size >= LARGE_BODY_SIZE and zstandard is not None:
+        codec, packed = CODEC_ZSTD, _zstd()[0].compress(data)
+    else:
+        codec = CODEC_ZLIB
+        packed = zlib.compress(data, ZLIB_LARGE_LEVEL if size >= LARGE_BODY_SIZE else ZLIB_LEVEL)
+    if len(packed) > size * (1 - MIN_SAVING):
+        return data  # already compressed (images, gzip passthrough) or random
+    return PackedBytes(codec, packed, size)
+
+
+def unpack(value, limit=None):
+    if isinstance(value, PackedBytes):
+        return value.unpack(limit)
+    return value if limit is None else value[:limit]
+
+
+def stored_size(value):
+    return len(value.data) if isinstance(value, PackedBytes) else len(value)
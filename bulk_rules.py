@@ -0,0 +1,189 @@
+# bulk_rules.py
+#
+# Match and extraction rules for Bulk Sender runs. Rules are parsed and
+# compiled once per run and evaluated on each response inside the send
+# workers (bulksender_widget.BulkRun), so a run keeps one small BulkResult
+# per value (status, length, time, which match rules hit and the extracted
+# values) instead of every response body.
+#
+# Rule syntax, one rule per line (blank lines and lines starting with # are
+# skipped):
+#   match:    text        literal, case-insensitive
+#             /regex/     regex (add i after the closing slash to ignore case)
+#   extract:  [name =] $.json.path[0]     a value from the JSON body
+#             [name =] regex              its first group, or the whole match
+# Match rules search the response headers and body; extract rules the body.
+
+import json
+import re
+
+# Extracted values are cut to this many characters.
+EXTRACT_MAX_CHARS = 200
+_JSON_PATH_STEP = re.compile(r"""\.([^.\[\]]+)|\[(-?\d+)\]|\[(?:'([^']*)'|"([^"]*)")\]""")
+
+
+class RuleError(ValueError):
+    pass
+
+
+def _rule_lines(text):
+    for number, line in enumerate(text.splitlines(), 1):
+        line = line.strip()
+        if line and not line.startswith("#"):
+            yield number, line
+
+
+def _compile(pattern, flags, number):
+    try:
+        return re.compile(pattern.encode("utf-8"), flags)
+    except re.error as e:
+        raise RuleError(f"line {number}: bad regex {pattern!r}: {e}")
+
+
+class MatchRule:
+    __slots__ = ("name", "regex")
+
+    def __init__(self, name, regex):
+        self.name = name
+        # Compiled bytes pattern; literals are escaped and case-insensitive.
+        self.regex = regex
+
+    @classmethod
+    def parse(cls, line, number=1):
+        if len(line) > 2 and line.startswith("/") and (line.endswith("/") or line.endswith("/i")):
+            ignore_case = line.endswith("/i")
+            pattern = line[1:-2] if ignore_case else line[1:-1]
+            return cls(line, _compile(pattern, re.IGNORECASE if ignore_case else 0, number))
+        return cls(line, re.compile(re.escape(line.encode("utf-8")), re.IGNORECASE))
+
+    def search(self, *blobs):
+        return any(self.regex.search(blob) is not None for blob in blobs)
+
+
+class ExtractRule:
+    __slots__ = ("name", "path", "regex")
+
+    def __init__(self, name, path=None, regex=None):
+        self.name = name
+        # Either a JSON path (a list of keys and indexes) or a compiled regex.
+        self.path = path
+        self.regex = regex
+
+    @classmethod
+    def parse(cls, line, number=1):
+        name, sep, expression = line.partition(" = ")
+        if not sep:
+            name, expression = line, line
+        name, expression = name.strip(), expression.strip()
+        if expression.startswith("$"):
+            return cls(name, path=parse_json_path(expression, number))
+        return cls(name, regex=_compile(expression, 0, number))
+
+    def extract(self, body, document=None):
+        """The extracted value as text ("" when absent); document is the parsed JSON body."""
+        if self.path is not None:
+            value = document
+            for step in self.path:
+                try:
+                    value = value[step]
+                except (KeyError, IndexError, TypeError):
+                    return ""
+            if value is None:
+                return ""
+            if not isinstance(value, str):
+                value = json.dumps(value, separators=(",", ":"))
+        else:
+            m = self.regex.search(body)
+            if m is None:
+                return ""
+            value = (m.group(1) if self.regex.groups else m.group(0)) or b""
+            value = value.decode("utf-8", errors="replace")
+        return value[:EXTRACT_MAX_CHARS]
+
+
+def parse_json_path(expression, number=1):
+    """"$.data.items[0]['id']" -> ["data", "items", 0, "id"]."""
+    steps = []
+    rest = expression[1:]
+    while rest:
+        m = _JSON_PATH_STEP.match(rest)
+        if m is None:
+            raise RuleError(f"line {number}: bad JSON path {expression!r}")
+        key, index, quoted, double_quoted = m.groups()
+        if index is not None:
+            steps.append(int(index))
+        else:
+            steps.append(key if key is not None else quoted if quoted is not None else double_quoted)
+        rest = rest[m.end():]
+    return steps
+
+
+class RuleSet:
+    """Match and extract rules of one run, compiled once."""
+
+    def __init__(self, match_rules=(), extract_rules=()):
+        self.match_rules = list(match_rules)
+        self.extract_rules = list(extract_rules)
+        self.needs_json = any(rule.path is not None for rule in self.extract_rules)
+
+    @classmethod
+    def parse(cls, match_text="", extract_text=""):
+        """Build from the editors' text; raises RuleError naming the bad line."""
+        return cls([MatchRule.parse(line, number) for number, line in _rule_lines(match_text)],
+                   [ExtractRule.parse(line, number) for number, line in _rule_lines(extract_text)])
+
+    def __bool__(self):
+        return bool(self.match_rules or self.extract_rules)
+
+    @property
+    def match_names(self):
+        return [rule.name for rule in self.match_rules]
+
+    @property
+    def extract_names(self):
+        return [rule.name for rule in self.extract_rules]
+
+    def evaluate(self, response):
+        """(flags, extracted) for an HttpResponse.
+
+        flags has bit i set when match rule i hit; extracted is a tuple with
+        one string per extract rule.
+        """
+        body = response.body
+        flags = 0
+        if self.match_rules:
+            head = "\r\n".join(f"{k}: {v}" for k, v in response.headers).encode("utf-8", errors="replace")
+            for i, rule in enumerate(self.match_rules):
+                if rule.search(head, body):
+                    flags |= 1 << i
+        if not self.extract_rules:
+            return flags, ()
+        document = None
+        if self.needs_json:
+            try:
+                document = json.loads(body)
+            except ValueError:
+                pass
+        return flags, tuple(rule.extract(body, document) for rule in self.extract_rules)
+
+
+class BulkResult:
+    __slots__ = ("index", "value", "status", "length", "elapsed", "flags", "extracted", "error")
+
+    def __init__(self, index, value, status=None, length=0, elapsed=0.0, flags=0, extracted=(), error=""):
+        # Position of the value in the run.
+        self.index = index
+        self.value = value
+        self.status = status
+        self.length = length
+        self.elapsed = elapsed
+        self.flags = flags
+        self.extracted = extracted
+        self.error = error
+
+    @property
+    def matched(self):
+        return self.flags != 0
+
+    def hit(self, rule_index):
+        return bool(self.flags >> rule_index & 1)
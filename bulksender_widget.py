@@ -1,63 +1,368 @@
 # bulksender_widget.py
 
+import collections
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
 from PyQt5.QtWidgets import (
-    QWidget, QVBoxLayout, QHBoxLayout, QTextEdit, QPushButton, QTableWidget,
-    QTableWidgetItem, QLabel, QLineEdit, QDialog, QDialogButtonBox, QHeaderView, QMessageBox
+    QWidget, QVBoxLayout, QHBoxLayout, QTextEdit, QPushButton, QTableView, QCheckBox, QSpinBox,
+    QLabel, QLineEdit, QDialog, QHeaderView, QAbstractItemView, QMessageBox
 )
-import requests
+from PyQt5.QtCore import Qt, QAbstractTableModel, QModelIndex, QTimer
+from PyQt5.QtGui import QColor
 from urllib.parse import urlparse
+from bulk_rules import BulkResult, RuleError, RuleSet
+from flow_model import HttpResponse
+from http_parser import parse_request_text
+
+SEND_TIMEOUT = 20
+DEFAULT_WORKERS = 8
+MAX_WORKERS = 64
+# How often the results dialog collects finished results from the workers.
+POLL_MS = 200
+MATCH_COLOR = QColor(255, 240, 190)
+
+
+def build_request(template, keyword, value):
+    """Substitute {keyword} with value and parse; returns (request text, request, url)."""
+    req_text = template.replace(f"{{{keyword}}}", value)
+    req = parse_request_text(req_text)
+    url = req.url.strip().strip("'\"[]")  # CLEAN UP URL to fix issues
+    parsed_url = urlparse(url)
+    if not parsed_url.scheme or not parsed_url.netloc:
+        raise Exception(f"Malformed URL: '{url}'")
+    return req_text, req, url
+
+
+def fetch_response(req, url, session=None):
+    """Send one parsed request; returns the HttpResponse."""
+    if session is None:
+        import requests
+        session = requests
+    resp = session.request(req.method, url, headers=req.headers.to_dict(), data=req.body or None,
+                           verify=False, timeout=SEND_TIMEOUT)
+    return HttpResponse(resp.status_code, resp.reason, resp.headers.items(), resp.content)
+
+
+def send_request(req, url, session=None):
+    """Send one parsed request; returns (status code, content length)."""
+    response = fetch_response(req, url, session)
+    return response.status_code, response.body_size
+
+
+class BulkRun:
+    """Sends the template with each value on a thread pool.
+
+    Workers evaluate the rules on each response and queue a BulkResult; the
+    UI collects them with take_results() on a timer, so no per-response
+    signal crosses threads. With keep_responses the responses themselves are
+    kept too (bodies packed), in value order, for the Sequencer.
+    """
+
+    def __init__(self, template, keyword, values, rules=None, workers=DEFAULT_WORKERS, keep_responses=False):
+        self.template = template
+        self.keyword = keyword
+        self.values = values
+        self.rules = rules if rules is not None else RuleSet()
+        self.workers = max(1, min(workers, MAX_WORKERS, len(values) or 1))
+        self.responses = [None] * len(values) if keep_responses else None
+        self.cancel_event = threading.Event()
+        self.sent = 0
+        self.matched = 0
+        self.errors = 0
+        self.started = None
+        self.finished = None
+        self.executor = None
+        # Finished results not yet taken by the UI.
+        self._done = collections.deque()
+        self._indexes = iter(range(len(values)))
+        self._running = 0
+        self._lock = threading.Lock()
+
+    def start(self):
+        self.started = time.perf_counter()
+        self._running = self.workers
+        self.executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="bulk-send")
+        for _ in range(self.workers):
+            self.executor.submit(self._work)
+
+    def _work(self):
+        import requests
+        session = requests.Session()
+        try:
+            while not self.cancel_event.is_set():
+                with self._lock:
+                    index = next(self._indexes, None)
+                if index is None:
+                    break
+                result = self._send(index, session)
+                with self._lock:
+                    self.sent += 1
+                    self.matched += result.matched
+                    self.errors += bool(result.error)
+                self._done.append(result)
+        finally:
+            session.close()
+            with self._lock:
+                self._running -= 1
+                if not self._running:
+                    self.finished = time.perf_counter()
+
+    def _send(self, index, session):
+        value = self.values[index]
+        t0 = time.perf_counter()
+        try:
+            _, req, url = build_request(self.template, self.keyword, value)
+            response = fetch_response(req, url, session)
+            flags, extracted = self.rules.evaluate(response)
+        except Exception as e:
+            return BulkResult(index, value, elapsed=time.perf_counter() - t0, error=str(e))
+        if self.responses is not None:
+            response.pack_body()
+            self.responses[index] = response
+        return BulkResult(index, value, response.status_code, response.body_size, time.perf_counter() - t0,
+                          flags, extracted)
+
+    def take_results(self):
+        """Results finished since the last call, in completion order."""
+        done = self._done
+        return [done.popleft() for _ in range(len(done))]
+
+    @property
+    def done(self):
+        return self.started is not None and self.finished is not None
+
+    @property
+    def rate(self):
+        if self.started is None:
+            return 0.0
+        elapsed = (self.finished or time.perf_counter()) - self.started
+        return self.sent / elapsed if elapsed > 0 else 0.0
+
+    def request_text(self, index):
+        return self.template.replace(f"{{{self.keyword}}}", self.values[index])
+
+    def kept_responses(self):
+        return [r for r in self.responses or () if r is not None]
+
+    def cancel(self):
+        # Requests already on the wire still complete; nothing new is sent.
+        self.cancel_event.set()
+
+    def shutdown(self):
+        self.cancel()
+        if self.executor is not None:
+            self.executor.shutdown(wait=False)
+
+
+class BulkResultsModel(QAbstractTableModel):
+    """Rows are the BulkResults of a run, optionally only those a match rule hit."""
+
+    FIXED = ("#", "Value", "Status", "Length", "Time ms")
+
+    def __init__(self, rules):
+        super().__init__()
+        self.match_count = len(rules.match_rules)
+        self.labels = list(self.FIXED) + rules.match_names + rules.extract_names + ["Error"]
+        self.results = []
+        # The results shown, in display order.
+        self.rows = []
+        self.matched_only = False
+        # (column, Qt.SortOrder) once the view has been sorted.
+        self.sort_by = None
+
+    def _key(self, column):
+        extract_start = len(self.FIXED) + self.match_count
+        if column == 0:
+            return lambda r: r.index
+        if column == 1:
+            return lambda r: r.value
+        if column == 2:
+            return lambda r: (r.status is None, r.status or 0)
+        if column == 3:
+            return lambda r: r.length
+        if column == 4:
+            return lambda r: r.elapsed
+        if column < extract_start:
+            bit = column - len(self.FIXED)
+            return lambda r: r.flags >> bit & 1
+        if column < len(self.labels) - 1:
+            slot = column - extract_start
+            return lambda r: r.extracted[slot] if r.extracted else ""
+        return lambda r: r.error
+
+    def add_results(self, results):
+        self.results.extend(results)
+        shown = [r for r in results if r.matched] if self.matched_only else results
+        if not shown:
+            return
+        if self.sort_by is not None:
+            # Timsort merges the appended run into the sorted rows cheaply.
+            self.layoutAboutToBeChanged.emit()
+            self.rows.extend(shown)
+            self._sort_rows()
+            self.layoutChanged.emit()
+            return
+        self.beginInsertRows(QModelIndex(), len(self.rows), len(self.rows) + len(shown) - 1)
+        self.rows.extend(shown)
+        self.endInsertRows()
+
+    def set_matched_only(self, matched_only):
+        self.beginResetModel()
+        self.matched_only = matched_only
+        self.rows = [r for r in self.results if r.matched] if matched_only else list(self.results)
+        if self.sort_by is not None:
+            self._sort_rows()
+        self.endResetModel()
+
+    def _sort_rows(self):
+        column, order = self.sort_by
+        self.rows.sort(key=self._key(column), reverse=order == Qt.DescendingOrder)
+
+    def sort(self, column, order=Qt.AscendingOrder):
+        self.layoutAboutToBeChanged.emit()
+        self.sort_by = (column, order)
+        self._sort_rows()
+        self.layoutChanged.emit()
+
+    def result(self, row):
+        return self.rows[row] if 0 <= row < len(self.rows) else None
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.labels)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return self.labels[section]
+        return None
+
+    def data(self, index, role=Qt.DisplayRole):
+        result = self.result(index.row())
+        if result is None:
+            return None
+        col = index.column()
+        if role == Qt.DisplayRole:
+            if col == 0:
+                return result.index + 1
+            if col == 1:
+                return result.value
+            if col == 2:
+                return result.status if result.status is not None else "ERR"
+            if col == 3:
+                return result.length
+            if col == 4:
+                return round(result.elapsed * 1000, 1)
+            if col < len(self.FIXED) + self.match_count:
+                return "✓" if result.hit(col - len(self.FIXED)) else ""
+            if col < len(self.labels) - 1:
+                return result.extracted[col - len(self.FIXED) - self.match_count] if result.extracted else ""
+            return result.error
+        if role == Qt.BackgroundRole and result.matched:
+            return MATCH_COLOR
+        return None
 
 
 class BulkSenderResultsDialog(QDialog):
-    def __init__(self, results, parent=None):
+    """Live results of a BulkRun; closing the dialog stops the run."""
+
+    def __init__(self, run, parent=None, on_finished=None):
         super().__init__(parent)
         self.setWindowTitle("Bulk Send Results")
-        self.resize(600, 400)
+        self.resize(900, 500)
         self.parent_widget = parent
+        self.run = run
+        self.on_finished = on_finished
         layout = QVBoxLayout(self)
 
-        self.results_table = QTableWidget(0, 3)
-        self.results_table.setHorizontalHeaderLabels(["Value", "Status", "Content Length"])
-        self.results_table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        top_layout = QHBoxLayout()
+        self.progress_label = QLabel("")
+        top_layout.addWidget(self.progress_label, 1)
+        self.matched_only_checkbox = QCheckBox("Only rows matching a rule")
+        self.matched_only_checkbox.setEnabled(bool(run.rules.match_rules))
+        self.matched_only_checkbox.toggled.connect(lambda checked: self.model.set_matched_only(checked))
+        top_layout.addWidget(self.matched_only_checkbox)
+        layout.addLayout(top_layout)
+
+        self.model = BulkResultsModel(run.rules)
+        self.results_table = QTableView()
+        self.results_table.setModel(self.model)
+        self.results_table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.results_table.setSelectionMode(QAbstractItemView.SingleSelection)
+        self.results_table.verticalHeader().setVisible(False)
+        self.results_table.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
+        self.results_table.setWordWrap(False)
+        self.results_table.horizontalHeader().setStretchLastSection(True)
+        self.results_table.horizontalHeader().setSectionResizeMode(1, QHeaderView.Stretch)
+        # Rows stay in completion order until a header is clicked.
+        self.results_table.horizontalHeader().setSortIndicatorShown(False)
+        self.results_table.horizontalHeader().sectionClicked.connect(self.on_header_clicked)
         layout.addWidget(self.results_table)
 
         btns_layout = QHBoxLayout()
+        self.stop_btn = QPushButton("Stop")
+        self.stop_btn.clicked.connect(self.stop)
         self.send_to_replay_btn = QPushButton("Send Selected to Replay")
         self.send_to_replay_btn.clicked.connect(self.send_selected_to_replay)
         self.close_btn = QPushButton("Close")
         self.close_btn.clicked.connect(self.close)
 
+        btns_layout.addWidget(self.stop_btn)
         btns_layout.addWidget(self.send_to_replay_btn)
         btns_layout.addWidget(self.close_btn)
         layout.addLayout(btns_layout)
 
-        self.results = results
-        self._requests_text = []
-        self.fill_results(results)
-
-    def fill_results(self, results):
-        self.results_table.setRowCount(0)
-        for value, status, length in results:
-            row = self.results_table.rowCount()
-            self.results_table.insertRow(row)
-            self.results_table.setItem(row, 0, QTableWidgetItem(value))
-            self.results_table.setItem(row, 1, QTableWidgetItem(str(status)))
-            self.results_table.setItem(row, 2, QTableWidgetItem(str(length)))
-
-    def set_requests_text(self, requests_text):
-        """
-        Store the list of request texts corresponding to the results in order,
-        so that selected request can be forwarded to Replay tab.
-        """
-        self._requests_text = requests_text
+        # Closed (or Escape): nothing more is sent; the results already in stay.
+        self.finished.connect(lambda _: self.run.cancel())
+        self.poll_timer = QTimer(self)
+        self.poll_timer.timeout.connect(self.poll)
+        self.poll_timer.start(POLL_MS)
+        self.update_progress()
+
+    def on_header_clicked(self, column):
+        header = self.results_table.horizontalHeader()
+        current = self.model.sort_by
+        order = Qt.DescendingOrder if current == (column, Qt.AscendingOrder) else Qt.AscendingOrder
+        header.setSortIndicatorShown(True)
+        header.setSortIndicator(column, order)
+        self.model.sort(column, order)
+
+    def poll(self):
+        results = self.run.take_results()
+        if results:
+            self.model.add_results(results)
+        self.update_progress()
+        if self.run.done:
+            self.poll_timer.stop()
+            self.model.add_results(self.run.take_results())
+            self.stop_btn.setEnabled(False)
+            self.update_progress()
+            if self.on_finished is not None:
+                self.on_finished(self.run)
+
+    def update_progress(self):
+        run = self.run
+        total = len(run.values)
+        state = "stopped" if run.cancel_event.is_set() else "done" if run.done else f"{run.workers} workers"
+        text = f"Sent {run.sent:,} of {total:,} ({state}, {run.rate:.0f} req/s) | {run.errors:,} errors"
+        if run.rules.match_rules:
+            text += f" | {run.matched:,} matched"
+        self.progress_label.setText(text)
+
+    def stop(self):
+        self.run.cancel()
+        self.stop_btn.setEnabled(False)
 
     def send_selected_to_replay(self):
-        row = self.results_table.currentRow()
-        if row < 0 or row >= len(self._requests_text):
+        result = self.model.result(self.results_table.currentIndex().row())
+        if result is None:
             QMessageBox.information(self, "No Selection", "Please select a request to send.")
             return
 
-        req_text = self._requests_text[row]
+        req_text = self.run.request_text(result.index)
 
         # Find Replay tab widget in parent main window
         main_win = None
@@ -72,22 +377,8 @@ class BulkSenderResultsDialog(QDialog):
             QMessageBox.warning(self, "Error", "Could not find main window to send request to Replay tab.")
             return
 
-        replay_tab = None
-        for i in range(main_win.tabs.count()):
-            widget = main_win.tabs.widget(i)
-            if widget and widget.__class__.__name__ == 'ReplayWidget':
-                replay_tab = widget
-                break
-
-        if not replay_tab:
-            QMessageBox.warning(self, "Error", "Could not find Replay tab to send request.")
-            return
-
-        replay_tab.add_new_tab(req_text)
-
-        index = main_win.tabs.indexOf(replay_tab)
-        if index != -1:
-            main_win.tabs.setCurrentIndex(index)
+        # show_tab builds the Replay tab if it has not been opened yet.
+        main_win.show_tab("replay").add_new_tab(req_text)
 
 
 class BulkSenderWidget(QWidget):
@@ -123,8 +414,24 @@ class BulkSenderWidget(QWidget):
         bottom_layout.addLayout(values_layout, 3)
         bottom_layout.addLayout(keyword_layout, 1)
 
+        # Section 4: match and extract rules, evaluated on each response by the send workers
+        rules_layout = QHBoxLayout()
+        match_layout = QVBoxLayout()
+        match_layout.addWidget(QLabel("Match rules (one per line: text, or /regex/ or /regex/i):"))
+        self.match_rules_input = QTextEdit()
+        self.match_rules_input.setPlaceholderText("SQL syntax\n/ORA-\\d{5}/\n/stack ?trace/i")
+        match_layout.addWidget(self.match_rules_input)
+        extract_layout = QVBoxLayout()
+        extract_layout.addWidget(QLabel("Extract rules (one per line: [name =] $.json.path or regex):"))
+        self.extract_rules_input = QTextEdit()
+        self.extract_rules_input.setPlaceholderText("user = $.data.user.id\ncsrf = name=\"csrf\" value=\"([^\"]+)\"")
+        extract_layout.addWidget(self.extract_rules_input)
+        rules_layout.addLayout(match_layout)
+        rules_layout.addLayout(extract_layout)
+
         main_layout.addLayout(req_layout)
         main_layout.addLayout(bottom_layout)
+        main_layout.addLayout(rules_layout)
 
         # Send and Send to Replay buttons
         btn_layout = QHBoxLayout()
@@ -132,13 +439,32 @@ class BulkSenderWidget(QWidget):
         self.send_btn.clicked.connect(self.send_bulk)
         self.send_replay_btn = QPushButton("Send Bulk to Replay")
         self.send_replay_btn.clicked.connect(self.send_bulk_to_replay)
+        self.send_sequencer_btn = QPushButton("Send Responses to Sequencer")
+        self.send_sequencer_btn.setToolTip("Analyse a token (e.g. a session cookie) from every response of the last run")
+        self.send_sequencer_btn.clicked.connect(self.send_responses_to_sequencer)
+        btn_layout.addWidget(QLabel("Workers:"))
+        self.workers_input = QSpinBox()
+        self.workers_input.setRange(1, MAX_WORKERS)
+        self.workers_input.setValue(DEFAULT_WORKERS)
+        btn_layout.addWidget(self.workers_input)
+        self.keep_responses_checkbox = QCheckBox("Keep responses for Sequencer")
+        self.keep_responses_checkbox.setChecked(True)
+        self.keep_responses_checkbox.setToolTip("Uncheck for large runs: only the status, length and rule results of "
+                                                "each response are kept")
+        btn_layout.addWidget(self.keep_responses_checkbox)
         btn_layout.addWidget(self.send_btn)
         btn_layout.addWidget(self.send_replay_btn)
+        btn_layout.addWidget(self.send_sequencer_btn)
 
         main_layout.addLayout(btn_layout)
 
         # Store last sent requests with their values for sending to replay
+        # (a run's requests are rebuilt from its template when needed)
         self.last_sent_requests = []
+        self.last_run = None
+        self.results_dialog = None
+        # Responses of the last run, for the Sequencer
+        self.last_responses = []
 
     def send_bulk(self):
         template = self.req_editor.toPlainText()
@@ -155,52 +481,36 @@ class BulkSenderWidget(QWidget):
             QMessageBox.warning(self, "Input Error", "Please enter at least one value.")
             return
 
-        results = []
-        sent_requests = []
-
-        for value in values:
-            req_text = template.replace(f"{{{keyword}}}", value)
-            try:
-                lines = [l for l in req_text.strip().splitlines() if l.strip()]
-                if not lines:
-                    raise Exception("Empty request text")
-                first_line = lines[0].strip()
-                parts = first_line.split()
-                if len(parts) < 2:
-                    raise Exception(f"Malformed request line: '{first_line}'")
-                method, url = parts[0], parts[1]
-                url = url.strip().strip("'\"[]")  # CLEAN UP URL to fix issues
-
-                parsed_url = urlparse(url)
-                if not parsed_url.scheme or not parsed_url.netloc:
-                    raise Exception(f"Malformed URL: '{url}'")
-
-                headers = {}
-                body_lines = []
-                in_headers = True
-                for line in lines[1:]:
-                    if in_headers and ':' in line:
-                        k, v = line.split(':', 1)
-                        headers[k.strip()] = v.strip()
-                    else:
-                        in_headers = False
-                        body_lines.append(line)
-                body = '\n'.join(body_lines).strip() or None
-
-                resp = requests.request(method, url, headers=headers, data=body, verify=False, timeout=20)
-                results.append((value, resp.status_code, len(resp.content)))
-                sent_requests.append(req_text)
-            except Exception as e:
-                results.append((value, "ERR", str(e)))
-                sent_requests.append(req_text)
-
-        self.last_sent_requests = sent_requests
-
-        dlg = BulkSenderResultsDialog(results, self)
-        dlg.set_requests_text(sent_requests)
-        dlg.exec_()
+        try:
+            rules = RuleSet.parse(self.match_rules_input.toPlainText(), self.extract_rules_input.toPlainText())
+        except RuleError as e:
+            QMessageBox.warning(self, "Rule Error", str(e))
+            return
+
+        if self.last_run is not None and not self.last_run.done:
+            if QMessageBox.question(self, "Run in Progress", "Stop the current run and start a new one?") \
+                    != QMessageBox.Yes:
+                return
+            self.last_run.cancel()
+
+        run = BulkRun(template, keyword, values, rules, self.workers_input.value(),
+                      self.keep_responses_checkbox.isChecked())
+        self.last_run = run
+        self.last_sent_requests = []
+        self.last_responses = []
+        self.results_dialog = BulkSenderResultsDialog(run, self, self.on_run_finished)
+        run.start()
+        self.results_dialog.show()
+
+    def on_run_finished(self, run):
+        run.shutdown()
+        if run is self.last_run:
+            self.last_responses = run.kept_responses()
 
     def send_bulk_to_replay(self):
+        run = self.last_run
+        if run is not None:
+            self.last_sent_requests = [run.request_text(i) for i in range(len(run.values))]
         if not self.last_sent_requests:
             QMessageBox.information(self, "No Requests Sent", "Please send bulk requests first before sending to Replay.")
             return
@@ -213,26 +523,29 @@ class BulkSenderWidget(QWidget):
             QMessageBox.warning(self, "Replay Tab Not Found", "Could not find main window to send requests.")
             return
 
-        replay_tab = None
-        for i in range(main_win.tabs.count()):
-            widget = main_win.tabs.widget(i)
-            if widget and widget.__class__.__name__ == 'ReplayWidget':
-                replay_tab = widget
-                break
+        replay_tab = main_win.show_tab("replay")
+        for req_text in self.last_sent_requests:
+            replay_tab.add_new_tab(req_text)
 
-        if not replay_tab:
-            QMessageBox.warning(self, "Replay Tab Not Found", "Could not find Replay tab to send requests.")
+    def send_responses_to_sequencer(self):
+        if not self.last_responses:
+            QMessageBox.information(self, "No Responses", "Please send bulk requests first before sending to the Sequencer.")
             return
 
-        for req_text in self.last_sent_requests:
-            replay_tab.add_new_tab(req_text)
+        main_win = self.parent()
+        while main_win and not hasattr(main_win, 'tabs'):
+            main_win = main_win.parent()
+
+        if not main_win:
+            QMessageBox.warning(self, "Sequencer Tab Not Found", "Could not find main window to send responses.")
+            return
 
-        index = main_win.tabs.indexOf(replay_tab)
-        if index != -1:
-            main_win.tabs.setCurrentIndex(index)
+        main_win.show_tab("sequencer").add_responses(self.last_responses)
 
-    def add_request(self, req_text):
+    def add_request(self, req):
+        req_text = req if isinstance(req, str) else req.text
         self.req_editor.setPlainText(req_text)
         self.values_input.clear()
         self.keyword_input.clear()
+        self.last_run = None
         self.last_sent_requests = [req_text]
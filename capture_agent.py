@@ -0,0 +1,299 @@
+# capture_agent.py
+#
+# Headless capture agent: runs the mitmdump workers (with the usual IPC
+# addon) on a machine near the target and streams their flows to a desktop
+# running Anvesha with the "Remote agent" proxy backend. See
+# remote_capture.py for the protocol, batching and spooling.
+#
+# Usage: python capture_agent.py [--listen HOST:PORT] [--token TOKEN]
+#            [--proxy-host HOST] [--proxy-port PORT] [--workers N]
+#            [--spool DIR] [--max-spool-mb MB] [--no-proxy] [-- mitmdump args]
+#
+# The agent listens on 127.0.0.1 by default, for an SSH tunnel
+# (ssh -L 7878:127.0.0.1:7878 server). Listening on another address needs
+# a token (--token or ANVESHA_AGENT_TOKEN), which the desktop must send.
+# With --no-proxy no mitmdump is started and anything written to the agent
+# socket (--socket) is forwarded, which is how the benchmark feeds it.
+
+import argparse
+import hmac
+import json
+import os
+import signal
+import socket
+import sys
+import threading
+import time
+
+from remote_capture import (
+    ACK, AGENT_SOCKET_PATH, AGENT_SPOOL_DIR, BATCH, BATCH_DELAY, BATCH_MAX_BYTES, DEFAULT_AGENT_PORT, HELLO,
+    PROTOCOL_VERSION, READ_TIMEOUT, SCOPE, SPOOL_MAX_BYTES, STATUS, STATUS_INTERVAL, WELCOME, DiskSpool,
+    ProtocolError, pack_batch, read_frame, send_frame, send_json,
+)
+from scope_rules import ScopeRules, save_rules
+
+LOOPBACK = ("127.0.0.1", "::1", "localhost")
+
+
+class CaptureAgent:
+    """Collects addon messages, spools them in batches and serves one desktop at a time."""
+
+    def __init__(self, host="127.0.0.1", port=DEFAULT_AGENT_PORT, token="", spool_dir=AGENT_SPOOL_DIR,
+                 socket_path=AGENT_SOCKET_PATH, max_spool_bytes=SPOOL_MAX_BYTES):
+        self.host = host
+        self.port = port
+        self.token = token
+        self.socket_path = socket_path
+        self.spool = DiskSpool(spool_dir, max_spool_bytes)
+        self.workers = []
+        self.messages_received = 0
+        self.started = time.monotonic()
+        # Addon lines waiting to be sealed into a batch.
+        self._pending = []
+        self._pending_bytes = 0
+        self._pending_lock = threading.Lock()
+        # Keeps batches in order when flush() is called besides the batcher.
+        self._flush_lock = threading.Lock()
+        self._batch_ready = threading.Event()
+        self._stop_event = threading.Event()
+        self._client = None
+        self._ipc_server = None
+        self._tcp_server = None
+
+    # --- collecting ----------------------------------------------------------
+
+    def start(self):
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+        self._ipc_server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._ipc_server.bind(self.socket_path)
+        self._ipc_server.listen(64)
+        family = socket.AF_INET6 if ":" in self.host else socket.AF_INET
+        self._tcp_server = socket.create_server((self.host, self.port), family=family)
+        # The port actually bound, for port 0.
+        self.port = self._tcp_server.getsockname()[1]
+        for target, name in ((self._receive, "agent-ipc"), (self._batch_loop, "agent-batcher"),
+                             (self._accept_loop, "agent-server")):
+            threading.Thread(target=target, daemon=True, name=name).start()
+        print(f"[CaptureAgent] serving on {self.host}:{self.port}, spool {self.spool.directory} "
+              f"(messages {self.spool.first_seq}-{self.spool.next_seq})")
+
+    def start_proxy(self, host, port, workers=1, extra_args=()):
+        # Imported here so --no-proxy runs without the supervisor's dependencies.
+        from proxy_runner import ProxyWorker
+        self.workers = [ProxyWorker(i, host, port + i, extra_args, socket_path=self.socket_path)
+                        for i in range(workers)]
+        for worker in self.workers:
+            worker.start()
+
+    def _receive(self):
+        # The addon opens one connection per message.
+        while not self._stop_event.is_set():
+            try:
+                conn, _ = self._ipc_server.accept()
+            except OSError:
+                break
+            with conn:
+                chunks = []
+                while True:
+                    chunk = conn.recv(65536)
+                    if not chunk:
+                        break
+                    chunks.append(chunk)
+            lines = [line for line in b"".join(chunks).split(b"\n") if line]
+            if not lines:
+                continue
+            with self._pending_lock:
+                self._pending.extend(lines)
+                self._pending_bytes += sum(len(line) for line in lines)
+                self.messages_received += len(lines)
+                full = self._pending_bytes >= BATCH_MAX_BYTES
+            if full:
+                self._batch_ready.set()
+
+    def _batch_loop(self):
+        while not self._stop_event.is_set():
+            self._batch_ready.wait(BATCH_DELAY)
+            self._batch_ready.clear()
+            self.flush()
+
+    def flush(self):
+        """Seal the pending messages into a batch and spool it."""
+        with self._flush_lock:
+            with self._pending_lock:
+                lines, self._pending = self._pending, []
+                self._pending_bytes = 0
+            # A burst can leave more than one batch's worth pending.
+            start = size = 0
+            for end, line in enumerate(lines, 1):
+                size += len(line)
+                if size >= BATCH_MAX_BYTES or end == len(lines):
+                    codec, payload = pack_batch(lines[start:end])
+                    self.spool.append(end - start, codec, payload)
+                    start, size = end, 0
+
+    # --- serving -------------------------------------------------------------
+
+    def _accept_loop(self):
+        while not self._stop_event.is_set():
+            try:
+                conn, address = self._tcp_server.accept()
+            except OSError:
+                break
+            threading.Thread(target=self._serve, args=(conn, address), daemon=True, name="agent-client").start()
+
+    def _serve(self, conn, address):
+        with conn:
+            try:
+                conn.settimeout(READ_TIMEOUT)
+                conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+                kind, _, _, _, payload = read_frame(conn)
+                hello = json.loads(payload) if kind == HELLO else {}
+                if kind != HELLO or hello.get("version") != PROTOCOL_VERSION:
+                    send_json(conn, WELCOME, {"error": f"unsupported client (protocol {PROTOCOL_VERSION})"})
+                    return
+                if self.token and not hmac.compare_digest(str(hello.get("token", "")).encode(),
+                                                          self.token.encode()):
+                    print(f"[CaptureAgent] {address[0]}: bad token")
+                    send_json(conn, WELCOME, {"error": "bad agent token"})
+                    return
+                # The newest desktop wins; the previous connection is closed.
+                previous, self._client = self._client, conn
+                if previous is not None:
+                    _close(previous)
+                self._stream(conn, address, hello)
+            except (OSError, ProtocolError, ValueError) as e:
+                if self._client is conn:
+                    print(f"[CaptureAgent] {address[0]} disconnected: {e}")
+            finally:
+                if self._client is conn:
+                    self._client = None
+
+    def _stream(self, conn, address, hello):
+        spool = self.spool
+        reset = hello.get("spool_id") != spool.spool_id
+        # A desktop that knows another spool (or none) starts from the oldest message kept.
+        resume = spool.first_seq if reset else max(0, int(hello.get("resume_from", 0)))
+        first = spool.first_seq
+        send_json(conn, WELCOME, {
+            "version": PROTOCOL_VERSION, "spool_id": spool.spool_id, "reset": reset,
+            "first_seq": first, "next_seq": spool.next_seq, "lost": max(0, first - resume),
+        })
+        print(f"[CaptureAgent] {address[0]} connected, sending from message {max(resume, first)} "
+              f"of {spool.next_seq}")
+        threading.Thread(target=self._read_acks, args=(conn,), daemon=True, name="agent-acks").start()
+        next_seq = resume
+        last_status = 0.0
+        while self._client is conn:
+            for seq, count, codec, payload in spool.read_from(next_seq):
+                if seq + count <= next_seq:
+                    continue
+                send_frame(conn, BATCH, payload, seq=seq, count=count, codec=codec)
+                next_seq = seq + count
+            now = time.monotonic()
+            if now - last_status >= STATUS_INTERVAL:
+                send_json(conn, STATUS, self.status())
+                last_status = now
+            with spool.cond:
+                spool.cond.wait_for(lambda: spool.next_seq > next_seq or self._client is not conn,
+                                    timeout=STATUS_INTERVAL)
+
+    def _read_acks(self, conn):
+        try:
+            while self._client is conn:
+                kind, _, _, seq, payload = read_frame(conn)
+                if kind == ACK:
+                    self.spool.trim(seq)
+                elif kind == SCOPE:
+                    # The workers' RulesFile picks this up on its next check.
+                    save_rules(ScopeRules.from_dict(json.loads(payload)))
+        except (OSError, ProtocolError, ValueError):
+            pass
+        if self._client is conn:
+            self._client = None
+            _close(conn)
+        with self.spool.cond:
+            self.spool.cond.notify_all()
+
+    def status(self):
+        spool = self.spool
+        return {
+            "workers": [worker.stats() for worker in self.workers],
+            "messages_received": self.messages_received,
+            "next_seq": spool.next_seq,
+            "first_seq": spool.first_seq,
+            "spool_bytes": spool.size,
+            "dropped": spool.dropped,
+            "uptime": time.monotonic() - self.started,
+        }
+
+    def stop(self):
+        self._stop_event.set()
+        for worker in self.workers:
+            worker.stop()
+        self.flush()
+        for server in (self._ipc_server, self._tcp_server):
+            if server is not None:
+                # Wakes the accept() threads, which hold the socket open otherwise.
+                _close(server)
+        if self._client is not None:
+            _close(self._client)
+            self._client = None
+        try:
+            os.unlink(self.socket_path)
+        except OSError:
+            pass
+        self.spool.close()
+
+
+def _close(conn):
+    try:
+        conn.shutdown(socket.SHUT_RDWR)
+    except OSError:
+        pass
+    conn.close()
+
+
+def parse_address(text, default_port=DEFAULT_AGENT_PORT):
+    host, sep, port = text.rpartition(":")
+    if not sep:
+        return text, default_port
+    return host.strip("[]") or "127.0.0.1", int(port)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Headless Anvesha capture agent")
+    parser.add_argument("--listen", default=f"127.0.0.1:{DEFAULT_AGENT_PORT}",
+                        help="address the desktop connects to (default %(default)s)")
+    parser.add_argument("--token", default=os.environ.get("ANVESHA_AGENT_TOKEN", ""),
+                        help="shared secret the desktop must send (default $ANVESHA_AGENT_TOKEN)")
+    parser.add_argument("--proxy-host", default="0.0.0.0")
+    parser.add_argument("--proxy-port", type=int, default=8080)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--spool", default=AGENT_SPOOL_DIR, help="spool directory (default %(default)s)")
+    parser.add_argument("--max-spool-mb", type=int, default=SPOOL_MAX_BYTES // 1048576)
+    parser.add_argument("--socket", default=AGENT_SOCKET_PATH, help="IPC socket the addon writes to")
+    parser.add_argument("--no-proxy", action="store_true", help="do not start mitmdump")
+    parser.add_argument("mitmdump_args", nargs="*", help="extra mitmdump arguments, after --")
+    args = parser.parse_args(argv)
+
+    host, port = parse_address(args.listen)
+    if host not in LOOPBACK and not args.token:
+        parser.error("listening on a non-loopback address needs --token (or use an SSH tunnel)")
+    agent = CaptureAgent(host, port, args.token, args.spool, args.socket, args.max_spool_mb * 1048576)
+    agent.start()
+    if not args.no_proxy:
+        agent.start_proxy(args.proxy_host, args.proxy_port, max(1, args.workers), args.mitmdump_args)
+    stopped = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stopped.set())
+    try:
+        while not stopped.wait(1.0):
+            pass
+    except KeyboardInterrupt:
+        pass
+    print("[CaptureAgent] stopping")
+    agent.stop()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,86 @@
+# capture_hooks.py
+#
+# The mitmproxy hooks shared by both proxy backends: capture scope, the
+# health-check reply, streamed (SSE, gRPC-web...) responses, WebSocket
+# events and the error hook. mitmproxy_addon_ipc.py wraps them for the
+# subprocess backend and sends what they produce over the IPC socket;
+# proxy_engine.py wraps them for the in-process backend and hands Flow
+# objects straight to the UI. Only the response hook differs: it ends in
+# the wrapper's deliver_flow(flow, rules, recorder).
+#
+# mitmproxy is imported only when a health check is answered, so this
+# module loads without it.
+
+from stream_capture import (
+    StreamRecorder, stream_kind, websocket_end_event, websocket_message_event, websocket_start_event
+)
+
+# Answered locally for ProxyRunner's health checks.
+HEALTH_CHECK_HOST = "anvesha.health"
+# flow.metadata key marking flows that are proxied but not sent to the UI.
+OUT_OF_SCOPE = "anvesha_out_of_scope"
+
+
+class CaptureHooks:
+    """mitmproxy addon; rules() returns the current ScopeRules."""
+
+    def __init__(self, deliver_flow, deliver_event, rules, worker=0):
+        # deliver_flow(mitmproxy flow, rules, StreamRecorder or None) for in-scope responses.
+        self.deliver_flow = deliver_flow
+        self.deliver_event = deliver_event
+        self.rules = rules
+        self.worker = worker
+        # flow id -> StreamRecorder of a response being streamed to the client.
+        self.streams = {}
+
+    def requestheaders(self, flow):
+        host = flow.request.pretty_host
+        if host != HEALTH_CHECK_HOST and not self.rules().host_in_scope(host):
+            flow.metadata[OUT_OF_SCOPE] = True
+            flow.request.stream = True
+
+    def request(self, flow):
+        if flow.request.pretty_host == HEALTH_CHECK_HOST:
+            from mitmproxy import http
+            flow.response = http.Response.make(200, b"ok", {"Content-Type": "text/plain"})
+
+    def responseheaders(self, flow):
+        if not flow.metadata.get(OUT_OF_SCOPE):
+            rules = self.rules()
+            content_type = flow.response.headers.get("content-type", "")
+            if rules.content_type_in_scope(content_type):
+                kind = stream_kind(content_type)
+                if kind:
+                    # Relayed and recorded chunk by chunk, never buffered whole.
+                    flow.response.stream = self.streams[flow.id] = StreamRecorder(
+                        flow, kind, self.deliver_event, rules, self.worker)
+                return
+            flow.metadata[OUT_OF_SCOPE] = True
+        # Out-of-scope bodies are passed through without being buffered.
+        flow.response.stream = True
+
+    def error(self, flow):
+        recorder = self.streams.pop(flow.id, None)
+        if recorder is not None:
+            recorder.end(str(flow.error))
+
+    def websocket_start(self, flow):
+        if not flow.metadata.get(OUT_OF_SCOPE):
+            self.deliver_event(websocket_start_event(flow, self.worker))
+
+    def websocket_message(self, flow):
+        if not flow.metadata.get(OUT_OF_SCOPE):
+            self.deliver_event(websocket_message_event(flow, self.rules()))
+
+    def websocket_end(self, flow):
+        if not flow.metadata.get(OUT_OF_SCOPE):
+            self.deliver_event(websocket_end_event(flow))
+
+    def response(self, flow):
+        if flow.request.pretty_host == HEALTH_CHECK_HOST or flow.metadata.get(OUT_OF_SCOPE):
+            return
+        recorder = self.streams.pop(flow.id, None)
+        if recorder is not None:
+            # The body went out as stream_chunk events; the flow only records its size.
+            recorder.end()
+        self.deliver_flow(flow, self.rules(), recorder)
@@ -0,0 +1,154 @@
+# dashboard_widget.py
+#
+# Traffic dashboard: statistics over every captured flow, computed from the
+# logger's column store (flow_columns.py) while the tab is visible. Shows a
+# summary line, per-host throughput and latency, status classes and
+# methods, the response size distribution and errors over time.
+
+import time
+from datetime import datetime
+
+from PyQt5.QtWidgets import (
+    QWidget, QVBoxLayout, QHBoxLayout, QLabel, QComboBox, QPushButton, QTableWidget, QTableWidgetItem,
+    QHeaderView, QAbstractItemView, QSplitter
+)
+from PyQt5.QtCore import Qt
+
+from flow_columns import TIME_BUCKET_SECONDS, numpy
+
+
+def _number_item(value):
+    # DisplayRole numbers sort numerically when the table is sorted.
+    item = QTableWidgetItem()
+    item.setData(Qt.DisplayRole, value)
+    return item
+
+
+def _table(labels, stretch=0):
+    table = QTableWidget(0, len(labels))
+    table.setHorizontalHeaderLabels(labels)
+    table.horizontalHeader().setSectionResizeMode(stretch, QHeaderView.Stretch)
+    table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+    table.verticalHeader().setVisible(False)
+    return table
+
+
+def _fill(table, rows):
+    sorting = table.isSortingEnabled()
+    table.setSortingEnabled(False)
+    table.setRowCount(len(rows))
+    for row, cells in enumerate(rows):
+        for col, value in enumerate(cells):
+            table.setItem(row, col, QTableWidgetItem(value) if isinstance(value, str) else _number_item(value))
+    table.setSortingEnabled(sorting)
+
+
+def _bucket_label(seconds):
+    if seconds % 3600 == 0:
+        return f"{seconds // 3600} h"
+    if seconds % 60 == 0:
+        return f"{seconds // 60} min"
+    return f"{seconds} s"
+
+
+class DashboardWidget(QWidget):
+    def __init__(self, get_columns):
+        super().__init__()
+        self.get_columns = get_columns
+        # (flow count, bucket) at the last refresh; nothing is recomputed until it changes.
+        self.shown = None
+        layout = QVBoxLayout(self)
+
+        top_layout = QHBoxLayout()
+        self.summary_label = QLabel("No flows yet")
+        self.summary_label.setWordWrap(True)
+        top_layout.addWidget(self.summary_label, 1)
+        top_layout.addWidget(QLabel("Error buckets:"))
+        self.bucket_combo = QComboBox()
+        self.bucket_combo.addItem("Auto", None)
+        for seconds in TIME_BUCKET_SECONDS:
+            self.bucket_combo.addItem(_bucket_label(seconds), seconds)
+        self.bucket_combo.currentIndexChanged.connect(self.force_refresh)
+        top_layout.addWidget(self.bucket_combo)
+        refresh_btn = QPushButton("Refresh")
+        refresh_btn.clicked.connect(self.force_refresh)
+        top_layout.addWidget(refresh_btn)
+        layout.addLayout(top_layout)
+
+        self.host_table = _table(["Host", "Flows", "Errors", "Error %", "Sent KB", "Received KB", "Flows/s",
+                                  "KB/s", "Mean ms", "p95 ms"])
+        self.host_table.setSortingEnabled(True)
+        self.host_table.sortByColumn(1, Qt.DescendingOrder)
+        self.status_table = _table(["Status / Method", "Flows", "%"])
+        self.size_table = _table(["Response Size", "Responses", "Total KB"])
+        self.time_table = _table(["Interval Start", "Flows", "4xx", "5xx", "Error %"])
+
+        lower = QSplitter(Qt.Horizontal)
+        lower.addWidget(self.status_table)
+        lower.addWidget(self.size_table)
+        lower.addWidget(self.time_table)
+        splitter = QSplitter(Qt.Vertical)
+        splitter.addWidget(self.host_table)
+        splitter.addWidget(lower)
+        layout.addWidget(splitter)
+
+        self.timing_label = QLabel("")
+        layout.addWidget(self.timing_label)
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        self.refresh()
+
+    def force_refresh(self, *args):
+        self.shown = None
+        self.refresh()
+
+    def refresh(self):
+        if not self.isVisible():
+            return
+        columns = self.get_columns()
+        bucket = self.bucket_combo.currentData()
+        if self.shown == (len(columns), bucket):
+            return
+        self.shown = (len(columns), bucket)
+        start = time.perf_counter()
+        summary = columns.summary()
+        hosts = columns.host_stats()
+        statuses = columns.status_classes()
+        methods = columns.method_counts()
+        sizes = columns.size_distribution()
+        bucket_seconds, series = columns.time_series(bucket)
+        elapsed = time.perf_counter() - start
+
+        n = summary["flows"]
+        if not n:
+            self.summary_label.setText("No flows yet")
+        else:
+            self.summary_label.setText(
+                f"{n:,} flows to {summary['hosts']} hosts over {summary['span_seconds']:.0f} s "
+                f"({summary['flows_per_second']:.1f}/s) | errors {summary['errors']:,} "
+                f"({summary['error_rate'] * 100:.1f}%), no response {summary['no_response']:,} | "
+                f"sent {summary['request_bytes'] / 1048576:.1f} MB, received {summary['response_bytes'] / 1048576:.1f} MB | "
+                f"latency p50 {summary['duration_p50'] * 1000:.0f} ms, p95 {summary['duration_p95'] * 1000:.0f} ms, "
+                f"max {summary['duration_max'] * 1000:.0f} ms | "
+                f"response size p50 {summary['response_size_p50']:.0f} B, p95 {summary['response_size_p95']:.0f} B"
+            )
+        _fill(self.host_table, [
+            [h["host"], h["flows"], h["errors"], round(h["error_rate"] * 100, 1),
+             round(h["request_bytes"] / 1024, 1), round(h["response_bytes"] / 1024, 1),
+             round(h["flows_per_second"], 2), round(h["bytes_per_second"] / 1024, 1),
+             round(h["duration_mean"] * 1000, 1), round(h["duration_p95"] * 1000, 1)]
+            for h in hosts
+        ])
+        _fill(self.status_table, [[label, count, round(count * 100 / n, 1) if n else 0.0]
+                                  for label, count in statuses + methods])
+        _fill(self.size_table, [[label, count, round(total / 1024, 1)] for label, count, total in sizes])
+        time_format = "%H:%M:%S" if bucket_seconds < 86400 else "%Y-%m-%d"
+        _fill(self.time_table, [
+            [datetime.fromtimestamp(start_time).strftime(time_format), flows, client, server,
+             round((client + server) * 100 / flows, 1) if flows else 0.0]
+            for start_time, flows, client, server in series
+        ])
+        backend = "NumPy" if numpy is not None else "pure Python"
+        interval = f", error buckets of {_bucket_label(bucket_seconds)}" if bucket_seconds else ""
+        self.timing_label.setText(f"Computed over {n:,} flows in {elapsed * 1000:.0f} ms ({backend}){interval}")
@@ -0,0 +1,66 @@
+# endpoints.py
+#
+# Endpoint templates: requests that differ only in IDs, query values or
+# body values map to the same template, e.g.
+#   GET https://api.example.com/users/1842/orders?page=2
+#   -> GET https://api.example.com/users/{id}/orders?page
+# Used to analyse one flow per endpoint instead of one per flow.
+
+import json
+import re
+from urllib.parse import parse_qsl, urlsplit
+
+# Path segments that are identifiers rather than names: numbers, UUIDs,
+# long hex strings, and long opaque tokens that contain a digit.
+_NUMBER_RE = re.compile(r"^\d+$")
+_UUID_RE = re.compile(r"^[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}$")
+_HEX_RE = re.compile(r"^[0-9a-fA-F]{12,}$")
+_TOKEN_RE = re.compile(r"^[A-Za-z0-9_\-.~=]{20,}$")
+
+
+def is_id_segment(segment):
+    if not segment:
+        return False
+    if _NUMBER_RE.match(segment) or _UUID_RE.match(segment) or _HEX_RE.match(segment):
+        return True
+    return bool(_TOKEN_RE.match(segment)) and any(c.isdigit() for c in segment)
+
+
+def path_template(path):
+    return "/".join("{id}" if is_id_segment(seg) else seg for seg in (path or "/").split("/"))
+
+
+def body_shape(request):
+    """Field names of a JSON object or form body, or None for other bodies."""
+    if not request.body_size:
+        return None
+    content_type = (request.headers.get("content-type") or "").lower()
+    if "json" in content_type:
+        try:
+            data = json.loads(request.body)
+        except ValueError:
+            return None
+        return tuple(sorted(data)) if isinstance(data, dict) else type(data).__name__
+    if "x-www-form-urlencoded" in content_type:
+        return tuple(sorted({k for k, _ in parse_qsl(request.body_text, keep_blank_values=True)}))
+    return None
+
+
+def endpoint_key(request, include_body=True):
+    """Template identifying requests that share structure."""
+    parts = urlsplit(request.url)
+    query = ",".join(sorted({k for k, _ in parse_qsl(parts.query, keep_blank_values=True)}))
+    key = (
+        (request.method or "GET").upper(),
+        f"{parts.scheme}://{parts.netloc}".lower(),
+        path_template(parts.path),
+        query,
+    )
+    if include_body:
+        key += (body_shape(request),)
+    return key
+
+
+def format_endpoint_key(key):
+    method, origin, path, query = key[:4]
+    return f"{method} {origin}{path}" + (f"?{query}" if query else "")
@@ -0,0 +1,326 @@
+# flow_columns.py
+#
+# Per-flow metadata kept column by column next to the FlowStore: timestamp,
+# duration, status, method, host and request/response sizes. Row i is
+# FlowStore.flows[i]. Each column is a growable array.array (8 bytes or
+# less per flow); method and host are stored as codes into a table of
+# distinct values.
+#
+# Sorting and the aggregates behind the dashboard (per-host totals and
+# latency percentiles, status classes, size distribution, errors over
+# time) are NumPy operations over those arrays when NumPy is installed,
+# so they stay fast at a million flows. Without NumPy the same results
+# come from plain loops.
+#
+# NumPy gets a copy of a column for each computation: a view would lock
+# the array.array against growing while it exists.
+
+import bisect
+import math
+from array import array
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+SORT_KEYS = ("timestamp", "method", "host", "status", "request_size", "response_size", "duration")
+# Upper bounds of the response size buckets; the last bucket is open-ended.
+SIZE_BUCKETS = (0, 1024, 10 * 1024, 100 * 1024, 1024 * 1024, 10 * 1024 * 1024)
+SIZE_LABELS = ("0 B", "1 B - 1 KB", "1 - 10 KB", "10 - 100 KB", "100 KB - 1 MB", "1 - 10 MB", "> 10 MB")
+# Time-series bucket widths tried in turn, so a capture spans about TIME_BUCKETS_WANTED of them.
+TIME_BUCKET_SECONDS = (1, 5, 10, 30, 60, 300, 600, 1800, 3600, 6 * 3600, 86400)
+TIME_BUCKETS_WANTED = 40
+STATUS_CLASSES = ("no response", "1xx", "2xx", "3xx", "4xx", "5xx")
+
+
+class CategoryColumn:
+    """Codes into a table of distinct strings (method, host)."""
+
+    __slots__ = ("codes", "values", "index")
+
+    def __init__(self):
+        self.codes = array("I")
+        self.values = []
+        self.index = {}
+
+    def append(self, value):
+        code = self.index.get(value)
+        if code is None:
+            code = self.index[value] = len(self.values)
+            self.values.append(value)
+        self.codes.append(code)
+
+    def ranks(self):
+        # code -> position of its value in sorted order
+        ranks = [0] * len(self.values)
+        for rank, code in enumerate(sorted(range(len(self.values)), key=self.values.__getitem__)):
+            ranks[code] = rank
+        return ranks
+
+    def clear(self):
+        self.codes = array("I")
+        self.values = []
+        self.index = {}
+
+
+def _percentile(sorted_values, fraction):
+    # Nearest rank; works on lists and sorted NumPy arrays.
+    if not len(sorted_values):
+        return 0.0
+    return float(sorted_values[min(len(sorted_values) - 1, max(0, math.ceil(fraction * len(sorted_values)) - 1))])
+
+
+def _stable_order(values):
+    """Stable argsort of non-negative integers; NumPy radix-sorts 16-bit keys."""
+    if len(values) and int(values.max()) < 65536:
+        values = values.astype(numpy.uint16)
+    return numpy.argsort(values, kind="stable")
+
+
+class FlowColumns:
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        self.timestamp = array("d")
+        # NaN when the flow has no measured duration.
+        self.duration = array("d")
+        # 0 when the flow has no response.
+        self.status = array("H")
+        self.request_size = array("q")
+        self.response_size = array("q")
+        self.method = CategoryColumn()
+        self.host = CategoryColumn()
+
+    def __len__(self):
+        return len(self.timestamp)
+
+    def append(self, flow):
+        request, response = flow.request, flow.response
+        self.timestamp.append(flow.timestamp or 0.0)
+        self.duration.append(flow.duration if flow.duration is not None else math.nan)
+        self.status.append((response.status_code or 0) if response is not None else 0)
+        self.request_size.append(request.truncated_size or request.body_size)
+        self.response_size.append((response.truncated_size or response.body_size) if response is not None else 0)
+        self.method.append(request.method)
+        self.host.append(request.host)
+
+    def _np(self, name):
+        column = getattr(self, name)
+        if isinstance(column, CategoryColumn):
+            column = column.codes
+        return numpy.array(column)
+
+    # --- sorting ---------------------------------------------------------
+
+    def order(self, key, descending=False):
+        """Row indices sorted by one column; ties keep capture order."""
+        n = len(self)
+        if key in ("method", "host"):
+            category = getattr(self, key)
+            ranks = category.ranks()
+            if numpy is not None:
+                values = numpy.array(ranks, dtype=numpy.int64)[self._np(key)] if ranks else numpy.zeros(n)
+            else:
+                values = [ranks[c] for c in category.codes]
+        else:
+            values = self._np(key) if numpy is not None else getattr(self, key)
+        if numpy is None:
+            if key == "duration":
+                # Unknown durations (NaN) sort last either way.
+                known = [i for i in range(n) if values[i] == values[i]]
+                unknown = [i for i in range(n) if values[i] != values[i]]
+                return sorted(known, key=values.__getitem__, reverse=descending) + unknown
+            # sorted() keeps ties in capture order even with reverse=True.
+            return sorted(range(n), key=values.__getitem__, reverse=descending)
+        if key not in ("timestamp", "duration"):
+            values = values.astype(numpy.int64)
+            if descending and len(values):
+                values = values.max() - values
+            return _stable_order(values).tolist()
+        values = values.astype(numpy.float64)
+        if descending:
+            values = -values
+        if key == "duration":
+            values = numpy.where(numpy.isnan(values), numpy.inf, values)
+        return numpy.argsort(values, kind="stable").tolist()
+
+    # --- aggregates ------------------------------------------------------
+
+    def summary(self):
+        n = len(self)
+        if not n:
+            return {"flows": 0}
+        if numpy is not None:
+            timestamp, status = self._np("timestamp"), self._np("status")
+            duration = self._np("duration")
+            duration = numpy.sort(duration[~numpy.isnan(duration)])
+            response_size = numpy.sort(self._np("response_size"))
+            span = float(timestamp.max() - timestamp.min())
+            errors = int((status >= 400).sum())
+            missing = int((status == 0).sum())
+            request_bytes, response_bytes = int(self._np("request_size").sum()), int(response_size.sum())
+        else:
+            span = max(self.timestamp) - min(self.timestamp)
+            errors = sum(1 for s in self.status if s >= 400)
+            missing = self.status.count(0)
+            request_bytes, response_bytes = sum(self.request_size), sum(self.response_size)
+            duration = sorted(d for d in self.duration if not math.isnan(d))
+            response_size = sorted(self.response_size)
+        return {
+            "flows": n, "hosts": len(self.host.values), "span_seconds": span,
+            "flows_per_second": n / span if span > 0 else 0.0,
+            "errors": errors, "error_rate": errors / n, "no_response": missing,
+            "request_bytes": request_bytes, "response_bytes": response_bytes,
+            "duration_p50": _percentile(duration, 0.5), "duration_p95": _percentile(duration, 0.95),
+            "duration_max": float(duration[-1]) if len(duration) else 0.0,
+            "response_size_p50": _percentile(response_size, 0.5),
+            "response_size_p95": _percentile(response_size, 0.95),
+        }
+
+    def host_stats(self):
+        """One dict per host: flows, errors, bytes, throughput and latency."""
+        hosts = self.host.values
+        if not hosts:
+            return []
+        if numpy is not None:
+            rows = self._host_stats_numpy(len(hosts))
+        else:
+            rows = self._host_stats_python(len(hosts))
+        out = []
+        for code, (flows, errors, req_bytes, resp_bytes, first, last, mean, p95) in enumerate(rows):
+            if not flows:
+                continue
+            span = last - first
+            out.append({
+                "host": hosts[code] or "(none)", "flows": flows, "errors": errors, "error_rate": errors / flows,
+                "request_bytes": req_bytes, "response_bytes": resp_bytes,
+                # Over the host's active span; a single flow has no span to divide by.
+                "flows_per_second": flows / span if span > 0 else 0.0,
+                "bytes_per_second": resp_bytes / span if span > 0 else 0.0,
+                "duration_mean": mean, "duration_p95": p95,
+            })
+        return out
+
+    def _host_stats_numpy(self, hosts):
+        codes = self._np("host").astype(numpy.int64)
+        status, timestamp = self._np("status"), self._np("timestamp")
+        flows = numpy.bincount(codes, minlength=hosts)
+        errors = numpy.bincount(codes, weights=status >= 400, minlength=hosts)
+        req_bytes = numpy.bincount(codes, weights=self._np("request_size"), minlength=hosts)
+        resp_bytes = numpy.bincount(codes, weights=self._np("response_size"), minlength=hosts)
+        first = numpy.full(hosts, numpy.inf)
+        last = numpy.full(hosts, -numpy.inf)
+        numpy.minimum.at(first, codes, timestamp)
+        numpy.maximum.at(last, codes, timestamp)
+        duration = self._np("duration")
+        known = ~numpy.isnan(duration)
+        dcodes, dvalues = codes[known], duration[known]
+        timed = numpy.bincount(dcodes, minlength=hosts)
+        total = numpy.bincount(dcodes, weights=dvalues, minlength=hosts)
+        mean = numpy.divide(total, timed, out=numpy.zeros(hosts), where=timed > 0)
+        # p95 per host: sort by duration, then stably by host, and index into each host's run.
+        by_duration = numpy.argsort(dvalues)
+        by_host = by_duration[_stable_order(dcodes[by_duration])]
+        starts = numpy.concatenate(([0], numpy.cumsum(timed)[:-1]))
+        picks = starts + numpy.maximum(0, numpy.ceil(0.95 * timed).astype(numpy.int64) - 1)
+        p95 = numpy.zeros(hosts)
+        has = timed > 0
+        p95[has] = dvalues[by_host][picks[has]]
+        return zip(flows.tolist(), errors.astype(numpy.int64).tolist(), req_bytes.astype(numpy.int64).tolist(),
+                   resp_bytes.astype(numpy.int64).tolist(), first.tolist(), last.tolist(), mean.tolist(),
+                   p95.tolist())
+
+    def _host_stats_python(self, hosts):
+        rows = [[0, 0, 0, 0, math.inf, -math.inf, []] for _ in range(hosts)]
+        for code, status, req, resp, ts, dur in zip(self.host.codes, self.status, self.request_size,
+                                                    self.response_size, self.timestamp, self.duration):
+            row = rows[code]
+            row[0] += 1
+            if status >= 400:
+                row[1] += 1
+            row[2] += req
+            row[3] += resp
+            if ts < row[4]:
+                row[4] = ts
+            if ts > row[5]:
+                row[5] = ts
+            if not math.isnan(dur):
+                row[6].append(dur)
+        out = []
+        for flows, errors, req, resp, first, last, durations in rows:
+            durations.sort()
+            mean = sum(durations) / len(durations) if durations else 0.0
+            out.append((flows, errors, req, resp, first, last, mean, _percentile(durations, 0.95)))
+        return out
+
+    def status_classes(self):
+        """Flow count per status class: no response, 1xx ... 5xx."""
+        if numpy is not None:
+            classes = numpy.minimum(self._np("status").astype(numpy.int64) // 100, 5)
+            counts = numpy.bincount(classes, minlength=6).tolist()
+        else:
+            counts = [0] * 6
+            for status in self.status:
+                counts[min(status // 100, 5)] += 1
+        return list(zip(STATUS_CLASSES, counts))
+
+    def method_counts(self):
+        if numpy is not None:
+            counts = numpy.bincount(self._np("method").astype(numpy.int64), minlength=len(self.method.values)).tolist()
+        else:
+            counts = [0] * len(self.method.values)
+            for code in self.method.codes:
+                counts[code] += 1
+        return sorted(zip(self.method.values, counts), key=lambda item: -item[1])
+
+    def size_distribution(self):
+        """Response count and bytes per SIZE_BUCKETS bucket."""
+        if numpy is not None:
+            sizes = self._np("response_size")
+            buckets = numpy.searchsorted(numpy.array(SIZE_BUCKETS), sizes, side="left")
+            counts = numpy.bincount(buckets, minlength=len(SIZE_LABELS)).tolist()
+            totals = numpy.bincount(buckets, weights=sizes, minlength=len(SIZE_LABELS)).astype(numpy.int64).tolist()
+        else:
+            counts = [0] * len(SIZE_LABELS)
+            totals = [0] * len(SIZE_LABELS)
+            for size in self.response_size:
+                bucket = bisect.bisect_left(SIZE_BUCKETS, size)
+                counts[bucket] += 1
+                totals[bucket] += size
+        return list(zip(SIZE_LABELS, counts, totals))
+
+    def time_series(self, bucket_seconds=None):
+        """(bucket width, [(start time, flows, 4xx, 5xx)]) over the capture."""
+        n = len(self)
+        if not n:
+            return 0, []
+        if numpy is not None:
+            timestamp = self._np("timestamp")
+            start, end = float(timestamp.min()), float(timestamp.max())
+        else:
+            start, end = min(self.timestamp), max(self.timestamp)
+        if bucket_seconds is None:
+            bucket_seconds = next((b for b in TIME_BUCKET_SECONDS if (end - start) / b <= TIME_BUCKETS_WANTED),
+                                  TIME_BUCKET_SECONDS[-1])
+        # Buckets are aligned to whole multiples of their width.
+        origin = math.floor(start / bucket_seconds) * bucket_seconds
+        buckets = int((end - origin) // bucket_seconds) + 1
+        if numpy is not None:
+            index = ((timestamp - origin) // bucket_seconds).astype(numpy.int64)
+            status = self._np("status")
+            flows = numpy.bincount(index, minlength=buckets).tolist()
+            client = numpy.bincount(index, weights=(status >= 400) & (status < 500), minlength=buckets)
+            server = numpy.bincount(index, weights=status >= 500, minlength=buckets)
+            client, server = client.astype(numpy.int64).tolist(), server.astype(numpy.int64).tolist()
+        else:
+            flows, client, server = [0] * buckets, [0] * buckets, [0] * buckets
+            for ts, status in zip(self.timestamp, self.status):
+                i = int((ts - origin) // bucket_seconds)
+                flows[i] += 1
+                if 400 <= status < 500:
+                    client[i] += 1
+                elif status >= 500:
+                    server[i] += 1
+        return bucket_seconds, [(origin + i * bucket_seconds, flows[i], client[i], server[i]) for i in range(buckets)]
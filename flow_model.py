@@ -0,0 +1,372 @@
+# flow_model.py
+#
+# Shared in-memory representation of captured HTTP flows. Bodies are kept as
+# raw bytes (or compressed, see body_codec.py) and the text shown in the UI
+# is rendered lazily on demand, so tabs can hand these objects to each other
+# instead of re-parsing strings.
+
+import datetime
+from urllib.parse import urlsplit
+
+from body_codec import PackedBytes, pack, stored_size, unpack
+
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+def to_bytes(data):
+    if data is None:
+        return b""
+    if isinstance(data, bytes):
+        return data
+    if isinstance(data, (bytearray, memoryview)):
+        return bytes(data)
+    return str(data).encode("utf-8")
+
+
+def to_text(data):
+    if data is None:
+        return ""
+    if isinstance(data, str):
+        return data
+    return bytes(data).decode("utf-8", errors="replace")
+
+
+class Headers:
+    """Ordered list of (name, value) pairs; duplicates are kept, lookups ignore case."""
+
+    __slots__ = ("fields",)
+
+    def __init__(self, fields=None):
+        if fields is None:
+            self.fields = []
+        elif isinstance(fields, Headers):
+            self.fields = list(fields.fields)
+        elif isinstance(fields, dict):
+            self.fields = [(str(k), str(v)) for k, v in fields.items()]
+        else:
+            self.fields = [(str(k), str(v)) for k, v in fields]
+
+    def get(self, name, default=None):
+        name = name.lower()
+        for k, v in self.fields:
+            if k.lower() == name:
+                return v
+        return default
+
+    def get_all(self, name):
+        name = name.lower()
+        return [v for k, v in self.fields if k.lower() == name]
+
+    def add(self, name, value):
+        self.fields.append((name, value))
+
+    def set(self, name, value):
+        lname = name.lower()
+        self.fields = [(k, v) for k, v in self.fields if k.lower() != lname]
+        self.fields.append((name, value))
+
+    def remove(self, name):
+        name = name.lower()
+        self.fields = [(k, v) for k, v in self.fields if k.lower() != name]
+
+    def items(self):
+        return list(self.fields)
+
+    def to_dict(self):
+        # For senders that take a mapping (requests): repeated headers are
+        # folded under the first spelling of the name, Cookie with "; "
+        # (RFC 6265) and the rest with ", " (RFC 9110).
+        result = {}
+        names = {}
+        for k, v in self.fields:
+            lname = k.lower()
+            name = names.setdefault(lname, k)
+            if name in result:
+                result[name] += ("; " if lname == "cookie" else ", ") + v
+            else:
+                result[name] = v
+        return result
+
+    def __contains__(self, name):
+        return self.get(name) is not None
+
+    def __iter__(self):
+        return iter(self.fields)
+
+    def __len__(self):
+        return len(self.fields)
+
+    def __eq__(self, other):
+        return isinstance(other, Headers) and self.fields == other.fields
+
+    def __repr__(self):
+        return f"Headers({self.fields!r})"
+
+
+class _Message:
+    # Body storage shared by requests and responses. `body` always returns
+    # plain bytes; a packed body is decompressed on each access, so callers
+    # that need it repeatedly should keep the result.
+    __slots__ = ()
+
+    @property
+    def body(self):
+        return unpack(self._body)
+
+    @body.setter
+    def body(self, value):
+        self._body = value if isinstance(value, PackedBytes) else to_bytes(value)
+        self._text = None
+
+    @property
+    def stored_body(self):
+        """The body as held in memory: bytes or PackedBytes."""
+        return self._body
+
+    @property
+    def body_size(self):
+        return len(self._body)
+
+    @property
+    def body_stored_size(self):
+        return stored_size(self._body)
+
+    def pack_body(self, packer=pack):
+        if not isinstance(self._body, PackedBytes):
+            self._body = packer(self._body)
+        return self._body
+
+    @property
+    def body_text(self):
+        return to_text(self.body)
+
+    @property
+    def text(self):
+        if self._text is None:
+            self._text = self.render()
+        return self._text
+
+
+class HttpRequest(_Message):
+    # Instances are treated as immutable once handed to the UI; the rendered
+    # text is cached on first access.
+    __slots__ = ("method", "url", "http_version", "headers", "_body", "truncated_size", "_text")
+
+    def __init__(self, method="", url="", headers=None, body=b"", http_version="HTTP/1.1", truncated_size=None):
+        self.method = method
+        self.url = url
+        self.http_version = http_version
+        self.headers = Headers(headers)
+        self.body = body
+        # Original body size when the proxy cut the body to the scope limit.
+        self.truncated_size = truncated_size
+
+    @property
+    def host(self):
+        try:
+            return urlsplit(self.url).hostname or ""
+        except ValueError:
+            return ""
+
+    def render(self, body_limit=None):
+        """Render without caching; body_limit caps the body bytes shown (for previews)."""
+        lines = [f"{self.method} {self.url}"]
+        lines.extend(f"{k}: {v}" for k, v in self.headers)
+        text = "\n".join(lines)
+        if self._body:
+            text += "\n\n" + _render_body(self._body, body_limit)
+        return text
+
+    def to_dict(self):
+        return {
+            "method": self.method,
+            "url": self.url,
+            "headers": self.headers.to_dict(),
+            "body": self.body_text,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(
+            data.get("method", ""),
+            data.get("url", ""),
+            data.get("headers") or {},
+            data.get("body") or b"",
+        )
+
+
+class HttpResponse(_Message):
+    __slots__ = ("status_code", "reason", "http_version", "headers", "_body", "truncated_size", "_text")
+
+    def __init__(self, status_code=None, reason="", headers=None, body=b"", http_version="HTTP/1.1",
+                 truncated_size=None):
+        self.status_code = status_code
+        self.reason = reason or ""
+        self.http_version = http_version
+        self.headers = Headers(headers)
+        self.body = body
+        self.truncated_size = truncated_size
+
+    def render(self, body_limit=None):
+        """Render without caching; body_limit caps the body bytes shown (for previews)."""
+        status_line = " ".join(
+            str(p) for p in (self.http_version, self.status_code, self.reason) if p not in (None, "")
+        )
+        lines = [status_line]
+        lines.extend(f"{k}: {v}" for k, v in self.headers)
+        text = "\n".join(lines)
+        if self._body:
+            text += "\n\n" + _render_body(self._body, body_limit)
+        if self.truncated_size is not None:
+            text += f"\n\n[body truncated to {self.body_size} of {self.truncated_size} bytes]"
+        return text
+
+    def to_dict(self):
+        return {
+            "status": self.status_code,
+            "reason": self.reason,
+            "headers": self.headers.to_dict(),
+            "body": self.body_text,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        status = data.get("status")
+        if isinstance(status, list):
+            # Exports written by older versions stored the split status line.
+            status = status[1] if len(status) > 1 else None
+        try:
+            status = int(status) if status not in (None, "") else None
+        except (TypeError, ValueError):
+            status = None
+        return cls(status, data.get("reason", ""), data.get("headers") or {}, data.get("body") or b"")
+
+
+class Flow:
+    __slots__ = ("id", "timestamp", "request", "response", "duration", "_search_index")
+
+    def __init__(self, flow_id, request, response=None, timestamp=None, duration=None):
+        self.id = flow_id or ""
+        self.timestamp = timestamp if timestamp is not None else datetime.datetime.now().timestamp()
+        self.request = request
+        self.response = response
+        # Seconds from the start of the request to the end of the response, if known.
+        self.duration = duration
+        self._search_index = None
+
+    @property
+    def timestamp_text(self):
+        return datetime.datetime.fromtimestamp(self.timestamp).strftime(TIMESTAMP_FORMAT)
+
+    @property
+    def response_text(self):
+        return self.response.text if self.response else ""
+
+    def build_search_text(self):
+        text = self.request.render()
+        if self.response is not None:
+            text += "\n" + self.response.render()
+        return text.lower()
+
+    def get_search_index(self, packer=pack):
+        """Lower-cased UTF-8 haystack for the logger search, stored like a body.
+
+        Built once per flow. packer maps the raw bytes to what is kept
+        (FlowStore passes one that also shares identical haystacks).
+        """
+        if self._search_index is None:
+            self._search_index = packer(self.build_search_text().encode("utf-8"))
+        return self._search_index
+
+    @property
+    def search_text(self):
+        return to_text(unpack(self.get_search_index()))
+
+    def to_dict(self):
+        req = self.request.to_dict()
+        req["id"] = self.id
+        req["timestamp"] = self.timestamp_text
+        if self.duration is not None:
+            req["duration"] = self.duration
+        return {
+            "request": req,
+            "response": self.response.to_dict() if self.response else {},
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        req_data = data.get("request") or {}
+        resp_data = data.get("response") or {}
+        timestamp = None
+        if req_data.get("timestamp"):
+            try:
+                timestamp = datetime.datetime.strptime(req_data["timestamp"], TIMESTAMP_FORMAT).timestamp()
+            except ValueError:
+                pass
+        return cls(
+            req_data.get("id", ""),
+            HttpRequest.from_dict(req_data),
+            HttpResponse.from_dict(resp_data) if resp_data else None,
+            timestamp,
+            req_data.get("duration"),
+        )
+
+    @classmethod
+    def from_ipc(cls, data):
+        request = HttpRequest(
+            data.get("method", ""),
+            data.get("url", ""),
+            data.get("headers") or {},
+            _ipc_body(data, "body"),
+            data.get("http_version") or "HTTP/1.1",
+            data.get("body_truncated"),
+        )
+        response = None
+        if data.get("response_status") is not None:
+            response = HttpResponse(
+                data.get("response_status"),
+                data.get("response_reason", ""),
+                data.get("response_headers") or {},
+                _ipc_body(data, "response_body"),
+                data.get("response_http_version") or "HTTP/1.1",
+                data.get("response_body_truncated"),
+            )
+        return cls(data.get("id"), request, response, data.get("timestamp"), data.get("duration"))
+
+    @classmethod
+    def from_mitmproxy(cls, mflow, rules=None):
+        """Build a Flow from a mitmproxy HTTPFlow (used by the in-process backend).
+
+        rules is an optional scope_rules.ScopeRules whose body size limit applies.
+        """
+        req, resp = mflow.request, mflow.response
+        body, truncated = req.get_content(strict=False) or b"", None
+        if rules is not None:
+            body, truncated = rules.truncate(body)
+        request = HttpRequest(req.method, req.url, req.headers.items(multi=True), body, req.http_version, truncated)
+        response = duration = None
+        if resp is not None:
+            if resp.timestamp_end and req.timestamp_start:
+                duration = resp.timestamp_end - req.timestamp_start
+            body, truncated = resp.get_content(strict=False) or b"", None
+            if rules is not None:
+                body, truncated = rules.truncate(body)
+            response = HttpResponse(
+                resp.status_code, resp.reason, resp.headers.items(multi=True), body, resp.http_version, truncated
+            )
+        return cls(mflow.id, request, response, req.timestamp_start, duration)
+
+
+def _render_body(stored, limit):
+    size = len(stored)
+    if limit is not None and size > limit:
+        return to_text(unpack(stored, limit)) + f"\n[... {size - limit} more bytes]"
+    return to_text(unpack(stored))
+
+
+def _ipc_body(data, key):
+    # Bodies that are not valid UTF-8 travel base64-encoded under "<key>_b64".
+    if data.get(key + "_b64") is not None:
+        import base64
+        return base64.b64decode(data[key + "_b64"])
+    return data.get(key) or b""
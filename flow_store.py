@@ -0,0 +1,198 @@
+# flow_store.py
+#
+# Storage for captured flows. Repetitive traffic (SPAs polling the same
+# endpoints) produces thousands of byte-identical bodies and header sets;
+# they are interned here so each distinct value is held once and every flow
+# references it. Distinct bodies and search haystacks are kept compressed
+# (body_codec.py) and unpacked only when viewed, searched or exported.
+# Flows are also grouped by (method, URL, request body) for the logger's
+# collapsed view, and their sortable metadata is kept in columns
+# (flow_columns.py) for the logger's sort and the dashboard.
+#
+# Interned values are shared between flows: treat a stored flow's headers
+# and bodies as read-only (copy with Headers(h) before modifying).
+
+import hashlib
+
+from body_codec import pack, stored_size, unpack
+from flow_columns import FlowColumns
+
+
+class InternPool:
+    """Maps a value to one canonical, shared instance of equal content.
+
+    Lookups hash the content (cached on bytes/str objects by Python) and
+    only compare bytes on a hash match.
+    """
+
+    __slots__ = ("_items", "hits", "saved_bytes")
+
+    def __init__(self):
+        self._items = {}
+        self.hits = 0
+        self.saved_bytes = 0
+
+    def intern(self, value, key=None, size=None):
+        existing = self._items.setdefault(value if key is None else key, value)
+        if existing is not value:
+            self.hits += 1
+            self.saved_bytes += size if size is not None else len(value)
+        return existing
+
+    def clear(self):
+        self._items.clear()
+        self.hits = 0
+        self.saved_bytes = 0
+
+    def __len__(self):
+        return len(self._items)
+
+
+class PackedPool:
+    """Interns bytes by digest and keeps each distinct value packed.
+
+    Keyed by a digest rather than the bytes themselves, so the pool does
+    not hold an uncompressed copy of everything it has seen.
+    """
+
+    __slots__ = ("_items", "hits", "saved_bytes", "raw_bytes", "stored_bytes")
+
+    def __init__(self):
+        self._items = {}
+        self.hits = 0
+        self.saved_bytes = 0
+        # Totals over distinct values: before and after compression.
+        self.raw_bytes = 0
+        self.stored_bytes = 0
+
+    def pack(self, data):
+        if not data:
+            return data
+        key = hashlib.blake2b(data, digest_size=16).digest()
+        stored = self._items.get(key)
+        if stored is None:
+            stored = self._items[key] = pack(data)
+            self.raw_bytes += len(data)
+            self.stored_bytes += stored_size(stored)
+        else:
+            self.hits += 1
+            self.saved_bytes += len(data)
+        return stored
+
+    def clear(self):
+        self._items.clear()
+        self.hits = 0
+        self.saved_bytes = 0
+        self.raw_bytes = 0
+        self.stored_bytes = 0
+
+    def __len__(self):
+        return len(self._items)
+
+
+class FlowGroup:
+    """Flows that repeat the same request: same method, URL and request body."""
+
+    __slots__ = ("key", "first", "last", "last_row", "count")
+
+    def __init__(self, key, flow, row):
+        self.key = key
+        self.first = flow
+        self.last = flow
+        # Store index of the last flow, so collapsed rows sort with its columns.
+        self.last_row = row
+        self.count = 1
+
+    def add(self, flow, row):
+        self.last = flow
+        self.last_row = row
+        self.count += 1
+
+
+def group_key(flow):
+    """Repeats share a method, URL and request body."""
+    # The request body is interned, so equal bodies are the same object and
+    # the key compares by identity after the cached hash matches.
+    request = flow.request
+    return request.method, request.url, request.stored_body
+
+
+class FlowStore:
+    def __init__(self):
+        self.flows = []
+        # flow id -> index in flows
+        self.by_id = {}
+        self.groups = {}
+        self.bodies = PackedPool()
+        self.header_sets = InternPool()
+        self.search_indexes = PackedPool()
+        self.columns = FlowColumns()
+
+    def add(self, flow):
+        """Intern the flow's parts, store it and return (group, is_new_group)."""
+        request, response = flow.request, flow.response
+        # The search index is built now, while the bodies are still unpacked,
+        # so searching never has to render a flow again.
+        flow.get_search_index(self.search_indexes.pack)
+        self._intern_message(request)
+        if response is not None:
+            self._intern_message(response)
+        row = len(self.flows)
+        self.flows.append(flow)
+        self.columns.append(flow)
+        if flow.id:
+            self.by_id[flow.id] = row
+        key = group_key(flow)
+        group = self.groups.get(key)
+        if group is None:
+            group = self.groups[key] = FlowGroup(key, flow, row)
+            return group, True
+        group.add(flow, row)
+        return group, False
+
+    def _intern_message(self, message):
+        message.pack_body(self.bodies.pack)
+        headers = message.headers
+        if headers:
+            key = tuple(headers.fields)
+            message.headers = self.header_sets.intern(headers, key, sum(len(k) + len(v) for k, v in key))
+
+    def matches(self, flow, needle):
+        """Substring search over the flow's lower-cased index; needle is lower-cased text."""
+        return needle.encode("utf-8") in unpack(flow.get_search_index(self.search_indexes.pack))
+
+    def get(self, flow_id):
+        row = self.by_id.get(flow_id)
+        return None if row is None else self.flows[row]
+
+    def index_of(self, flow_id):
+        return self.by_id.get(flow_id)
+
+    def clear(self):
+        self.flows = []
+        self.by_id = {}
+        self.groups = {}
+        self.bodies.clear()
+        self.header_sets.clear()
+        self.search_indexes.clear()
+        self.columns.clear()
+
+    def stats(self):
+        raw = self.bodies.raw_bytes + self.search_indexes.raw_bytes
+        stored = self.bodies.stored_bytes + self.search_indexes.stored_bytes
+        return {
+            "flows": len(self.flows),
+            "groups": len(self.groups),
+            "unique_bodies": len(self.bodies),
+            "unique_header_sets": len(self.header_sets),
+            "bytes_saved": self.bodies.saved_bytes + self.header_sets.saved_bytes + self.search_indexes.saved_bytes,
+            "raw_bytes": raw,
+            "stored_bytes": stored,
+            "compression_ratio": raw / stored if stored else 1.0,
+        }
+
+    def __len__(self):
+        return len(self.flows)
+
+    def __iter__(self):
+        return iter(self.flows)
@@ -0,0 +1,418 @@
+# http_parser.py
+#
+# Raw HTTP/1.x parsing and serialization shared by every tab.
+#
+# MessageParser is incremental: feed() it bytes as they arrive and it returns
+# each message once it is complete (Content-Length, chunked and read-until-close
+# bodies are supported). parse_request_text() is the lenient variant used for
+# hand-edited requests in the Replay and Bulk Sender editors.
+
+from urllib.parse import urlsplit
+
+from flow_model import Headers, HttpRequest, HttpResponse
+
+MAX_HEAD_BYTES = 256 * 1024
+MAX_CHUNK_LINE_BYTES = 4096
+
+_HEAD, _BODY_LENGTH, _CHUNK_SIZE, _CHUNK_DATA, _CHUNK_END, _TRAILERS, _BODY_EOF = range(7)
+
+
+class HttpParseError(ValueError):
+    pass
+
+
+def _decode(data):
+    # Header bytes are nominally latin-1, but UTF-8 is what we actually see.
+    try:
+        return data.decode("utf-8")
+    except UnicodeDecodeError:
+        return data.decode("latin-1")
+
+
+def _find_blank_line(buf, start=0):
+    """Return (head_end, body_start) for the first empty line at or after start.
+
+    Walks line by line so the search stops at the end of the header section
+    instead of scanning a large body for a pattern it may not contain.
+    """
+    i = buf.find(b"\n", start)
+    while i != -1:
+        nxt = buf[i + 1:i + 2]
+        if nxt == b"\n":
+            return i, i + 2
+        if nxt == b"\r" and buf[i + 2:i + 3] == b"\n":
+            return i, i + 3
+        i = buf.find(b"\n", i + 1)
+    return None
+
+
+def _parse_header_lines(lines):
+    """Parse already-decoded header lines into an ordered list of (name, value)."""
+    headers = []
+    for line in lines:
+        name, sep, value = line.partition(":")
+        if sep and name and name[0] not in " \t":
+            headers.append((name.strip(), value.strip()))
+            continue
+        if not line.strip():
+            continue
+        if line[0] in " \t":
+            # Obsolete line folding (RFC 9112 5.2): join with the previous field.
+            if not headers:
+                raise HttpParseError("Continuation line before first header")
+            name, value = headers[-1]
+            headers[-1] = (name, value + " " + line.strip())
+            continue
+        raise HttpParseError(f"Malformed header line: {line[:80]!r}")
+    return headers
+
+
+def _parse_head(head):
+    """Split a raw header section into (start line parts, header pairs)."""
+    lines = _decode(head).split("\n")
+    return lines[0].strip().split(None, 2), _parse_header_lines(lines[1:])
+
+
+def _make_headers(fields):
+    # The parser already produces (str, str) tuples, so skip Headers' coercion.
+    headers = Headers()
+    headers.fields = fields
+    return headers
+
+
+def _absolute_url(target, headers, default_scheme):
+    """Turn an origin-form target into an absolute URL using the Host header."""
+    if "://" in target:
+        return target
+    if target.startswith("/"):
+        host = None
+        for k, v in headers:
+            if k.lower() == "host":
+                host = v
+                break
+        if host:
+            return f"{default_scheme}://{host}{target}"
+    # Authority-form (CONNECT), asterisk-form or no Host: keep the target as sent.
+    return target
+
+
+def _body_framing(headers):
+    """Return ("chunked", None), ("length", n) or (None, None) from the headers."""
+    transfer_encoding = None
+    lengths = []
+    for k, v in headers:
+        lk = k.lower()
+        if lk == "transfer-encoding":
+            transfer_encoding = v
+        elif lk == "content-length":
+            lengths.append(v)
+    if transfer_encoding is not None:
+        codings = [c.strip().lower() for c in transfer_encoding.split(",")]
+        if codings[-1] == "chunked":
+            return "chunked", None
+        # Non-chunked transfer coding: the body is delimited by connection close.
+        return "eof", None
+    if lengths:
+        values = {v.strip() for length in lengths for v in length.split(",")}
+        if len(values) != 1:
+            raise HttpParseError(f"Conflicting Content-Length values: {sorted(values)}")
+        value = values.pop()
+        if not value.isdigit():
+            raise HttpParseError(f"Invalid Content-Length: {value!r}")
+        return "length", int(value)
+    return None, None
+
+
+class MessageParser:
+    """Incremental HTTP/1.x parser.
+
+    kind is "request" or "response". feed() returns the list of messages
+    completed by the new data (possibly empty); feed_eof() finishes a
+    response whose body is delimited by connection close. For responses to
+    HEAD requests, pass request_method="HEAD" so no body is expected.
+    """
+
+    def __init__(self, kind="request", default_scheme="http", request_method=None):
+        if kind not in ("request", "response"):
+            raise ValueError(f"Unknown message kind: {kind}")
+        self.kind = kind
+        self.default_scheme = default_scheme
+        self.request_method = request_method
+        self._buf = bytearray()
+        self._pos = 0
+        self._scan_from = 0
+        self._reset()
+
+    def _reset(self):
+        self._state = _HEAD
+        self._start = None
+        self._headers = None
+        self._body = bytearray()
+        self._remaining = 0
+
+    @property
+    def idle(self):
+        """True when no partial message is buffered."""
+        return self._state == _HEAD and not self._buf[self._pos:].strip(b"\r\n")
+
+    def feed(self, data):
+        self._buf += data
+        messages = []
+        while True:
+            message = self._step()
+            if message is None:
+                break
+            messages.append(message)
+        # Drop consumed bytes once per feed rather than once per message.
+        if self._pos:
+            del self._buf[:self._pos]
+            self._scan_from = max(0, self._scan_from - self._pos)
+            self._pos = 0
+        return messages
+
+    def feed_eof(self):
+        if self._state == _BODY_EOF:
+            return [self._finish()]
+        if not self.idle:
+            raise HttpParseError("Connection closed in the middle of a message")
+        return []
+
+    def _take_body(self):
+        buf, pos = self._buf, self._pos
+        take = min(self._remaining, len(buf) - pos)
+        if take:
+            self._body += buf[pos:pos + take]
+            self._pos = pos + take
+            self._remaining -= take
+        return not self._remaining
+
+    def _step(self):
+        buf = self._buf
+        while True:
+            state = self._state
+            pos = self._pos
+            if state == _HEAD:
+                # Leading empty lines before a message are ignored (RFC 9112 2.2).
+                while buf[pos:pos + 1] in (b"\r", b"\n"):
+                    pos += 1
+                self._pos = pos
+                found = _find_blank_line(buf, max(pos, self._scan_from))
+                if found is None:
+                    if len(buf) - pos > MAX_HEAD_BYTES:
+                        raise HttpParseError("Header section too large")
+                    self._scan_from = max(pos, len(buf) - 3)
+                    return None
+                head_end, body_start = found
+                self._start, self._headers = _parse_head(bytes(buf[pos:head_end]))
+                self._pos = body_start
+                self._begin_body()
+                if self._state == _HEAD:
+                    return self._finish()
+            elif state == _BODY_LENGTH:
+                if not self._take_body():
+                    return None
+                return self._finish()
+            elif state == _CHUNK_SIZE:
+                nl = buf.find(b"\n", pos)
+                if nl == -1:
+                    if len(buf) - pos > MAX_CHUNK_LINE_BYTES:
+                        raise HttpParseError("Chunk size line too long")
+                    return None
+                size_line = bytes(buf[pos:nl]).split(b";", 1)[0].strip()
+                self._pos = nl + 1
+                try:
+                    size = int(size_line, 16)
+                except ValueError:
+                    raise HttpParseError(f"Invalid chunk size: {size_line[:20]!r}")
+                if size:
+                    self._remaining = size
+                    self._state = _CHUNK_DATA
+                else:
+                    self._state = _TRAILERS
+            elif state == _CHUNK_DATA:
+                if not self._take_body():
+                    return None
+                self._state = _CHUNK_END
+            elif state == _CHUNK_END:
+                if buf[pos:pos + 2] == b"\r\n":
+                    self._pos = pos + 2
+                elif buf[pos:pos + 1] == b"\n":
+                    self._pos = pos + 1
+                elif len(buf) - pos < 2:
+                    return None
+                else:
+                    raise HttpParseError("Missing CRLF after chunk data")
+                self._state = _CHUNK_SIZE
+            elif state == _TRAILERS:
+                if buf[pos:pos + 2] == b"\r\n":
+                    self._pos = pos + 2
+                    return self._finish()
+                if buf[pos:pos + 1] == b"\n":
+                    self._pos = pos + 1
+                    return self._finish()
+                found = _find_blank_line(buf, pos)
+                if found is None:
+                    if len(buf) - pos > MAX_HEAD_BYTES:
+                        raise HttpParseError("Trailer section too large")
+                    return None
+                head_end, body_start = found
+                # Trailer fields are merged into the header list.
+                self._headers.extend(_parse_header_lines(_decode(bytes(buf[pos:head_end])).split("\n")))
+                self._pos = body_start
+                return self._finish()
+            elif state == _BODY_EOF:
+                if len(buf) > pos:
+                    self._body += buf[pos:]
+                    self._pos = len(buf)
+                return None
+
+    def _begin_body(self):
+        framing, length = _body_framing(self._headers)
+        if self.kind == "response":
+            status = self._status_code(self._start)
+            if (self.request_method or "").upper() == "HEAD" or 100 <= status < 200 or status in (204, 304):
+                framing = None
+            elif framing is None:
+                framing = "eof"
+        elif framing == "eof":
+            raise HttpParseError("Request body with unknown length")
+        if framing == "chunked":
+            self._state = _CHUNK_SIZE
+        elif framing == "length" and length:
+            self._remaining = length
+            self._state = _BODY_LENGTH
+        elif framing == "eof":
+            self._state = _BODY_EOF
+        else:
+            self._state = _HEAD
+
+    @staticmethod
+    def _status_code(start):
+        if len(start) < 2 or not start[0].startswith("HTTP/"):
+            raise HttpParseError(f"Malformed status line: {' '.join(start)!r}")
+        try:
+            return int(start[1])
+        except ValueError:
+            raise HttpParseError(f"Invalid status code: {start[1]!r}")
+
+    def _finish(self):
+        start, headers, body = self._start, self._headers, bytes(self._body)
+        self._reset()
+        if self.kind == "request":
+            if len(start) != 3 or not start[2].startswith("HTTP/"):
+                raise HttpParseError(f"Malformed request line: {' '.join(start)!r}")
+            method, target, version = start
+            url = _absolute_url(target, headers, self.default_scheme)
+            return HttpRequest(method, url, _make_headers(headers), body, version)
+        status = self._status_code(start)
+        reason = start[2] if len(start) > 2 else ""
+        return HttpResponse(status, reason, _make_headers(headers), body, start[0])
+
+
+def parse_request(data, default_scheme="http"):
+    """Parse one complete raw request (bytes or str)."""
+    return _parse_one(MessageParser("request", default_scheme), data)
+
+
+def parse_response(data, request_method=None):
+    """Parse one complete raw response (bytes or str); the body may run to the end of data."""
+    return _parse_one(MessageParser("response", request_method=request_method), data)
+
+
+def _parse_one(parser, data):
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    messages = parser.feed(data)
+    if not messages:
+        messages = parser.feed_eof()
+    if not messages:
+        raise HttpParseError("Incomplete HTTP message")
+    return messages[0]
+
+
+def split_message_text(text):
+    """Split hand-edited HTTP text into (start line parts, header pairs, body bytes).
+
+    Headers end at the first empty line; a line without ':' in the header block
+    is taken as the start of the body so requests typed without the blank line
+    still work. The body is kept verbatim, including blank lines and colons.
+    """
+    if isinstance(text, str):
+        text = text.encode("utf-8")
+    text = text.lstrip(b"\r\n")
+    first_nl = text.find(b"\n")
+    if first_nl == -1:
+        return _decode(text).strip().split(None, 2), [], b""
+    size = len(text)
+    head_end = body_start = size
+    i = first_nl + 1
+    while i < size:
+        nl = text.find(b"\n", i)
+        end = size if nl == -1 else nl
+        line = text[i:end]
+        if line in (b"", b"\r"):
+            head_end, body_start = i, end + 1
+            break
+        if b":" not in line and line[:1] not in (b" ", b"\t"):
+            head_end = body_start = i
+            break
+        i = end + 1
+    start, headers = _parse_head(text[:head_end])
+    return start, headers, text[body_start:]
+
+
+def parse_request_text(text, default_scheme="http"):
+    """Parse a request typed or edited in the UI ("METHOD URL [VERSION]" + headers + body)."""
+    start, headers, body = split_message_text(text)
+    if len(start) < 2:
+        raise HttpParseError(f"Malformed request line: '{' '.join(start)}'")
+    version = start[2] if len(start) > 2 else "HTTP/1.1"
+    return HttpRequest(start[0], _absolute_url(start[1], headers, default_scheme), _make_headers(headers), body, version)
+
+
+def _framed_fields(message, update_content_length, body_allowed=True):
+    fields = list(message.headers)
+    body = message.body
+    chunked = False
+    for k, v in fields:
+        if k.lower() == "transfer-encoding" and v.lower().rstrip().endswith("chunked"):
+            chunked = True
+    if chunked:
+        body = (b"%x\r\n" % len(body) + body + b"\r\n" if body else b"") + b"0\r\n\r\n"
+    elif update_content_length and body_allowed:
+        value = str(len(body))
+        for i, (k, v) in enumerate(fields):
+            if k.lower() == "content-length":
+                fields[i] = (k, value)
+                break
+        else:
+            if body:
+                fields.append(("Content-Length", value))
+    return fields, body
+
+
+def _serialize(start_line, fields, body):
+    head = start_line + "\r\n" + "".join(f"{k}: {v}\r\n" for k, v in fields) + "\r\n"
+    return head.encode("utf-8") + body
+
+
+def serialize_request(request, origin_form=True, update_content_length=True):
+    """Serialize to wire bytes. With origin_form, an absolute URL is sent as path + Host header."""
+    fields, body = _framed_fields(request, update_content_length)
+    target = request.url
+    if origin_form and "://" in target:
+        parts = urlsplit(target)
+        target = parts.path or "/"
+        if parts.query:
+            target += "?" + parts.query
+        if not any(k.lower() == "host" for k, _ in fields):
+            fields.insert(0, ("Host", parts.netloc))
+    return _serialize(f"{request.method} {target} {request.http_version or 'HTTP/1.1'}", fields, body)
+
+
+def serialize_response(response, update_content_length=True):
+    status = response.status_code
+    body_allowed = status is None or not (100 <= status < 200 or status in (204, 304))
+    fields, body = _framed_fields(response, update_content_length, body_allowed)
+    start_line = f"{response.http_version or 'HTTP/1.1'} {status} {response.reason}".rstrip()
+    return _serialize(start_line, fields, body)
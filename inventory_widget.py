@@ -0,0 +1,107 @@
+# inventory_widget.py
+#
+# Per-endpoint view of the API inventory: one row per method + path
+# template, and the inferred OpenAPI operation (parameters, request and
+# response body schemas) of the selected endpoint. Rows are refreshed from
+# the EndpointInventory while the tab is visible.
+
+import json
+from datetime import datetime
+
+from PyQt5.QtWidgets import (
+    QWidget, QVBoxLayout, QHBoxLayout, QTableWidget, QTableWidgetItem, QTextEdit,
+    QPushButton, QLabel, QLineEdit, QSplitter, QHeaderView, QAbstractItemView
+)
+from PyQt5.QtCore import Qt
+
+from api_inventory import openapi_path
+
+COUNT_COLUMN = 2
+
+
+class InventoryWidget(QWidget):
+    def __init__(self, inventory):
+        super().__init__()
+        self.inventory = inventory
+        # (method, template) -> table row
+        self.rows = {}
+        layout = QVBoxLayout(self)
+
+        top_layout = QHBoxLayout()
+        self.filter_input = QLineEdit()
+        self.filter_input.setPlaceholderText("Filter endpoints (method or path)")
+        self.filter_input.textChanged.connect(self.apply_filter)
+        refresh_btn = QPushButton("Refresh")
+        refresh_btn.clicked.connect(self.refresh)
+        self.summary_label = QLabel("No endpoints yet")
+        top_layout.addWidget(self.filter_input)
+        top_layout.addWidget(refresh_btn)
+        top_layout.addWidget(self.summary_label)
+        layout.addLayout(top_layout)
+
+        splitter = QSplitter(Qt.Vertical)
+        self.table = QTableWidget(0, 5)
+        self.table.setHorizontalHeaderLabels(["Method", "Path", "Count", "Responses", "Last Seen"])
+        self.table.horizontalHeader().setSectionResizeMode(1, QHeaderView.Stretch)
+        self.table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.table.itemSelectionChanged.connect(self.show_selected)
+        splitter.addWidget(self.table)
+
+        self.detail_view = QTextEdit()
+        self.detail_view.setReadOnly(True)
+        splitter.addWidget(self.detail_view)
+        layout.addWidget(splitter)
+
+    def selected_endpoint(self):
+        row = self.table.currentRow()
+        if row < 0:
+            return None
+        key = self.table.item(row, 0).data(Qt.UserRole)
+        return self.inventory.endpoints.get(key)
+
+    def refresh(self):
+        endpoints = self.inventory.endpoints
+        if len(self.rows) > len(endpoints):
+            # Inventory was cleared (import or clear): rebuild.
+            self.rows = {}
+            self.table.setRowCount(0)
+        for key, endpoint in endpoints.items():
+            row = self.rows.get(key)
+            if row is None:
+                row = self.rows[key] = self.table.rowCount()
+                self.table.insertRow(row)
+                method_item = QTableWidgetItem(endpoint.method)
+                method_item.setData(Qt.UserRole, key)
+                self.table.setItem(row, 0, method_item)
+                self.table.setItem(row, 1, QTableWidgetItem(openapi_path(endpoint.path)[0]))
+            count_item = QTableWidgetItem()
+            count_item.setData(Qt.DisplayRole, endpoint.count)
+            self.table.setItem(row, COUNT_COLUMN, count_item)
+            self.table.setItem(row, 3, QTableWidgetItem(", ".join(sorted(endpoint.responses))))
+            last_seen = datetime.fromtimestamp(endpoint.last_seen).strftime("%H:%M:%S") if endpoint.last_seen else ""
+            self.table.setItem(row, 4, QTableWidgetItem(last_seen))
+        self.summary_label.setText(f"{len(endpoints)} endpoints from {self.inventory.flows_seen} flows")
+        self.apply_filter()
+
+    def apply_filter(self):
+        needle = self.filter_input.text().strip().lower()
+        for row in range(self.table.rowCount()):
+            text = f"{self.table.item(row, 0).text()} {self.table.item(row, 1).text()}".lower()
+            self.table.setRowHidden(row, bool(needle) and needle not in text)
+
+    def show_selected(self):
+        endpoint = self.selected_endpoint()
+        if endpoint is None:
+            self.detail_view.clear()
+            return
+        path, names = openapi_path(endpoint.path)
+        operation = endpoint.to_operation(names)
+        text = f"{endpoint.method} {path}\nServers: {', '.join(sorted(endpoint.servers))}\n\n"
+        self.detail_view.setPlainText(text + json.dumps(operation, indent=2))
+
+    def clear_all(self):
+        self.rows = {}
+        self.table.setRowCount(0)
+        self.detail_view.clear()
+        self.summary_label.setText("No endpoints yet")
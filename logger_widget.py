@@ -1,14 +1,305 @@
+from bisect import bisect_left
+from itertools import compress
+
 from PyQt5.QtWidgets import (
-    QWidget, QVBoxLayout, QTableWidget, QTableWidgetItem, QPushButton,
-    QLineEdit, QHeaderView, QLabel, QHBoxLayout
+    QWidget, QVBoxLayout, QTableView, QPushButton, QAbstractItemView,
+    QLineEdit, QHeaderView, QLabel, QHBoxLayout, QCheckBox, QSplitter
 )
-from PyQt5.QtCore import Qt
+from PyQt5.QtCore import Qt, QTimer, QAbstractTableModel, QModelIndex
+from PyQt5.QtGui import QColor
+
+from flow_store import FlowStore, group_key
+from response_viewer import RENDER_CACHE, ResponseViewer
+
+# Table cells show a bounded preview; the full text is rendered on demand
+# (replay, export), so thousands of rows do not each hold a whole body.
+PREVIEW_BODY_BYTES = 1000
+# Previews rendered for painting are kept for this many cells.
+PREVIEW_CACHE_SIZE = 4096
+(ID_COLUMN, TIME_COLUMN, METHOD_COLUMN, HOST_COLUMN, STATUS_COLUMN, SIZE_COLUMN, DURATION_COLUMN,
+ REQUEST_COLUMN, RESPONSE_COLUMN, COUNT_COLUMN) = range(10)
+COLUMN_LABELS = ["Request ID", "Timestamp", "Method", "Host", "Status", "Size", "Time (ms)",
+                 "Request", "Response", "Count"]
+# Header click -> FlowColumns sort key. Clicking Request ID goes back to capture order.
+SORT_COLUMNS = {
+    TIME_COLUMN: "timestamp", METHOD_COLUMN: "method", HOST_COLUMN: "host", STATUS_COLUMN: "status",
+    SIZE_COLUMN: "response_size", DURATION_COLUMN: "duration",
+}
+# Searching unpacks the stored indexes, so wait for typing to pause.
+SEARCH_DELAY_MS = 200
+SECRET_HIGHLIGHT = QColor(255, 220, 200)
+# Starting widths of the columns that are not stretched.
+COLUMN_WIDTHS = {ID_COLUMN: 250, TIME_COLUMN: 150, METHOD_COLUMN: 70, HOST_COLUMN: 180, STATUS_COLUMN: 60,
+                 SIZE_COLUMN: 80, DURATION_COLUMN: 80, COUNT_COLUMN: 60}
+
+
+class LoggerModel(QAbstractTableModel):
+    """The logger's rows, read from the FlowStore when they are painted.
+
+    Rows are store indexes in display order, or FlowGroups when collapsed.
+    A sort only replaces that order with FlowColumns.order(); the search
+    and secrets filters are a per-flow mask that narrows it. No cells are
+    created, so a header click costs the sort and not a table rebuild.
+    """
+
+    def __init__(self, store, secret_marks):
+        super().__init__()
+        self.store = store
+        # flow id -> secret rule hits, shared with the widget.
+        self.secret_marks = secret_marks
+        self.collapsed = False
+        # Store indexes shown; None is every flow in capture order, the first `count` of them.
+        self.rows = None
+        self.count = 0
+        # When collapsed: the FlowGroups shown, and group key -> row.
+        self.groups = []
+        self.group_rows = {}
+        # When collapsed and filtered: group key -> store index of the last repeat that passed,
+        # which the row shows. Unfiltered rows show the group's latest repeat.
+        self.group_shown = {}
+        # flow -> bool, and mask[i] set when store flow i passes it; None shows everything.
+        self.filter = None
+        self.mask = None
+        # None keeps capture order.
+        self.sort_key = None
+        self.sort_descending = False
+        self._previews = {}
+
+    # --- rows ----------------------------------------------------------------
+
+    def flow(self, row):
+        """The flow shown on row; a collapsed row shows the latest repeat of its group that passes the filter."""
+        if self.collapsed:
+            return self.store.flows[self._shown_index(self.groups[row])] if 0 <= row < len(self.groups) else None
+        if not 0 <= row < self.rowCount():
+            return None
+        return self.store.flows[row if self.rows is None else self.rows[row]]
+
+    def group(self, row):
+        return self.groups[row] if self.collapsed and 0 <= row < len(self.groups) else None
+
+    def _shown_index(self, group):
+        return group.last_row if self.mask is None else self.group_shown[group.key]
+
+    def _item(self, row):
+        if self.collapsed:
+            return self.groups[row]
+        return row if self.rows is None else self.rows[row]
+
+    def _display_items(self):
+        if self.collapsed:
+            return self.groups
+        return range(self.count) if self.rows is None else self.rows
+
+    def _order(self):
+        if self.sort_key is None:
+            return None
+        return self.store.columns.order(self.sort_key, self.sort_descending)
+
+    def _build_rows(self):
+        order = self._order()
+        mask = self.mask
+        self._previews = {}
+        if not self.collapsed:
+            self.groups, self.group_rows, self.group_shown = [], {}, {}
+            if mask is None:
+                self.rows, self.count = order, len(self.store.flows)
+            elif order is None:
+                self.rows = list(compress(range(len(mask)), mask))
+            else:
+                self.rows = list(compress(order, map(mask.__getitem__, order)))
+            return
+        self.rows = None
+        self.group_shown = shown = {}
+        if mask is None:
+            groups = list(self.store.groups.values())
+        else:
+            flows = self.store.flows
+            for i in compress(range(len(mask)), mask):
+                shown[group_key(flows[i])] = i
+            groups = [g for g in self.store.groups.values() if g.key in shown]
+        if order is not None:
+            # A collapsed row sorts by the repeat it shows.
+            position = [0] * len(order)
+            for pos, i in enumerate(order):
+                position[i] = pos
+            groups.sort(key=lambda g: position[self._shown_index(g)])
+        self.groups = groups
+        self.group_rows = {g.key: row for row, g in enumerate(groups)}
+
+    def set_view(self, collapsed, flow_filter):
+        """Show the flows passing flow_filter (None: all), one row per group when collapsed."""
+        self.beginResetModel()
+        self.collapsed = collapsed
+        self.filter = flow_filter
+        self.mask = None if flow_filter is None else bytearray(map(flow_filter, self.store.flows))
+        self._build_rows()
+        self.endResetModel()
+
+    def sort_rows(self, key, descending=False):
+        self.layoutAboutToBeChanged.emit()
+        # Keep the selection and current row on the same flows.
+        persistent = self.persistentIndexList()
+        items = [self._item(index.row()) for index in persistent]
+        self.sort_key, self.sort_descending = key, descending
+        self._build_rows()
+        if persistent:
+            wanted = set(items)
+            rows = {item: row for row, item in enumerate(self._display_items()) if item in wanted}
+            self.changePersistentIndexList(persistent, [
+                self.index(rows[item], index.column()) if item in rows else QModelIndex()
+                for index, item in zip(persistent, items)])
+        self.layoutChanged.emit()
+
+    def add_flow(self, group, is_new):
+        """Show the flow just added to the store. While sorted, new rows go at the bottom."""
+        index = len(self.store.flows) - 1
+        flow = self.store.flows[index]
+        passes = self.filter is None or self.filter(flow)
+        if self.mask is not None:
+            self.mask.append(passes)
+        if not passes:
+            # A collapsed row keeps showing the group's last repeat that passed.
+            return
+        if self.collapsed:
+            if self.mask is not None:
+                self.group_shown[group.key] = index
+            row = self.group_rows.get(group.key)
+            if row is not None:
+                self._previews = {}
+                self.dataChanged.emit(self.index(row, 0), self.index(row, len(COLUMN_LABELS) - 1))
+                return
+            row = len(self.groups)
+            self.beginInsertRows(QModelIndex(), row, row)
+            self.groups.append(group)
+            self.group_rows[group.key] = row
+            self.endInsertRows()
+            return
+        row = self.rowCount()
+        self.beginInsertRows(QModelIndex(), row, row)
+        if self.rows is None:
+            self.count += 1
+        else:
+            self.rows.append(index)
+        self.endInsertRows()
+
+    def recheck_flow(self, index):
+        """Show store flow index if it passes the filter now but did not when it was added."""
+        mask = self.mask
+        if mask is None or mask[index]:
+            return
+        flow = self.store.flows[index]
+        if not self.filter(flow):
+            return
+        mask[index] = 1
+        if self.collapsed:
+            key = group_key(flow)
+            row = self.group_rows.get(key)
+            if row is None:
+                row = len(self.groups)
+                self.beginInsertRows(QModelIndex(), row, row)
+                self.groups.append(self.store.groups[key])
+                self.group_rows[key] = row
+                self.group_shown[key] = index
+                self.endInsertRows()
+            elif index > self.group_shown[key]:
+                self.group_shown[key] = index
+                self._previews = {}
+                self.dataChanged.emit(self.index(row, 0), self.index(row, len(COLUMN_LABELS) - 1))
+            return
+        # In capture order the row goes where the flow was captured; while sorted, at the bottom.
+        row = len(self.rows) if self.sort_key is not None else bisect_left(self.rows, index)
+        self.beginInsertRows(QModelIndex(), row, row)
+        self.rows.insert(row, index)
+        self.endInsertRows()
+
+    def refresh_marks(self):
+        # Repaints the visible cells; the view skips rows that are off screen.
+        if self.rowCount():
+            self.dataChanged.emit(self.index(0, 0), self.index(self.rowCount() - 1, len(COLUMN_LABELS) - 1),
+                                  [Qt.BackgroundRole, Qt.ToolTipRole])
+
+    def clear(self):
+        self.beginResetModel()
+        self.mask = None if self.filter is None else bytearray()
+        self._build_rows()
+        self.endResetModel()
+
+    # --- Qt model ------------------------------------------------------------
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        if self.collapsed:
+            return len(self.groups)
+        return self.count if self.rows is None else len(self.rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(COLUMN_LABELS)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return COLUMN_LABELS[section]
+        return None
+
+    def data(self, index, role=Qt.DisplayRole):
+        flow = self.flow(index.row())
+        if flow is None:
+            return None
+        col = index.column()
+        if role == Qt.DisplayRole:
+            return self._text(flow, col, index.row())
+        if role in (Qt.BackgroundRole, Qt.ToolTipRole):
+            titles = self.secret_marks.get(flow.id)
+            if not titles:
+                return None
+            # Titles end in "in request" or "in response"; shade the cells they came from.
+            shaded = (col == ID_COLUMN
+                      or col == REQUEST_COLUMN and any(t.endswith("in request") for t in titles)
+                      or col == RESPONSE_COLUMN and any(t.endswith("in response") for t in titles))
+            if not shaded:
+                return None
+            return SECRET_HIGHLIGHT if role == Qt.BackgroundRole else "Secrets found:\n" + "\n".join(titles)
+        return None
+
+    def _text(self, flow, col, row):
+        request, response = flow.request, flow.response
+        if col == ID_COLUMN:
+            return flow.id
+        if col == TIME_COLUMN:
+            return flow.timestamp_text
+        if col == METHOD_COLUMN:
+            return request.method
+        if col == HOST_COLUMN:
+            return request.host
+        if col == STATUS_COLUMN:
+            return str(response.status_code or "") if response is not None else ""
+        if col == SIZE_COLUMN:
+            return str(response.truncated_size or response.body_size) if response is not None else ""
+        if col == DURATION_COLUMN:
+            return f"{flow.duration * 1000:.0f}" if flow.duration is not None else ""
+        if col == COUNT_COLUMN:
+            group = self.group(row)
+            return str(group.count) if group is not None else ""
+        key = (flow.id, col)
+        text = self._previews.get(key)
+        if text is None:
+            if col == REQUEST_COLUMN:
+                text = request.render(PREVIEW_BODY_BYTES)
+            else:
+                text = response.render(PREVIEW_BODY_BYTES) if response is not None else ""
+            if len(self._previews) >= PREVIEW_CACHE_SIZE:
+                self._previews = {}
+            self._previews[key] = text
+        return text
+
 
 class LoggerWidget(QWidget):
-    def __init__(self, send_to_replay_callback, send_to_bulk_callback):
+    def __init__(self, send_to_replay_callback, send_to_bulk_callback, send_to_ai_callback=None):
         super().__init__()
         self.send_to_replay_callback = send_to_replay_callback
         self.send_to_bulk_callback = send_to_bulk_callback
+        self.send_to_ai_callback = send_to_ai_callback
 
         main_layout = QVBoxLayout()
 
@@ -18,25 +309,56 @@ class LoggerWidget(QWidget):
         self.search_input = QLineEdit()
         self.search_input.setPlaceholderText("Search requests or responses")
         self.search_input.textChanged.connect(self.on_search_text_changed)
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.timeout.connect(self.refresh)
         self.clear_btn = QPushButton("Clear")
         self.clear_btn.clicked.connect(self.on_clear_clicked)
         search_layout.addWidget(search_label)
         search_layout.addWidget(self.search_input)
         search_layout.addWidget(self.clear_btn)
+        self.collapse_checkbox = QCheckBox("Collapse repeats")
+        self.collapse_checkbox.setToolTip("Show one row per method, URL and request body, with a count")
+        self.collapse_checkbox.toggled.connect(self.on_collapse_toggled)
+        search_layout.addWidget(self.collapse_checkbox)
+        self.secrets_checkbox = QCheckBox("Only flows with secrets")
+        self.secrets_checkbox.setToolTip("Show only flows where the secret rules matched (see Passive Scan)")
+        self.secrets_checkbox.toggled.connect(self.refresh)
+        search_layout.addWidget(self.secrets_checkbox)
         main_layout.addLayout(search_layout)
 
-        # Table with columns: ID, Timestamp, Request, Response
-        self.table = QTableWidget()
-        self.table.setColumnCount(4)
-        self.table.setHorizontalHeaderLabels(["Request ID", "Timestamp", "Request", "Response"])
+        # Flows in capture order, with bodies and headers interned.
+        self.store = FlowStore()
+        # flow id -> secret rule hits
+        self.secret_marks = {}
+        self.model = LoggerModel(self.store, self.secret_marks)
+        self.table = QTableView()
+        self.table.setModel(self.model)
+        self.table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        # Rows keep the default height, so the view never measures the cells of rows off screen.
+        self.table.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
 
         header = self.table.horizontalHeader()
-        header.setSectionResizeMode(0, QHeaderView.ResizeToContents)
-        header.setSectionResizeMode(1, QHeaderView.ResizeToContents)
-        header.setSectionResizeMode(2, QHeaderView.Stretch)
-        header.setSectionResizeMode(3, QHeaderView.Stretch)
+        for col, width in COLUMN_WIDTHS.items():
+            header.resizeSection(col, width)
+        header.setSectionResizeMode(REQUEST_COLUMN, QHeaderView.Stretch)
+        header.setSectionResizeMode(RESPONSE_COLUMN, QHeaderView.Stretch)
+        self.table.setColumnHidden(COUNT_COLUMN, True)
+        # Sorting is done on the store's columns by LoggerModel, not by the view.
+        header.setSectionsClickable(True)
+        header.setSortIndicatorShown(True)
+        header.setSortIndicator(-1, Qt.AscendingOrder)
+        header.sectionClicked.connect(self.on_header_clicked)
+        self.table.selectionModel().currentRowChanged.connect(self.on_current_row_changed)
 
-        main_layout.addWidget(self.table)
+        # The selected flow's response, rendered off the UI thread.
+        self.response_viewer = ResponseViewer()
+        splitter = QSplitter(Qt.Vertical)
+        splitter.addWidget(self.table)
+        splitter.addWidget(self.response_viewer)
+        splitter.setStretchFactor(0, 3)
+        splitter.setStretchFactor(1, 2)
+        main_layout.addWidget(splitter)
 
         # Send buttons
         btn_layout = QHBoxLayout()
@@ -48,118 +370,134 @@ class LoggerWidget(QWidget):
         self.send_bulk_btn.clicked.connect(self.send_selected_to_bulk)
         btn_layout.addWidget(self.send_bulk_btn)
 
+        self.send_ai_btn = QPushButton("Send Selected to AI Analyser")
+        self.send_ai_btn.setToolTip("Analyse every selected row as one batch")
+        self.send_ai_btn.clicked.connect(self.send_selected_to_ai)
+        btn_layout.addWidget(self.send_ai_btn)
+
         main_layout.addLayout(btn_layout)
 
+        self.memory_label = QLabel("")
+        main_layout.addWidget(self.memory_label)
+
         self.setLayout(main_layout)
-        self.all_rows = []
+        # The flow whose response the viewer shows.
+        self.response_flow = None
+
+    @property
+    def collapsed(self):
+        return self.collapse_checkbox.isChecked()
+
+    @property
+    def all_rows(self):
+        return self.store.flows
+
+    def selected_flow(self):
+        # A collapsed row stands for its group; act on the latest repeat.
+        return self.model.flow(self.table.currentIndex().row())
+
+    def selected_flows(self):
+        rows = sorted(index.row() for index in self.table.selectionModel().selectedRows(0))
+        return [flow for flow in map(self.model.flow, rows) if flow is not None]
+
+    def on_current_row_changed(self, current, previous):
+        flow = self.selected_flow()
+        if flow is self.response_flow:
+            return
+        self.response_flow = flow
+        if flow is None or flow.response is None:
+            self.response_viewer.clear()
+        else:
+            self.response_viewer.show_response(flow.response, key=flow.id)
 
     def send_selected_to_replay(self):
-        row = self.table.currentRow()
-        if row >= 0:
-            item = self.table.item(row, 2)
-            if item and self.send_to_replay_callback:
-                req_text = item.text()
-                self.send_to_replay_callback(req_text)
+        flow = self.selected_flow()
+        if flow and self.send_to_replay_callback:
+            self.send_to_replay_callback(flow.request)
 
     def send_selected_to_bulk(self):
-        row = self.table.currentRow()
-        if row >= 0:
-            item = self.table.item(row, 2)
-            if item and self.send_to_bulk_callback:
-                req_text = item.text()
-                self.send_to_bulk_callback(req_text)
-
-    def log_request(self, req_dict, resp_dict):
-        req_id = req_dict.get("id", "")
-        timestamp = req_dict.get("timestamp", "")
-        req_str = (
-            f"{req_dict.get('method', '')} {req_dict.get('url', '')}\n" +
-            "\n".join(f"{k}: {v}" for k, v in (req_dict.get('headers') or {}).items()) +
-            ("\n\n" + req_dict.get('body', '') if req_dict.get('body') else "")
-        )
-        resp_str = ""
-        if resp_dict:
-            resp_str = (
-                f"{resp_dict.get('status', '')}\n" +
-                "\n".join(f"{k}: {v}" for k, v in (resp_dict.get('headers') or {}).items()) +
-                ("\n\n" + resp_dict.get('body', '') if resp_dict.get('body') else "")
-            )
-        self.all_rows.append((req_id, timestamp, req_str, resp_str))
-
-        if self.filter_match(req_str, resp_str, self.search_input.text()):
-            self._add_row(req_id, timestamp, req_str, resp_str)
-
-    def _add_row(self, req_id, timestamp, req_str, resp_str):
-        row = self.table.rowCount()
-        self.table.insertRow(row)
-        self.table.setItem(row, 0, QTableWidgetItem(req_id))
-        self.table.setItem(row, 1, QTableWidgetItem(timestamp))
-        self.table.setItem(row, 2, QTableWidgetItem(req_str))
-        self.table.setItem(row, 3, QTableWidgetItem(resp_str))
+        flow = self.selected_flow()
+        if flow and self.send_to_bulk_callback:
+            self.send_to_bulk_callback(flow.request)
+
+    def send_selected_to_ai(self):
+        flows = self.selected_flows()
+        if flows and self.send_to_ai_callback:
+            self.send_to_ai_callback(flows)
+
+    def log_flow(self, flow):
+        group, is_new = self.store.add(flow)
+        self.model.add_flow(group, is_new)
+
+    def mark_secrets(self, flow_id, titles):
+        marks = self.secret_marks.setdefault(flow_id, [])
+        for title in titles:
+            if title not in marks:
+                marks.append(title)
+        index = self.store.index_of(flow_id)
+        if index is not None and self.secrets_checkbox.isChecked():
+            self.model.recheck_flow(index)
+        self.model.refresh_marks()
 
     def on_search_text_changed(self, text):
-        text = text.lower()
-        self.table.setRowCount(0)
-        for req_id, timestamp, req_str, resp_str in self.all_rows:
-            if self.filter_match(req_str, resp_str, text):
-                self._add_row(req_id, timestamp, req_str, resp_str)
+        self.search_timer.start(SEARCH_DELAY_MS)
+
+    def on_collapse_toggled(self, checked):
+        self.table.setColumnHidden(COUNT_COLUMN, not checked)
+        self.refresh()
+
+    def on_header_clicked(self, col):
+        model = self.model
+        key = SORT_COLUMNS.get(col)
+        if key is None:
+            if col != ID_COLUMN:
+                # Request/Response previews are not sortable; keep the current indicator.
+                self._show_sort_indicator()
+                return
+            key, descending = None, False
+        else:
+            descending = key == model.sort_key and not model.sort_descending
+        model.sort_rows(key, descending)
+        self._show_sort_indicator()
 
-    def filter_match(self, req_str, resp_str, text):
+    def _show_sort_indicator(self):
+        col = next((c for c, key in SORT_COLUMNS.items() if key == self.model.sort_key), -1)
+        order = Qt.DescendingOrder if self.model.sort_descending else Qt.AscendingOrder
+        self.table.horizontalHeader().setSortIndicator(col, order)
+
+    def refresh(self):
+        text = self.search_input.text().lower()
+        secrets_only = self.secrets_checkbox.isChecked()
+        flow_filter = None
+        if text or secrets_only:
+            flow_filter = lambda flow: self.filter_match(flow, text, secrets_only)  # noqa: E731
+        self.model.set_view(self.collapsed, flow_filter)
+
+    def filter_match(self, flow, text, secrets_only=False):
+        if secrets_only and flow.id not in self.secret_marks:
+            return False
         if not text:
             return True
-        return text in req_str.lower() or text in resp_str.lower()
+        return self.store.matches(flow, text)
+
+    def update_memory_stats(self):
+        stats = self.store.stats()
+        self.memory_label.setText(
+            f"Memory: {stats['flows']} flows, {stats['unique_bodies']} distinct bodies | "
+            f"{stats['raw_bytes'] / 1048576:.1f} MB stored as {stats['stored_bytes'] / 1048576:.1f} MB "
+            f"(compression {stats['compression_ratio']:.1f}x) | "
+            f"{stats['bytes_saved'] / 1048576:.1f} MB saved by deduplication"
+        )
 
     def on_clear_clicked(self):
         self.search_input.clear()
 
     def clear_all(self):
-        self.table.setRowCount(0)
-        self.all_rows.clear()
-
-    def parse_req_resp_to_dict(self, req_id, timestamp, req_str):
-        lines = req_str.strip().split("\n")
-        if not lines:
-            return {}
-        method_url = lines[0].split(" ", 1)
-        method = method_url[0] if len(method_url) > 0 else ""
-        url = method_url[1] if len(method_url) > 1 else ""
-        headers, body = {}, ""
-        parsing_headers = True
-        for line in lines[1:]:
-            if parsing_headers and ":" in line:
-                k, v = line.split(":", 1)
-                headers[k.strip()] = v.strip()
-            else:
-                parsing_headers = False
-                body += line + "\n"
-        return {
-            "id": req_id,
-            "timestamp": timestamp,
-            "method": method,
-            "url": url,
-            "headers": headers,
-            "body": body.strip()
-        }
-
-    def parse_resp_str_to_dict(self, resp_str):
-        lines = resp_str.strip().split("\n")
-        status_line = lines[0] if lines else ""
-        status = ""
-        if status_line.startswith("HTTP"):
-            parts = status_line.split()
-            if len(parts) > 1:
-                status = parts
-        headers, body = {}, ""
-        parsing_headers = True
-        for line in lines[1:]:
-            if parsing_headers and ":" in line:
-                k, v = line.split(":", 1)
-                headers[k.strip()] = v.strip()
-            else:
-                parsing_headers = False
-                body += line + "\n"
-        return {
-            "status": status,
-            "headers": headers,
-            "body": body.strip()
-        }
+        self.store.clear()
+        # Cleared in place; the model reads the same dict.
+        self.secret_marks.clear()
+        self.model.clear()
+        self.response_flow = None
+        self.response_viewer.clear()
+        RENDER_CACHE.clear()
+        self.update_memory_stats()
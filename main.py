@@ -1,79 +1,85 @@
 import sys
 import os
 import json
-import threading
-import socket
-import datetime
-from PyQt5.QtWidgets import (
-    QApplication, QMainWindow, QTabWidget, QWidget, QLabel,
-    QLineEdit, QPushButton, QVBoxLayout, QHBoxLayout, QMessageBox, QFileDialog, QTextEdit
-)
-from PyQt5.QtCore import QTimer, pyqtSignal, QObject
-from logger_widget import LoggerWidget
-from replay_widget import ReplayWidget
-from bulksender_widget import BulkSenderWidget
-from proxy_runner import ProxyRunner
-import webbrowser
-from urllib.parse import urlparse
-from ai_analyser_widget import AIAnalyserWidget
-
-SOCKET_PATH = "/tmp/anvesha_proxy.sock"  # Adjust if needed for your OS
+import time
+from collections import deque
+
+from startup_timer import StartupTimer
+
+# Started before the heavy imports so they are included in the report.
+STARTUP = StartupTimer.from_environment()
+
+with STARTUP.measure("import PyQt5"):
+    from PyQt5.QtWidgets import (
+        QApplication, QMainWindow, QTabWidget, QWidget, QLabel,
+        QLineEdit, QPushButton, QVBoxLayout, QHBoxLayout, QMessageBox, QFileDialog, QTextEdit, QComboBox
+    )
+    from PyQt5.QtCore import QTimer, pyqtSignal, QObject
+# Only the tabs needed while capturing are imported here. Replay, Bulk
+# Sender, AI Analyser, API Inventory, Sequencer, Streams and Dashboard (and requests with them)
+# are imported when first opened, see LazyTab.
+with STARTUP.measure("import logger and flow store"):
+    from logger_widget import LoggerWidget
+    from flow_model import Flow
+    from response_viewer import shutdown_renderer
+with STARTUP.measure("import proxy runner and metrics"):
+    from proxy_runner import STAGE_HELP, ProxyRunner
+    from stream_capture import StreamStore
+    from scope_rules import ScopeRules
+    from metrics import REGISTRY
+    from metrics_widget import MetricsPanel
+with STARTUP.measure("import inventory and passive scanner"):
+    from api_inventory import EndpointInventory
+    from scanner_widget import ScannerWidget
+
+# UI-thread stages of the capture pipeline; the proxy-side ones live in proxy_runner.
+UI_QUEUE_STAGE = REGISTRY.histogram("anvesha_stage_seconds", STAGE_HELP, stage="ui_queue_wait")
+INVENTORY_STAGE = REGISTRY.histogram("anvesha_stage_seconds", STAGE_HELP, stage="ui_inventory")
+LOGGER_STAGE = REGISTRY.histogram("anvesha_stage_seconds", STAGE_HELP, stage="ui_table_insert")
+SCANNER_STAGE = REGISTRY.histogram("anvesha_stage_seconds", STAGE_HELP, stage="ui_scanner_submit")
+FLOWS_DISPLAYED = REGISTRY.counter("anvesha_flows_displayed_total", "Flows added to the Request Logger")
 
 
 class FlowEventEmitter(QObject):
-    new_flow = pyqtSignal(dict)
+    new_flow = pyqtSignal(object)
+    # WebSocket and streamed-body events (stream_capture.py)
+    stream_event = pyqtSignal(object)
 
 
-class FlowReceiverThread(threading.Thread):
-    def __init__(self, emit_flow_callback):
-        super().__init__(daemon=True)
-        self.emit_flow_callback = emit_flow_callback
-        self._running = True
-        # Remove socket file before binding
-        try:
-            if os.path.exists(SOCKET_PATH):
-                os.unlink(SOCKET_PATH)
-        except Exception:
-            pass
-
-        self.server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
-        self.server.bind(SOCKET_PATH)
-        self.server.listen(1)
-
-    def run(self):
-        while self._running:
-            try:
-                conn, _ = self.server.accept()
-                with conn:
-                    data = b""
-                    while True:
-                        chunk = conn.recv(4096)
-                        if not chunk:
-                            break
-                        data += chunk
-                    if data:
-                        try:
-                            for line in data.decode("utf-8").splitlines():
-                                flow = json.loads(line)
-                                self.emit_flow_callback(flow)
-                        except Exception as e:
-                            print("Error parsing IPC flow data:", e)
-            except Exception as e:
-                print("IPC server error:", e)
-
-    def stop(self):
-        self._running = False
-        self.server.close()
-        try:
-            os.unlink(SOCKET_PATH)
-        except Exception:
-            pass
+class LazyTab(QWidget):
+    """Tab page that imports and builds its widget the first time it is shown or used."""
+
+    def __init__(self, label, module_name, build):
+        super().__init__()
+        self.label = label
+        self.module_name = module_name
+        # Called with the imported module, returns the tab widget.
+        self.build = build
+        self.widget = None
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+
+    def get(self):
+        if self.widget is None:
+            with STARTUP.measure(f"import {self.module_name}"):
+                module = __import__(self.module_name)
+            with STARTUP.measure(f"build {self.label} tab"):
+                self.widget = self.build(module)
+            self.layout().addWidget(self.widget)
+        return self.widget
+
+    def showEvent(self, event):
+        self.get()
+        super().showEvent(event)
 
 
 class ProxyConfigWidget(QWidget):
     def __init__(self, start_proxy_callback, stop_proxy_callback, show_cert_callback,
-                 get_request_by_id_callback, export_all_callback, import_all_callback):
+                 get_request_by_id_callback, export_all_callback, import_all_callback,
+                 apply_scope_callback=None, export_inventory_callback=None):
         super().__init__()
+        self.apply_scope_callback = apply_scope_callback
+        self.export_inventory_callback = export_inventory_callback
         self.start_proxy_callback = start_proxy_callback
         self.stop_proxy_callback = stop_proxy_callback
         self.show_cert_callback = show_cert_callback
@@ -97,6 +103,33 @@ class ProxyConfigWidget(QWidget):
         port_layout.addWidget(self.port_input)
         layout.addLayout(port_layout)
 
+        workers_layout = QHBoxLayout()
+        workers_label = QLabel("Proxy Workers:")
+        self.workers_input = QLineEdit("1")
+        self.workers_input.setToolTip("Number of mitmdump processes; worker N listens on port + N.")
+        workers_layout.addWidget(workers_label)
+        workers_layout.addWidget(self.workers_input)
+        layout.addLayout(workers_layout)
+
+        backend_layout = QHBoxLayout()
+        backend_label = QLabel("Proxy Backend:")
+        self.backend_input = QComboBox()
+        self.backend_input.addItem("Subprocess (isolated)", "subprocess")
+        self.backend_input.addItem("In-process (low latency, single worker)", "inprocess")
+        self.backend_input.addItem("Remote agent (capture_agent.py at host:port)", "remote")
+        backend_layout.addWidget(backend_label)
+        backend_layout.addWidget(self.backend_input)
+        layout.addLayout(backend_layout)
+
+        token_layout = QHBoxLayout()
+        token_label = QLabel("Agent Token:")
+        self.agent_token_input = QLineEdit()
+        self.agent_token_input.setEchoMode(QLineEdit.Password)
+        self.agent_token_input.setPlaceholderText("Remote agent only; empty uses $ANVESHA_AGENT_TOKEN")
+        token_layout.addWidget(token_label)
+        token_layout.addWidget(self.agent_token_input)
+        layout.addLayout(token_layout)
+
         self.start_button = QPushButton("Start Proxy")
         self.start_button.clicked.connect(self.on_start_proxy)
         layout.addWidget(self.start_button)
@@ -109,6 +142,29 @@ class ProxyConfigWidget(QWidget):
         self.cert_button.clicked.connect(self.show_cert_callback)
         layout.addWidget(self.cert_button)
 
+        # --- Capture Scope (evaluated inside the proxy, applied without restart) ---
+        scope_layout = QVBoxLayout()
+        scope_layout.addWidget(QLabel("Capture Scope (comma separated, * wildcards):"))
+        self.allow_hosts_input = QLineEdit()
+        self.allow_hosts_input.setPlaceholderText("Allow hosts, e.g. *.example.com (empty = all)")
+        self.deny_hosts_input = QLineEdit()
+        self.deny_hosts_input.setPlaceholderText("Deny hosts, e.g. *.google-analytics.com, *.doubleclick.net")
+        self.deny_types_input = QLineEdit()
+        self.deny_types_input.setPlaceholderText("Deny content types, e.g. image/, font/, video/, audio/")
+        self.max_body_input = QLineEdit("0")
+        self.max_body_input.setToolTip("Bodies larger than this many KB are truncated by the proxy (0 = no limit).")
+        max_body_layout = QHBoxLayout()
+        max_body_layout.addWidget(QLabel("Max body size (KB):"))
+        max_body_layout.addWidget(self.max_body_input)
+        apply_scope_btn = QPushButton("Apply Scope")
+        apply_scope_btn.clicked.connect(self.apply_scope)
+        max_body_layout.addWidget(apply_scope_btn)
+        scope_layout.addWidget(self.allow_hosts_input)
+        scope_layout.addWidget(self.deny_hosts_input)
+        scope_layout.addWidget(self.deny_types_input)
+        scope_layout.addLayout(max_body_layout)
+        layout.addLayout(scope_layout)
+
         # --- Perplexity AI Configuration ---
         ai_layout = QVBoxLayout()
         ai_label = QLabel("Perplexity AI Configuration:")
@@ -131,6 +187,14 @@ class ProxyConfigWidget(QWidget):
         export_layout.addWidget(export_btn)
         layout.addLayout(export_layout)
 
+        inventory_layout = QHBoxLayout()
+        self.inventory_label = QLabel("API inventory: no endpoints yet")
+        export_inventory_btn = QPushButton("Export API Inventory (OpenAPI 3)")
+        export_inventory_btn.clicked.connect(self.export_inventory)
+        inventory_layout.addWidget(self.inventory_label)
+        inventory_layout.addWidget(export_inventory_btn)
+        layout.addLayout(inventory_layout)
+
         # --- Import/Export All Controls ---
         imp_exp_layout = QHBoxLayout()
         export_all_btn = QPushButton("Export All (Logger & Replay)")
@@ -146,18 +210,34 @@ class ProxyConfigWidget(QWidget):
         self.status_label = QLabel("")
         layout.addWidget(self.status_label)
 
+        self.metrics_panel = MetricsPanel()
+        layout.addWidget(self.metrics_panel)
+
         self.setLayout(layout)
 
     def on_start_proxy(self):
         host = self.host_input.text().strip()
         port = self.port_input.text().strip()
+        workers = self.workers_input.text().strip()
         if not host or not port.isdigit():
             QMessageBox.warning(self, "Input Error", "Please enter valid host and port.")
             return
-        port = int(port)
+        if not workers.isdigit() or int(workers) < 1:
+            QMessageBox.warning(self, "Input Error", "Please enter at least one proxy worker.")
+            return
+        port, workers = int(port), int(workers)
+        backend = self.backend_input.currentData()
+        if backend in ("inprocess", "remote"):
+            # The agent's worker count is set where it runs.
+            workers = 1
         try:
-            self.start_proxy_callback(host, port)
-            self.status_label.setText(f"Starting proxy on {host}:{port}...")
+            self.start_proxy_callback(host, port, workers, backend)
+            if backend == "remote":
+                self.status_label.setText(f"Connecting to capture agent at {host}:{port}...")
+            elif workers > 1:
+                self.status_label.setText(f"Starting {workers} proxy workers on {host}:{port}-{port + workers - 1}...")
+            else:
+                self.status_label.setText(f"Starting proxy on {host}:{port}...")
         except Exception as ex:
             self.status_label.setText(f"Failed to start proxy: {str(ex)}")
 
@@ -165,25 +245,38 @@ class ProxyConfigWidget(QWidget):
         self.stop_proxy_callback()
         self.status_label.setText("Stopping proxy...")
 
+    def apply_scope(self):
+        max_body = self.max_body_input.text().strip() or "0"
+        if not max_body.isdigit():
+            QMessageBox.warning(self, "Input Error", "Max body size must be a whole number of KB.")
+            return
+        rules = ScopeRules(
+            allow_hosts=self.allow_hosts_input.text(),
+            deny_hosts=self.deny_hosts_input.text(),
+            deny_content_types=self.deny_types_input.text(),
+            max_body_size=int(max_body) * 1024,
+        )
+        if self.apply_scope_callback:
+            self.apply_scope_callback(rules)
+        self.status_label.setText("Capture scope applied.")
+
     def export_openapi(self):
         req_id = self.export_id_input.text().strip()
         if not req_id:
             QMessageBox.warning(self, "Input Error", "Enter a valid Request ID.")
             return
-        req_dict = self.get_request_by_id_callback(req_id)
-        if not req_dict:
+        flow = self.get_request_by_id_callback(req_id)
+        if not flow:
             QMessageBox.warning(self, "Error", f"No request found with ID {req_id}.")
             return
 
-        operation = openapi_from_request(req_dict)
-        openapi_spec = build_basic_openapi_document(operation)
-        openapi_json = json.dumps(openapi_spec, indent=2)
+        inventory = EndpointInventory()
+        inventory.add(flow)
+        save_openapi_document(self, inventory.to_openapi(f"Request {req_id}"))
 
-        dlg = QMessageBox(self)
-        dlg.setWindowTitle("Exported OpenAPI 3.0")
-        dlg.setText("OpenAPI 3.0 JSON exported. Save to file as needed.")
-        dlg.setDetailedText(openapi_json)
-        dlg.exec_()
+    def export_inventory(self):
+        if self.export_inventory_callback:
+            self.export_inventory_callback()
 
     def export_all(self):
         if self.export_all_callback:
@@ -197,83 +290,16 @@ class ProxyConfigWidget(QWidget):
         return self.perplexity_api_key_input.text().strip()
 
 
-def openapi_from_request(req_dict):
-    method = req_dict.get("method", "get").lower()
-    url = req_dict.get("url", "")
-    parsed = urlparse(url)
-    path = parsed.path or "/"
-    params = []
-    if parsed.query:
-        for part in parsed.query.split('&'):
-            if '=' in part:
-                k, v = part.split('=', 1)
-            else:
-                k, v = part, ""
-            params.append({
-                "name": k,
-                "in": "query",
-                "required": False,
-                "schema": {"type": "string"},
-                "example": v
-            })
-    headers = req_dict.get("headers", {})
-    request_body = None
-    if req_dict.get("body"):
-        request_body = {
-            "content": {
-                "application/json": {
-                    "example": req_dict["body"]
-                }
-            }
-        }
-    op = {
-        path: {
-            method: {
-                "summary": f"{method.upper()} {path}",
-                "parameters": params + [
-                    {
-                        "name": k,
-                        "in": "header",
-                        "required": False,
-                        "schema": {"type": "string"},
-                        "example": v
-                    } for k, v in headers.items()
-                ],
-                "requestBody": request_body,
-                "responses": {
-                    "default": {
-                        "description": "default response"
-                    }
-                }
-            }
-        }
-    }
-    return op
-
-
-def build_basic_openapi_document(operation):
-    return {
-        "openapi": "3.0.0",
-        "info": {
-            "title": "Exported API",
-            "version": "1.0.0"
-        },
-        "paths": operation
-    }
-
-
-def make_req_str_from_dict(req_dict):
-    request_line = f"{req_dict.get('method', '')} {req_dict.get('url', '')}"
-    headers = req_dict.get('headers', {})
-    headers_str = "\n".join(f"{k}: {v}" for k, v in headers.items()) if headers else ""
-    body = req_dict.get('body', '')
-    parts = [request_line]
-    if headers_str:
-        parts.append(headers_str)
-    if body:
-        parts.append("")  # blank line before body
-        parts.append(body)
-    return "\n".join(parts)
+def save_openapi_document(parent, document):
+    filename, _ = QFileDialog.getSaveFileName(parent, "Save OpenAPI Document", "openapi.json", "JSON Files (*.json)")
+    if not filename:
+        return
+    try:
+        with open(filename, "w") as f:
+            json.dump(document, f, indent=2)
+        QMessageBox.information(parent, "Export Successful", f"OpenAPI document saved to {filename}")
+    except OSError as e:
+        QMessageBox.warning(parent, "Export Failed", str(e))
 
 
 # class AIAnalyserWidget(QWidget):
@@ -319,69 +345,245 @@ class MainApp(QMainWindow):
         self.resize(1400, 900)
 
         self.tabs = QTabWidget()
-        self.logger_tab = LoggerWidget(self.send_to_replay, self.send_to_bulk_sender)
-        self.replay_tab = ReplayWidget()
-        self.bulk_tab = BulkSenderWidget()
-
-        self.proxy_runner = ProxyRunner()
-        self.proxy_tab = ProxyConfigWidget(
-            self.start_proxy,
-            self.stop_proxy,
-            self.show_cert,
-            self.get_request_by_id,
-            self.export_all_data,
-            self.import_all_data,
-        )
-
-        self.ai_tab = AIAnalyserWidget(self.proxy_tab.get_perplexity_api_key)
-
-        self.tabs.addTab(self.proxy_tab, "Proxy Config")
-        self.tabs.addTab(self.logger_tab, "Request Logger")
-        self.tabs.addTab(self.replay_tab, "Replay")
-        self.tabs.addTab(self.bulk_tab, "Bulk Sender")
-        self.tabs.addTab(self.ai_tab, "AI Analyser")
-
-        self.setCentralWidget(self.tabs)
+        with STARTUP.measure("build Request Logger tab"):
+            self.logger_tab = LoggerWidget(self.send_to_replay, self.send_to_bulk_sender, self.send_to_ai_analyser)
 
+        # Proxy backends share one interface. The subprocess one binds its IPC
+        # socket once the window is up (see start_flow_receiver); no proxy can
+        # be started before that.
         self.flow_emitter = FlowEventEmitter()
         self.flow_emitter.new_flow.connect(self._on_new_flow)
-        self.flow_receiver = FlowReceiverThread(self.flow_emitter.new_flow.emit)
-        self.flow_receiver.start()
+        self.flow_emitter.stream_event.connect(self._on_stream_event)
+        # WebSocket connections and streamed responses, kept here so nothing is
+        # lost before the Streams tab is first opened.
+        self.stream_store = StreamStore()
+        # Emit times of flows queued for the UI thread; signals arrive in order.
+        self.flow_emit_times = deque()
+        self.scope_rules = ScopeRules()
+        # Endpoints seen so far, updated per flow for the OpenAPI export.
+        self.endpoint_inventory = EndpointInventory()
+        self.proxy_backend = ProxyRunner()
+        self.proxy_backends = {self.proxy_backend.name: self.proxy_backend}
+        with STARTUP.measure("build Proxy Config tab"):
+            self.proxy_tab = ProxyConfigWidget(
+                self.start_proxy,
+                self.stop_proxy,
+                self.show_cert,
+                self.get_request_by_id,
+                self.export_all_data,
+                self.import_all_data,
+                self.apply_scope_rules,
+                self.export_api_inventory,
+            )
+
+        # The passive scanner sees every flow, so its tab is built now.
+        with STARTUP.measure("build Passive Scan tab"):
+            self.scanner_tab = ScannerWidget(self.send_to_replay, self.get_request_by_id,
+                                             lambda: self.logger_tab.store)
+        self.scanner_tab.flow_findings_signal.connect(self._on_flow_findings)
+        REGISTRY.gauge("anvesha_queue_depth", "Flows waiting in each queue of the pipeline",
+                       func=lambda: len(self.flow_emit_times), queue="ui")
+        REGISTRY.gauge("anvesha_queue_depth", func=lambda: self.scanner_tab.scanner.stats()["queued"],
+                       queue="passive_scan")
+        REGISTRY.gauge("anvesha_passive_scan_skipped", "Flows skipped because the passive scan queue was full",
+                       func=lambda: self.scanner_tab.scanner.stats()["flows_skipped"])
+        REGISTRY.gauge("anvesha_logger_flows", "Flows held by the Request Logger",
+                       func=lambda: len(self.logger_tab.store))
+
+        # Tab name -> page in self.tabs; lazy pages build their widget on first use.
+        self.tab_pages = {
+            "proxy": self.proxy_tab,
+            "logger": self.logger_tab,
+            "replay": LazyTab("Replay", "replay_widget", lambda m: m.ReplayWidget()),
+            "bulk": LazyTab("Bulk Sender", "bulksender_widget", lambda m: m.BulkSenderWidget()),
+            "ai": LazyTab("AI Analyser", "ai_analyser_widget",
+                          lambda m: m.AIAnalyserWidget(self.proxy_tab.get_perplexity_api_key)),
+            "inventory": LazyTab("API Inventory", "inventory_widget",
+                                 lambda m: m.InventoryWidget(self.endpoint_inventory)),
+            "scanner": self.scanner_tab,
+            "sequencer": LazyTab("Sequencer", "sequencer_widget",
+                                 lambda m: m.SequencerWidget(lambda: self.logger_tab.store.flows)),
+            "streams": LazyTab("Streams", "streams_widget", lambda m: m.StreamsWidget(self.stream_store)),
+            "dashboard": LazyTab("Dashboard", "dashboard_widget",
+                                 lambda m: m.DashboardWidget(lambda: self.logger_tab.store.columns)),
+            "sessions": LazyTab("Sessions", "sessions_widget",
+                                lambda m: m.SessionsWidget(self.open_archived_flow, self.send_to_replay)),
+        }
+        self.tabs.addTab(self.tab_pages["proxy"], "Proxy Config")
+        self.tabs.addTab(self.tab_pages["logger"], "Request Logger")
+        self.tabs.addTab(self.tab_pages["replay"], "Replay")
+        self.tabs.addTab(self.tab_pages["bulk"], "Bulk Sender")
+        self.tabs.addTab(self.tab_pages["ai"], "AI Analyser")
+        self.tabs.addTab(self.tab_pages["inventory"], "API Inventory")
+        self.tabs.addTab(self.tab_pages["scanner"], "Passive Scan")
+        self.tabs.addTab(self.tab_pages["sequencer"], "Sequencer")
+        self.tabs.addTab(self.tab_pages["streams"], "Streams")
+        self.tabs.addTab(self.tab_pages["dashboard"], "Dashboard")
+        self.tabs.addTab(self.tab_pages["sessions"], "Sessions")
+        self.tabs.currentChanged.connect(self.on_tab_changed)
+
+        self.setCentralWidget(self.tabs)
 
         self.status_timer = QTimer(self)
         self.status_timer.timeout.connect(self.update_proxy_status)
+        self.status_timer.timeout.connect(self.logger_tab.update_memory_stats)
+        self.status_timer.timeout.connect(self.update_inventory_status)
+        self.status_timer.timeout.connect(self.scanner_tab.update_stats)
+        self.status_timer.timeout.connect(self.proxy_tab.metrics_panel.refresh)
+        self.status_timer.timeout.connect(self.update_dashboard)
+        self.status_timer.timeout.connect(self.update_streams)
         self.status_timer.start(2000)  # every 2 seconds
-
-        self.request_map = {}
+        QTimer.singleShot(0, self.start_flow_receiver)
+
+    def start_flow_receiver(self):
+        # Runs from the event loop, after the window has been shown.
+        with STARTUP.measure("start IPC flow receiver"):
+            self.proxy_backends["subprocess"].set_stream_sink(self._queue_stream_event)
+            self.proxy_backends["subprocess"].set_flow_sink(self._queue_flow)
+        STARTUP.mark("event loop running")
+        STARTUP.report()
+
+    def tab(self, name):
+        """The widget of a tab ("replay", "bulk", "ai", ...), built if it has not been yet."""
+        page = self.tab_pages[name]
+        return page.get() if isinstance(page, LazyTab) else page
+
+    def built_tab(self, name):
+        """The widget of a tab, or None for a lazy tab that was never opened."""
+        page = self.tab_pages[name]
+        return page.widget if isinstance(page, LazyTab) else page
+
+    def show_tab(self, name):
+        widget = self.tab(name)
+        self.tabs.setCurrentWidget(self.tab_pages[name])
+        return widget
+
+    @property
+    def replay_tab(self):
+        return self.tab("replay")
+
+    @property
+    def bulk_tab(self):
+        return self.tab("bulk")
+
+    @property
+    def ai_tab(self):
+        return self.tab("ai")
+
+    @property
+    def inventory_tab(self):
+        return self.tab("inventory")
 
     def update_proxy_status(self):
-        if self.proxy_runner.is_running():
-            self.proxy_tab.status_label.setText("Proxy is running")
+        stats = self.proxy_backend.stats()
+        if stats["running"]:
+            health = {True: "healthy", False: "not responding", None: "starting"}[stats["healthy"]]
+            uptime = int(stats["uptime"])
+            text = (
+                f"Proxy is running ({stats['workers_running']}/{len(stats['workers'])} workers, {health}) | "
+                f"uptime {uptime // 3600:d}:{uptime // 60 % 60:02d}:{uptime % 60:02d} | "
+                f"restarts {stats['restarts']} | "
+                f"{stats['flows_per_second']:.1f} flows/s | "
+                f"IPC queue {stats['ipc_queue_depth']}"
+            )
+            remote = stats.get("remote")
+            if remote:
+                text += (
+                    f"\n  agent {remote['agent']} | message {remote['next_seq']} | "
+                    f"{remote['compression']:.1f}x compressed | desktop spool {remote['spool_bytes'] / 1048576:.1f} MB | "
+                    f"agent backlog {remote['agent_backlog']} | lost {remote['lost']} | "
+                    f"reconnects {remote['reconnects']}"
+                )
+            if len(stats["workers"]) > 1:
+                for w in stats["workers"]:
+                    state = f"pid {w['pid']}" if w["running"] else (w["last_error"] or "stopped")
+                    text += (
+                        f"\n  worker {w['worker']} :{w['port']} {state} | "
+                        f"restarts {w['restarts']} | {w['flows_per_second']:.1f} flows/s | "
+                        f"{w['flows_received']} flows"
+                    )
+        elif self.proxy_backend.host is not None and stats["last_error"] and stats.get("remote"):
+            text = f"Reconnecting to the capture agent: {stats['last_error']}"
+        elif self.proxy_backend.host is not None and stats["last_error"]:
+            text = f"Proxy is restarting: {stats['last_error']} (restarts {stats['restarts']})"
         else:
-            self.proxy_tab.status_label.setText("Proxy is stopped")
+            text = "Proxy is stopped"
+        self.proxy_tab.status_label.setText(text)
 
-    def _on_new_flow(self, flow):
-        req_dict = {
-            "id": flow.get("id"),
-            "timestamp": datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-            "method": flow.get("method", ""),
-            "url": flow.get("url", ""),
-            "headers": flow.get("headers", {}),
-            "body": flow.get("body", ""),
-        }
-        resp_dict = {
-            "status": flow.get("response_status", ""),
-            "headers": flow.get("response_headers", {}),
-            "body": flow.get("response_body", ""),
-        }
-        self.request_map[req_dict["id"]] = req_dict
-        self.logger_tab.log_request(req_dict, resp_dict)
+    def _queue_flow(self, flow):
+        # Proxy backend thread: hand the flow to the UI thread.
+        self.flow_emit_times.append(time.perf_counter())
+        self.flow_emitter.new_flow.emit(flow)
 
-    def start_proxy(self, host, port):
-        self.proxy_runner.start_proxy(host, port)
+    def _on_new_flow(self, flow):
+        started = time.perf_counter()
+        if self.flow_emit_times:
+            UI_QUEUE_STAGE.observe(started - self.flow_emit_times.popleft())
+        # Before log_flow: the store packs bodies, the inventory reads them.
+        self.endpoint_inventory.add(flow)
+        inventoried = time.perf_counter()
+        self.logger_tab.log_flow(flow)
+        logged = time.perf_counter()
+        self.scanner_tab.submit(flow)
+        sequencer = self.built_tab("sequencer")
+        if sequencer is not None:
+            sequencer.offer(flow)
+        INVENTORY_STAGE.observe(inventoried - started)
+        LOGGER_STAGE.observe(logged - inventoried)
+        SCANNER_STAGE.observe(time.perf_counter() - logged)
+        FLOWS_DISPLAYED.inc()
+        self.proxy_backend.note_flow_delivered()
+
+    def _queue_stream_event(self, event):
+        # Proxy backend thread, like _queue_flow.
+        self.flow_emitter.stream_event.emit(event)
+
+    def _on_stream_event(self, event):
+        connection, message, dropped = self.stream_store.apply(event)
+        streams = self.built_tab("streams")
+        if streams is not None:
+            streams.on_event(connection, message, dropped)
+
+    def _on_flow_findings(self, by_flow):
+        for flow_id, results in by_flow.items():
+            # Info-level hits (emails, internal IPs) are too common to highlight.
+            titles = [title for check, severity, title in results if check == "secrets" and severity != "Info"]
+            if titles:
+                self.logger_tab.mark_secrets(flow_id, titles)
+
+    def _get_proxy_backend(self, name):
+        backend = self.proxy_backends.get(name)
+        if backend is None:
+            if name == "inprocess":
+                from proxy_engine import InProcessProxy
+                backend = InProcessProxy()
+            elif name == "remote":
+                from remote_capture import RemoteCaptureClient
+                backend = RemoteCaptureClient()
+            else:
+                backend = ProxyRunner()
+            backend.set_stream_sink(self._queue_stream_event)
+            backend.set_flow_sink(self._queue_flow)
+            self.proxy_backends[name] = backend
+        return backend
+
+    def apply_scope_rules(self, rules):
+        self.scope_rules = rules
+        for backend in self.proxy_backends.values():
+            backend.set_scope_rules(rules)
+
+    def start_proxy(self, host, port, workers=1, backend="subprocess"):
+        if backend != self.proxy_backend.name:
+            self.proxy_backend.stop_proxy()
+            self.proxy_backend = self._get_proxy_backend(backend)
+        if backend == "remote":
+            self.proxy_backend.token = self.proxy_tab.agent_token_input.text() or self.proxy_backend.token
+        # Also replaces any rules file left behind by an earlier session.
+        self.proxy_backend.set_scope_rules(self.scope_rules)
+        self.proxy_backend.start_proxy(host, port, workers)
 
     def stop_proxy(self):
-        self.proxy_runner.stop_proxy()
+        self.proxy_backend.stop_proxy()
 
     def show_cert(self):
         home = os.path.expanduser("~")
@@ -395,46 +597,83 @@ class MainApp(QMainWindow):
         )
         QMessageBox.information(self, "mitmproxy CA Certificate Location", msg)
         if os.path.exists(mitmproxy_dir):
+            import webbrowser
             webbrowser.open(f"file://{mitmproxy_dir}")
 
-    def send_to_replay(self, req_text=None):
-        if req_text is None:
-            row = self.logger_tab.table.currentRow()
-            if row == -1:
+    def send_to_replay(self, request=None):
+        if request is None:
+            flow = self.logger_tab.selected_flow()
+            if flow is None:
                 return
-            req_item = self.logger_tab.table.item(row, 2)
-            if req_item:
-                req_text = req_item.text()
-        if req_text:
-            self.replay_tab.add_new_tab(req_text)
-
-    def send_to_bulk_sender(self, req_text=None):
-        if req_text is None:
-            row = self.logger_tab.table.currentRow()
-            if row == -1:
+            request = flow.request
+        self.replay_tab.add_new_tab(request)
+
+    def send_to_bulk_sender(self, request=None):
+        if request is None:
+            flow = self.logger_tab.selected_flow()
+            if flow is None:
                 return
-            req_item = self.logger_tab.table.item(row, 2)
-            if req_item:
-                req_text = req_item.text()
-        if req_text:
-            self.bulk_tab.add_request(req_text)
+            request = flow.request
+        self.bulk_tab.add_request(request)
+
+    def send_to_ai_analyser(self, flows):
+        self.ai_tab.analyze_batch(flows)
+
+    def open_archived_flow(self, flow):
+        # A flow from a saved session, added to the current logger without clearing it.
+        self.endpoint_inventory.add(flow)
+        self.logger_tab.log_flow(flow)
+        self.show_tab("logger")
+
+    def export_api_inventory(self):
+        if not self.endpoint_inventory.endpoints:
+            QMessageBox.information(self, "API Inventory", "No flows have been captured yet.")
+            return
+        save_openapi_document(self, self.endpoint_inventory.to_openapi())
+
+    def update_inventory_status(self):
+        inventory = self.endpoint_inventory
+        self.proxy_tab.inventory_label.setText(
+            f"API inventory: {len(inventory)} endpoints from {inventory.flows_seen} flows"
+        )
+        if self.tabs.currentWidget() is self.tab_pages["inventory"]:
+            self.inventory_tab.refresh()
+
+    def update_dashboard(self):
+        # Only while it is open; refresh() skips the work when no flows arrived.
+        dashboard = self.built_tab("dashboard")
+        if dashboard is not None:
+            dashboard.refresh()
+
+    def update_streams(self):
+        streams = self.built_tab("streams")
+        if streams is not None:
+            streams.refresh()
+
+    def on_tab_changed(self, index):
+        if self.tabs.widget(index) is self.tab_pages["inventory"]:
+            self.inventory_tab.refresh()
 
     def get_request_by_id(self, req_id):
-        return self.request_map.get(req_id)
+        return self.logger_tab.store.get(req_id)
 
     def export_all_data(self):
-        filename, _ = QFileDialog.getSaveFileName(self, "Save Exported Data", "", "JSON Files (*.json)")
+        from session_index import SESSIONS_DIR
+        # Sessions saved in the sessions folder are found by the Sessions tab's search.
+        default = os.path.join(SESSIONS_DIR, time.strftime("session-%Y%m%d-%H%M%S.json"))
+        try:
+            os.makedirs(SESSIONS_DIR, exist_ok=True)
+        except OSError:
+            default = ""
+        filename, _ = QFileDialog.getSaveFileName(self, "Save Exported Data", default, "JSON Files (*.json)")
         if not filename:
             return
         try:
             # Prepare clean dict format for logger requests
-            logger_data = []
-            for req_id, timestamp, req_str, resp_str in self.logger_tab.all_rows:
-                req_dict = self.logger_tab.parse_req_resp_to_dict(req_id, timestamp, req_str)
-                resp_dict = self.logger_tab.parse_resp_str_to_dict(resp_str)
-                logger_data.append({'request': req_dict, 'response': resp_dict})
+            logger_data = [flow.to_dict() for flow in self.logger_tab.store]
 
-            replay_data = self.replay_tab.get_all_replay_data()
+            replay_tab = self.built_tab("replay")
+            replay_data = replay_tab.get_all_replay_data() if replay_tab is not None else []
 
             data = {
                 "logger_requests": logger_data,
@@ -444,6 +683,9 @@ class MainApp(QMainWindow):
             with open(filename, "w") as f:
                 json.dump(data, f, indent=2)
             QMessageBox.information(self, "Export Successful", f"Exported data saved to {filename}")
+            sessions = self.built_tab("sessions")
+            if sessions is not None:
+                sessions.start_sync()
         except Exception as e:
             QMessageBox.warning(self, "Export Failed", str(e))
 
@@ -458,28 +700,45 @@ class MainApp(QMainWindow):
             replay_requests = data.get("replay_requests", [])
 
             self.logger_tab.clear_all()
+            self.endpoint_inventory.clear()
+            if self.built_tab("inventory") is not None:
+                self.inventory_tab.clear_all()
             for item in logger_requests:
-                req_dict = item.get('request', {})
-                resp_dict = item.get('response', {})
-                if req_dict:
-                    self.logger_tab.log_request(req_dict, resp_dict)
-
-            self.replay_tab.clear_all()
-            for item in replay_requests:
-                self.replay_tab.load_replay_data(item)
+                if item.get('request'):
+                    flow = Flow.from_dict(item)
+                    self.endpoint_inventory.add(flow)
+                    self.logger_tab.log_flow(flow)
+
+            # The Replay tab is only built when there is something to load into it.
+            replay_tab = self.replay_tab if replay_requests else self.built_tab("replay")
+            if replay_tab is not None:
+                replay_tab.clear_all()
+                for item in replay_requests:
+                    replay_tab.load_replay_data(item)
 
             QMessageBox.information(self, "Import Successful", f"Imported data loaded from {filename}")
         except Exception as e:
             QMessageBox.warning(self, "Import Failed", str(e))
 
     def closeEvent(self, event):
-        self.flow_receiver.stop()
-        self.proxy_runner.stop_proxy()
+        for backend in self.proxy_backends.values():
+            backend.stop_proxy()
+            backend.close()
+        if self.built_tab("ai") is not None:
+            self.ai_tab.shutdown()
+        self.scanner_tab.shutdown()
+        self.proxy_tab.metrics_panel.shutdown()
+        if self.built_tab("sessions") is not None:
+            self.tab("sessions").close_index()
+        shutdown_renderer()
         super().closeEvent(event)
 
 
 if __name__ == "__main__":
-    app = QApplication(sys.argv)
-    window = MainApp()
+    with STARTUP.measure("create QApplication"):
+        app = QApplication(sys.argv)
+    with STARTUP.measure("build main window"):
+        window = MainApp()
     window.show()
+    STARTUP.mark("window shown")
     sys.exit(app.exec_())
@@ -0,0 +1,292 @@
+# metrics.py
+#
+# Lightweight pipeline instrumentation: counters, gauges and latency
+# histograms kept in one registry, exported in the Prometheus text format
+# (to a file or a local /metrics endpoint). Recording a value is a lock and
+# an add, so it can sit on the hot path of every flow.
+#
+# Metrics are identified by name plus labels, e.g.
+#   REGISTRY.histogram("anvesha_stage_seconds", "...", stage="json_decode")
+# Gauges can be given a function, read only when metrics are collected.
+#
+# UIProfiler profiles the UI thread on demand with cProfile, or with a
+# sampling thread that records the UI thread's stack every few ms (lower
+# overhead, coarser numbers).
+
+import bisect
+import collections
+import sys
+import threading
+
+# Latency buckets in seconds, 50 us to 10 s.
+DEFAULT_BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+                   0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+DEFAULT_METRICS_PORT = 9464
+SAMPLE_INTERVAL = 0.005
+
+
+def _label_text(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in labels) + "}"
+
+
+class Counter:
+    __slots__ = ("name", "labels", "value", "_lock")
+    kind = "counter"
+
+    def __init__(self, name, labels):
+        self.name = name
+        self.labels = labels
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self._lock:
+            self.value += amount
+
+    def samples(self):
+        return [(self.name, self.labels, self.value)]
+
+
+class Gauge:
+    __slots__ = ("name", "labels", "value", "func")
+    kind = "gauge"
+
+    def __init__(self, name, labels, func=None):
+        self.name = name
+        self.labels = labels
+        self.value = 0
+        self.func = func
+
+    def set(self, value):
+        self.value = value
+
+    def get(self):
+        if self.func is None:
+            return self.value
+        try:
+            return self.func()
+        except Exception:
+            return 0
+
+    def samples(self):
+        return [(self.name, self.labels, self.get())]
+
+
+class Histogram:
+    __slots__ = ("name", "labels", "buckets", "counts", "count", "sum", "max", "_lock")
+    kind = "histogram"
+
+    def __init__(self, name, labels, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.labels = labels
+        self.buckets = tuple(buckets)
+        # One slot per bucket plus the +Inf overflow.
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[i] += 1
+            self.count += 1
+            self.sum += value
+            if value > self.max:
+                self.max = value
+
+    def percentile(self, fraction):
+        """Estimate from the buckets, interpolating linearly inside one."""
+        with self._lock:
+            counts, total, peak = list(self.counts), self.count, self.max
+        if not total:
+            return 0.0
+        rank = fraction * total
+        seen = 0
+        for i, n in enumerate(counts):
+            if n and seen + n >= rank:
+                low = self.buckets[i - 1] if i > 0 else 0.0
+                high = self.buckets[i] if i < len(self.buckets) else peak
+                return min(peak, low + (high - low) * (rank - seen) / n)
+            seen += n
+        return peak
+
+    def samples(self):
+        with self._lock:
+            counts, total, value_sum = list(self.counts), self.count, self.sum
+        out, running = [], 0
+        for bound, n in zip(self.buckets + (float("inf"),), counts):
+            running += n
+            le = "+Inf" if bound == float("inf") else repr(bound)
+            out.append((self.name + "_bucket", self.labels + (("le", le),), running))
+        out.append((self.name + "_sum", self.labels, value_sum))
+        out.append((self.name + "_count", self.labels, total))
+        return out
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = {}
+        self._help = {}
+        self._lock = threading.Lock()
+
+    def _get(self, cls, name, help_text, labels, **kwargs):
+        key = (name, tuple(sorted(labels.items())))
+        metric = self._metrics.get(key)
+        if metric is None:
+            with self._lock:
+                metric = self._metrics.get(key)
+                if metric is None:
+                    metric = self._metrics[key] = cls(name, key[1], **kwargs)
+                    self._help.setdefault(name, (cls.kind, help_text))
+        return metric
+
+    def counter(self, name, help_text="", **labels):
+        return self._get(Counter, name, help_text, labels)
+
+    def gauge(self, name, help_text="", func=None, **labels):
+        gauge = self._get(Gauge, name, help_text, labels)
+        if func is not None:
+            gauge.func = func
+        return gauge
+
+    def histogram(self, name, help_text="", buckets=DEFAULT_BUCKETS, **labels):
+        return self._get(Histogram, name, help_text, labels, buckets=buckets)
+
+    def metrics(self):
+        with self._lock:
+            return list(self._metrics.values())
+
+    def to_prometheus(self):
+        lines, described = [], set()
+        for metric in sorted(self.metrics(), key=lambda m: (m.name, m.labels)):
+            if metric.name not in described:
+                described.add(metric.name)
+                kind, help_text = self._help[metric.name]
+                if help_text:
+                    lines.append(f"# HELP {metric.name} {help_text}")
+                lines.append(f"# TYPE {metric.name} {kind}")
+            for name, labels, value in metric.samples():
+                lines.append(f"{name}{_label_text(labels)} {value}")
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path):
+        with open(path, "w") as f:
+            f.write(self.to_prometheus())
+
+
+REGISTRY = Registry()
+
+
+class MetricsServer:
+    """Serves the registry at http://host:port/metrics from a daemon thread."""
+
+    def __init__(self, port=DEFAULT_METRICS_PORT, host="127.0.0.1", registry=REGISTRY):
+        # Imported here: the HTTP server stack is only needed once serving is switched on.
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] not in ("/", "/metrics"):
+                    self.send_error(404)
+                    return
+                body = registry.to_prometheus().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), MetricsHandler)
+        self.url = f"http://{host}:{self.server.server_address[1]}/metrics"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        print(f"[Metrics] Serving {self.url}")
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class UIProfiler:
+    """Profiles the thread that calls start() (the UI thread) until stop().
+
+    mode "cprofile" traces every call on that thread; mode "sampling" looks
+    at its stack every SAMPLE_INTERVAL from a helper thread instead.
+    """
+
+    def __init__(self):
+        self.mode = None
+        self._profile = None
+        self._sampler = None
+        self._stop = threading.Event()
+        self._samples = collections.Counter()
+        self._self_samples = collections.Counter()
+        self._total = 0
+
+    @property
+    def running(self):
+        return self.mode is not None
+
+    def start(self, mode="cprofile"):
+        if self.running:
+            return
+        self.mode = mode
+        if mode == "cprofile":
+            import cProfile
+            self._profile = cProfile.Profile()
+            self._profile.enable()
+            return
+        self._samples.clear()
+        self._self_samples.clear()
+        self._total = 0
+        self._stop.clear()
+        self._sampler = threading.Thread(target=self._sample, args=(threading.get_ident(),), daemon=True)
+        self._sampler.start()
+
+    def _sample(self, thread_id):
+        while not self._stop.wait(SAMPLE_INTERVAL):
+            frame = sys._current_frames().get(thread_id)
+            if frame is None:
+                continue
+            self._total += 1
+            self._self_samples[self._where(frame)] += 1
+            seen = set()
+            while frame is not None:
+                where = self._where(frame)
+                if where not in seen:
+                    seen.add(where)
+                    self._samples[where] += 1
+                frame = frame.f_back
+
+    @staticmethod
+    def _where(frame):
+        code = frame.f_code
+        return f"{code.co_filename.rsplit('/', 1)[-1]}:{code.co_firstlineno}({code.co_name})"
+
+    def stop(self, limit=40):
+        """Stop and return a text report of the top functions."""
+        mode, self.mode = self.mode, None
+        if mode == "cprofile":
+            import io
+            import pstats
+            profile, self._profile = self._profile, None
+            profile.disable()
+            out = io.StringIO()
+            pstats.Stats(profile, stream=out).sort_stats("cumulative").print_stats(limit)
+            return out.getvalue()
+        if mode == "sampling":
+            self._stop.set()
+            self._sampler.join()
+            total = self._total or 1
+            lines = [f"{self._total} samples every {SAMPLE_INTERVAL * 1000:.0f} ms", "",
+                     f"{'total %':>8} {'self %':>8}  function"]
+            for where, n in self._samples.most_common(limit):
+                lines.append(f"{n / total * 100:8.1f} {self._self_samples[where] / total * 100:8.1f}  {where}")
+            return "\n".join(lines)
+        return ""
@@ -0,0 +1,138 @@
+# metrics_widget.py
+#
+# Pipeline metrics panel for the Proxy Config tab: one row per counter,
+# gauge and stage histogram in metrics.REGISTRY, with rates since the last
+# refresh and latency percentiles. Metrics can be saved as a Prometheus
+# text file or served on a local /metrics endpoint, and the UI thread can
+# be profiled on demand.
+
+import time
+
+from PyQt5.QtWidgets import (
+    QWidget, QVBoxLayout, QHBoxLayout, QLabel, QLineEdit, QPushButton, QCheckBox, QComboBox,
+    QTableWidget, QTableWidgetItem, QHeaderView, QAbstractItemView, QTextEdit, QFileDialog, QMessageBox
+)
+
+from metrics import DEFAULT_METRICS_PORT, REGISTRY, MetricsServer, UIProfiler
+
+
+def _metric_label(metric):
+    labels = ", ".join(f"{k}={v}" for k, v in metric.labels)
+    return f"{metric.name} {{{labels}}}" if labels else metric.name
+
+
+class MetricsPanel(QWidget):
+    def __init__(self, registry=REGISTRY):
+        super().__init__()
+        self.registry = registry
+        self.server = None
+        self.profiler = UIProfiler()
+        # metric label -> (count or value, time) at the previous refresh, for rates
+        self.previous = {}
+
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+
+        controls = QHBoxLayout()
+        controls.addWidget(QLabel("Pipeline Metrics:"))
+        export_btn = QPushButton("Export Metrics (Prometheus)")
+        export_btn.clicked.connect(self.export_metrics)
+        controls.addWidget(export_btn)
+        self.serve_checkbox = QCheckBox("Serve /metrics on port")
+        self.serve_checkbox.toggled.connect(self.on_serve_toggled)
+        self.serve_port_input = QLineEdit(str(DEFAULT_METRICS_PORT))
+        self.serve_port_input.setMaximumWidth(70)
+        controls.addWidget(self.serve_checkbox)
+        controls.addWidget(self.serve_port_input)
+        self.profile_checkbox = QCheckBox("Profile UI thread")
+        self.profile_checkbox.setToolTip("Record until unchecked, then show the busiest functions")
+        self.profile_checkbox.toggled.connect(self.on_profile_toggled)
+        self.profile_mode = QComboBox()
+        self.profile_mode.addItem("cProfile (every call)", "cprofile")
+        self.profile_mode.addItem("Sampling (low overhead)", "sampling")
+        controls.addWidget(self.profile_checkbox)
+        controls.addWidget(self.profile_mode)
+        layout.addLayout(controls)
+
+        self.table = QTableWidget(0, 6)
+        self.table.setHorizontalHeaderLabels(["Metric", "Value / Count", "Rate /s", "p50 ms", "p95 ms", "Max ms"])
+        self.table.horizontalHeader().setSectionResizeMode(0, QHeaderView.Stretch)
+        self.table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.table.verticalHeader().setVisible(False)
+        layout.addWidget(self.table)
+
+        self.profile_output = QTextEdit()
+        self.profile_output.setReadOnly(True)
+        self.profile_output.setLineWrapMode(QTextEdit.NoWrap)
+        self.profile_output.hide()
+        layout.addWidget(self.profile_output)
+
+    def refresh(self):
+        if not self.isVisible():
+            return
+        now = time.monotonic()
+        rows = []
+        for metric in sorted(self.registry.metrics(), key=lambda m: (m.kind != "histogram", m.name, m.labels)):
+            label = _metric_label(metric)
+            if metric.kind == "histogram":
+                value = metric.count
+                cells = [f"{metric.percentile(0.5) * 1000:.3f}", f"{metric.percentile(0.95) * 1000:.3f}",
+                         f"{metric.max * 1000:.3f}"]
+            else:
+                value = metric.value if metric.kind == "counter" else metric.get()
+                cells = ["", "", ""]
+            rate = ""
+            if metric.kind != "gauge":
+                before = self.previous.get(label)
+                if before is not None and now > before[1]:
+                    rate = f"{(value - before[0]) / (now - before[1]):.1f}"
+                self.previous[label] = (value, now)
+            rows.append([label, str(value), rate] + cells)
+        self.table.setRowCount(len(rows))
+        for row, cells in enumerate(rows):
+            for col, text in enumerate(cells):
+                self.table.setItem(row, col, QTableWidgetItem(text))
+
+    def export_metrics(self):
+        filename, _ = QFileDialog.getSaveFileName(self, "Export Metrics", "anvesha_metrics.prom",
+                                                  "Prometheus Text (*.prom *.txt)")
+        if not filename:
+            return
+        try:
+            self.registry.write_prometheus(filename)
+        except OSError as e:
+            QMessageBox.warning(self, "Export Failed", str(e))
+
+    def on_serve_toggled(self, checked):
+        if not checked:
+            self.stop_server()
+            return
+        port = self.serve_port_input.text().strip()
+        try:
+            self.server = MetricsServer(int(port), registry=self.registry)
+        except (ValueError, OSError) as e:
+            QMessageBox.warning(self, "Metrics Endpoint", f"Could not serve metrics on port {port}: {e}")
+            self.serve_checkbox.setChecked(False)
+            return
+        self.serve_checkbox.setToolTip(self.server.url)
+        self.serve_port_input.setEnabled(False)
+
+    def stop_server(self):
+        if self.server is not None:
+            self.server.close()
+            self.server = None
+        self.serve_port_input.setEnabled(True)
+
+    def on_profile_toggled(self, checked):
+        if checked:
+            self.profile_mode.setEnabled(False)
+            self.profiler.start(self.profile_mode.currentData())
+            return
+        self.profile_mode.setEnabled(True)
+        self.profile_output.setPlainText(self.profiler.stop())
+        self.profile_output.show()
+
+    def shutdown(self):
+        if self.profiler.running:
+            self.profiler.stop()
+        self.stop_server()
@@ -1,31 +1,88 @@
+import base64
 import json
 import socket
 import os
+import time
+from capture_hooks import CaptureHooks
+from scope_rules import RulesFile
+from stream_capture import event_to_ipc
 
-SOCKET_PATH = "/tmp/anvesha_proxy.sock"
+# Set by capture_agent.py to collect flows on a remote capture machine.
+SOCKET_PATH = os.environ.get("ANVESHA_SOCKET_PATH", "/tmp/anvesha_proxy.sock")
+# Set by ProxyRunner when several mitmdump workers feed the same UI.
+WORKER_ID = int(os.environ.get("ANVESHA_WORKER_ID", "0"))
+# Capture scope pushed by the UI; reloaded when the rules file changes.
+SCOPE = RulesFile()
+# Failed sends so far; reported with the next flow that gets through.
+SEND_ERRORS = 0
 print("==== LOADED mitmproxy_addon_ipc.py ====", flush=True)
 
-def response(flow):
-    print("In Addon IPC........")
+
+def _put_body(data, key, content, rules):
+    # Raw bytes are sent as UTF-8 text when possible, base64 otherwise, so
+    # binary bodies reach the UI unchanged.
+    if content is None:
+        data[key] = None
+        return
+    content, original_size = rules.truncate(content)
+    if original_size is not None:
+        data[key + "_truncated"] = original_size
+    try:
+        data[key] = content.decode("utf-8")
+    except UnicodeDecodeError:
+        data[key + "_b64"] = base64.b64encode(content).decode("ascii")
+
+
+def _deliver_flow(flow, rules, recorder):
+    started = time.perf_counter()
     data = {
         "id": flow.id,
+        "worker": WORKER_ID,
+        "timestamp": flow.request.timestamp_start,
         "method": flow.request.method,
         "host": flow.request.host,
         "url": flow.request.url,
-        "headers": dict(flow.request.headers),
-        "body": flow.request.get_text(),
+        "http_version": flow.request.http_version,
+        "headers": list(flow.request.headers.items(multi=True)),
         "response_status": flow.response.status_code if flow.response else None,
-        "response_headers": dict(flow.response.headers) if flow.response else None,
-        "response_body": flow.response.get_text() if flow.response else None
+        "response_reason": flow.response.reason if flow.response else None,
+        "response_http_version": flow.response.http_version if flow.response else None,
+        "response_headers": list(flow.response.headers.items(multi=True)) if flow.response else None,
     }
-    print("Trying to send to socket:", SOCKET_PATH)
+    if flow.response and flow.response.timestamp_end and flow.request.timestamp_start:
+        data["duration"] = flow.response.timestamp_end - flow.request.timestamp_start
+    _put_body(data, "body", flow.request.get_content(strict=False), rules)
+    if recorder is not None:
+        # The body went to the UI as stream_chunk events.
+        data["response_body"] = ""
+        data["response_body_truncated"] = recorder.size
+    else:
+        _put_body(data, "response_body", flow.response.get_content(strict=False) if flow.response else None, rules)
+    # Pipeline metrics for the UI: time spent here, send time and failures so far.
+    data["addon_seconds"] = time.perf_counter() - started
+    data["send_errors"] = SEND_ERRORS
+    data["sent_at"] = time.time()
+    _send(data)
+
+
+def _send_event(event):
+    _send(event_to_ipc(event))
+
+
+def _send(data):
+    global SEND_ERRORS
     try:
         if os.path.exists(SOCKET_PATH):
             with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
                 client.connect(SOCKET_PATH)
                 client.sendall((json.dumps(data) + "\n").encode("utf-8"))
-            print("Sent flow to socket")
         else:
+            SEND_ERRORS += 1
             print("Socket not found when trying to send.")
     except Exception as e:
+        SEND_ERRORS += 1
         print(f"IPC send error: {e}")
+
+
+# Scope, health check, streams and WebSocket events are handled in capture_hooks.py.
+addons = [CaptureHooks(_deliver_flow, _send_event, SCOPE.current, WORKER_ID)]
@@ -0,0 +1,171 @@
+# passive_checks.py
+#
+# Passive checks run by the scanner (passive_scanner.py) on every captured
+# flow. A check is a function check(request, response) that returns a list
+# of findings, each a (severity, title, detail) tuple. It must not send
+# traffic or keep state between flows. Checks run in worker processes, so
+# this module imports nothing from the UI.
+#
+# Add a check with register_check(name, func), at import time or later.
+# func must be a module-level function of an importable module: the
+# scanner sends each worker the module and name of every check registered
+# outside this file, and the worker imports and registers it. Functions
+# defined in the __main__ script or inside another function cannot be
+# found that way and do not run.
+
+import importlib
+import re
+from urllib.parse import parse_qsl, unquote_plus, urlsplit
+
+from secret_matcher import default_matcher
+
+SEVERITY_HIGH = "High"
+SEVERITY_MEDIUM = "Medium"
+SEVERITY_LOW = "Low"
+SEVERITY_INFO = "Info"
+SEVERITIES = (SEVERITY_HIGH, SEVERITY_MEDIUM, SEVERITY_LOW, SEVERITY_INFO)
+
+# Parameter values shorter than this reflect by coincidence ("1", "en").
+MIN_REFLECTED_LENGTH = 4
+# Only the start of a body is searched for reflections and error traces.
+SCAN_TEXT_LIMIT = 256 * 1024
+
+# name -> check function, in run order
+CHECKS = {}
+# name -> (module, qualified name) of checks defined outside this module,
+# for the scanner's worker processes to import.
+EXTERNAL_CHECKS = {}
+
+
+def register_check(name, func):
+    CHECKS[name] = func
+    module, qualname = func.__module__, func.__qualname__
+    if module == "__main__" or "<locals>" in qualname:
+        print(f"[passive_checks] check {name!r} cannot be imported by scanner workers and will not run")
+    elif module != __name__:
+        EXTERNAL_CHECKS[name] = (module, qualname)
+    return func
+
+
+def import_check(name, module, qualname):
+    """Register a check defined in another module, in a worker process."""
+    func = importlib.import_module(module)
+    for attr in qualname.split("."):
+        func = getattr(func, attr)
+    CHECKS[name] = func
+
+
+def _is_html(response):
+    return "html" in (response.headers.get("content-type") or "").lower()
+
+
+def _is_https(request):
+    return request.url.lower().startswith("https:")
+
+
+def _response_text(response):
+    return response.body[:SCAN_TEXT_LIMIT].decode("utf-8", errors="replace")
+
+
+def check_security_headers(request, response):
+    if response is None or not _is_html(response) or not response.status_code or response.status_code >= 400:
+        return []
+    findings = []
+    headers = response.headers
+    if _is_https(request) and "strict-transport-security" not in headers:
+        findings.append((SEVERITY_LOW, "Missing Strict-Transport-Security", "HTTPS page without an HSTS header."))
+    csp = headers.get("content-security-policy") or ""
+    if not csp:
+        findings.append((SEVERITY_LOW, "Missing Content-Security-Policy", "HTML response without a CSP."))
+    if "x-frame-options" not in headers and "frame-ancestors" not in csp:
+        findings.append((SEVERITY_LOW, "Clickjacking protection missing",
+                         "Neither X-Frame-Options nor CSP frame-ancestors is set."))
+    if (headers.get("x-content-type-options") or "").lower() != "nosniff":
+        findings.append((SEVERITY_INFO, "Missing X-Content-Type-Options: nosniff", ""))
+    return findings
+
+
+def _request_params(request):
+    parts = urlsplit(request.url)
+    params = parse_qsl(parts.query, keep_blank_values=True)
+    content_type = (request.headers.get("content-type") or "").lower()
+    if "x-www-form-urlencoded" in content_type:
+        params += parse_qsl(request.body_text, keep_blank_values=True)
+    return params
+
+
+def check_reflected_params(request, response):
+    if response is None or not response.body_size or not _is_html(response):
+        return []
+    params = [(k, v) for k, v in _request_params(request) if len(v) >= MIN_REFLECTED_LENGTH]
+    if not params:
+        return []
+    text = _response_text(response)
+    findings = []
+    for name, value in params:
+        for candidate in {value, unquote_plus(value)}:
+            if candidate in text:
+                severity = SEVERITY_MEDIUM if any(c in candidate for c in "<>\"'") else SEVERITY_INFO
+                findings.append((severity, f"Parameter '{name}' reflected in response",
+                                 f"Value {candidate[:80]!r} appears unencoded in the HTML."))
+                break
+    return findings
+
+
+def check_secrets(request, response):
+    # One automaton pass per body over all secret rules (secret_matcher.py).
+    findings = []
+    for part, match in default_matcher().scan_flow(request, response):
+        findings.append((match.severity, f"{match.rule} in {part}", f"{match.preview} at offset {match.start}"))
+    return findings
+
+
+ERROR_PATTERNS = (
+    ("Python traceback", re.compile(r"Traceback \(most recent call last\):")),
+    ("Java stack trace", re.compile(r"\bat [\w$.]+\([\w$]+\.java:\d+\)")),
+    (".NET exception", re.compile(r"System\.[\w.]+Exception|Server Error in '/' Application")),
+    ("PHP error", re.compile(r"<b>(?:Fatal error|Warning|Parse error)</b>:|PHP (?:Fatal|Parse) error")),
+    ("SQL error", re.compile(
+        r"SQL syntax.*MySQL|ORA-\d{5}|PG::SyntaxError|SQLSTATE\[|SQLite3::|Unclosed quotation mark", re.I)),
+    ("Node.js stack trace", re.compile(r"\n\s+at [\w.<>]+ \((?:/|[A-Z]:\\)[^)]+:\d+:\d+\)")),
+)
+
+
+def check_verbose_errors(request, response):
+    if response is None or not response.body_size:
+        return []
+    text = _response_text(response)
+    findings = []
+    for title, pattern in ERROR_PATTERNS:
+        match = pattern.search(text)
+        if match:
+            findings.append((SEVERITY_MEDIUM, f"Verbose error: {title}",
+                             f"Status {response.status_code}: {match.group(0).strip()[:100]!r}"))
+    return findings
+
+
+def check_cookies(request, response):
+    if response is None:
+        return []
+    findings = []
+    for value in response.headers.get_all("set-cookie"):
+        name = value.split("=", 1)[0].strip()
+        attrs = {a.strip().split("=", 1)[0].lower() for a in value.split(";")[1:]}
+        missing = []
+        if _is_https(request) and "secure" not in attrs:
+            missing.append("Secure")
+        if "httponly" not in attrs:
+            missing.append("HttpOnly")
+        if "samesite" not in attrs:
+            missing.append("SameSite")
+        if missing:
+            severity = SEVERITY_LOW if "Secure" in missing or "HttpOnly" in missing else SEVERITY_INFO
+            findings.append((severity, f"Cookie '{name}' without {', '.join(missing)}", ""))
+    return findings
+
+
+register_check("security-headers", check_security_headers)
+register_check("reflected-params", check_reflected_params)
+register_check("secrets", check_secrets)
+register_check("verbose-errors", check_verbose_errors)
+register_check("cookies", check_cookies)
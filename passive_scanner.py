@@ -0,0 +1,308 @@
+# passive_scanner.py
+#
+# Runs the passive checks (passive_checks.py) on every captured flow in a
+# pool of worker processes, away from the UI thread and the proxy.
+#
+# submit() never blocks. Flows go into a bounded queue; if the workers fall
+# behind and the queue fills, new flows are skipped and counted rather than
+# slowing capture. A dispatcher thread sends queued flows to the pool in
+# batches, keeping a fixed number of batches in flight. Workers time each
+# check, and stats() reports the totals so slow rules are easy to spot.
+#
+# Findings are deduplicated per endpoint (method + path template): a second
+# flow hitting the same issue only bumps the finding's count.
+
+import os
+import queue
+import sys
+import threading
+import time
+from urllib.parse import urlsplit
+
+from body_codec import unpack
+from endpoints import path_template
+
+MAX_QUEUED_FLOWS = 2000
+BATCH_SIZE = 32
+BATCH_WAIT = 0.05
+# Bodies beyond this are not sent to workers; checks only read the start.
+SCAN_BODY_LIMIT = 256 * 1024
+
+
+def default_workers():
+    return max(1, min(4, (os.cpu_count() or 2) - 1))
+
+
+def _job(flow):
+    """Plain tuple for a flow: cheap to pickle and free of UI state."""
+    request, response = flow.request, flow.response
+    job = (flow.id, request.method, request.url, request.headers.fields,
+           unpack(request.stored_body, SCAN_BODY_LIMIT))
+    if response is None:
+        return job + (None, None, None)
+    return job + (response.status_code, response.headers.fields, unpack(response.stored_body, SCAN_BODY_LIMIT))
+
+
+# Checks a worker failed to import, reported once.
+_unimportable = set()
+
+
+def _external_checks():
+    from passive_checks import EXTERNAL_CHECKS
+    return tuple((name, module, qualname) for name, (module, qualname) in EXTERNAL_CHECKS.items())
+
+
+def endpoint_of(method, url):
+    parts = urlsplit(url)
+    return f"{(method or 'GET').upper()} {parts.scheme}://{parts.netloc}{path_template(parts.path)}"
+
+
+def scan_batch(jobs, check_names=None, external_checks=()):
+    """Worker entry point: returns ([(flow_id, endpoint, check, severity, title, detail)], {check: [runs, seconds, errors]}).
+
+    external_checks are (name, module, qualified name) of checks registered
+    outside passive_checks in the UI process; they are imported here once.
+    """
+    from flow_model import HttpRequest, HttpResponse
+    from passive_checks import CHECKS, import_check
+
+    for name, module, qualname in external_checks:
+        if name in CHECKS or name in _unimportable:
+            continue
+        try:
+            import_check(name, module, qualname)
+        except Exception as e:
+            _unimportable.add(name)
+            print(f"[PassiveScanner] cannot import check {name!r} from {module}: {e}")
+
+    checks = {name: CHECKS[name] for name in check_names if name in CHECKS} if check_names else CHECKS
+    findings = []
+    timings = {name: [0, 0.0, 0] for name in checks}
+    for flow_id, method, url, req_headers, req_body, status, resp_headers, resp_body in jobs:
+        request = HttpRequest(method, url, req_headers, req_body)
+        response = HttpResponse(status, "", resp_headers, resp_body) if status is not None else None
+        endpoint = endpoint_of(method, url)
+        for name, check in checks.items():
+            timing = timings[name]
+            t0 = time.perf_counter()
+            try:
+                results = check(request, response)
+            except Exception:
+                results = ()
+                timing[2] += 1
+            timing[0] += 1
+            timing[1] += time.perf_counter() - t0
+            for severity, title, detail in results:
+                findings.append((flow_id, endpoint, name, severity, title, detail))
+    return findings, timings
+
+
+class Finding:
+    __slots__ = ("check", "severity", "title", "detail", "endpoint", "flow_ids", "count")
+
+    def __init__(self, check, severity, title, detail, endpoint, flow_id):
+        self.check = check
+        self.severity = severity
+        self.title = title
+        self.detail = detail
+        self.endpoint = endpoint
+        # The first few flows showing the issue, for jumping to an example.
+        self.flow_ids = [flow_id]
+        self.count = 1
+
+    @property
+    def key(self):
+        return (self.endpoint, self.check, self.title)
+
+
+class PassiveScanner:
+    """on_findings(new, updated) is called from a pool thread with lists of Finding.
+
+    on_flow_findings({flow_id: [(check, severity, title)]}), if set, gets
+    every result per flow before deduplication, for marking rows.
+    """
+
+    MAX_FLOW_IDS = 5
+
+    def __init__(self, on_findings=None, workers=None, max_queued=MAX_QUEUED_FLOWS, on_flow_findings=None):
+        self.on_findings = on_findings
+        self.on_flow_findings = on_flow_findings
+        self.workers = workers or default_workers()
+        self.enabled = True
+        self.findings = {}
+        self.flows_queued = 0
+        self.flows_scanned = 0
+        self.flows_skipped = 0
+        self.check_errors = 0
+        # check name -> [runs, seconds, errors]
+        self.timings = {}
+        self._queue = queue.Queue(maxsize=max_queued)
+        # Batches in flight; more would only queue inside the pool.
+        self._slots = threading.Semaphore(self.workers * 2)
+        self._lock = threading.Lock()
+        self._executor = None
+        self._dispatcher = None
+        self._stopping = threading.Event()
+
+    def _start(self):
+        # Imported on first use so they stay off the app's startup path.
+        import multiprocessing
+        from concurrent.futures import ProcessPoolExecutor
+
+        # Spawn rather than fork: forking a process that runs Qt and other
+        # threads is not safe.
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"))
+        self._dispatcher = threading.Thread(target=self._dispatch, name="passive-scan", daemon=True)
+        self._dispatcher.start()
+
+    def submit(self, flow):
+        if not self.enabled or self._stopping.is_set():
+            return False
+        if self._executor is None:
+            self._start()
+        try:
+            self._queue.put_nowait(flow)
+        except queue.Full:
+            self.flows_skipped += 1
+            return False
+        self.flows_queued += 1
+        return True
+
+    def _dispatch(self):
+        while not self._stopping.is_set():
+            try:
+                batch = [self._queue.get(timeout=0.5)]
+            except queue.Empty:
+                continue
+            deadline = time.monotonic() + BATCH_WAIT
+            while len(batch) < BATCH_SIZE:
+                try:
+                    batch.append(self._queue.get(timeout=max(0, deadline - time.monotonic())))
+                except queue.Empty:
+                    break
+            self._slots.acquire()
+            if self._stopping.is_set():
+                break
+            try:
+                # Built here, not in submit(), so body unpacking stays off the UI thread.
+                jobs = [_job(flow) for flow in batch]
+                future = self._executor.submit(scan_batch, jobs, None, _external_checks())
+            except Exception as e:
+                print(f"[PassiveScanner] could not submit batch: {e}")
+                self._slots.release()
+                continue
+            future.add_done_callback(lambda f, n=len(jobs): self._batch_done(f, n))
+
+    def scan_history(self, flows, check_names=None, on_progress=None):
+        """Scan already captured flows in parallel batches, without the live
+        queue's skipping. Runs in a background thread and returns it;
+        on_progress(done, total) is called as batches complete.
+        """
+        if self._executor is None:
+            self._start()
+        flows = list(flows)
+        progress = {"done": 0}
+        progress_lock = threading.Lock()
+
+        def batch_done(future, size):
+            self._batch_done(future, size)
+            with progress_lock:
+                progress["done"] += size
+                done = progress["done"]
+            if on_progress is not None:
+                on_progress(done, len(flows))
+
+        def run():
+            for start in range(0, len(flows), BATCH_SIZE):
+                # Waits for a free slot: history may take its time, live
+                # capture never waits on it (its flows are skipped instead).
+                self._slots.acquire()
+                if self._stopping.is_set():
+                    return
+                batch = flows[start:start + BATCH_SIZE]
+                try:
+                    future = self._executor.submit(scan_batch, [_job(flow) for flow in batch], check_names,
+                                                   _external_checks())
+                except Exception as e:
+                    print(f"[PassiveScanner] history scan stopped: {e}")
+                    self._slots.release()
+                    return
+                future.add_done_callback(lambda f, n=len(batch): batch_done(f, n))
+            if not flows and on_progress is not None:
+                on_progress(0, 0)
+
+        thread = threading.Thread(target=run, name="passive-scan-history", daemon=True)
+        thread.start()
+        return thread
+
+    def _batch_done(self, future, size):
+        self._slots.release()
+        try:
+            results, timings = future.result()
+        except Exception as e:
+            if not self._stopping.is_set():
+                print(f"[PassiveScanner] batch of {size} failed: {e}")
+            return
+        new, updated = {}, {}
+        with self._lock:
+            self.flows_scanned += size
+            for name, (runs, seconds, errors) in timings.items():
+                total = self.timings.setdefault(name, [0, 0.0, 0])
+                total[0] += runs
+                total[1] += seconds
+                total[2] += errors
+                self.check_errors += errors
+            for flow_id, endpoint, check, severity, title, detail in results:
+                key = (endpoint, check, title)
+                finding = self.findings.get(key)
+                if finding is None:
+                    new[key] = self.findings[key] = Finding(check, severity, title, detail, endpoint, flow_id)
+                    continue
+                finding.count += 1
+                if len(finding.flow_ids) < self.MAX_FLOW_IDS:
+                    finding.flow_ids.append(flow_id)
+                if key not in new:
+                    updated[key] = finding
+        if self.on_findings is not None and (new or updated):
+            self.on_findings(list(new.values()), list(updated.values()))
+        if self.on_flow_findings is not None and results:
+            by_flow = {}
+            for flow_id, endpoint, check, severity, title, detail in results:
+                by_flow.setdefault(flow_id, []).append((check, severity, title))
+            self.on_flow_findings(by_flow)
+
+    def clear(self):
+        with self._lock:
+            self.findings = {}
+
+    def stats(self):
+        with self._lock:
+            timings = {
+                name: {
+                    "runs": runs,
+                    "total_ms": seconds * 1000,
+                    "avg_us": seconds / runs * 1e6 if runs else 0.0,
+                    "errors": errors,
+                }
+                for name, (runs, seconds, errors) in self.timings.items()
+            }
+            return {
+                "workers": self.workers,
+                "queued": self._queue.qsize(),
+                "flows_queued": self.flows_queued,
+                "flows_scanned": self.flows_scanned,
+                "flows_skipped": self.flows_skipped,
+                "check_errors": self.check_errors,
+                "findings": len(self.findings),
+                "timings": timings,
+            }
+
+    def shutdown(self):
+        self._stopping.set()
+        self._slots.release()  # wake the dispatcher if it waits for a slot
+        if self._executor is not None:
+            if sys.version_info >= (3, 9):
+                self._executor.shutdown(wait=False, cancel_futures=True)
+            else:
+                self._executor.shutdown(wait=False)
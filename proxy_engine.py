@@ -1,30 +1,189 @@
 # proxy_engine.py
-import threading
+#
+# In-process proxy backend: mitmproxy's DumpMaster runs on its own event
+# loop thread inside the UI process and hands Flow objects straight to the
+# flow sink, with no JSON encoding and no socket hop. It trades the crash
+# isolation of the subprocess backend (proxy_runner.ProxyRunner) for lower
+# latency. Both expose the same interface, so MainApp can use either.
+#
+# mitmproxy is imported lazily so choosing the subprocess backend does not
+# pay for it at startup.
+
 import asyncio
-from mitmproxy import options
-from mitmproxy.tools.dump import DumpMaster
-from mitmproxy import http
-
-class RequestLoggerAddon:
-    def __init__(self, main_app):
-        self.main_app = main_app
-
-    def response(self, flow: http.HTTPFlow):
-        self.main_app.add_log(flow.request, flow.response)
-
-def _run_proxy(opts, main_app):
-    # Each proxy thread gets its own event loop
-    asyncio.set_event_loop(asyncio.new_event_loop())
-    master = DumpMaster(opts, with_termlog=False, with_dumper=False)
-    addon = RequestLoggerAddon(main_app)
-    master.addons.add(addon)
-    try:
-        master.run()
-    except KeyboardInterrupt:
-        master.shutdown()
-
-def start_proxy(main_app, host, port):
-    opts = options.Options(listen_host=host, listen_port=port)
-    proxy_thread = threading.Thread(target=_run_proxy, args=(opts, main_app), daemon=True)
-    proxy_thread.start()
-    return None, proxy_thread
+import threading
+import time
+from collections import deque
+
+from flow_model import Flow
+from metrics import REGISTRY
+from capture_hooks import CaptureHooks
+from proxy_runner import FLOW_RATE_WINDOW, STAGE_HELP, STOP_TIMEOUT, health_check
+from scope_rules import ScopeRules
+# Converting the mitmproxy flow; the counterpart of the addon's serialize stage.
+BUILD_STAGE = REGISTRY.histogram("anvesha_stage_seconds", STAGE_HELP, stage="flow_build")
+
+
+class RequestLoggerAddon(CaptureHooks):
+    """The shared hooks, delivering Flow objects instead of IPC messages."""
+
+    def __init__(self, deliver, rules, deliver_event=None):
+        # rules() returns the current ScopeRules.
+        super().__init__(self._build, deliver_event or (lambda event: None), rules)
+        self.deliver = deliver
+
+    def _build(self, flow, rules, recorder):
+        started = time.perf_counter()
+        built = Flow.from_mitmproxy(flow, rules)
+        if recorder is not None:
+            # The body was delivered as stream_chunk events; keep only its size.
+            built.response.truncated_size = recorder.size
+        BUILD_STAGE.observe(time.perf_counter() - started)
+        self.deliver(built)
+
+
+class InProcessProxy:
+    name = "inprocess"
+
+    def __init__(self):
+        self.flow_sink = None
+        self.stream_sink = None
+        self.scope_rules = ScopeRules()
+        self._addon = None
+        self.host = None
+        self.port = None
+        self.started_at = None
+        self.last_error = ""
+        self.flows_received = 0
+        self.flows_delivered = 0
+        self._flow_times = deque()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._loop = None
+        self._master = None
+        self._ready = threading.Event()
+
+    def set_flow_sink(self, sink):
+        # sink is called on the proxy thread; a queued Qt signal is the usual choice.
+        self.flow_sink = sink
+
+    def set_stream_sink(self, sink):
+        # Called with stream_capture events on the proxy thread.
+        self.stream_sink = sink
+
+    def close(self):
+        self.stop_proxy()
+
+    def set_scope_rules(self, rules):
+        # Takes effect immediately: the addon reads the attribute per flow.
+        self.scope_rules = rules
+
+    def start_proxy(self, host, port, workers=1):
+        if self._thread:
+            self.stop_proxy()
+        if workers > 1:
+            print(f"[InProcessProxy] in-process mode runs a single proxy; ignoring workers={workers}")
+        self.host, self.port = host, port
+        self.last_error = ""
+        self._ready.clear()
+        self._thread = threading.Thread(target=self._run, args=(host, port), daemon=True)
+        self._thread.start()
+        # Wait until the master exists so an immediate stop_proxy() can reach it.
+        self._ready.wait(timeout=STOP_TIMEOUT)
+        if self.last_error:
+            raise RuntimeError(self.last_error)
+
+    def _run(self, host, port):
+        from mitmproxy import options
+        from mitmproxy.tools.dump import DumpMaster
+
+        async def run_master():
+            opts = options.Options(listen_host=host, listen_port=port)
+            master = DumpMaster(opts, with_termlog=False, with_dumper=False)
+            self._addon = RequestLoggerAddon(self._deliver, lambda: self.scope_rules, self._deliver_event)
+            master.addons.add(self._addon)
+            self._loop = asyncio.get_running_loop()
+            self._master = master
+            self.started_at = time.monotonic()
+            self._ready.set()
+            await master.run()
+
+        try:
+            asyncio.run(run_master())
+        except Exception as e:
+            self.last_error = f"in-process proxy stopped: {e}"
+            print(f"[InProcessProxy] {self.last_error}")
+        finally:
+            self._master = None
+            self._loop = None
+            self._addon = None
+            self._ready.set()
+
+    def _deliver(self, flow):
+        now = time.monotonic()
+        with self._lock:
+            self.flows_received += 1
+            self._flow_times.append(now)
+        sink = self.flow_sink
+        if sink:
+            sink(flow)
+
+    def _deliver_event(self, event):
+        sink = self.stream_sink
+        if sink:
+            sink(event)
+
+    def stop_proxy(self):
+        thread, self._thread = self._thread, None
+        master, loop = self._master, self._loop
+        if master and loop:
+            try:
+                loop.call_soon_threadsafe(master.shutdown)
+            except RuntimeError:
+                pass  # the loop already closed on its own
+        if thread and thread is not threading.current_thread():
+            thread.join(timeout=STOP_TIMEOUT)
+        self.started_at = None
+
+    def is_running(self):
+        thread = self._thread
+        return thread is not None and thread.is_alive() and self._master is not None
+
+    def health_check(self):
+        return health_check(self.host, self.port)
+
+    def note_flow_delivered(self):
+        self.flows_delivered += 1
+
+    def stats(self):
+        now = time.monotonic()
+        with self._lock:
+            times = self._flow_times
+            while times and now - times[0] > FLOW_RATE_WINDOW:
+                times.popleft()
+            recent = len(times)
+        running = self.is_running()
+        uptime = now - self.started_at if running and self.started_at else 0.0
+        worker = {
+            "worker": 0,
+            "port": self.port,
+            "running": running,
+            "pid": None,
+            "uptime": uptime,
+            "restarts": 0,
+            "healthy": True if running else None,
+            "flows_per_second": recent / FLOW_RATE_WINDOW,
+            "flows_received": self.flows_received,
+            "last_error": self.last_error,
+        }
+        return {
+            "running": running,
+            "workers": [worker],
+            "workers_running": 1 if running else 0,
+            "uptime": uptime,
+            "restarts": 0,
+            "healthy": worker["healthy"],
+            "flows_per_second": worker["flows_per_second"],
+            "flows_received": self.flows_received,
+            "ipc_queue_depth": self.flows_received - self.flows_delivered,
+            "last_error": self.last_error,
+        }
@@ -1,42 +1,493 @@
 import subprocess
+import heapq
+import itertools
+import json
 import os
+import socket
 import threading
+import time
+from collections import deque
 
-class ProxyRunner:
-    def __init__(self):
+from capture_hooks import HEALTH_CHECK_HOST
+from flow_model import Flow
+from metrics import REGISTRY
+from scope_rules import SCOPE_PATH, save_rules
+from stream_capture import EVENT_TYPES, event_from_ipc
+
+SOCKET_PATH = "/tmp/anvesha_proxy.sock"  # Adjust if needed for your OS
+
+# Tells the addon which worker it runs in, so flows can be attributed.
+WORKER_ENV_VAR = "ANVESHA_WORKER_ID"
+# Tells the addon where to send flows when it is not SOCKET_PATH (capture_agent.py).
+SOCKET_ENV_VAR = "ANVESHA_SOCKET_PATH"
+
+SUPERVISE_INTERVAL = 1.0       # seconds between liveness polls
+HEALTH_CHECK_INTERVAL = 5.0    # seconds between active health checks
+HEALTH_CHECK_TIMEOUT = 3.0
+HEALTH_CHECK_FAILURES = 3      # consecutive failures before the proxy is considered wedged
+STARTUP_GRACE = 10.0           # mitmdump may take a few seconds to start listening
+RESTART_BACKOFF_MIN = 1.0
+RESTART_BACKOFF_MAX = 30.0
+STABLE_UPTIME = 60.0           # uptime after which the backoff is reset
+STOP_TIMEOUT = 5.0             # SIGTERM grace period before SIGKILL
+FLOW_RATE_WINDOW = 10.0
+MERGE_WINDOW = 0.25            # how long flows from several workers are held for reordering
+
+STAGE_HELP = "Time spent in each stage of the capture pipeline"
+IPC_CONNECTIONS = REGISTRY.counter("anvesha_ipc_connections_total", "IPC connections accepted")
+IPC_BYTES = REGISTRY.counter("anvesha_ipc_bytes_total", "Bytes read from the IPC socket")
+IPC_FLOWS = REGISTRY.counter("anvesha_ipc_flows_total", "Flows decoded from the IPC socket")
+IPC_STREAM_EVENTS = REGISTRY.counter("anvesha_ipc_stream_events_total",
+                                     "WebSocket and streamed-body events decoded from the IPC socket")
+IPC_ERRORS = REGISTRY.counter("anvesha_ipc_errors_total", "IPC messages that failed to decode")
+# Measured in mitmdump and reported with each flow.
+ADDON_STAGE = REGISTRY.histogram("anvesha_stage_seconds", STAGE_HELP, stage="addon_serialize")
+# From just before the addon encodes and sends to the end of the read (wall clock).
+TRANSIT_STAGE = REGISTRY.histogram("anvesha_stage_seconds", STAGE_HELP, stage="socket_transit")
+READ_STAGE = REGISTRY.histogram("anvesha_stage_seconds", STAGE_HELP, stage="socket_read")
+DECODE_STAGE = REGISTRY.histogram("anvesha_stage_seconds", STAGE_HELP, stage="json_decode")
+
+
+def health_check(host, port, timeout=HEALTH_CHECK_TIMEOUT):
+    """Send a request through the proxy port and expect the addon's 200 reply.
+
+    HEALTH_CHECK_HOST is answered by the capture hooks themselves, so this
+    exercises the listener, the event loop and the addon without touching
+    the network.
+    """
+    host = host if host not in (None, "", "0.0.0.0", "::") else "127.0.0.1"
+    request = (
+        f"GET http://{HEALTH_CHECK_HOST}/ HTTP/1.1\r\n"
+        f"Host: {HEALTH_CHECK_HOST}\r\n"
+        "Connection: close\r\n\r\n"
+    ).encode("ascii")
+    try:
+        with socket.create_connection((host, port), timeout=timeout) as conn:
+            conn.sendall(request)
+            status_line = conn.recv(64).split(b"\r\n", 1)[0]
+    except OSError:
+        return False
+    return status_line.startswith(b"HTTP/") and status_line.split(b" ")[1:2] == [b"200"]
+
+
+class ProxyWorker:
+    """One supervised mitmdump process listening on its own port."""
+
+    def __init__(self, index, host, port, extra_args=(), socket_path=None):
+        self.index = index
+        self.host = host
+        self.port = port
+        self.extra_args = list(extra_args)
+        # IPC socket the addon reports to; None keeps the addon's default.
+        self.socket_path = socket_path
         self.proc = None
+        self.started_at = None
+        self.restarts = 0
+        self.last_error = ""
+        self.healthy = None
+        self.flows_received = 0
+        self._flow_times = deque()
+        self._lock = threading.Lock()
+        self._stop_event = None
+        self._supervisor = None
 
-    def start_proxy(self, host, port):
-        if self.proc:
-            self.stop_proxy()
+    def start(self):
+        self._stop_event = threading.Event()
+        self._launch()
+        self._supervisor = threading.Thread(target=self._supervise, args=(self._stop_event,), daemon=True)
+        self._supervisor.start()
+
+    def _launch(self, stop_event=None):
         addon_path = os.path.abspath(os.path.join(os.path.dirname(__file__), "mitmproxy_addon_ipc.py"))
         cmd = [
             "mitmdump",
             "-s", addon_path,
-            "--listen-host", host,
-            "-p", str(port)
-        ]
-        print("[ProxyRunner] Launching mitmdump:", " ".join(cmd))
-        self.proc = subprocess.Popen(
+            "--listen-host", self.host,
+            "-p", str(self.port)
+        ] + self.extra_args
+        env = dict(os.environ)
+        env[WORKER_ENV_VAR] = str(self.index)
+        if self.socket_path:
+            env[SOCKET_ENV_VAR] = self.socket_path
+        print(f"[ProxyRunner] Launching worker {self.index}:", " ".join(cmd))
+        proc = subprocess.Popen(
             cmd,
             cwd=os.path.dirname(os.path.abspath(__file__)),
             stdout=subprocess.PIPE,
             stderr=subprocess.PIPE,
+            env=env,
         )
+        with self._lock:
+            stopped = stop_event is not None and stop_event.is_set()
+            if not stopped:
+                self.proc = proc
+                self.started_at = time.monotonic()
+                self.healthy = None
+        if stopped:
+            # stop() ran while a restart was in flight.
+            self._terminate(proc)
+            return
         # Stream output to the main terminal for debugging
-        threading.Thread(target=self._stream_output, args=(self.proc.stdout, 'STDOUT'), daemon=True).start()
-        threading.Thread(target=self._stream_output, args=(self.proc.stderr, 'STDERR'), daemon=True).start()
-        print(f"[ProxyRunner] mitmdump started with pid {self.proc.pid}")
+        threading.Thread(target=self._stream_output, args=(proc.stdout, 'STDOUT'), daemon=True).start()
+        threading.Thread(target=self._stream_output, args=(proc.stderr, 'STDERR'), daemon=True).start()
+        print(f"[ProxyRunner] worker {self.index} started with pid {proc.pid} on port {self.port}")
 
     def _stream_output(self, pipe, name):
+        lines = REGISTRY.counter("anvesha_proxy_output_lines_total", "Lines printed by mitmdump",
+                                 worker=str(self.index), stream=name.lower())
         for line in iter(pipe.readline, b''):
-            print(f"[mitmdump {name}] {line.decode('utf-8').rstrip()}")
+            lines.inc()
+            print(f"[mitmdump {self.index} {name}] {line.decode('utf-8', errors='replace').rstrip()}")
+
+    def _supervise(self, stop_event):
+        backoff = RESTART_BACKOFF_MIN
+        failures = 0
+        last_check = time.monotonic()
+        while not stop_event.wait(SUPERVISE_INTERVAL):
+            proc = self.proc
+            if proc is None:
+                return
+            code = proc.poll()
+            if code is not None:
+                if time.monotonic() - self.started_at >= STABLE_UPTIME:
+                    backoff = RESTART_BACKOFF_MIN
+                if not self.last_error:
+                    self.last_error = f"mitmdump exited with code {code}"
+                print(f"[ProxyRunner] worker {self.index}: {self.last_error}; restarting in {backoff:.0f}s")
+                if stop_event.wait(backoff):
+                    return
+                backoff = min(backoff * 2, RESTART_BACKOFF_MAX)
+                with self._lock:
+                    if stop_event.is_set():
+                        return
+                    self.restarts += 1
+                try:
+                    self._launch(stop_event)
+                except OSError as e:
+                    self.last_error = f"Failed to restart mitmdump: {e}"
+                    print(f"[ProxyRunner] worker {self.index}: {self.last_error}")
+                    continue
+                self.last_error = ""
+                failures = 0
+                last_check = time.monotonic()
+                continue
+
+            now = time.monotonic()
+            if now - last_check < HEALTH_CHECK_INTERVAL:
+                continue
+            last_check = now
+            if self.health_check():
+                failures = 0
+                self.healthy = True
+                continue
+            failures += 1
+            if now - self.started_at < STARTUP_GRACE and not self.healthy:
+                continue
+            self.healthy = False
+            if failures >= HEALTH_CHECK_FAILURES:
+                self.last_error = f"health check failed {failures} times in a row"
+                print(f"[ProxyRunner] worker {self.index} appears wedged ({self.last_error}), killing pid {proc.pid}")
+                self._terminate(proc)
+                failures = 0
+
+    def health_check(self):
+        return health_check(self.host, self.port)
+
+    def _terminate(self, proc):
+        # SIGTERM first so mitmdump can shut down cleanly, SIGKILL if it does not.
+        if proc.poll() is not None:
+            return
+        proc.terminate()
+        try:
+            proc.wait(timeout=STOP_TIMEOUT)
+        except subprocess.TimeoutExpired:
+            print(f"[ProxyRunner] mitmdump pid {proc.pid} ignored SIGTERM, sending SIGKILL")
+            proc.kill()
+            proc.wait()
+
+    def stop(self):
+        with self._lock:
+            if self._stop_event:
+                self._stop_event.set()
+            supervisor, self._supervisor = self._supervisor, None
+            proc, self.proc = self.proc, None
+        if supervisor and supervisor is not threading.current_thread():
+            supervisor.join(timeout=HEALTH_CHECK_TIMEOUT + 1)
+        if proc:
+            self._terminate(proc)
+        self.started_at = None
+        self.healthy = None
+        self.last_error = ""
+
+    def is_running(self):
+        proc = self.proc
+        return proc is not None and proc.poll() is None
+
+    def note_flow_received(self, now):
+        with self._lock:
+            self.flows_received += 1
+            self._flow_times.append(now)
+
+    def stats(self, now=None):
+        now = now if now is not None else time.monotonic()
+        with self._lock:
+            times = self._flow_times
+            while times and now - times[0] > FLOW_RATE_WINDOW:
+                times.popleft()
+            recent = len(times)
+            proc = self.proc
+        running = proc is not None and proc.poll() is None
+        return {
+            "worker": self.index,
+            "port": self.port,
+            "running": running,
+            "pid": proc.pid if proc else None,
+            "uptime": now - self.started_at if running and self.started_at else 0.0,
+            "restarts": self.restarts,
+            "healthy": self.healthy,
+            "flows_per_second": recent / FLOW_RATE_WINDOW,
+            "flows_received": self.flows_received,
+            "last_error": self.last_error,
+        }
+
+
+class ProxyRunner:
+    """Subprocess proxy backend: launches and supervises mitmdump workers.
+
+    mitmdump cannot share a listening socket, so worker i listens on
+    port + i; all workers report flows over the UNIX socket to one
+    FlowReceiverThread, which hands Flow objects to the flow sink.
+    """
+
+    name = "subprocess"
+
+    def __init__(self, extra_args=()):
+        # Extra mitmdump arguments, e.g. ["--set", "ssl_insecure=true"].
+        self.extra_args = list(extra_args)
+        self.workers = []
+        self.host = None
+        self.port = None
+        self.flows_received = 0
+        self.flows_delivered = 0
+        self.receiver = None
+        self.stream_sink = None
+        self._lock = threading.Lock()
+
+    def set_flow_sink(self, sink):
+        # The receiver is bound up front so an externally started mitmdump
+        # running the IPC addon is picked up as well.
+        if self.receiver is None:
+            self.receiver = FlowReceiverThread(sink, self.note_flow_received)
+            self.receiver.emit_stream_callback = self.stream_sink
+            self.receiver.start()
+        else:
+            self.receiver.emit_flow_callback = sink
+
+    def set_stream_sink(self, sink):
+        # Called with stream_capture events (dicts) on the receiver thread.
+        self.stream_sink = sink
+        if self.receiver is not None:
+            self.receiver.emit_stream_callback = sink
+
+    def close(self):
+        if self.receiver:
+            self.receiver.stop()
+            self.receiver = None
+
+    def set_scope_rules(self, rules):
+        # Running workers reload the rules file within a second; no restart needed.
+        save_rules(rules, SCOPE_PATH)
+
+    def start_proxy(self, host, port, workers=1):
+        if self.workers:
+            self.stop_proxy()
+        self.host, self.port = host, port
+        if self.receiver:
+            self.receiver.set_merge_window(MERGE_WINDOW if workers > 1 else 0.0)
+        self.workers = [ProxyWorker(i, host, port + i, self.extra_args) for i in range(max(1, workers))]
+        try:
+            for worker in self.workers:
+                worker.start()
+        except Exception:
+            self.stop_proxy()
+            raise
 
     def stop_proxy(self):
-        if self.proc:
-            self.proc.terminate()
-            self.proc.wait(timeout=5)
-            self.proc = None
+        # Workers are stopped in parallel so shutdown takes one SIGTERM grace period.
+        workers, self.workers = self.workers, []
+        threads = [threading.Thread(target=w.stop, daemon=True) for w in workers]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
 
     def is_running(self):
-        return self.proc is not None and self.proc.poll() is None
+        return any(w.is_running() for w in self.workers)
+
+    @property
+    def ports(self):
+        return [w.port for w in self.workers]
+
+    def note_flow_received(self, worker=0):
+        # Called from the IPC receiver thread for every flow.
+        now = time.monotonic()
+        with self._lock:
+            self.flows_received += 1
+        workers = self.workers
+        if 0 <= worker < len(workers):
+            workers[worker].note_flow_received(now)
+
+    def note_flow_delivered(self):
+        # Called on the UI thread once a flow has been added to the logger.
+        self.flows_delivered += 1
+
+    def stats(self):
+        now = time.monotonic()
+        workers = [w.stats(now) for w in self.workers]
+        running = [w for w in workers if w["running"]]
+        checked = [w["healthy"] for w in running if w["healthy"] is not None]
+        errors = [f"worker {w['worker']}: {w['last_error']}" for w in workers if w["last_error"]]
+        return {
+            "running": bool(running),
+            "workers": workers,
+            "workers_running": len(running),
+            "uptime": max((w["uptime"] for w in running), default=0.0),
+            "restarts": sum(w["restarts"] for w in workers),
+            "healthy": all(checked) if checked else None,
+            "flows_per_second": sum(w["flows_per_second"] for w in workers),
+            "flows_received": self.flows_received,
+            "ipc_queue_depth": self.flows_received - self.flows_delivered,
+            "last_error": "; ".join(errors),
+        }
+
+
+class TimestampMerger:
+    """Reorders flows from several workers by capture timestamp.
+
+    Each flow is held for `window` seconds after it arrives so that a flow
+    captured earlier by a slower worker can still be emitted before it. With
+    a window of 0 flows pass straight through.
+    """
+
+    def __init__(self, window=0.0):
+        self.window = window
+        self._heap = []
+        self._seq = itertools.count()
+
+    def push(self, flow, now=None):
+        if self.window <= 0 and not self._heap:
+            return [flow]
+        now = now if now is not None else time.monotonic()
+        heapq.heappush(self._heap, (flow.timestamp, next(self._seq), now, flow))
+        return self.pop_ready(now)
+
+    def pop_ready(self, now=None):
+        now = now if now is not None else time.monotonic()
+        ready = []
+        heap = self._heap
+        while heap and now - heap[0][2] >= self.window:
+            ready.append(heapq.heappop(heap)[3])
+        return ready
+
+    def flush(self):
+        heap, self._heap = self._heap, []
+        return [entry[3] for entry in sorted(heap)]
+
+    def __len__(self):
+        return len(self._heap)
+
+
+class FlowReceiverThread(threading.Thread):
+    def __init__(self, emit_flow_callback, receive_callback=None):
+        super().__init__(daemon=True)
+        self.emit_flow_callback = emit_flow_callback
+        # Called with the worker index of every flow, before reordering.
+        self.receive_callback = receive_callback
+        # WebSocket and streamed-body events skip the merger: each
+        # connection's events come from one worker, in order.
+        self.emit_stream_callback = None
+        # Flows from several proxy workers are re-sequenced by capture time.
+        self.merger = TimestampMerger()
+        self._running = True
+        # Remove socket file before binding
+        try:
+            if os.path.exists(SOCKET_PATH):
+                os.unlink(SOCKET_PATH)
+        except Exception:
+            pass
+
+        self.server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.server.bind(SOCKET_PATH)
+        self.server.listen(64)
+        # Wake up periodically to release flows held back by the merger.
+        self.server.settimeout(MERGE_WINDOW / 2)
+        REGISTRY.gauge("anvesha_queue_depth", "Flows waiting in each queue of the pipeline",
+                       func=lambda: len(self.merger), queue="reorder")
+
+    def set_merge_window(self, window):
+        self.merger.window = window
+
+    def _emit(self, flows):
+        for flow in flows:
+            self.emit_flow_callback(flow)
+
+    def _handle(self, data):
+        received = time.time()
+        try:
+            for line in data.decode("utf-8").splitlines():
+                started = time.perf_counter()
+                flow_data = json.loads(line)
+                if flow_data.get("type") in EVENT_TYPES:
+                    IPC_STREAM_EVENTS.inc()
+                    if self.emit_stream_callback:
+                        self.emit_stream_callback(event_from_ipc(flow_data))
+                    continue
+                # Build the flow model here so the UI thread only inserts rows.
+                flow = Flow.from_ipc(flow_data)
+                DECODE_STAGE.observe(time.perf_counter() - started)
+                IPC_FLOWS.inc()
+                worker = flow_data.get("worker", 0)
+                if "sent_at" in flow_data:
+                    TRANSIT_STAGE.observe(max(0.0, received - flow_data["sent_at"]))
+                    ADDON_STAGE.observe(flow_data.get("addon_seconds", 0.0))
+                    REGISTRY.gauge("anvesha_addon_send_errors", "IPC sends that failed in the addon",
+                                   worker=str(worker)).set(flow_data.get("send_errors", 0))
+                if self.receive_callback:
+                    self.receive_callback(worker)
+                self._emit(self.merger.push(flow))
+        except Exception as e:
+            IPC_ERRORS.inc()
+            print("Error parsing IPC flow data:", e)
+
+    def run(self):
+        while self._running:
+            try:
+                try:
+                    conn, _ = self.server.accept()
+                except socket.timeout:
+                    self._emit(self.merger.pop_ready())
+                    continue
+                IPC_CONNECTIONS.inc()
+                with conn:
+                    started = time.perf_counter()
+                    data = b""
+                    while True:
+                        chunk = conn.recv(4096)
+                        if not chunk:
+                            break
+                        data += chunk
+                    READ_STAGE.observe(time.perf_counter() - started)
+                    if data:
+                        IPC_BYTES.inc(len(data))
+                        self._handle(data)
+            except Exception as e:
+                if self._running:
+                    print("IPC server error:", e)
+
+    def stop(self):
+        self._running = False
+        self.server.close()
+        try:
+            os.unlink(SOCKET_PATH)
+        except Exception:
+            pass
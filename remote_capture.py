@@ -0,0 +1,531 @@
+# remote_capture.py
+#
+# Capture on one machine, view on another. The headless capture agent
+# (capture_agent.py) runs the mitmdump workers near the target, and their
+# IPC addon writes to the agent's UNIX socket instead of the desktop's. The
+# agent numbers every message, packs them into zlib-compressed batches and
+# appends each batch to an on-disk spool before sending it over TCP, so
+# nothing is lost while the desktop is away. RemoteCaptureClient, the
+# desktop's "remote" proxy backend, writes each batch to its own spool,
+# hands the flows and stream events to the UI and acknowledges the batch.
+# After a disconnect it reconnects with backoff and asks for everything
+# after the last message it stored. The agent deletes spool segments once
+# they are acknowledged, and the oldest ones (counted as lost) when its
+# spool outgrows the size limit.
+#
+# Wire format: every frame is FRAME (kind, codec, count, seq, length)
+# followed by `length` bytes of payload. HELLO, WELCOME, SCOPE and STATUS
+# payloads are JSON. A BATCH holds `count` addon messages (JSON lines)
+# numbered from `seq`; an ACK's seq is the next message the desktop needs.
+# The desktop ACKs every batch and every STATUS, so each side hears from
+# the other at least every STATUS_INTERVAL even when no flows are captured.
+# There is no TLS: keep the agent on 127.0.0.1 behind an SSH tunnel, or
+# set a token and trust the network.
+
+import json
+import os
+import socket
+import struct
+import threading
+import time
+import uuid
+import zlib
+from collections import deque
+
+from flow_model import Flow
+from metrics import REGISTRY
+from stream_capture import EVENT_TYPES, event_from_ipc
+
+PROTOCOL_VERSION = 1
+DEFAULT_AGENT_PORT = 7878
+AGENT_SOCKET_PATH = "/tmp/anvesha_agent.sock"
+AGENT_SPOOL_DIR = os.path.join(os.path.expanduser("~"), ".anvesha", "agent_spool")
+CLIENT_SPOOL_DIR = os.path.join(os.path.expanduser("~"), ".anvesha", "remote_spool")
+SPOOL_MAX_BYTES = 1024 * 1024 * 1024
+# The desktop keeps the most recent batches it received as a journal.
+CLIENT_SPOOL_BYTES = 256 * 1024 * 1024
+SEGMENT_BYTES = 8 * 1024 * 1024
+# A batch is sealed at this many raw bytes, or BATCH_DELAY after its first message.
+BATCH_MAX_BYTES = 256 * 1024
+BATCH_DELAY = 0.05
+COMPRESS_LEVEL = 6
+# The agent sends a STATUS frame this often, and the desktop ACKs it; they double as keepalives.
+STATUS_INTERVAL = 2.0
+# No frame for this long and the connection is taken as dead.
+READ_TIMEOUT = 15.0
+CONNECT_TIMEOUT = 5.0
+RECONNECT_MIN = 1.0
+RECONNECT_MAX = 30.0
+MAX_FRAME = 64 * 1024 * 1024
+FLOW_RATE_WINDOW = 10.0
+
+HELLO, WELCOME, BATCH, ACK, SCOPE, STATUS = range(1, 7)
+CODEC_NONE, CODEC_ZLIB = 0, 1
+FRAME = struct.Struct("!BBIQI")
+# Spool record header: first seq, count, codec, payload length.
+RECORD = struct.Struct("!QIBI")
+
+REMOTE_BATCHES = REGISTRY.counter("anvesha_remote_batches_total", "Batches received from a remote capture agent")
+REMOTE_BYTES = REGISTRY.counter("anvesha_remote_bytes_total", "Compressed bytes received from a remote capture agent")
+REMOTE_MESSAGES = REGISTRY.counter("anvesha_remote_messages_total",
+                                   "Flows and stream events received from a remote capture agent")
+
+
+class ProtocolError(Exception):
+    pass
+
+
+# --- framing -----------------------------------------------------------------
+
+def send_frame(sock, kind, payload=b"", seq=0, count=0, codec=CODEC_NONE):
+    sock.sendall(FRAME.pack(kind, codec, count, seq, len(payload)) + payload)
+
+
+def send_json(sock, kind, data):
+    send_frame(sock, kind, json.dumps(data).encode("utf-8"))
+
+
+def _recv_exact(sock, size):
+    buf = bytearray(size)
+    view = memoryview(buf)
+    got = 0
+    while got < size:
+        n = sock.recv_into(view[got:])
+        if not n:
+            raise ConnectionError("connection closed")
+        got += n
+    return bytes(buf)
+
+
+def read_frame(sock):
+    """(kind, codec, count, seq, payload) of the next frame."""
+    kind, codec, count, seq, length = FRAME.unpack(_recv_exact(sock, FRAME.size))
+    if length > MAX_FRAME:
+        raise ProtocolError(f"frame of {length} bytes is too large")
+    return kind, codec, count, seq, _recv_exact(sock, length) if length else b""
+
+
+def pack_batch(lines):
+    return CODEC_ZLIB, zlib.compress(b"\n".join(lines), COMPRESS_LEVEL)
+
+
+def unpack_batch(codec, payload):
+    if codec == CODEC_ZLIB:
+        payload = zlib.decompress(payload)
+    elif codec != CODEC_NONE:
+        raise ProtocolError(f"unknown batch codec {codec}")
+    return payload.split(b"\n")
+
+
+# --- spool -------------------------------------------------------------------
+
+class DiskSpool:
+    """Batches in seq order, kept in segment files under directory.
+
+    A segment is named after the first seq it holds and is a run of RECORD
+    headers, each followed by a batch payload. Appends go to the last
+    segment and are flushed before append() returns. Whole segments are
+    deleted when trimmed (acknowledged) or, oldest first, when the spool
+    grows past max_bytes; the messages in those are counted as dropped.
+    A record cut short by a crash is removed when the spool is reopened.
+    """
+
+    def __init__(self, directory, max_bytes=SPOOL_MAX_BYTES, segment_bytes=SEGMENT_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.segment_bytes = segment_bytes
+        # [first seq, next seq, size, path], oldest first
+        self.segments = []
+        self.next_seq = 0
+        self.dropped = 0
+        # Notified on every append; senders wait on it for new batches.
+        self.cond = threading.Condition()
+        self._file = None
+        os.makedirs(directory, exist_ok=True)
+        self.spool_id = self._load_id()
+        self._recover()
+
+    def _load_id(self):
+        # Identifies this spool's numbering; a new spool starts again at 0.
+        path = os.path.join(self.directory, "spool.id")
+        try:
+            with open(path, encoding="utf-8") as f:
+                return f.read().strip()
+        except OSError:
+            spool_id = uuid.uuid4().hex
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(spool_id)
+            return spool_id
+
+    def _recover(self):
+        for name in sorted(os.listdir(self.directory)):
+            if not name.endswith(".seg"):
+                continue
+            path = os.path.join(self.directory, name)
+            first = int(name[:-4])
+            next_seq, size = self._scan(path, first)
+            if size:
+                self.segments.append([first, next_seq, size, path])
+            else:
+                os.remove(path)
+        if self.segments:
+            self.next_seq = self.segments[-1][1]
+
+    @staticmethod
+    def _scan(path, first):
+        next_seq, good = first, 0
+        end = os.path.getsize(path)
+        with open(path, "r+b") as f:
+            while good + RECORD.size <= end:
+                f.seek(good)
+                seq, count, _, length = RECORD.unpack(f.read(RECORD.size))
+                if good + RECORD.size + length > end:
+                    break
+                next_seq, good = seq + count, good + RECORD.size + length
+            f.truncate(good)
+        return next_seq, good
+
+    @property
+    def first_seq(self):
+        return self.segments[0][0] if self.segments else self.next_seq
+
+    @property
+    def size(self):
+        return sum(segment[2] for segment in self.segments)
+
+    def append(self, count, codec, payload, first_seq=None):
+        """Store a batch numbered from first_seq (default: the next seq); returns its first seq."""
+        with self.cond:
+            first = self.next_seq if first_seq is None else first_seq
+            if first < self.next_seq:
+                raise ValueError(f"batch {first} is before the end of the spool ({self.next_seq})")
+            if not self.segments or self.segments[-1][2] >= self.segment_bytes or self._file is None:
+                self._roll(first)
+            record = RECORD.pack(first, count, codec, len(payload)) + payload
+            self._file.write(record)
+            self._file.flush()
+            segment = self.segments[-1]
+            segment[1] = first + count
+            segment[2] += len(record)
+            self.next_seq = first + count
+            self._enforce_limit()
+            self.cond.notify_all()
+            return first
+
+    def _roll(self, first):
+        if self._file is not None:
+            self._file.close()
+        if self.segments and self.segments[-1][2] < self.segment_bytes:
+            # Reopened spool: keep appending to its last segment.
+            self._file = open(self.segments[-1][3], "ab")
+            return
+        path = os.path.join(self.directory, f"{first:020d}.seg")
+        self._file = open(path, "ab")
+        self.segments.append([first, first, 0, path])
+
+    def _enforce_limit(self):
+        total = self.size
+        while total > self.max_bytes and len(self.segments) > 1:
+            first, next_seq, size, path = self.segments.pop(0)
+            self.dropped += next_seq - first
+            total -= size
+            os.remove(path)
+
+    def trim(self, seq):
+        """Delete the segments whose messages are all before seq."""
+        with self.cond:
+            while len(self.segments) > 1 and self.segments[0][1] <= seq:
+                os.remove(self.segments.pop(0)[3])
+
+    def read_from(self, seq):
+        """(first seq, count, codec, payload) of the stored batches with messages from seq on."""
+        with self.cond:
+            segments = [list(segment) for segment in self.segments if segment[1] > seq]
+        for _, _, _, path in segments:
+            try:
+                f = open(path, "rb")
+            except FileNotFoundError:
+                # Trimmed or dropped since the snapshot.
+                continue
+            with f:
+                while True:
+                    header = f.read(RECORD.size)
+                    if len(header) < RECORD.size:
+                        break
+                    first, count, codec, length = RECORD.unpack(header)
+                    if first + count <= seq:
+                        f.seek(length, os.SEEK_CUR)
+                        continue
+                    payload = f.read(length)
+                    if len(payload) < length:
+                        break
+                    yield first, count, codec, payload
+
+    def clear(self):
+        with self.cond:
+            self.close()
+            for segment in self.segments:
+                os.remove(segment[3])
+            self.segments = []
+            self.next_seq = 0
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+# --- desktop backend ---------------------------------------------------------
+
+class RemoteCaptureClient:
+    """Proxy backend that receives flows from a capture agent over TCP.
+
+    start_proxy(host, port) connects to the agent at host:port (the proxy
+    itself runs on the agent's machine). Batches are written to a spool
+    under CLIENT_SPOOL_DIR before the flows reach the sinks and before they
+    are acknowledged, so the agent only frees what the desktop has stored.
+    """
+
+    name = "remote"
+
+    def __init__(self, token="", spool_root=CLIENT_SPOOL_DIR, max_spool_bytes=CLIENT_SPOOL_BYTES):
+        self.token = token or os.environ.get("ANVESHA_AGENT_TOKEN", "")
+        self.spool_root = spool_root
+        self.max_spool_bytes = max_spool_bytes
+        self.flow_sink = None
+        self.stream_sink = None
+        self.scope_rules = None
+        self.host = None
+        self.port = None
+        self.spool = None
+        self.sock = None
+        self.connected_at = None
+        self.last_error = ""
+        self.reconnects = 0
+        # Messages the agent dropped (spool limit) before this desktop stored them.
+        self.lost = 0
+        self.flows_received = 0
+        self.flows_delivered = 0
+        self.events_received = 0
+        self.wire_bytes = 0
+        self.raw_bytes = 0
+        self.agent_status = {}
+        # Next message expected from the agent in this connection.
+        self._next = 0
+        self._flow_times = deque()
+        self._lock = threading.Lock()
+        # Frames are sent by the client thread (ACKs) and the UI thread (SCOPE).
+        self._send_lock = threading.Lock()
+        self._stop_event = None
+        self._thread = None
+
+    def set_flow_sink(self, sink):
+        # Called on the client thread; a queued Qt signal is the usual choice.
+        self.flow_sink = sink
+
+    def set_stream_sink(self, sink):
+        self.stream_sink = sink
+
+    def set_scope_rules(self, rules):
+        # Forwarded to the agent, which writes its workers' rules file.
+        self.scope_rules = rules
+        sock = self.sock
+        if sock is not None and rules is not None:
+            try:
+                self._send(sock, SCOPE, rules.to_dict())
+            except OSError:
+                pass
+
+    def _send(self, sock, kind, data=None, seq=0):
+        # data, if any, is sent as a JSON payload.
+        payload = json.dumps(data).encode("utf-8") if data is not None else b""
+        with self._send_lock:
+            send_frame(sock, kind, payload, seq=seq)
+
+    def start_proxy(self, host, port, workers=1):
+        self.stop_proxy()
+        self.host, self.port = host, port
+        name = f"{host}_{port}".replace(":", "_").replace("/", "_")
+        self.spool = DiskSpool(os.path.join(self.spool_root, name), self.max_spool_bytes)
+        self.last_error = ""
+        self._stop_event = threading.Event()
+        self._thread = threading.Thread(target=self._run, args=(self._stop_event,), daemon=True,
+                                        name="remote-capture")
+        self._thread.start()
+
+    def stop_proxy(self):
+        if self._stop_event is not None:
+            self._stop_event.set()
+        sock, self.sock = self.sock, None
+        if sock is not None:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            sock.close()
+        if self._thread is not None:
+            self._thread.join(timeout=CONNECT_TIMEOUT)
+            self._thread = None
+        if self.spool is not None:
+            self.spool.close()
+        self.connected_at = None
+
+    def close(self):
+        self.stop_proxy()
+
+    def is_running(self):
+        return self.connected_at is not None
+
+    @property
+    def ports(self):
+        return [self.port] if self.port is not None else []
+
+    def note_flow_delivered(self):
+        self.flows_delivered += 1
+
+    def _run(self, stop_event):
+        delay = RECONNECT_MIN
+        while not stop_event.is_set():
+            try:
+                self._session(stop_event)
+            except (OSError, ProtocolError, ValueError, zlib.error) as e:
+                if stop_event.is_set():
+                    break
+                self.last_error = f"agent {self.host}:{self.port}: {e}"
+                print(f"[RemoteCaptureClient] {self.last_error}; reconnecting in {delay:.0f} s")
+            if self.connected_at is not None:
+                # Was connected: start the backoff again.
+                delay = RECONNECT_MIN
+            self.connected_at = None
+            self.sock = None
+            if stop_event.wait(delay):
+                break
+            delay = min(delay * 2, RECONNECT_MAX)
+            self.reconnects += 1
+
+    def _session(self, stop_event):
+        sock = socket.create_connection((self.host, self.port), timeout=CONNECT_TIMEOUT)
+        self.sock = sock
+        with sock:
+            sock.settimeout(READ_TIMEOUT)
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            spool = self.spool
+            self._send(sock, HELLO, {"version": PROTOCOL_VERSION, "token": self.token,
+                                     "resume_from": spool.next_seq, "spool_id": self._agent_spool_id()})
+            kind, _, _, _, payload = read_frame(sock)
+            welcome = json.loads(payload) if kind == WELCOME else {}
+            if welcome.get("error") or kind != WELCOME:
+                raise ProtocolError(welcome.get("error") or f"unexpected frame {kind}")
+            if welcome.get("reset"):
+                # A different agent spool: its numbering starts over.
+                spool.clear()
+                self._save_agent_spool_id(welcome.get("spool_id", ""))
+            self.lost += welcome.get("lost", 0)
+            self._next = max(spool.next_seq, welcome.get("first_seq", 0))
+            self.connected_at = time.monotonic()
+            self.last_error = ""
+            print(f"[RemoteCaptureClient] connected to {self.host}:{self.port}, resuming at message {self._next}")
+            rules = self.scope_rules
+            if rules is not None:
+                self._send(sock, SCOPE, rules.to_dict())
+            while not stop_event.is_set():
+                kind, codec, count, seq, payload = read_frame(sock)
+                if kind == BATCH:
+                    self._on_batch(sock, seq, count, codec, payload)
+                elif kind == STATUS:
+                    self.agent_status = json.loads(payload)
+                    # Keeps the agent's read timeout from closing an idle link.
+                    self._send(sock, ACK, seq=spool.next_seq)
+
+    def _agent_spool_id(self):
+        try:
+            with open(os.path.join(self.spool.directory, "agent.id"), encoding="utf-8") as f:
+                return f.read().strip()
+        except OSError:
+            return ""
+
+    def _save_agent_spool_id(self, spool_id):
+        with open(os.path.join(self.spool.directory, "agent.id"), "w", encoding="utf-8") as f:
+            f.write(spool_id)
+
+    def _on_batch(self, sock, first, count, codec, payload):
+        spool = self.spool
+        wanted = self._next
+        if first + count <= wanted:
+            return
+        REMOTE_BATCHES.inc()
+        REMOTE_BYTES.inc(len(payload))
+        self.wire_bytes += len(payload)
+        lines = unpack_batch(codec, payload)
+        if first < wanted:
+            lines = lines[wanted - first:]
+            codec, payload = pack_batch(lines)
+            first, count = wanted, len(lines)
+        elif first > wanted:
+            # Dropped by the agent's spool limit while this desktop was behind.
+            self.lost += first - wanted
+        # Stored before it is shown or acknowledged.
+        spool.append(count, codec, payload, first)
+        self._next = first + count
+        for line in lines:
+            self.raw_bytes += len(line) + 1
+            try:
+                self._deliver(line)
+            except Exception as e:
+                print("[RemoteCaptureClient] Error parsing remote flow data:", e)
+        self._send(sock, ACK, seq=spool.next_seq)
+
+    def _deliver(self, line):
+        data = json.loads(line)
+        REMOTE_MESSAGES.inc()
+        if data.get("type") in EVENT_TYPES:
+            self.events_received += 1
+            if self.stream_sink is not None:
+                self.stream_sink(event_from_ipc(data))
+            return
+        flow = Flow.from_ipc(data)
+        now = time.monotonic()
+        with self._lock:
+            self.flows_received += 1
+            self._flow_times.append(now)
+        if self.flow_sink is not None:
+            self.flow_sink(flow)
+
+    def stats(self):
+        now = time.monotonic()
+        with self._lock:
+            times = self._flow_times
+            while times and now - times[0] > FLOW_RATE_WINDOW:
+                times.popleft()
+            recent = len(times)
+        running = self.connected_at is not None
+        status = self.agent_status if running else {}
+        workers = status.get("workers") or [{
+            "worker": 0, "port": self.port, "running": running, "pid": None, "uptime": 0.0, "restarts": 0,
+            "healthy": None, "flows_per_second": 0.0, "flows_received": 0, "last_error": "",
+        }]
+        checked = [w["healthy"] for w in workers if w["running"] and w["healthy"] is not None]
+        ratio = self.raw_bytes / self.wire_bytes if self.wire_bytes else 0.0
+        spool = self.spool
+        return {
+            "running": running,
+            "workers": workers,
+            "workers_running": sum(1 for w in workers if w["running"]),
+            "uptime": now - self.connected_at if running else 0.0,
+            "restarts": sum(w["restarts"] for w in workers),
+            "healthy": all(checked) if checked else None,
+            "flows_per_second": recent / FLOW_RATE_WINDOW,
+            "flows_received": self.flows_received,
+            "ipc_queue_depth": self.flows_received - self.flows_delivered,
+            "last_error": self.last_error,
+            "remote": {
+                "agent": f"{self.host}:{self.port}",
+                "next_seq": spool.next_seq if spool is not None else 0,
+                "spool_bytes": spool.size if spool is not None else 0,
+                "agent_spool_bytes": status.get("spool_bytes", 0),
+                "agent_backlog": max(0, status.get("next_seq", 0) - (spool.next_seq if spool is not None else 0)),
+                "lost": self.lost,
+                "reconnects": self.reconnects,
+                "compression": ratio,
+            },
+        }
@@ -6,6 +6,10 @@ from PyQt5.QtWidgets import (
     QHBoxLayout, QFileDialog, QMessageBox, QLineEdit, QApplication
 )
 from PyQt5.QtCore import QDateTime
+from urllib.parse import urlparse
+from flow_model import HttpResponse, Flow
+from http_parser import parse_request_text
+from response_viewer import ResponseViewer
 
 def get_main_window_with_tabs(widget):
     parent = widget.parent()
@@ -20,8 +24,7 @@ class SingleReplayTab(QWidget):
         super().__init__()
         layout = QVBoxLayout(self)
         self.req_editor = QTextEdit()
-        self.res_display = QTextEdit()
-        self.res_display.setReadOnly(True)
+        self.res_display = ResponseViewer()
 
         layout.addWidget(QLabel("Request:"))
         layout.addWidget(self.req_editor)
@@ -35,55 +38,41 @@ class SingleReplayTab(QWidget):
 
     def load_data(self, data):
         self.req_editor.setPlainText(data.get('request', ''))
-        self.res_display.setPlainText(data.get('response', ''))
+        response = data.get('response', '')
+        if isinstance(response, HttpResponse):
+            self.res_display.show_response(response)
+        else:
+            self.res_display.set_text(response)
 
     def get_data(self):
         return {
             'request': self.req_editor.toPlainText(),
-            'response': self.res_display.toPlainText()
+            'response': self.res_display.plain_text()
         }
 
     def send_request(self):
         req_text = self.req_editor.toPlainText()
         try:
-            lines = req_text.splitlines()
-            request_line = lines[0]
-            method, url, *_ = request_line.split()
-            headers = {}
-            body_lines = []
-            is_body = False
-            for line in lines[1:]:
-                if not is_body and ':' in line:
-                    k, v = line.split(':', 1)
-                    headers[k.strip()] = v.strip()
-                elif line == '':
-                    is_body = True
-                else:
-                    is_body = True
-                    body_lines.append(line)
-            body = '\n'.join(body_lines) if body_lines else None
-
-            from urllib.parse import urlparse
-            parsed = urlparse(url)
+            req = parse_request_text(req_text)
+            parsed = urlparse(req.url)
             if not parsed.scheme:
-                self.res_display.setPlainText("Error: URL must be absolute (include http:// or https://)")
+                self.res_display.set_text("Error: URL must be absolute (include http:// or https://)")
                 return
 
             import requests
+            # requests takes a mapping, so repeated headers are folded (Cookie with "; ").
             resp = requests.request(
-                method,
-                url,
-                headers=headers,
-                data=body,
+                req.method,
+                req.url,
+                headers=req.headers.to_dict(),
+                data=req.body or None,
                 verify=False,
                 timeout=20
             )
-            resp_txt = f"{resp.status_code} {resp.reason}\n"
-            resp_txt += "\n".join(f"{k}: {v}" for k, v in resp.headers.items())
-            resp_txt += "\n\n" + resp.text
-            self.res_display.setPlainText(resp_txt)
+            response = HttpResponse(resp.status_code, resp.reason, resp.headers.items(), resp.content)
+            self.res_display.show_response(response)
         except Exception as ex:
-            self.res_display.setPlainText(f"Error parsing or sending request:\n{str(ex)}")
+            self.res_display.set_text(f"Error parsing or sending request:\n{str(ex)}")
 
 
 class ReplayWidget(QWidget):
@@ -153,22 +142,11 @@ class ReplayWidget(QWidget):
             return
 
         main_win = get_main_window_with_tabs(self)
-        bulk_tab = None
-        if main_win:
-            for i in range(main_win.tabs.count()):
-                widget = main_win.tabs.widget(i)
-                if widget and widget.__class__.__name__ == 'BulkSenderWidget':
-                    bulk_tab = widget
-                    break
-
-        if not bulk_tab:
+        if not main_win:
             QMessageBox.warning(self, "Bulk Sender Tab Not Found", "Could not find Bulk Sender tab to send requests.")
             return
-
-        bulk_tab.add_request(req_text)
-        index = main_win.tabs.indexOf(bulk_tab)
-        if index != -1:
-            main_win.tabs.setCurrentIndex(index)
+        # show_tab builds the tab if it has not been opened yet.
+        main_win.show_tab("bulk").add_request(req_text)
 
     # --- New method to send to AI Analyser
     def send_selected_to_ai_analyser(self):
@@ -182,25 +160,20 @@ class ReplayWidget(QWidget):
             return
 
         main_win = get_main_window_with_tabs(self)
-        ai_tab = None
-        if main_win:
-            for i in range(main_win.tabs.count()):
-                widget = main_win.tabs.widget(i)
-                if widget and widget.__class__.__name__ == 'AIAnalyserWidget':
-                    ai_tab = widget
-                    break
-        if not ai_tab:
+        if not main_win:
             QMessageBox.warning(self, "AI Analyser Tab Not Found", "Could not find AI Analyser tab to send requests.")
             return
-        ai_tab.req_editor.setPlainText(req_text)
-        index = main_win.tabs.indexOf(ai_tab)
-        if index != -1:
-            main_win.tabs.setCurrentIndex(index)
+        main_win.show_tab("ai").req_editor.setPlainText(req_text)
 
-    def add_new_tab(self, req_text, resp_text=""):
+    def add_new_tab(self, req, resp=""):
+        # Accepts raw text or flow model objects (Flow, HttpRequest, HttpResponse).
+        if isinstance(req, Flow):
+            req, resp = req.request, req.response or resp
+        req_text = req if isinstance(req, str) else req.text
         self.tab_count += 1
         new_tab = SingleReplayTab()
-        new_tab.load_data({'request': req_text, 'response': resp_text})
+        # Responses stay objects so the viewer can decode and pretty-print the body.
+        new_tab.load_data({'request': req_text, 'response': resp})
         self.tab_widget.addTab(new_tab, str(self.tab_count))
         self.tab_widget.setCurrentWidget(new_tab)
 
@@ -0,0 +1,481 @@
+# response_render.py
+#
+# Turns a response into display text for the response viewer, off the UI
+# thread: undoes Content-Encoding (gzip, deflate, br, zstd), picks the
+# charset, pretty-prints JSON, XML and HTML, and falls back to a hex view
+# for binary bodies. The result is indexed by line (TextLines, HexLines) so
+# the viewer only ever slices out the lines on screen, however large the
+# body is; highlight_spans() colours one line at a time for the same reason.
+#
+# Brotli needs the optional `brotli` (or `brotlicffi`) package and zstd the
+# optional `zstandard` package; without them such bodies are shown as-is.
+
+import codecs
+import json
+import re
+import time
+import zlib
+from array import array
+from collections import OrderedDict
+
+from flow_model import HttpResponse
+
+try:
+    import brotli
+except ImportError:
+    try:
+        import brotlicffi as brotli
+    except ImportError:
+        brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+MODES = ("pretty", "raw", "hex")
+# Decoded bodies larger than this are cut, so a compression bomb cannot
+# exhaust memory.
+MAX_DECODED_SIZE = 256 * 1024 * 1024
+# Pretty-printing above this size costs more than it helps; show raw text.
+MAX_PRETTY_SIZE = 64 * 1024 * 1024
+# Lines longer than this are split into display lines (minified bodies).
+MAX_LINE_CHARS = 2000
+HEX_ROW = 16
+SNIFF_BYTES = 4096
+RENDER_CACHE_CHARS = 96 * 1024 * 1024
+
+BINARY_TYPES = ("image/", "audio/", "video/", "font/", "application/octet-stream", "application/zip",
+                "application/gzip", "application/pdf", "application/x-protobuf", "application/protobuf",
+                "application/wasm", "application/grpc")
+VOID_ELEMENTS = {"area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "param",
+                 "source", "track", "wbr", "!doctype"}
+# Element content that is not markup and is kept as it is.
+RAW_TEXT_ELEMENTS = ("script", "style", "pre", "textarea")
+
+_CHARSET_PARAM = re.compile(r"charset\s*=\s*[\"']?([\w.:-]+)", re.I)
+_META_CHARSET = re.compile(rb"<meta[^>]+charset\s*=\s*[\"']?([\w.:-]+)", re.I)
+_XML_ENCODING = re.compile(rb"<\?xml[^>]+encoding\s*=\s*[\"']([\w.:-]+)", re.I)
+_MARKUP_TOKEN = re.compile(r"(<!--.*?-->|<!\[CDATA\[.*?\]\]>|<[^>]*>)", re.S)
+_TAG_NAME = re.compile(r"</?\s*([!?\w:-]+)")
+
+HIGHLIGHT_PATTERNS = {
+    "json": re.compile(
+        r'(?P<key>"(?:[^"\\]|\\.)*"(?=\s*:))|(?P<string>"(?:[^"\\]|\\.)*"?)'
+        r"|(?P<number>-?\b\d+(?:\.\d+)?(?:[eE][+-]?\d+)?\b)|(?P<keyword>\b(?:true|false|null)\b)"),
+    "markup": re.compile(
+        r"(?P<comment><!--.*?(?:-->|$))|(?P<tag></?[\w:.-]+|/?>|<[!?][\w-]*)"
+        r'|(?P<attr>\b[\w:.-]+(?==))|(?P<string>"[^"]*"?|\'[^\']*\'?)'),
+    "header": re.compile(r"(?P<key>^[\w-]+(?=:))|(?P<keyword>^HTTP/[\d.]+\s+\d+)"),
+}
+
+
+# --- decoding --------------------------------------------------------------
+
+def _decode_one(encoding, data):
+    if encoding in ("gzip", "x-gzip"):
+        if not data.startswith(b"\x1f\x8b"):
+            raise ValueError("not gzip data")
+        d = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        return d.decompress(data, MAX_DECODED_SIZE)
+    if encoding == "deflate":
+        try:
+            d = zlib.decompressobj()
+            return d.decompress(data, MAX_DECODED_SIZE)
+        except zlib.error:
+            # Some servers send raw deflate without the zlib header.
+            d = zlib.decompressobj(-zlib.MAX_WBITS)
+            return d.decompress(data, MAX_DECODED_SIZE)
+    if encoding == "br":
+        if brotli is None:
+            raise ValueError("br needs the brotli package")
+        return brotli.decompress(data)[:MAX_DECODED_SIZE]
+    if encoding == "zstd":
+        if zstandard is None:
+            raise ValueError("zstd needs the zstandard package")
+        return zstandard.ZstdDecompressor().decompressobj().decompress(data)[:MAX_DECODED_SIZE]
+    raise ValueError(f"unknown encoding {encoding}")
+
+
+def decode_content(data, content_encoding):
+    """Undo Content-Encoding; returns (bytes, note).
+
+    Bodies from the proxy and from requests are usually decoded already
+    even though the header still names the encoding, so a failure keeps the
+    bytes unchanged rather than being an error.
+    """
+    encodings = [e.strip().lower() for e in (content_encoding or "").split(",") if e.strip()]
+    encodings = [e for e in encodings if e != "identity"]
+    if not encodings or not data:
+        return data, ""
+    decoded = data
+    # Listed in the order applied, so undo them from the last.
+    for encoding in reversed(encodings):
+        try:
+            decoded = _decode_one(encoding, decoded)
+        except Exception as e:
+            if decoded is data:
+                reason = str(e) if "package" in str(e) else "already decoded"
+                return data, f"{','.join(encodings)}: {reason}"
+            return decoded, f"{encoding} failed: {e}"
+    return decoded, f"decoded {','.join(encodings)}"
+
+
+def media_type(content_type):
+    return (content_type or "").split(";", 1)[0].strip().lower()
+
+
+def is_binary(data, content_type=""):
+    mtype = media_type(content_type)
+    if mtype.startswith(BINARY_TYPES):
+        return True
+    head = data[:SNIFF_BYTES]
+    if b"\x00" in head:
+        return True
+    if not head:
+        return False
+    try:
+        head.decode("utf-8")
+        return False
+    except UnicodeDecodeError as e:
+        # A multi-byte character cut at the end of the sniffed range is fine.
+        if e.start >= len(head) - 3:
+            return False
+    controls = sum(1 for b in head if b < 9 or 13 < b < 32)
+    return controls > len(head) * 0.1
+
+
+def detect_charset(data, content_type=""):
+    """Charset from the header, a BOM, an HTML meta tag or XML declaration, else a guess."""
+    match = _CHARSET_PARAM.search(content_type or "")
+    candidates = [match.group(1)] if match else []
+    if data.startswith(codecs.BOM_UTF8):
+        candidates.insert(0, "utf-8-sig")
+    elif data.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)):
+        candidates.insert(0, "utf-16")
+    head = data[:SNIFF_BYTES]
+    for pattern in (_META_CHARSET, _XML_ENCODING):
+        found = pattern.search(head)
+        if found:
+            candidates.append(found.group(1).decode("ascii", "replace"))
+    candidates.append("utf-8")
+    for name in candidates:
+        try:
+            codec = codecs.lookup(name).name
+        except LookupError:
+            continue
+        if codec in ("utf-8", "utf-8-sig"):
+            try:
+                data.decode(codec)
+            except UnicodeDecodeError:
+                continue
+        return codec
+    # Not UTF-8 and nothing declared: Windows-1252 is the usual culprit;
+    # the few bytes it does not map are replaced when decoding.
+    return "cp1252"
+
+
+def body_kind(text, content_type=""):
+    mtype = media_type(content_type)
+    if mtype.endswith(("/json", "+json")) or mtype == "application/x-ndjson":
+        return "json"
+    if "html" in mtype:
+        return "html"
+    if mtype.endswith(("/xml", "+xml")):
+        return "xml"
+    start = text[:256].lstrip().lower()
+    if start.startswith(("{", "[")):
+        return "json"
+    if start.startswith(("<!doctype html", "<html")):
+        return "html"
+    if start.startswith("<?xml") or (start.startswith("<") and mtype in ("", "text/plain")):
+        return "xml"
+    return "text"
+
+
+# --- pretty printing -------------------------------------------------------
+
+def pretty_json(text):
+    return json.dumps(json.loads(text), indent=2, ensure_ascii=False)
+
+
+def indent_markup(text, html=False):
+    """Put each tag on its own line, indented by depth. Text in script,
+    style, pre and textarea elements is left untouched."""
+    out = []
+    depth = 0
+    pos = 0
+    while True:
+        match = _MARKUP_TOKEN.search(text, pos)
+        if match is None:
+            break
+        between = text[pos:match.start()]
+        token = match.group(0)
+        pos = match.end()
+        if between.strip():
+            out.append("  " * depth + between.strip())
+        name_match = _TAG_NAME.match(token)
+        name = name_match.group(1).lower() if name_match else ""
+        if token.startswith("</"):
+            depth = max(0, depth - 1)
+            out.append("  " * depth + token)
+        elif token.startswith(("<!", "<?")) or token.endswith("/>") or (html and name in VOID_ELEMENTS):
+            out.append("  " * depth + token)
+        elif html and name in RAW_TEXT_ELEMENTS:
+            # Everything up to the closing tag is content, even if it contains "<".
+            close = re.compile(rf"</{name}\s*>", re.I).search(text, pos)
+            content_end = close.start() if close else len(text)
+            content = text[pos:content_end].strip("\n")
+            out.append("  " * depth + token)
+            if content.strip():
+                out.append(content)
+            if close:
+                out.append("  " * depth + close.group(0))
+            pos = close.end() if close else len(text)
+        else:
+            out.append("  " * depth + token)
+            depth += 1
+    tail = text[pos:]
+    if tail.strip():
+        out.append("  " * depth + tail.strip())
+    return "\n".join(out)
+
+
+def pretty_text(text, kind):
+    if len(text) > MAX_PRETTY_SIZE:
+        return text, "too large to pretty-print"
+    try:
+        if kind == "json":
+            try:
+                return pretty_json(text), ""
+            except ValueError:
+                # Newline-delimited JSON: one document per line.
+                lines = [pretty_json(line) for line in text.splitlines() if line.strip()]
+                return "\n".join(lines), ""
+        if kind in ("xml", "html"):
+            return indent_markup(text, html=kind == "html"), ""
+    except (ValueError, RecursionError) as e:
+        return text, f"not valid {kind}: {e}"
+    return text, ""
+
+
+# --- line access -----------------------------------------------------------
+
+class TextLines:
+    """Line view over one string: line i is sliced out on demand.
+
+    Keeps the text plus an array of line starts instead of a list of line
+    strings. Lines longer than MAX_LINE_CHARS are split into several.
+    """
+
+    __slots__ = ("text", "starts", "longest")
+
+    def __init__(self, text, max_width=MAX_LINE_CHARS):
+        self.text = text
+        longest = 0
+        starts = array("q", [0])
+        # Split in chunks so a huge body never exists as a list of all its lines.
+        chunk = 1 << 20
+        offset = 0
+        size = len(text)
+        while offset <= size:
+            end = text.find("\n", offset + chunk) if offset + chunk < size else -1
+            stop = size if end < 0 else end
+            pos = offset
+            for line in text[offset:stop].split("\n"):
+                n = len(line)
+                if n > max_width:
+                    starts.extend(range(pos + max_width, pos + n, max_width))
+                if n > longest:
+                    longest = n
+                pos += n + 1
+                starts.append(pos)
+            offset = stop + 1
+        self.starts = starts
+        # Width of the widest display line, for the horizontal scroll range.
+        self.longest = min(longest, max_width)
+
+    def __len__(self):
+        return len(self.starts) - 1
+
+    def __getitem__(self, i):
+        line = self.text[self.starts[i]:self.starts[i + 1]]
+        return line[:-1] if line.endswith("\n") else line
+
+    def join(self, first, last):
+        """Text of lines first..last inclusive."""
+        return self.text[self.starts[first]:self.starts[last + 1]].rstrip("\n")
+
+    @property
+    def chars(self):
+        return len(self.text)
+
+
+class HexLines:
+    """Hex dump computed per line, so a large binary body costs nothing up front."""
+
+    __slots__ = ("data",)
+    longest = 10 + HEX_ROW * 4
+
+    def __init__(self, data):
+        self.data = data
+
+    def __len__(self):
+        return max(1, (len(self.data) + HEX_ROW - 1) // HEX_ROW)
+
+    def __getitem__(self, i):
+        offset = i * HEX_ROW
+        row = self.data[offset:offset + HEX_ROW]
+        hex_part = " ".join(f"{b:02x}" for b in row)
+        text = "".join(chr(b) if 32 <= b < 127 else "." for b in row)
+        return f"{offset:08x}  {hex_part:<{HEX_ROW * 3 - 1}}  {text}"
+
+    def join(self, first, last):
+        return "\n".join(self[i] for i in range(first, last + 1))
+
+    @property
+    def chars(self):
+        # The dump is not stored; only the bytes count against the cache.
+        return len(self.data)
+
+
+# --- rendering -------------------------------------------------------------
+
+class RenderedBody:
+    __slots__ = ("mode", "kind", "lines", "body_line", "summary", "seconds")
+
+    def __init__(self, mode, kind, lines, body_line, summary, seconds):
+        self.mode = mode
+        # "json", "xml", "html", "text" or "binary"; selects the highlighter.
+        self.kind = kind
+        self.lines = lines
+        # Index of the first body line; lines before it are the status line and headers.
+        self.body_line = body_line
+        self.summary = summary
+        self.seconds = seconds
+
+
+def _head_text(response):
+    status_line = " ".join(
+        str(p) for p in (response.http_version, response.status_code, response.reason) if p not in (None, "")
+    )
+    return "\n".join([status_line] + [f"{k}: {v}" for k, v in response.headers])
+
+
+def response_from_text(text):
+    """Parse a rendered response (as saved in projects) back into an
+    HttpResponse; None if the text does not start with a status line."""
+    if not text.startswith("HTTP/"):
+        return None
+    head, _, body = text.partition("\n\n")
+    lines = head.split("\n")
+    version, _, rest = lines[0].partition(" ")
+    status, _, reason = rest.partition(" ")
+    headers = [tuple(p.strip() for p in line.split(":", 1)) for line in lines[1:] if ":" in line]
+    return HttpResponse(int(status) if status.isdigit() else None, reason, headers, body.encode("utf-8"), version)
+
+
+def render_text(text):
+    """Plain text that is not a response, e.g. an error message."""
+    started = time.perf_counter()
+    lines = TextLines(text)
+    return RenderedBody("raw", "text", lines, len(lines), f"text, {len(text):,} chars",
+                        time.perf_counter() - started)
+
+
+def render_response(response, mode="pretty", pretty=pretty_text):
+    """Render a flow_model.HttpResponse for the viewer. Runs in a worker thread;
+    `pretty` is pretty_text or something that runs it elsewhere."""
+    started = time.perf_counter()
+    headers = response.headers
+    content_type = headers.get("Content-Type", "")
+    data, note = decode_content(response.body, headers.get("Content-Encoding"))
+    notes = [note] if note else []
+    head = _head_text(response)
+    body_line = head.count("\n") + 2
+    binary = is_binary(data, content_type)
+    if mode == "hex" or (binary and mode == "pretty"):
+        # Headers stay as text; the body rows follow them.
+        lines = _Joined(TextLines(head + "\n"), HexLines(data))
+        kind = "binary"
+        notes.append("binary" if binary else "hex")
+    else:
+        charset = detect_charset(data, content_type)
+        text = data.decode(charset, errors="replace")
+        kind = "binary" if binary else body_kind(text, content_type)
+        notes.append(charset)
+        if mode == "pretty" and kind != "binary":
+            text, problem = pretty(text, kind)
+            if problem:
+                notes.append(problem)
+        if response.truncated_size is not None:
+            text += f"\n\n[body truncated to {response.body_size} of {response.truncated_size} bytes]"
+        lines = TextLines(head + "\n\n" + text if data else head)
+    summary = f"{kind}, {len(data):,} bytes" + (f" ({', '.join(notes)})" if notes else "")
+    return RenderedBody(mode, kind, lines, body_line, summary, time.perf_counter() - started)
+
+
+class _Joined:
+    """Two line sources shown one after the other (text headers, then hex rows)."""
+
+    __slots__ = ("first", "second")
+
+    def __init__(self, first, second):
+        self.first = first
+        self.second = second
+
+    def __len__(self):
+        return len(self.first) + len(self.second)
+
+    def __getitem__(self, i):
+        n = len(self.first)
+        return self.first[i] if i < n else self.second[i - n]
+
+    def join(self, first, last):
+        return "\n".join(self[i] for i in range(first, last + 1))
+
+    @property
+    def longest(self):
+        return max(self.first.longest, self.second.longest)
+
+    @property
+    def chars(self):
+        return self.first.chars + self.second.chars
+
+
+def highlight_spans(kind, line, header=False):
+    """[(start, end, style)] for one display line."""
+    pattern = HIGHLIGHT_PATTERNS["header"] if header else HIGHLIGHT_PATTERNS.get(
+        "markup" if kind in ("xml", "html") else kind)
+    if pattern is None:
+        return []
+    return [(m.start(), m.end(), m.lastgroup) for m in pattern.finditer(line)]
+
+
+class RenderCache:
+    """LRU of rendered bodies by (key, mode), bounded by total characters."""
+
+    def __init__(self, max_chars=RENDER_CACHE_CHARS):
+        self.max_chars = max_chars
+        self.chars = 0
+        self._entries = OrderedDict()
+
+    def get(self, key, mode):
+        entry = self._entries.get((key, mode))
+        if entry is not None:
+            self._entries.move_to_end((key, mode))
+        return entry
+
+    def put(self, key, mode, rendered):
+        old = self._entries.pop((key, mode), None)
+        if old is not None:
+            self.chars -= old.lines.chars
+        self._entries[(key, mode)] = rendered
+        self.chars += rendered.lines.chars
+        while self.chars > self.max_chars and len(self._entries) > 1:
+            _, evicted = self._entries.popitem(last=False)
+            self.chars -= evicted.lines.chars
+
+    def clear(self):
+        self._entries.clear()
+        self.chars = 0
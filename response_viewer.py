@@ -0,0 +1,363 @@
+# response_viewer.py
+#
+# Response viewer used by the Logger and Replay tabs. Decoding and
+# pretty-printing (response_render.py) run on a worker thread; the result
+# is cached per flow and mode, and BodyView paints only the lines that are
+# on screen, highlighting them as they are drawn. A 20 MB body opens as
+# fast as a 2 KB one: nothing is ever loaded into a QTextDocument.
+#
+# Selection works on whole lines (click, shift+click or drag); Ctrl+C copies
+# them and Ctrl+A selects everything.
+
+import itertools
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from PyQt5.QtWidgets import (
+    QAbstractScrollArea, QApplication, QComboBox, QHBoxLayout, QLabel, QPushButton, QVBoxLayout, QWidget
+)
+from PyQt5 import sip
+from PyQt5.QtCore import QObject, Qt, pyqtSignal
+from PyQt5.QtGui import QColor, QFontDatabase, QFontMetrics, QKeySequence, QPainter, QPalette
+
+from metrics import REGISTRY
+from proxy_runner import STAGE_HELP
+from response_render import (
+    RenderCache, highlight_spans, pretty_text, render_response, render_text, response_from_text
+)
+
+RENDER_STAGE = REGISTRY.histogram("anvesha_stage_seconds", STAGE_HELP, stage="response_render")
+RENDER_CACHE = RenderCache()
+SCROLL_LINES = 3
+# Above this size pretty-printing takes long enough that the raw text is
+# shown first and replaced when the pretty version is ready.
+PREVIEW_SIZE = 1024 * 1024
+# json.loads holds the GIL for the whole parse (about half a second for
+# 20 MB), which would freeze the UI; bodies this large are pretty-printed
+# in a helper process instead.
+PROCESS_PRETTY_SIZE = 4 * 1024 * 1024
+HIGHLIGHT_COLORS = {
+    "key": QColor(140, 40, 140),
+    "string": QColor(30, 120, 30),
+    "number": QColor(20, 80, 190),
+    "keyword": QColor(180, 90, 0),
+    "tag": QColor(30, 60, 170),
+    "attr": QColor(150, 60, 20),
+    "comment": QColor(120, 120, 120),
+}
+MODE_LABELS = (("Pretty", "pretty"), ("Raw", "raw"), ("Hex", "hex"))
+
+_keys = itertools.count()
+
+
+class ResponseRenderer(QObject):
+    """One worker thread shared by all viewers. Jobs superseded before they
+    start (the user clicked on through the table) are skipped. Large bodies
+    are pretty-printed in a single helper process, started on first use."""
+
+    # token, RenderedBody, final (False for the raw preview of a large body)
+    rendered = pyqtSignal(object, object, bool)
+
+    def __init__(self):
+        super().__init__()
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="response-render")
+        self.pool = None
+        # id(viewer) -> token of its latest job
+        self.latest = {}
+
+    def submit(self, owner, token, response, text, mode):
+        self.latest[owner] = token
+        self.executor.submit(self._render, owner, token, response, text, mode)
+
+    def _render(self, owner, token, response, text, mode):
+        if self.latest.get(owner) is not token:
+            return
+        try:
+            if response is None:
+                response = response_from_text(text)
+            if mode == "pretty" and response is not None and response.body_size > PREVIEW_SIZE:
+                self.rendered.emit(token, render_response(response, "raw"), False)
+                if self.latest.get(owner) is not token:
+                    return
+            result = render_text(text) if response is None else render_response(response, mode, self._pretty)
+            RENDER_STAGE.observe(result.seconds)
+        except Exception as e:
+            print(f"[ResponseRenderer] Render failed: {e}")
+            result = render_text(f"Could not render response: {e}")
+        self.rendered.emit(token, result, True)
+
+    def _pretty(self, text, kind):
+        if len(text) < PROCESS_PRETTY_SIZE:
+            return pretty_text(text, kind)
+        if self.pool is None:
+            # Imported here: most sessions never open a body this large.
+            import multiprocessing
+            from concurrent.futures import ProcessPoolExecutor
+            # Spawn rather than fork, as in passive_scanner.py.
+            self.pool = ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn"))
+        try:
+            return self.pool.submit(pretty_text, text, kind).result()
+        except Exception as e:
+            print(f"[ResponseRenderer] Helper process failed ({e}); pretty-printing in this process")
+            self.pool = None
+            return pretty_text(text, kind)
+
+    def shutdown(self):
+        if sys.version_info >= (3, 9):
+            self.executor.shutdown(wait=False, cancel_futures=True)
+        else:
+            self.executor.shutdown(wait=False)
+        if self.pool is not None:
+            self.pool.shutdown(wait=False)
+
+
+_renderer = None
+
+
+def shared_renderer():
+    global _renderer
+    # Qt deletes the renderer with the QApplication; a later application
+    # (benchmarks, tests) gets a new one.
+    if _renderer is not None and sip.isdeleted(_renderer):
+        _renderer.shutdown()
+        _renderer = None
+    if _renderer is None:
+        _renderer = ResponseRenderer()
+    return _renderer
+
+
+def shutdown_renderer():
+    if _renderer is not None:
+        _renderer.shutdown()
+
+
+class BodyView(QAbstractScrollArea):
+    """Read-only text view that draws lines straight from a line source."""
+
+    def __init__(self):
+        super().__init__()
+        self.setFont(QFontDatabase.systemFont(QFontDatabase.FixedFont))
+        self.setFocusPolicy(Qt.StrongFocus)
+        self.setHorizontalScrollBarPolicy(Qt.ScrollBarAsNeeded)
+        self.rendered = None
+        self.anchor = self.cursor_line = None
+        self.verticalScrollBar().setSingleStep(SCROLL_LINES)
+        self._update_metrics()
+
+    def _update_metrics(self):
+        metrics = QFontMetrics(self.font())
+        self.line_height = metrics.lineSpacing()
+        self.ascent = metrics.ascent()
+        self.char_width = metrics.averageCharWidth()
+
+    def set_rendered(self, rendered):
+        self.rendered = rendered
+        self.anchor = self.cursor_line = None
+        self.verticalScrollBar().setValue(0)
+        self.horizontalScrollBar().setValue(0)
+        self._update_scrollbars()
+        self.viewport().update()
+
+    def _visible_lines(self):
+        return max(1, self.viewport().height() // self.line_height)
+
+    def _update_scrollbars(self):
+        lines = self.rendered.lines if self.rendered is not None else ()
+        page = self._visible_lines()
+        vbar = self.verticalScrollBar()
+        vbar.setRange(0, max(0, len(lines) - page))
+        vbar.setPageStep(page)
+        columns = max(1, self.viewport().width() // self.char_width)
+        hbar = self.horizontalScrollBar()
+        hbar.setRange(0, max(0, (lines.longest if lines else 0) - columns + 1))
+        hbar.setPageStep(columns)
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        self._update_scrollbars()
+
+    def paintEvent(self, event):
+        painter = QPainter(self.viewport())
+        palette = self.palette()
+        painter.fillRect(self.viewport().rect(), palette.color(QPalette.Base))
+        if self.rendered is None:
+            return
+        lines = self.rendered.lines
+        first = self.verticalScrollBar().value()
+        last = min(len(lines), first + self._visible_lines() + 1)
+        column = self.horizontalScrollBar().value()
+        columns = self.viewport().width() // self.char_width + 2
+        selected = self.selected_range()
+        text_color = palette.color(QPalette.Text)
+        metrics = painter.fontMetrics()
+        for row, i in enumerate(range(first, last)):
+            y = row * self.line_height
+            if selected and selected[0] <= i <= selected[1]:
+                painter.fillRect(0, y, self.viewport().width(), self.line_height, palette.color(QPalette.Highlight))
+            line = lines[i].replace("\t", "    ")[column:column + columns]
+            x = 0
+            pos = 0
+            for start, end, style in highlight_spans(self.rendered.kind, line, i < self.rendered.body_line):
+                if start > pos:
+                    x = self._draw(painter, metrics, x, y, line[pos:start], text_color)
+                x = self._draw(painter, metrics, x, y, line[start:end], HIGHLIGHT_COLORS.get(style, text_color))
+                pos = end
+            if pos < len(line):
+                self._draw(painter, metrics, x, y, line[pos:], text_color)
+
+    def _draw(self, painter, metrics, x, y, text, color):
+        painter.setPen(color)
+        painter.drawText(x, y + self.ascent, text)
+        return x + metrics.horizontalAdvance(text)
+
+    def selected_range(self):
+        if self.anchor is None:
+            return None
+        return min(self.anchor, self.cursor_line), max(self.anchor, self.cursor_line)
+
+    def _line_at(self, pos):
+        if self.rendered is None:
+            return None
+        line = self.verticalScrollBar().value() + pos.y() // self.line_height
+        return max(0, min(line, len(self.rendered.lines) - 1))
+
+    def mousePressEvent(self, event):
+        line = self._line_at(event.pos())
+        if line is None:
+            return
+        if not (event.modifiers() & Qt.ShiftModifier) or self.anchor is None:
+            self.anchor = line
+        self.cursor_line = line
+        self.viewport().update()
+
+    def mouseMoveEvent(self, event):
+        line = self._line_at(event.pos())
+        if line is not None and self.anchor is not None and event.buttons() & Qt.LeftButton:
+            self.cursor_line = line
+            self.ensure_visible(line)
+            self.viewport().update()
+
+    def ensure_visible(self, line):
+        vbar = self.verticalScrollBar()
+        if line < vbar.value():
+            vbar.setValue(line)
+        elif line >= vbar.value() + self._visible_lines():
+            vbar.setValue(line - self._visible_lines() + 1)
+
+    def keyPressEvent(self, event):
+        if event.matches(QKeySequence.Copy):
+            self.copy()
+        elif event.matches(QKeySequence.SelectAll) and self.rendered is not None:
+            self.anchor, self.cursor_line = 0, len(self.rendered.lines) - 1
+            self.viewport().update()
+        else:
+            super().keyPressEvent(event)
+
+    def selected_text(self):
+        selected = self.selected_range()
+        if self.rendered is None or selected is None:
+            return ""
+        return self.rendered.lines.join(*selected)
+
+    def copy(self):
+        text = self.selected_text()
+        if text:
+            QApplication.clipboard().setText(text)
+
+
+class ResponseViewer(QWidget):
+    def __init__(self):
+        super().__init__()
+        self.renderer = shared_renderer()
+        self.renderer.rendered.connect(self.on_rendered)
+        # What is shown: a response object, or text (saved projects, errors).
+        self.response = None
+        self.text = ""
+        self.key = None
+        self.token = None
+        self.pending_mode = None
+        self.requested_at = 0.0
+
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+        controls = QHBoxLayout()
+        self.mode_combo = QComboBox()
+        for label, mode in MODE_LABELS:
+            self.mode_combo.addItem(label, mode)
+        self.mode_combo.currentIndexChanged.connect(self.refresh)
+        controls.addWidget(self.mode_combo)
+        self.info_label = QLabel("")
+        controls.addWidget(self.info_label, 1)
+        copy_btn = QPushButton("Copy")
+        copy_btn.setToolTip("Copy the selected lines, or everything if nothing is selected")
+        copy_btn.clicked.connect(self.copy)
+        controls.addWidget(copy_btn)
+        layout.addLayout(controls)
+        self.view = BodyView()
+        layout.addWidget(self.view)
+
+    @property
+    def mode(self):
+        return self.mode_combo.currentData()
+
+    def show_response(self, response, key=None):
+        """Show an HttpResponse; key (e.g. the flow id) lets the rendering be reused."""
+        self.response = response
+        self.text = ""
+        self.key = key if key is not None else ("viewer", next(_keys))
+        self.refresh()
+
+    def set_text(self, text):
+        self.response = None
+        self.text = text or ""
+        self.key = ("viewer", next(_keys))
+        self.refresh()
+
+    def plain_text(self):
+        # Unformatted text, as saved in project files.
+        return self.response.text if self.response is not None else self.text
+
+    def clear(self):
+        self.set_text("")
+
+    def refresh(self):
+        mode = self.mode
+        cached = RENDER_CACHE.get(self.key, mode)
+        if cached is not None:
+            self._show(cached, "cached")
+            return
+        if self.response is None and len(self.text) < 4096 and not self.text.startswith("HTTP/"):
+            # Short messages (errors, empty) are not worth a round trip to the worker.
+            self._show(render_text(self.text), "")
+            return
+        self.token = object()
+        self.pending_mode = mode
+        self.requested_at = time.perf_counter()
+        self.info_label.setText("Rendering...")
+        self.renderer.submit(id(self), self.token, self.response, self.text, mode)
+
+    def on_rendered(self, token, rendered, final):
+        if token is not self.token:
+            return
+        if not final:
+            RENDER_CACHE.put(self.key, "raw", rendered)
+            self.view.set_rendered(rendered)
+            self.info_label.setText(f"{rendered.summary}  raw, pretty-printing...")
+            return
+        RENDER_CACHE.put(self.key, self.pending_mode, rendered)
+        waited = time.perf_counter() - self.requested_at
+        self._show(rendered, f"rendered in {rendered.seconds * 1000:.0f} ms, shown after {waited * 1000:.0f} ms")
+
+    def _show(self, rendered, how):
+        self.token = None
+        self.view.set_rendered(rendered)
+        self.info_label.setText(f"{rendered.summary}  {how}".strip())
+
+    def copy(self):
+        text = self.view.selected_text()
+        if not text and self.view.rendered is not None:
+            lines = self.view.rendered.lines
+            text = lines.join(0, len(lines) - 1) if len(lines) else ""
+        if text:
+            QApplication.clipboard().setText(text)
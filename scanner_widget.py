@@ -0,0 +1,163 @@
+# scanner_widget.py
+#
+# Passive Scan tab: findings from the background passive scanner, one row
+# per issue per endpoint, plus queue counters and per-check timings.
+
+from PyQt5.QtWidgets import (
+    QWidget, QVBoxLayout, QHBoxLayout, QLabel, QTextEdit, QPushButton, QCheckBox,
+    QTableWidget, QTableWidgetItem, QHeaderView, QAbstractItemView, QSplitter
+)
+from PyQt5.QtCore import Qt, pyqtSignal
+
+from passive_checks import SEVERITIES
+from passive_scanner import PassiveScanner
+
+COUNT_COLUMN = 3
+
+
+class ScannerWidget(QWidget):
+    findings_signal = pyqtSignal(list, list)
+    # {flow_id: [(check, severity, title)]}, for marking logger rows
+    flow_findings_signal = pyqtSignal(dict)
+    history_progress_signal = pyqtSignal(int, int)
+
+    def __init__(self, send_to_replay_callback=None, get_flow_callback=None, get_all_flows_callback=None):
+        super().__init__()
+        self.send_to_replay_callback = send_to_replay_callback
+        self.get_flow_callback = get_flow_callback
+        self.get_all_flows_callback = get_all_flows_callback
+        self.history_text = ""
+        # finding key -> table row
+        self.rows = {}
+        self.findings_signal.connect(self._on_findings)
+        self.history_progress_signal.connect(self._on_history_progress)
+        self.scanner = PassiveScanner(self.findings_signal.emit, on_flow_findings=self.flow_findings_signal.emit)
+        layout = QVBoxLayout(self)
+
+        top_layout = QHBoxLayout()
+        self.enabled_checkbox = QCheckBox("Scan new flows")
+        self.enabled_checkbox.setChecked(True)
+        self.enabled_checkbox.toggled.connect(self.on_enabled_toggled)
+        clear_btn = QPushButton("Clear Findings")
+        clear_btn.clicked.connect(self.clear_all)
+        replay_btn = QPushButton("Send Example to Replay")
+        replay_btn.clicked.connect(self.send_example_to_replay)
+        history_btn = QPushButton("Scan Captured Flows for Secrets")
+        history_btn.setToolTip("Run the secret rules over every flow in the logger, in parallel batches")
+        history_btn.clicked.connect(self.scan_history_for_secrets)
+        top_layout.addWidget(self.enabled_checkbox)
+        top_layout.addWidget(history_btn)
+        top_layout.addWidget(clear_btn)
+        top_layout.addWidget(replay_btn)
+        layout.addLayout(top_layout)
+
+        self.status_label = QLabel("Passive scanner idle")
+        layout.addWidget(self.status_label)
+
+        splitter = QSplitter(Qt.Vertical)
+        self.table = QTableWidget(0, 5)
+        self.table.setHorizontalHeaderLabels(["Severity", "Issue", "Endpoint", "Count", "Check"])
+        self.table.horizontalHeader().setSectionResizeMode(2, QHeaderView.Stretch)
+        self.table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.table.itemSelectionChanged.connect(self.show_selected)
+        splitter.addWidget(self.table)
+
+        self.detail_view = QTextEdit()
+        self.detail_view.setReadOnly(True)
+        splitter.addWidget(self.detail_view)
+
+        self.timing_table = QTableWidget(0, 5)
+        self.timing_table.setHorizontalHeaderLabels(["Check", "Runs", "Total ms", "Avg us", "Errors"])
+        self.timing_table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        splitter.addWidget(self.timing_table)
+        layout.addWidget(splitter)
+
+    def submit(self, flow):
+        self.scanner.submit(flow)
+
+    def on_enabled_toggled(self, checked):
+        self.scanner.enabled = checked
+
+    def scan_history_for_secrets(self):
+        if self.get_all_flows_callback is None:
+            return
+        flows = list(self.get_all_flows_callback())
+        self.history_text = f"History scan: 0/{len(flows)} flows"
+        self.scanner.scan_history(flows, ("secrets",), self.history_progress_signal.emit)
+
+    def _on_history_progress(self, done, total):
+        self.history_text = f"History scan: {done}/{total} flows" + (" (done)" if done >= total else "")
+
+    def _on_findings(self, new, updated):
+        for finding in new:
+            row = self.rows[finding.key] = self.table.rowCount()
+            self.table.insertRow(row)
+            severity_item = QTableWidgetItem(finding.severity)
+            severity_item.setData(Qt.UserRole, finding.key)
+            self.table.setItem(row, 0, severity_item)
+            self.table.setItem(row, 1, QTableWidgetItem(finding.title))
+            self.table.setItem(row, 2, QTableWidgetItem(finding.endpoint))
+            self.table.setItem(row, COUNT_COLUMN, QTableWidgetItem(str(finding.count)))
+            self.table.setItem(row, 4, QTableWidgetItem(finding.check))
+        for finding in updated:
+            row = self.rows.get(finding.key)
+            if row is not None:
+                self.table.item(row, COUNT_COLUMN).setText(str(finding.count))
+
+    def selected_finding(self):
+        row = self.table.currentRow()
+        if row < 0:
+            return None
+        return self.scanner.findings.get(self.table.item(row, 0).data(Qt.UserRole))
+
+    def show_selected(self):
+        finding = self.selected_finding()
+        if finding is None:
+            self.detail_view.clear()
+            return
+        self.detail_view.setPlainText(
+            f"[{finding.severity}] {finding.title}\n"
+            f"Endpoint: {finding.endpoint}\n"
+            f"Check: {finding.check}\n"
+            f"Seen in {finding.count} flow(s); examples: {', '.join(finding.flow_ids)}\n\n"
+            f"{finding.detail}"
+        )
+
+    def send_example_to_replay(self):
+        finding = self.selected_finding()
+        if finding is None or self.get_flow_callback is None or self.send_to_replay_callback is None:
+            return
+        for flow_id in finding.flow_ids:
+            flow = self.get_flow_callback(flow_id)
+            if flow is not None:
+                self.send_to_replay_callback(flow.request)
+                return
+
+    def update_stats(self):
+        stats = self.scanner.stats()
+        by_severity = {s: 0 for s in SEVERITIES}
+        for finding in list(self.scanner.findings.values()):
+            by_severity[finding.severity] = by_severity.get(finding.severity, 0) + 1
+        self.status_label.setText(
+            f"{stats['workers']} workers | scanned {stats['flows_scanned']} | queued {stats['queued']} | "
+            f"skipped (backpressure) {stats['flows_skipped']} | check errors {stats['check_errors']} | "
+            + ", ".join(f"{s} {n}" for s, n in by_severity.items())
+            + (f" | {self.history_text}" if self.history_text else "")
+        )
+        # Slowest checks first.
+        timings = sorted(stats["timings"].items(), key=lambda kv: -kv[1]["total_ms"])
+        self.timing_table.setRowCount(len(timings))
+        for row, (name, t) in enumerate(timings):
+            values = (name, str(t["runs"]), f"{t['total_ms']:.1f}", f"{t['avg_us']:.1f}", str(t["errors"]))
+            for col, value in enumerate(values):
+                self.timing_table.setItem(row, col, QTableWidgetItem(value))
+
+    def clear_all(self):
+        self.scanner.clear()
+        self.rows = {}
+        self.table.setRowCount(0)
+        self.detail_view.clear()
+
+    def shutdown(self):
+        self.scanner.shutdown()
@@ -0,0 +1,335 @@
+# schema_infer.py
+#
+# Online schema inference for request and response bodies. Each sample is
+# merged into a SchemaNode tree as it arrives and then dropped. The tree
+# records which types were seen at every position, how often each object
+# property was present, a few distinct values for enum detection, string
+# formats and numeric ranges. Memory is proportional to the size of the
+# schema, not to the number of samples. to_schema() renders an OpenAPI 3
+# schema object.
+#
+# JSON, application/x-www-form-urlencoded and multipart/form-data bodies
+# are understood; anything else is described as a binary string. Those
+# three are not parsed above MAX_INFER_BODY: such samples add nothing, and
+# a media type seen only that large gets an empty schema saying so.
+
+import json
+import re
+from urllib.parse import parse_qsl
+
+MAX_DEPTH = 12
+MAX_PROPERTIES = 300
+# Values are listed as an enum only when few distinct values were seen and
+# each recurred, so IDs and free text are not mistaken for enums.
+MAX_ENUM = 12
+ENUM_MIN_SAMPLES_PER_VALUE = 3
+MAX_ENUM_LENGTH = 64
+# Structured bodies larger than this are not parsed at ingest.
+MAX_INFER_BODY = 512 * 1024
+
+_INT_RE = re.compile(r"^-?\d+$")
+_FLOAT_RE = re.compile(r"^-?\d+\.\d+(?:[eE][-+]?\d+)?$")
+_UUID_RE = re.compile(r"^[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}$")
+_DATE_RE = re.compile(r"^\d{4}-\d{2}-\d{2}$")
+_DATETIME_RE = re.compile(r"^\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}(?::\d{2}(?:\.\d+)?)?(?:Z|[+-]\d{2}:?\d{2})?$")
+_EMAIL_RE = re.compile(r"^[^@\s]+@[^@\s]+\.[A-Za-z]{2,}$")
+_URI_RE = re.compile(r"^https?://\S+$")
+_IPV4_RE = re.compile(r"^(?:\d{1,3}\.){3}\d{1,3}$")
+
+
+def string_format(value):
+    if _UUID_RE.match(value):
+        return "uuid"
+    if _DATETIME_RE.match(value):
+        return "date-time"
+    if _DATE_RE.match(value):
+        return "date"
+    if _EMAIL_RE.match(value):
+        return "email"
+    if _URI_RE.match(value):
+        return "uri"
+    if _IPV4_RE.match(value):
+        return "ipv4"
+    return None
+
+
+def infer_scalar(value):
+    """(type, format) of a string value as seen in a query, header or form field."""
+    if value in ("true", "false"):
+        return "boolean", None
+    if _INT_RE.match(value) and len(value) < 19:
+        return "integer", None
+    if _FLOAT_RE.match(value):
+        return "number", None
+    return "string", string_format(value)
+
+
+def typed_scalar(value):
+    """Convert a text value to the Python value its inferred type suggests."""
+    type_name = infer_scalar(value)[0]
+    if type_name == "boolean":
+        return value == "true"
+    if type_name == "integer":
+        return int(value)
+    if type_name == "number":
+        return float(value)
+    return value
+
+
+def _json_type(value):
+    if value is None:
+        return "null"
+    if isinstance(value, bool):
+        return "boolean"
+    if isinstance(value, int):
+        return "integer"
+    if isinstance(value, float):
+        return "number"
+    if isinstance(value, str):
+        return "string"
+    if isinstance(value, list):
+        return "array"
+    return "object"
+
+
+class SchemaNode:
+    __slots__ = (
+        "count", "types", "formats", "values", "enum_overflow", "minimum", "maximum",
+        "properties", "items", "object_count", "binary",
+    )
+
+    def __init__(self):
+        self.count = 0
+        self.types = {}
+        self.formats = {}
+        # Distinct scalar values and how often each was seen, until there
+        # are too many to be an enum.
+        self.values = {}
+        self.enum_overflow = False
+        self.minimum = None
+        self.maximum = None
+        self.properties = None
+        self.items = None
+        self.object_count = 0
+        self.binary = False
+
+    def merge(self, value, depth=0):
+        self.count += 1
+        type_name = _json_type(value)
+        self.types[type_name] = self.types.get(type_name, 0) + 1
+        if type_name == "object":
+            self._merge_object(value, depth)
+        elif type_name == "array":
+            if depth < MAX_DEPTH:
+                if self.items is None:
+                    self.items = SchemaNode()
+                for item in value:
+                    self.items.merge(item, depth + 1)
+        elif type_name in ("integer", "number"):
+            self.minimum = value if self.minimum is None else min(self.minimum, value)
+            self.maximum = value if self.maximum is None else max(self.maximum, value)
+            self._note_value(value)
+        elif type_name == "string":
+            fmt = string_format(value)
+            self.formats[fmt] = self.formats.get(fmt, 0) + 1
+            if fmt is None:
+                self._note_value(value)
+
+    def _merge_object(self, value, depth):
+        self.object_count += 1
+        if self.properties is None:
+            self.properties = {}
+        if depth >= MAX_DEPTH:
+            return
+        for name, child_value in value.items():
+            child = self.properties.get(name)
+            if child is None:
+                if len(self.properties) >= MAX_PROPERTIES:
+                    continue
+                child = self.properties[name] = SchemaNode()
+            child.merge(child_value, depth + 1)
+
+    def _note_value(self, value):
+        if self.enum_overflow:
+            return
+        if isinstance(value, str) and len(value) > MAX_ENUM_LENGTH:
+            self.enum_overflow = True
+            self.values = {}
+            return
+        self.values[value] = self.values.get(value, 0) + 1
+        if len(self.values) > MAX_ENUM:
+            self.enum_overflow = True
+            self.values = {}
+
+    def merge_binary(self):
+        self.count += 1
+        self.types["string"] = self.types.get("string", 0) + 1
+        self.binary = True
+
+    def to_schema(self):
+        types = [t for t in self.types if t != "null"]
+        schema = {}
+        if not types:
+            return {"nullable": True}
+        if len(types) == 1:
+            type_name = types[0]
+        elif set(types) == {"integer", "number"}:
+            type_name = "number"
+        else:
+            # OpenAPI 3.0 has no type unions; oneOf keeps each observed shape.
+            return {"oneOf": [self._typed_schema(t) for t in sorted(types)], **self._nullable()}
+        schema.update(self._typed_schema(type_name))
+        schema.update(self._nullable())
+        return schema
+
+    def _nullable(self):
+        return {"nullable": True} if "null" in self.types else {}
+
+    def _typed_schema(self, type_name):
+        schema = {"type": type_name}
+        if type_name == "object":
+            props = self.properties or {}
+            schema["properties"] = {name: child.to_schema() for name, child in props.items()}
+            # Required: present in every object seen at this position.
+            required = [name for name, child in props.items() if child.count >= self.object_count]
+            if required:
+                schema["required"] = required
+        elif type_name == "array":
+            schema["items"] = self.items.to_schema() if self.items is not None and self.items.count else {}
+        elif type_name == "string":
+            if self.binary:
+                schema["format"] = "binary"
+            elif len(self.formats) == 1 and None not in self.formats:
+                schema["format"] = next(iter(self.formats))
+            enum = self._enum(str)
+            if enum:
+                schema["enum"] = enum
+        elif type_name in ("integer", "number"):
+            if self.minimum is not None:
+                schema["minimum"] = self.minimum
+                schema["maximum"] = self.maximum
+            enum = self._enum((int, float))
+            if enum and type_name == "integer":
+                schema["enum"] = enum
+        return schema
+
+    def _enum(self, kinds):
+        if self.enum_overflow or not self.values:
+            return None
+        values = [v for v in self.values if isinstance(v, kinds) and not isinstance(v, bool)]
+        if len(values) < 2:
+            return None
+        if any(self.values[v] < ENUM_MIN_SAMPLES_PER_VALUE for v in values):
+            return None
+        return sorted(values)
+
+
+def _media_type(content_type):
+    return (content_type or "application/octet-stream").split(";", 1)[0].strip().lower()
+
+
+def _header_param(header_value, name):
+    for part in header_value.split(";")[1:]:
+        key, _, value = part.strip().partition("=")
+        if key.lower() == name:
+            return value.strip().strip('"')
+    return None
+
+
+def parse_multipart(body, content_type):
+    """Yield (field name, filename or None, content type, data bytes) for each part."""
+    boundary = _header_param(content_type, "boundary")
+    if not boundary:
+        return
+    delimiter = b"--" + boundary.encode("latin-1")
+    for part in body.split(delimiter)[1:]:
+        if part.startswith(b"--"):
+            break  # closing delimiter
+        part = part[2:] if part.startswith(b"\r\n") else part.lstrip(b"\n")
+        head, sep, data = part.partition(b"\r\n\r\n")
+        if not sep:
+            head, sep, data = part.partition(b"\n\n")
+        if data.endswith(b"\r\n"):
+            data = data[:-2]
+        elif data.endswith(b"\n"):
+            data = data[:-1]
+        name = filename = None
+        part_type = "text/plain"
+        for line in head.decode("utf-8", errors="replace").splitlines():
+            key, _, value = line.partition(":")
+            key = key.strip().lower()
+            if key == "content-disposition":
+                name = _header_param(value, "name")
+                filename = _header_param(value, "filename")
+            elif key == "content-type":
+                part_type = _media_type(value)
+        if name is not None:
+            yield name, filename, part_type, data
+
+
+class BodySchemas:
+    """Schema per media type for one kind of body (an endpoint's requests, or one response code)."""
+
+    __slots__ = ("by_type", "count")
+
+    def __init__(self):
+        self.by_type = {}
+        self.count = 0
+
+    def add(self, content_type, body):
+        """Merge one body. body is bytes; empty bodies are not counted."""
+        if not body:
+            return
+        self.count += 1
+        media_type = _media_type(content_type)
+        node = self.by_type.get(media_type)
+        if node is None:
+            node = self.by_type[media_type] = SchemaNode()
+        json_body = media_type == "application/json" or media_type.endswith("+json")
+        if len(body) > MAX_INFER_BODY and (
+                json_body or media_type in ("application/x-www-form-urlencoded", "multipart/form-data")):
+            # Unknown rather than binary; smaller samples of the type still describe it.
+            return
+        if json_body:
+            try:
+                node.merge(json.loads(body))
+            except ValueError:
+                node.merge_binary()
+        elif media_type == "application/x-www-form-urlencoded":
+            text = body.decode("utf-8", errors="replace")
+            node.merge({k: typed_scalar(v) for k, v in parse_qsl(text, keep_blank_values=True)})
+        elif media_type == "multipart/form-data":
+            self._merge_multipart(node, body, content_type)
+        elif media_type.startswith("text/"):
+            node.merge("")  # text body; content not modelled
+        else:
+            node.merge_binary()
+
+    @staticmethod
+    def _merge_multipart(node, body, content_type):
+        fields = {}
+        files = []
+        for name, filename, part_type, data in parse_multipart(body, content_type):
+            if filename is not None:
+                files.append(name)
+            else:
+                fields[name] = typed_scalar(data.decode("utf-8", errors="replace"))
+        node.merge(fields)
+        for name in files:
+            child = node.properties.get(name)
+            if child is None and len(node.properties) < MAX_PROPERTIES:
+                child = node.properties[name] = SchemaNode()
+            if child is not None:
+                child.merge_binary()
+
+    def to_content(self):
+        content = {}
+        for media_type, node in self.by_type.items():
+            if not node.count:
+                description = f"Not inferred: every captured body was over {MAX_INFER_BODY // 1024} KB"
+                content[media_type] = {"schema": {"description": description}}
+            elif media_type.startswith("text/") and not node.properties:
+                content[media_type] = {"schema": {"type": "string"}}
+            else:
+                content[media_type] = {"schema": node.to_schema()}
+        return content
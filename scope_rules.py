@@ -0,0 +1,149 @@
+# scope_rules.py
+#
+# Capture scope evaluated inside the proxy addons, before a flow is
+# serialized: host allow/deny lists, content-type filters and a maximum
+# body size. Out-of-scope responses are streamed through by mitmproxy
+# without being buffered, so they cost only the proxying itself.
+#
+# The subprocess backend picks up new rules from SCOPE_PATH, which the
+# addon re-reads when its mtime changes; the in-process backend is handed
+# the ScopeRules object directly.
+
+import fnmatch
+import json
+import os
+import re
+import time
+
+SCOPE_PATH = "/tmp/anvesha_scope.json"  # Adjust if needed for your OS
+RELOAD_INTERVAL = 1.0
+
+
+def _compile_patterns(patterns):
+    """Compile glob patterns ("*.example.com", "image/*") into one regex, or None."""
+    patterns = [p.strip().lower() for p in patterns if p and p.strip()]
+    if not patterns:
+        return None
+    # A trailing slash means "this whole media type", e.g. "image/".
+    patterns = [p + "*" if p.endswith("/") else p for p in patterns]
+    return re.compile("|".join(f"(?:{fnmatch.translate(p)})" for p in patterns))
+
+
+def _split_list(value):
+    if isinstance(value, str):
+        value = value.replace("\n", ",").split(",")
+    return [v.strip() for v in (value or []) if v and v.strip()]
+
+
+class ScopeRules:
+    def __init__(self, allow_hosts=None, deny_hosts=None, allow_content_types=None,
+                 deny_content_types=None, max_body_size=0):
+        self.allow_hosts = _split_list(allow_hosts)
+        self.deny_hosts = _split_list(deny_hosts)
+        self.allow_content_types = _split_list(allow_content_types)
+        self.deny_content_types = _split_list(deny_content_types)
+        self.max_body_size = int(max_body_size or 0)
+        self._allow_hosts_re = _compile_patterns(self.allow_hosts)
+        self._deny_hosts_re = _compile_patterns(self.deny_hosts)
+        self._allow_types_re = _compile_patterns(self.allow_content_types)
+        self._deny_types_re = _compile_patterns(self.deny_content_types)
+        self._host_cache = {}
+
+    @property
+    def is_empty(self):
+        return not (self.allow_hosts or self.deny_hosts or self.allow_content_types
+                    or self.deny_content_types or self.max_body_size)
+
+    def host_in_scope(self, host):
+        host = (host or "").lower()
+        result = self._host_cache.get(host)
+        if result is None:
+            result = True
+            if self._allow_hosts_re is not None and not self._allow_hosts_re.match(host):
+                result = False
+            elif self._deny_hosts_re is not None and self._deny_hosts_re.match(host):
+                result = False
+            if len(self._host_cache) > 10000:
+                self._host_cache.clear()
+            self._host_cache[host] = result
+        return result
+
+    def content_type_in_scope(self, content_type):
+        media_type = (content_type or "").split(";", 1)[0].strip().lower()
+        if self._allow_types_re is not None and not self._allow_types_re.match(media_type):
+            return False
+        if self._deny_types_re is not None and self._deny_types_re.match(media_type):
+            return False
+        return True
+
+    def truncate(self, body):
+        """Return (body, original_size); original_size is None if nothing was cut."""
+        if self.max_body_size and body is not None and len(body) > self.max_body_size:
+            return body[:self.max_body_size], len(body)
+        return body, None
+
+    def to_dict(self):
+        return {
+            "allow_hosts": self.allow_hosts,
+            "deny_hosts": self.deny_hosts,
+            "allow_content_types": self.allow_content_types,
+            "deny_content_types": self.deny_content_types,
+            "max_body_size": self.max_body_size,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(
+            data.get("allow_hosts"),
+            data.get("deny_hosts"),
+            data.get("allow_content_types"),
+            data.get("deny_content_types"),
+            data.get("max_body_size", 0),
+        )
+
+
+def save_rules(rules, path=SCOPE_PATH):
+    # Write-then-rename so a worker never reads a half-written file.
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(rules.to_dict(), f)
+    os.replace(tmp_path, path)
+
+
+class RulesFile:
+    """Rules loaded from a JSON file, reloaded when the file changes.
+
+    current() costs one os.stat() at most every RELOAD_INTERVAL seconds,
+    so it can be called for every flow.
+    """
+
+    def __init__(self, path=SCOPE_PATH):
+        self.path = path
+        self.rules = ScopeRules()
+        self._mtime = None
+        self._checked_at = 0.0
+
+    def current(self):
+        now = time.monotonic()
+        if now - self._checked_at >= RELOAD_INTERVAL:
+            self._checked_at = now
+            self._reload()
+        return self.rules
+
+    def _reload(self):
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except OSError:
+            mtime = None
+        if mtime == self._mtime:
+            return
+        self._mtime = mtime
+        if mtime is None:
+            self.rules = ScopeRules()
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                self.rules = ScopeRules.from_dict(json.load(f))
+            print(f"Loaded capture scope rules from {self.path}", flush=True)
+        except (OSError, ValueError) as e:
+            print(f"Ignoring invalid scope rules in {self.path}: {e}", flush=True)
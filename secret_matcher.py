@@ -0,0 +1,236 @@
+# secret_matcher.py
+#
+# Finds secrets and personal data in captured traffic with many rules
+# (secret_rules.py) in roughly one pass per body.
+#
+# All rule keywords are compiled into one automaton that runs over the
+# lowercased body once. This is Aho-Corasick when the optional
+# `pyahocorasick` package is installed. Otherwise it is a single regex
+# whose alternation is factored into a trie, so the engine branches on
+# each byte instead of trying every keyword in turn. Only rules whose
+# keywords occur in the body then run their confirming regex. Most bodies
+# contain no keyword at all and cost one automaton pass.
+#
+# scan_flow() is used by the passive scanner's "secrets" check at ingest.
+# Historical captures are scanned in parallel batches through
+# PassiveScanner.scan_history().
+
+import json
+import os
+import re
+
+from secret_rules import BUILTIN_RULES
+
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
+
+USER_RULES_FILE = os.path.join(os.path.expanduser("~"), ".anvesha", "secret_rules.json")
+MAX_MATCHES_PER_RULE = 5
+PREVIEW_CHARS = 4
+
+
+def luhn_valid(digits):
+    digits = [int(c) for c in digits if c.isdigit()]
+    if not 13 <= len(digits) <= 19:
+        return False
+    total = 0
+    for i, d in enumerate(reversed(digits)):
+        if i % 2:
+            d *= 2
+            if d > 9:
+                d -= 9
+        total += d
+    return total % 10 == 0
+
+
+CARD_PREFIXES = re.compile(r"^(?:4|5[1-5]|2[2-7]|3[47]|6011|65)")
+
+
+def card_valid(text):
+    digits = "".join(c for c in text if c.isdigit())
+    return bool(CARD_PREFIXES.match(digits)) and luhn_valid(digits)
+
+
+def iban_valid(text):
+    value = text.replace(" ", "").upper()
+    if not 15 <= len(value) <= 34:
+        return False
+    rearranged = value[4:] + value[:4]
+    try:
+        return int("".join(str(int(c, 36)) for c in rearranged)) % 97 == 1
+    except ValueError:
+        return False
+
+
+VALIDATORS = {"luhn": luhn_valid, "card": card_valid, "iban": iban_valid}
+
+
+class SecretRule:
+    __slots__ = ("name", "severity", "keywords", "regex", "validator")
+
+    def __init__(self, name, severity, keywords, pattern, validator=None):
+        self.name = name
+        self.severity = severity
+        self.keywords = tuple(k.lower().encode() if isinstance(k, str) else k.lower() for k in keywords)
+        self.regex = re.compile(pattern.encode() if isinstance(pattern, str) else pattern)
+        self.validator = VALIDATORS[validator] if validator else None
+
+
+class SecretMatch:
+    __slots__ = ("rule", "severity", "start", "end", "preview")
+
+    def __init__(self, rule, severity, start, end, preview):
+        self.rule = rule
+        self.severity = severity
+        self.start = start
+        self.end = end
+        self.preview = preview
+
+    def __repr__(self):
+        return f"SecretMatch({self.rule!r}, {self.start}-{self.end}, {self.preview!r})"
+
+
+def load_user_rules(path=USER_RULES_FILE):
+    if not os.path.exists(path):
+        return []
+    try:
+        with open(path, "r") as f:
+            entries = json.load(f)
+        return [
+            (e["name"], e.get("severity", "Medium"), tuple(e.get("keywords") or ()), e["pattern"])
+            for e in entries
+        ]
+    except (OSError, ValueError, KeyError, TypeError) as e:
+        print(f"[SecretMatcher] ignoring {path}: {e}")
+        return []
+
+
+def _trie_pattern(words):
+    """One regex matching any of words, with shared prefixes factored out."""
+    trie = {}
+    for word in words:
+        node = trie
+        for byte in word:
+            node = node.setdefault(byte, {})
+        node[None] = True
+
+    def build(node):
+        branches = [re.escape(bytes([b])) + build(child) for b, child in sorted(
+            (k, v) for k, v in node.items() if k is not None)]
+        if not branches:
+            return b""
+        body = branches[0] if len(branches) == 1 else b"(?:" + b"|".join(branches) + b")"
+        return b"(?:" + body + b")?" if None in node else body
+
+    return build(trie)
+
+
+def _mask(value):
+    text = value.decode("utf-8", errors="replace")
+    if len(text) <= PREVIEW_CHARS * 2:
+        return text[:PREVIEW_CHARS] + "..."
+    return f"{text[:PREVIEW_CHARS]}...{text[-2:]} ({len(text)} chars)"
+
+
+class SecretMatcher:
+    def __init__(self, rules=None):
+        if rules is None:
+            rules = list(BUILTIN_RULES) + load_user_rules()
+        self.rules = []
+        for entry in rules:
+            try:
+                self.rules.append(SecretRule(*entry))
+            except (re.error, KeyError, TypeError) as e:
+                print(f"[SecretMatcher] skipping rule {entry[0]!r}: {e}")
+        # keyword -> indexes of the rules it enables
+        self.keyword_rules = {}
+        self.always_rules = []
+        for index, rule in enumerate(self.rules):
+            if not rule.keywords:
+                self.always_rules.append(index)
+            for keyword in rule.keywords:
+                self.keyword_rules.setdefault(keyword, []).append(index)
+        self.automaton = None
+        self.keyword_regex = None
+        self.keyword_closure = {}
+        if ahocorasick is not None:
+            self.automaton = ahocorasick.Automaton()
+            for keyword, indexes in self.keyword_rules.items():
+                self.automaton.add_word(keyword.decode("latin-1"), indexes)
+            self.automaton.make_automaton()
+        elif self.keyword_rules:
+            # A lookahead reports the longest keyword starting at every
+            # position, so keywords that overlap ("sk" in "postgresk") are all
+            # seen. A keyword hidden inside the one found at a position ("sk"
+            # in "sk_live_") enables its rules through the closure.
+            self.keyword_regex = re.compile(b"(?=(" + _trie_pattern(self.keyword_rules) + b"))")
+            for keyword in self.keyword_rules:
+                self.keyword_closure[keyword] = sorted({
+                    index for other, indexes in self.keyword_rules.items() if other in keyword
+                    for index in indexes
+                })
+        self.engine = "aho-corasick" if self.automaton is not None else "trie-regex"
+
+    def candidate_rules(self, data):
+        """Indexes of rules worth confirming on data (bytes)."""
+        candidates = set(self.always_rules)
+        lowered = data.lower()
+        if self.automaton is not None:
+            for _, indexes in self.automaton.iter(lowered.decode("latin-1")):
+                candidates.update(indexes)
+        elif self.keyword_regex is not None:
+            closure = self.keyword_closure
+            seen = set()
+            for match in self.keyword_regex.finditer(lowered):
+                keyword = match.group(1)
+                if keyword not in seen:
+                    seen.add(keyword)
+                    candidates.update(closure[keyword])
+        return candidates
+
+    def scan(self, data):
+        """Return SecretMatch objects for data (bytes), in rule order."""
+        if not data:
+            return []
+        matches = []
+        for index in sorted(self.candidate_rules(data)):
+            rule = self.rules[index]
+            found = 0
+            for m in rule.regex.finditer(data):
+                value = m.group(m.lastindex or 0)
+                if rule.validator is not None and not rule.validator(value.decode("latin-1")):
+                    continue
+                matches.append(SecretMatch(rule.name, rule.severity, m.start(), m.end(), _mask(value)))
+                found += 1
+                if found >= MAX_MATCHES_PER_RULE:
+                    break
+        return matches
+
+    def scan_flow(self, request, response):
+        """Return (part, SecretMatch) pairs; part is "request" or "response".
+
+        The request URL and body are scanned, not its headers, where
+        credentials are expected. The response is scanned with headers.
+        """
+        results = []
+        request_data = request.url.encode("utf-8", errors="replace") + b"\n" + request.body
+        for match in self.scan(request_data):
+            results.append(("request", match))
+        if response is not None:
+            head = "\n".join(f"{k}: {v}" for k, v in response.headers).encode("utf-8", errors="replace")
+            for match in self.scan(head + b"\n\n" + response.body):
+                results.append(("response", match))
+        return results
+
+
+_default_matcher = None
+
+
+def default_matcher():
+    """The process-wide matcher with built-in and user rules, built on first use."""
+    global _default_matcher
+    if _default_matcher is None:
+        _default_matcher = SecretMatcher()
+    return _default_matcher
@@ -0,0 +1,115 @@
+# secret_rules.py
+#
+# Built-in rules for the secret matcher (secret_matcher.py). Each rule is
+# (name, severity, keywords, pattern) or (name, severity, keywords, pattern,
+# validator name). Keywords are lowercase literals, at least one of which
+# occurs in every match; the matcher only runs a rule's regex on data that
+# contains one of its keywords. A rule with no keywords runs on every body,
+# so those are kept few and cheap. Patterns are matched against bytes.
+#
+# More rules can be added without code changes in
+# ~/.anvesha/secret_rules.json: a list of {"name", "severity", "keywords",
+# "pattern"} objects.
+
+BUILTIN_RULES = (
+    # Cloud providers
+    ("AWS access key ID", "High", ("akia", "asia", "abia", "acca"), rb"\b(?:AKIA|ASIA|ABIA|ACCA)[0-9A-Z]{16}\b"),
+    ("AWS secret access key", "High", ("aws_secret", "secretaccesskey", "secret_access_key"),
+     rb"(?i)(?:aws_secret_access_key|secretaccesskey|secret_access_key)[\"']?\s*[:=]\s*[\"']?([A-Za-z0-9/+=]{40})"),
+    ("AWS session token", "Medium", ("aws_session_token", "sessiontoken"),
+     rb"(?i)(?:aws_session_token|sessiontoken)[\"']?\s*[:=]\s*[\"']?([A-Za-z0-9/+=]{100,})"),
+    ("Google API key", "High", ("aiza",), rb"\bAIza[0-9A-Za-z_\-]{35}\b"),
+    ("Google OAuth access token", "High", ("ya29.",), rb"\bya29\.[0-9A-Za-z_\-]{20,}"),
+    ("Google OAuth client secret", "High", ("gocspx-",), rb"\bGOCSPX-[0-9A-Za-z_\-]{28}\b"),
+    ("GCP service account key", "High", ("service_account",),
+     rb"\"type\"\s*:\s*\"service_account\"[^}]{0,200}\"private_key_id\""),
+    ("Azure storage account key", "High", ("accountkey=",), rb"(?i)AccountKey=[A-Za-z0-9+/]{86}=="),
+    ("Azure SAS token", "Medium", ("sig=",), rb"[?&]sv=\d{4}-\d{2}-\d{2}&[^\s\"']*?sig=[A-Za-z0-9%/+=]{20,}"),
+    ("Azure AD client secret", "High", ("client_secret",),
+     rb"(?i)client_secret[\"']?\s*[:=]\s*[\"']?([A-Za-z0-9_~.\-]{34,40})"),
+    ("DigitalOcean token", "High", ("dop_v1_", "doo_v1_", "dor_v1_"), rb"\bdo[por]_v1_[a-f0-9]{64}\b"),
+    ("Heroku API key", "High", ("heroku",),
+     rb"(?i)heroku[a-z_\-]{0,20}[\"']?\s*[:=]\s*[\"']?[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}"),
+    ("Alibaba access key ID", "High", ("ltai",), rb"\bLTAI[A-Za-z0-9]{12,20}\b"),
+    ("IBM Cloud API key", "High", ("ibm",), rb"(?i)ibm[a-z_\-]{0,20}api[_\-]?key[\"']?\s*[:=]\s*[\"']?[A-Za-z0-9_\-]{44}"),
+    # Source control and CI
+    ("GitHub token", "High", ("ghp_", "gho_", "ghu_", "ghs_", "ghr_"), rb"\bgh[pousr]_[A-Za-z0-9]{36,}\b"),
+    ("GitHub fine-grained token", "High", ("github_pat_",), rb"\bgithub_pat_[A-Za-z0-9_]{80,}\b"),
+    ("GitLab token", "High", ("glpat-", "gldt-", "glrt-"), rb"\bgl(?:pat|dt|rt)-[A-Za-z0-9_\-]{20,}\b"),
+    ("Bitbucket app password", "Medium", ("atbb",), rb"\bATBB[A-Za-z0-9_\-=.]{32,}\b"),
+    ("npm token", "High", ("npm_",), rb"\bnpm_[A-Za-z0-9]{36}\b"),
+    ("PyPI token", "High", ("pypi-",), rb"\bpypi-AgEIcHlwaS5vcmc[A-Za-z0-9_\-]{50,}"),
+    ("RubyGems API key", "High", ("rubygems_",), rb"\brubygems_[a-f0-9]{48}\b"),
+    ("Docker Hub token", "High", ("dckr_pat_",), rb"\bdckr_pat_[A-Za-z0-9_\-]{27,}\b"),
+    ("CircleCI token", "Medium", ("circle",), rb"(?i)circle[a-z_\-]{0,10}token[\"']?\s*[:=]\s*[\"']?[a-f0-9]{40}"),
+    ("Travis CI token", "Medium", ("travis",), rb"(?i)travis[a-z_\-]{0,10}token[\"']?\s*[:=]\s*[\"']?[A-Za-z0-9]{22}"),
+    # Messaging and SaaS
+    ("Slack token", "High", ("xoxa-", "xoxb-", "xoxp-", "xoxr-", "xoxs-"), rb"\bxox[abprs]-[A-Za-z0-9-]{10,}\b"),
+    ("Slack webhook", "Medium", ("hooks.slack.com",),
+     rb"https://hooks\.slack\.com/services/T[A-Z0-9]+/B[A-Z0-9]+/[A-Za-z0-9]{20,}"),
+    ("Discord bot token", "High", ("discord",),
+     rb"(?i)discord[a-z_\-]{0,20}[\"']?\s*[:=]\s*[\"']?[MNO][A-Za-z\d_\-]{23,25}\.[A-Za-z\d_\-]{6}\.[A-Za-z\d_\-]{27,}"),
+    ("Discord webhook", "Medium", ("discord.com/api/webhooks", "discordapp.com/api/webhooks"),
+     rb"https://(?:ptb\.|canary\.)?discord(?:app)?\.com/api/webhooks/\d+/[A-Za-z0-9_\-]{60,}"),
+    ("Telegram bot token", "High", ("bot",), rb"\bbot\d{8,10}:AA[A-Za-z0-9_\-]{33}\b"),
+    ("Twilio API key", "High", ("sk",), rb"\bSK[0-9a-fA-F]{32}\b"),
+    ("Twilio account SID", "Low", ("ac",), rb"\bAC[0-9a-f]{32}\b"),
+    ("SendGrid API key", "High", ("sg.",), rb"\bSG\.[A-Za-z0-9_\-]{22}\.[A-Za-z0-9_\-]{43}\b"),
+    ("Mailgun API key", "High", ("key-",), rb"\bkey-[0-9a-z]{32}\b"),
+    ("Mailchimp API key", "High", ("-us",), rb"\b[0-9a-f]{32}-us\d{1,2}\b"),
+    ("Postmark server token", "Medium", ("postmark",),
+     rb"(?i)postmark[a-z_\-]{0,20}[\"']?\s*[:=]\s*[\"']?[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}"),
+    ("Shopify access token", "High", ("shpat_", "shpca_", "shppa_", "shpss_"), rb"\bshp(?:at|ca|pa|ss)_[a-fA-F0-9]{32}\b"),
+    ("Atlassian API token", "High", ("atatt",), rb"\bATATT[A-Za-z0-9_\-=]{180,}\b"),
+    ("Notion integration token", "High", ("secret_", "ntn_"), rb"\b(?:secret_[A-Za-z0-9]{43}|ntn_[A-Za-z0-9]{46})\b"),
+    ("Linear API key", "High", ("lin_api_",), rb"\blin_api_[A-Za-z0-9]{40}\b"),
+    ("Asana token", "Medium", ("asana",), rb"(?i)asana[a-z_\-]{0,20}[\"']?\s*[:=]\s*[\"']?\d/\d{16}:[a-f0-9]{32}"),
+    ("Dropbox access token", "High", ("sl.",), rb"\bsl\.[A-Za-z0-9_\-]{130,}"),
+    ("Figma token", "High", ("figd_",), rb"\bfigd_[A-Za-z0-9_\-]{40,}\b"),
+    ("HubSpot private app token", "High", ("pat-na1-", "pat-eu1-"),
+     rb"\bpat-(?:na|eu)1-[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}\b"),
+    ("Sentry auth token", "Medium", ("sntrys_", "sntryu_"), rb"\bsntry[su]_[A-Za-z0-9+/=_]{60,}"),
+    ("Datadog API key", "Medium", ("datadog", "dd_api_key"),
+     rb"(?i)(?:datadog|dd)[a-z_\-]{0,10}api[_\-]?key[\"']?\s*[:=]\s*[\"']?[a-f0-9]{32}"),
+    ("New Relic key", "Medium", ("nrak-", "nrjs-"), rb"\bNR(?:AK|JS)-[A-Z0-9]{27}\b"),
+    # Payments
+    ("Stripe secret key", "High", ("sk_live_", "rk_live_"), rb"\b[sr]k_live_[0-9A-Za-z]{20,}\b"),
+    ("Stripe test secret key", "Low", ("sk_test_",), rb"\bsk_test_[0-9A-Za-z]{20,}\b"),
+    ("Stripe webhook secret", "High", ("whsec_",), rb"\bwhsec_[A-Za-z0-9]{32,}\b"),
+    ("PayPal Braintree token", "High", ("access_token$production$",), rb"access_token\$production\$[0-9a-z]{16}\$[0-9a-f]{32}"),
+    ("Square access token", "High", ("sq0atp-", "eaaa"), rb"\b(?:sq0atp-[0-9A-Za-z_\-]{22}|EAAA[A-Za-z0-9_\-]{60})\b"),
+    ("Square OAuth secret", "High", ("sq0csp-",), rb"\bsq0csp-[0-9A-Za-z_\-]{43}\b"),
+    ("Adyen API key", "High", ("aq",), rb"\bAQE[A-Za-z0-9_\-+/=]{80,}"),
+    # AI providers
+    ("OpenAI API key", "High", ("sk-",), rb"\bsk-(?:proj-|svcacct-|admin-)?[A-Za-z0-9_\-]{20,}T3BlbkFJ[A-Za-z0-9_\-]{20,}"),
+    ("Anthropic API key", "High", ("sk-ant-",), rb"\bsk-ant-(?:api|admin)\d{2}-[A-Za-z0-9_\-]{80,}"),
+    ("Perplexity API key", "High", ("pplx-",), rb"\bpplx-[A-Za-z0-9]{40,}\b"),
+    ("Hugging Face token", "High", ("hf_",), rb"\bhf_[A-Za-z]{34}\b"),
+    ("Groq API key", "High", ("gsk_",), rb"\bgsk_[A-Za-z0-9]{52}\b"),
+    # Keys, tokens and credentials
+    ("Private key", "High", ("private key-----",),
+     rb"-----BEGIN (?:RSA |EC |DSA |OPENSSH |ENCRYPTED |PGP )?PRIVATE KEY(?: BLOCK)?-----"),
+    ("PKCS#12 / keystore password", "Medium", ("keystore",),
+     rb"(?i)keystore[_\-]?pass(?:word)?[\"']?\s*[:=]\s*[\"']?[^\s\"']{6,}"),
+    ("JSON Web Token", "Medium", ("eyj",), rb"\beyJ[A-Za-z0-9_\-]{10,}\.eyJ[A-Za-z0-9_\-]{10,}\.[A-Za-z0-9_\-]{10,}"),
+    ("Basic auth credentials in URL", "High", ("://",), rb"://[^\s:/@\"'<>]{1,64}:[^\s:/@\"'<>]{3,64}@[A-Za-z0-9.\-]+"),
+    ("Database connection string", "High", ("mongodb", "postgres", "mysql://", "redis://", "amqp://"),
+     rb"\b(?:mongodb(?:\+srv)?|postgres(?:ql)?|mysql|redis|amqps?)://[^\s:/@\"']+:[^\s@\"']+@[^\s\"'/]+"),
+    ("Password assignment", "Medium", ("password", "passwd", "pwd"),
+     rb"(?i)[\"']?(?:password|passwd|pwd)[\"']?\s*[:=]\s*[\"']([^\"'\s]{6,})[\"']"),
+    ("Generic API key assignment", "Low", ("api_key", "apikey", "api-key", "secret_key", "client_secret", "access_key"),
+     rb"(?i)[\"']?(?:api[_\-]?key|secret[_\-]?key|client[_\-]?secret|access[_\-]?key)[\"']?\s*[:=]\s*[\"']([A-Za-z0-9_\-+/=.]{16,})[\"']"),
+    ("Bearer token in body", "Low", ("bearer ",), rb"(?i)\bbearer\s+[A-Za-z0-9_\-.=+/]{20,}"),
+    # Personal data
+    # Starts at the "@" so the regex engine can jump between them; the
+    # preview shows the domain only.
+    ("Email address", "Info", ("@",), rb"(?<=[A-Za-z0-9._%+\-])@[A-Za-z0-9\-]+(?:\.[A-Za-z0-9\-]+)*\.[A-Za-z]{2,24}\b"),
+    # Card numbers have no keyword, so this runs on every body; the issuer
+    # prefix and Luhn checksum are left to the validator to keep it cheap.
+    ("Credit card number", "High", (), rb"\b[2-6]\d{3}[ \-]?\d{4}[ \-]?\d{4}[ \-]?\d{1,4}\b", "card"),
+    ("US social security number", "Medium", ("ssn", "social"),
+     rb"\b(?!000|666|9\d\d)\d{3}-(?!00)\d{2}-(?!0000)\d{4}\b"),
+    ("IBAN", "Medium", ("iban",), rb"\b[A-Z]{2}\d{2}(?: ?[A-Z0-9]{4}){3,7}(?: ?[A-Z0-9]{1,3})?\b", "iban"),
+    ("Internal IP address", "Info", ("10.", "192.168.", "172."),
+     rb"\b(?:10\.\d{1,3}|192\.168|172\.(?:1[6-9]|2\d|3[01]))\.\d{1,3}\.\d{1,3}\b"),
+)
@@ -0,0 +1,391 @@
+# sequencer.py
+#
+# Token randomness analysis for session IDs, CSRF tokens and the like.
+# TokenExtractor pulls one token out of each response (a cookie, a header,
+# a JSON key or a regex over the body); analyze() runs the statistics over
+# the sample:
+#
+#   - per-position character entropy and a chi-square test against a
+#     uniform distribution over the observed alphabet
+#   - per-bit entropy and chi-square, with each character mapped to its
+#     index in the alphabet (so hex gives 4 bits, base64 6)
+#   - serial correlation of every bit between consecutive tokens, and
+#     correlation between bits of different character positions
+#   - the FIPS 140-2 monobit, poker, runs and long-run tests over the
+#     concatenated bit stream, in 20,000-bit blocks
+#
+# Tokens are turned into one string of "0"/"1" characters with a single
+# str.translate call. With NumPy installed that string becomes a bit matrix
+# and every test is a handful of array operations. Without it, the same
+# counts come from C-level string and integer operations (str.count,
+# slicing, big-integer AND plus popcount). Either way 100k tokens take
+# seconds.
+#
+# Only tokens of the most common length are analysed, so bit positions
+# line up; the report says how many were left out.
+
+import math
+import re
+import time
+from collections import Counter
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+SIGNIFICANCE = 0.01
+FIPS_BLOCK = 20000
+# FIPS 140-2 acceptance intervals for one 20,000-bit block.
+FIPS_MONOBIT = (9725, 10275)
+FIPS_POKER = (2.16, 46.17)
+FIPS_RUNS = {1: (2315, 2685), 2: (1114, 1386), 3: (527, 723), 4: (240, 384), 5: (103, 209), 6: (103, 209)}
+FIPS_LONG_RUN = 26
+# Rows per chunk when NumPy builds the bit matrix, bounding its memory.
+NUMPY_CHUNK = 16384
+EXTRACT_LOCATIONS = (("Cookie", "cookie"), ("Header", "header"), ("JSON key", "json"), ("Body regex", "regex"))
+
+
+class TokenExtractor:
+    """Finds one token in a response: cookie or header by name, JSON key
+    (anywhere in the body), or a regex over the body (group 1 if present)."""
+
+    __slots__ = ("location", "name", "pattern")
+
+    def __init__(self, location, name):
+        self.location = location
+        self.name = name.strip()
+        self.pattern = None
+        if location == "json":
+            self.pattern = re.compile(rb'"' + re.escape(self.name.encode("utf-8")) + rb'"\s*:\s*"([^"]*)"')
+        elif location == "regex":
+            self.pattern = re.compile(self.name.encode("utf-8"))
+
+    def extract(self, response):
+        if response is None or not self.name:
+            return None
+        if self.location == "cookie":
+            prefix = self.name + "="
+            for value in response.headers.get_all("Set-Cookie"):
+                if value.startswith(prefix):
+                    return value[len(prefix):].split(";", 1)[0].strip() or None
+            return None
+        if self.location == "header":
+            return response.headers.get(self.name)
+        match = self.pattern.search(response.body)
+        if match is None:
+            return None
+        token = match.group(1) if match.re.groups else match.group(0)
+        return token.decode("utf-8", errors="replace") or None
+
+
+# --- statistics helpers ----------------------------------------------------
+
+def chi2_sf(x, dof):
+    """P(X >= x) for a chi-square distribution (regularized upper gamma)."""
+    if x <= 0:
+        return 1.0
+    a, x = dof / 2.0, x / 2.0
+    log_front = -x + a * math.log(x) - math.lgamma(a)
+    if x < a + 1:
+        term = total = 1.0 / a
+        n = a
+        for _ in range(1000):
+            n += 1
+            term *= x / n
+            total += term
+            if term < total * 1e-14:
+                break
+        return max(0.0, 1.0 - total * math.exp(log_front))
+    # Continued fraction (modified Lentz).
+    tiny = 1e-300
+    b = x + 1 - a
+    c = 1 / tiny
+    d = 1 / b
+    h = d
+    for i in range(1, 1000):
+        an = -i * (i - a)
+        b += 2
+        d = an * d + b
+        d = tiny if abs(d) < tiny else d
+        c = b + an / c
+        c = tiny if abs(c) < tiny else c
+        d = 1 / d
+        delta = d * c
+        h *= delta
+        if abs(delta - 1) < 1e-14:
+            break
+    return min(1.0, math.exp(log_front) * h)
+
+
+def normal_sf2(z):
+    """Two-sided p-value of a standard normal score."""
+    return math.erfc(abs(z) / math.sqrt(2))
+
+
+def entropy_bits(counts, total):
+    return max(0.0, -sum(c / total * math.log2(c / total) for c in counts if c))
+
+
+def binary_entropy(p):
+    if p <= 0 or p >= 1:
+        return 0.0
+    return -(p * math.log2(p) + (1 - p) * math.log2(1 - p))
+
+
+def correlation(n11, p1, p2, n):
+    # Pearson correlation of two 0/1 variables from the count of (1, 1) pairs.
+    spread = p1 * (1 - p1) * p2 * (1 - p2)
+    if spread <= 0 or n <= 0:
+        return 0.0
+    return (n11 / n - p1 * p2) / math.sqrt(spread)
+
+
+def _popcount(value):
+    return value.bit_count() if hasattr(value, "bit_count") else bin(value).count("1")
+
+
+# --- bit counts: NumPy and pure-Python backends -----------------------------
+#
+# Both return (ones, serial, pairs, fips): ones[k] and serial[k] (count of
+# consecutive tokens both having bit k set) per bit column, pairs as
+# {(i, j): count of tokens with both bits set} for the requested column
+# pairs, and the FIPS results per block.
+
+def _numpy_counts(stream, n, width, pair_list):
+    raw = numpy.frombuffer(stream.encode("ascii"), dtype=numpy.uint8) - 48
+    bits = raw.reshape(n, width)
+    ones = bits.sum(axis=0, dtype=numpy.int64)
+    serial = (bits[1:] & bits[:-1]).sum(axis=0, dtype=numpy.int64)
+    both = numpy.zeros((width, width), dtype=numpy.int64)
+    for start in range(0, n, NUMPY_CHUNK):
+        # float32 matmul is exact for counts below 2**24, so chunk the rows.
+        chunk = bits[start:start + NUMPY_CHUNK].astype(numpy.float32)
+        both += (chunk.T @ chunk).astype(numpy.int64)
+    pairs = {(i, j): int(both[i, j]) for i, j in pair_list}
+    return [int(v) for v in ones], [int(v) for v in serial], pairs, _numpy_fips(raw)
+
+
+def _numpy_fips(raw):
+    blocks = len(raw) // FIPS_BLOCK
+    if not blocks:
+        return []
+    stream = raw[:blocks * FIPS_BLOCK]
+    grid = stream.reshape(blocks, FIPS_BLOCK)
+    monobit = grid.sum(axis=1)
+    nibbles = grid.reshape(blocks, FIPS_BLOCK // 4, 4) @ numpy.array([8, 4, 2, 1], dtype=numpy.uint8)
+    offsets = numpy.arange(blocks)[:, None] * 16
+    poker_counts = numpy.bincount((nibbles + offsets).ravel(), minlength=blocks * 16).reshape(blocks, 16)
+    poker = 16.0 / 5000 * (poker_counts.astype(numpy.float64) ** 2).sum(axis=1) - 5000
+    # A run starts where the bit changes or a block starts.
+    starts_mask = numpy.ones(len(stream), dtype=bool)
+    starts_mask[1:] = stream[1:] != stream[:-1]
+    starts_mask[::FIPS_BLOCK] = True
+    starts = numpy.flatnonzero(starts_mask)
+    block_of = starts // FIPS_BLOCK
+    ends = numpy.append(starts[1:], len(stream))
+    ends = numpy.minimum(ends, (block_of + 1) * FIPS_BLOCK)
+    lengths = ends - starts
+    values = stream[starts].astype(numpy.int64)
+    capped = numpy.minimum(lengths, 6)
+    run_counts = numpy.bincount((block_of * 2 + values) * 7 + capped, minlength=blocks * 14).reshape(blocks, 2, 7)
+    longest = numpy.zeros(blocks, dtype=numpy.int64)
+    numpy.maximum.at(longest, block_of, lengths)
+    results = []
+    for k in range(blocks):
+        runs = {value: {length: int(run_counts[k, value, length]) for length in FIPS_RUNS} for value in (0, 1)}
+        results.append(_fips_verdict(int(monobit[k]), float(poker[k]), runs, int(longest[k])))
+    return results
+
+
+def _python_counts(stream, n, width, pair_list):
+    columns = [stream[k::width] for k in range(width)]
+    ones = [column.count("1") for column in columns]
+    # Column k as an integer, token 0 in the highest bit.
+    ints = [int(column, 2) if column else 0 for column in columns]
+    serial = [_popcount(v & (v >> 1)) for v in ints]
+    pairs = {(i, j): _popcount(ints[i] & ints[j]) for i, j in pair_list}
+    return ones, serial, pairs, _python_fips(stream)
+
+
+_HIGH_NIBBLE = bytes(b >> 4 for b in range(256))
+_LOW_NIBBLE = bytes(b & 15 for b in range(256))
+
+
+def _python_fips(stream):
+    results = []
+    for start in range(0, len(stream) - FIPS_BLOCK + 1, FIPS_BLOCK):
+        block = stream[start:start + FIPS_BLOCK]
+        packed = int(block, 2).to_bytes(FIPS_BLOCK // 8, "big")
+        poker_counts = Counter(packed.translate(_HIGH_NIBBLE)) + Counter(packed.translate(_LOW_NIBBLE))
+        poker = 16.0 / 5000 * sum(c * c for c in poker_counts.values()) - 5000
+        runs, longest = {}, 0
+        for value, other in ((1, "0"), (0, "1")):
+            lengths = Counter(map(len, block.split(other)))
+            lengths.pop(0, None)
+            runs[value] = {length: lengths.get(length, 0) for length in range(1, 6)}
+            runs[value][6] = sum(c for length, c in lengths.items() if length >= 6)
+            if lengths:
+                longest = max(longest, max(lengths))
+        results.append(_fips_verdict(block.count("1"), poker, runs, longest))
+    return results
+
+
+def _fips_verdict(ones, poker, runs, longest):
+    runs_ok = all(low <= runs[value][length] <= high
+                  for value in (0, 1) for length, (low, high) in FIPS_RUNS.items())
+    return {
+        "monobit": FIPS_MONOBIT[0] < ones < FIPS_MONOBIT[1],
+        "poker": FIPS_POKER[0] < poker < FIPS_POKER[1],
+        "runs": runs_ok,
+        "long_run": longest < FIPS_LONG_RUN,
+    }
+
+
+# --- analysis ----------------------------------------------------------------
+
+def analyze(tokens, significance=SIGNIFICANCE, use_numpy=True):
+    """Run every test over a list of token strings; returns a report dict."""
+    started = time.perf_counter()
+    tokens = [t for t in tokens if t]
+    if not tokens:
+        raise ValueError("no tokens to analyse")
+    lengths = Counter(map(len, tokens))
+    length = lengths.most_common(1)[0][0]
+    sample = [t for t in tokens if len(t) == length]
+    n = len(sample)
+    if n < 2:
+        raise ValueError("need at least two tokens of the same length")
+    joined = "".join(sample)
+    alphabet = "".join(sorted(set(joined)))
+    size = len(alphabet)
+    bits_per_char = max(1, math.ceil(math.log2(size))) if size > 1 else 1
+    table = {ord(c): format(i, f"0{bits_per_char}b") for i, c in enumerate(alphabet)}
+    stream = joined.translate(table)
+    width = length * bits_per_char
+    notes = []
+
+    # Character level: one chi-square per position over the whole alphabet.
+    positions = []
+    expected = n / size
+    if expected < 5:
+        notes.append(f"Fewer than {5 * size} tokens: per-position chi-square results are unreliable.")
+    for pos in range(length):
+        counts = Counter(joined[pos::length])
+        chi = sum((counts.get(c, 0) - expected) ** 2 / expected for c in alphabet) if size > 1 else 0.0
+        p = chi2_sf(chi, size - 1) if size > 1 else 0.0
+        positions.append({
+            "position": pos, "distinct": len(counts), "entropy": entropy_bits(counts.values(), n),
+            "chi2": chi, "p": p, "passed": p >= significance,
+        })
+
+    # Bit level: expected share of ones for each bit of a character index,
+    # if characters were uniform over the alphabet.
+    expected_ones = [sum((i >> (bits_per_char - 1 - q)) & 1 for i in range(size)) / size
+                     for q in range(bits_per_char)]
+    pair_list = [(i, j) for i in range(width) for j in range(i + 1, width)
+                 if i // bits_per_char != j // bits_per_char]
+    backend = "numpy" if numpy is not None and use_numpy else "python"
+    counter = _numpy_counts if backend == "numpy" else _python_counts
+    ones, serial, pairs, fips = counter(stream, n, width, pair_list)
+
+    bits = []
+    for k in range(width):
+        e = expected_ones[k % bits_per_char]
+        p_obs = ones[k] / n
+        if 0 < e < 1:
+            chi = (ones[k] - n * e) ** 2 / (n * e) + (n - ones[k] - n * (1 - e)) ** 2 / (n * (1 - e))
+            p = chi2_sf(chi, 1)
+        else:
+            p = 0.0
+        r = correlation(serial[k], p_obs, p_obs, n - 1)
+        bits.append({
+            "bit": k, "position": k // bits_per_char, "ones": p_obs, "expected": e,
+            "entropy": binary_entropy(p_obs), "p": p, "passed": p >= significance,
+            "serial_r": r, "serial_p": normal_sf2(r * math.sqrt(n - 1)),
+        })
+
+    correlated = []
+    for (i, j), both in pairs.items():
+        r = correlation(both, ones[i] / n, ones[j] / n, n)
+        if normal_sf2(r * math.sqrt(n)) < significance:
+            correlated.append((abs(r), i, j, r))
+    correlated.sort(reverse=True)
+
+    duplicates = n - len(set(sample))
+    if duplicates:
+        notes.append(f"{duplicates} duplicate tokens in the sample.")
+    if not fips:
+        notes.append(f"FIPS tests need at least {FIPS_BLOCK} bits ({math.ceil(FIPS_BLOCK / width)} tokens).")
+    if size & (size - 1):
+        notes.append(f"The alphabet has {size} characters, not a power of two: bit-level results compare "
+                     "against the ones ratio a uniform character would give.")
+
+    char_entropy = sum(p["entropy"] for p in positions if p["passed"])
+    bit_entropy = sum(b["entropy"] for b in bits if b["passed"] and b["serial_p"] >= significance)
+    return {
+        "tokens": len(tokens), "analysed": n, "length": length, "other_lengths": len(tokens) - n,
+        "distinct": n - duplicates, "alphabet": alphabet, "bits_per_char": bits_per_char,
+        "significance": significance, "positions": positions, "bits": bits,
+        "char_entropy_bits": char_entropy, "bit_entropy_bits": bit_entropy,
+        "effective_entropy_bits": min(char_entropy, bit_entropy),
+        "serial_failed": sum(1 for b in bits if b["serial_p"] < significance),
+        "correlated_pairs": len(correlated), "pairs_tested": len(pair_list), "worst_pairs": correlated[:5],
+        "fips": fips, "notes": notes, "backend": backend, "seconds": time.perf_counter() - started,
+    }
+
+
+def rating(bits):
+    # About 1% of bits fail each test by chance, so a true 128-bit token
+    # scores a little under 128.
+    if bits >= 100:
+        return "excellent"
+    if bits >= 64:
+        return "reasonable"
+    if bits >= 32:
+        return "poor"
+    return "extremely poor"
+
+
+def format_report(report):
+    r = report
+    sig = r["significance"]
+    lines = [
+        f"Tokens: {r['tokens']:,} collected, {r['analysed']:,} of length {r['length']} analysed"
+        + (f" ({r['other_lengths']:,} of other lengths skipped)" if r["other_lengths"] else ""),
+        f"Distinct: {r['distinct']:,}   Alphabet: {len(r['alphabet'])} characters, "
+        f"{r['bits_per_char']} bits each   Significance level: {sig:.0%}",
+        "",
+        f"Effective entropy: {r['effective_entropy_bits']:.1f} bits ({rating(r['effective_entropy_bits'])})",
+        f"  Character level: {r['char_entropy_bits']:.1f} bits from "
+        f"{sum(p['passed'] for p in r['positions'])} of {r['length']} positions passing chi-square",
+        f"  Bit level: {r['bit_entropy_bits']:.1f} bits from "
+        f"{sum(b['passed'] for b in r['bits'])} of {len(r['bits'])} bits passing chi-square",
+        f"Serial correlation: {r['serial_failed']} of {len(r['bits'])} bits correlated with the previous token",
+        f"Bit correlation: {r['correlated_pairs']:,} of {r['pairs_tested']:,} pairs across positions significant "
+        f"(about {r['pairs_tested'] * sig:,.0f} expected by chance)",
+    ]
+    for _, i, j, corr in r["worst_pairs"]:
+        lines.append(f"  bit {i} (position {i // r['bits_per_char']}) ~ bit {j} "
+                     f"(position {j // r['bits_per_char']}): r={corr:+.3f}")
+    fips = r["fips"]
+    if fips:
+        lines.append(f"FIPS 140-2 over {len(fips)} blocks of {FIPS_BLOCK} bits (blocks passed):")
+        for test in ("monobit", "poker", "runs", "long_run"):
+            lines.append(f"  {test:<9} {sum(b[test] for b in fips)}/{len(fips)}")
+    lines.append("")
+    lines.append("Position  Distinct  Entropy   Chi-square        p  Result")
+    for p in r["positions"]:
+        lines.append(f"{p['position']:>8}  {p['distinct']:>8}  {p['entropy']:>7.3f}  {p['chi2']:>11.1f}  "
+                     f"{p['p']:>7.4f}  {'pass' if p['passed'] else 'FAIL'}")
+    lines.append("")
+    lines.append("Bit  Position  Ones  Expected       p  Serial r  Result")
+    for b in r["bits"]:
+        ok = b["passed"] and b["serial_p"] >= sig
+        lines.append(f"{b['bit']:>3}  {b['position']:>8}  {b['ones']:.3f}  {b['expected']:>8.3f}  {b['p']:>6.4f}  "
+                     f"{b['serial_r']:>+8.4f}  {'pass' if ok else 'FAIL'}")
+    if r["notes"]:
+        lines.append("")
+        lines.extend(f"Note: {note}" for note in r["notes"])
+    lines.append(f"Analysed in {r['seconds']:.2f} s ({r['backend']})")
+    return "\n".join(lines)
@@ -0,0 +1,188 @@
+# sequencer_widget.py
+#
+# Sequencer tab: collects one token (session cookie, CSRF token, ...) from
+# many responses and runs the randomness tests in sequencer.py on them.
+# Tokens come live from captured flows, from flows already in the logger,
+# from a Bulk Sender run, or from a text file with one token per line.
+# The analysis runs on a background thread.
+
+import re
+import threading
+
+from PyQt5.QtWidgets import (
+    QWidget, QVBoxLayout, QHBoxLayout, QLabel, QLineEdit, QPushButton, QCheckBox, QComboBox, QTextEdit,
+    QFileDialog, QMessageBox
+)
+from PyQt5.QtCore import pyqtSignal
+from PyQt5.QtGui import QFontDatabase
+
+from sequencer import EXTRACT_LOCATIONS, TokenExtractor, analyze, format_report
+
+MIN_TOKENS = 100
+
+
+class SequencerWidget(QWidget):
+    analysis_done_signal = pyqtSignal(object, str)
+
+    def __init__(self, get_captured_flows):
+        super().__init__()
+        self.get_captured_flows = get_captured_flows
+        self.tokens = []
+        self.extractor = None
+        self.analysing = False
+        self.analysis_done_signal.connect(self.on_analysis_done)
+        layout = QVBoxLayout(self)
+
+        source_layout = QHBoxLayout()
+        source_layout.addWidget(QLabel("Token in:"))
+        self.location_combo = QComboBox()
+        for label, location in EXTRACT_LOCATIONS:
+            self.location_combo.addItem(label, location)
+        self.location_combo.currentIndexChanged.connect(self.on_extractor_changed)
+        source_layout.addWidget(self.location_combo)
+        self.name_input = QLineEdit()
+        self.name_input.setPlaceholderText("cookie, header or JSON key name, or a regex (group 1 is the token)")
+        self.name_input.textChanged.connect(self.on_extractor_changed)
+        source_layout.addWidget(self.name_input, 2)
+        source_layout.addWidget(QLabel("URL contains:"))
+        self.url_filter_input = QLineEdit()
+        self.url_filter_input.setPlaceholderText("optional, e.g. /login")
+        source_layout.addWidget(self.url_filter_input, 1)
+        layout.addLayout(source_layout)
+
+        collect_layout = QHBoxLayout()
+        self.live_checkbox = QCheckBox("Capture live")
+        self.live_checkbox.setToolTip("Take the token from every new flow the proxy captures")
+        collect_layout.addWidget(self.live_checkbox)
+        extract_btn = QPushButton("Extract from Captured Flows")
+        extract_btn.clicked.connect(self.extract_from_captured)
+        collect_layout.addWidget(extract_btn)
+        load_btn = QPushButton("Load Tokens")
+        load_btn.clicked.connect(self.load_tokens)
+        collect_layout.addWidget(load_btn)
+        save_btn = QPushButton("Save Tokens")
+        save_btn.clicked.connect(self.save_tokens)
+        collect_layout.addWidget(save_btn)
+        clear_btn = QPushButton("Clear")
+        clear_btn.clicked.connect(self.clear_tokens)
+        collect_layout.addWidget(clear_btn)
+        self.count_label = QLabel("")
+        collect_layout.addWidget(self.count_label, 1)
+        self.analyse_btn = QPushButton("Analyse")
+        self.analyse_btn.clicked.connect(self.start_analysis)
+        collect_layout.addWidget(self.analyse_btn)
+        layout.addLayout(collect_layout)
+
+        self.report_view = QTextEdit()
+        self.report_view.setReadOnly(True)
+        self.report_view.setLineWrapMode(QTextEdit.NoWrap)
+        self.report_view.setFont(QFontDatabase.systemFont(QFontDatabase.FixedFont))
+        layout.addWidget(self.report_view)
+        self.update_count()
+
+    def on_extractor_changed(self, *args):
+        self.extractor = None
+
+    def current_extractor(self):
+        if self.extractor is None and self.name_input.text().strip():
+            try:
+                self.extractor = TokenExtractor(self.location_combo.currentData(), self.name_input.text())
+            except re.error as e:
+                self.count_label.setText(f"Invalid regex: {e}")
+        return self.extractor
+
+    def _take(self, flow):
+        url_filter = self.url_filter_input.text().strip()
+        if url_filter and url_filter not in flow.request.url:
+            return False
+        token = self.extractor.extract(flow.response)
+        if token:
+            self.tokens.append(token)
+            return True
+        return False
+
+    def offer(self, flow):
+        # Called for every captured flow while the tab exists.
+        if not self.live_checkbox.isChecked() or self.current_extractor() is None:
+            return
+        if self._take(flow):
+            self.update_count()
+
+    def extract_from_captured(self):
+        if self.current_extractor() is None:
+            QMessageBox.warning(self, "No Token Selected", "Enter the cookie, header, JSON key or regex first.")
+            return
+        found = sum(1 for flow in self.get_captured_flows() if self._take(flow))
+        self.update_count(f"{found} from captured flows")
+
+    def add_responses(self, responses):
+        """Tokens from a Bulk Sender run (HttpResponse objects)."""
+        if self.current_extractor() is None:
+            QMessageBox.warning(self, "No Token Selected", "Enter the cookie, header, JSON key or regex first.")
+            return
+        found = 0
+        for response in responses:
+            token = self.extractor.extract(response)
+            if token:
+                self.tokens.append(token)
+                found += 1
+        self.update_count(f"{found} of {len(responses)} Bulk Sender responses had the token")
+
+    def load_tokens(self):
+        filename, _ = QFileDialog.getOpenFileName(self, "Load Tokens", "", "Text Files (*.txt);;All Files (*)")
+        if not filename:
+            return
+        try:
+            with open(filename, encoding="utf-8") as f:
+                loaded = [line.strip() for line in f if line.strip()]
+        except (OSError, UnicodeDecodeError) as e:
+            QMessageBox.warning(self, "Load Failed", str(e))
+            return
+        self.tokens.extend(loaded)
+        self.update_count(f"{len(loaded)} loaded")
+
+    def save_tokens(self):
+        filename, _ = QFileDialog.getSaveFileName(self, "Save Tokens", "tokens.txt", "Text Files (*.txt)")
+        if not filename:
+            return
+        try:
+            with open(filename, "w", encoding="utf-8") as f:
+                f.write("\n".join(self.tokens) + "\n")
+        except OSError as e:
+            QMessageBox.warning(self, "Save Failed", str(e))
+
+    def clear_tokens(self):
+        self.tokens = []
+        self.update_count()
+
+    def update_count(self, detail=""):
+        text = f"{len(self.tokens):,} tokens"
+        self.count_label.setText(f"{text} ({detail})" if detail else text)
+
+    def start_analysis(self):
+        if self.analysing:
+            return
+        if len(self.tokens) < MIN_TOKENS:
+            QMessageBox.information(self, "Not Enough Tokens",
+                                    f"Collect at least {MIN_TOKENS} tokens; a few thousand give meaningful results.")
+            return
+        self.analysing = True
+        self.analyse_btn.setEnabled(False)
+        self.analyse_btn.setText("Analysing...")
+        tokens = list(self.tokens)
+        threading.Thread(target=self._analyse, args=(tokens,), daemon=True).start()
+
+    def _analyse(self, tokens):
+        try:
+            self.analysis_done_signal.emit(analyze(tokens), "")
+        except Exception as e:
+            self.analysis_done_signal.emit(None, str(e))
+
+    def on_analysis_done(self, report, error):
+        self.analysing = False
+        self.analyse_btn.setEnabled(True)
+        self.analyse_btn.setText("Analyse")
+        if report is None:
+            QMessageBox.warning(self, "Analysis Failed", error)
+            return
+        self.report_view.setPlainText(format_report(report))
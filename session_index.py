@@ -0,0 +1,353 @@
+# session_index.py
+#
+# Persistent full-text index over saved sessions: the JSON files written by
+# "Export All", kept in a sessions folder (~/.anvesha/sessions by default,
+# subfolders included). Every logger flow of every session gets a row in a
+# SQLite database with an FTS5 table over its URL, request and response
+# text, so a search across hundreds of sessions is one indexed query
+# instead of loading each file.
+#
+# sync() is incremental: files are compared with the index by size and
+# modification time, only new or changed sessions are read, and sessions
+# whose file is gone are dropped. A hit records the session file and the
+# byte span of the flow in it; open_flow() reads and parses just those
+# bytes, without touching the logger. Bodies are indexed up to
+# INDEXED_BODY_CHARS.
+#
+# Without FTS5 in the sqlite3 library the text goes in a plain table and
+# searches scan it, which is correct but much slower.
+
+import json
+import os
+import re
+import sqlite3
+import time
+
+from flow_model import Flow
+
+SESSIONS_DIR = os.path.join(os.path.expanduser("~"), ".anvesha", "sessions")
+INDEX_FILE = os.path.join(os.path.expanduser("~"), ".anvesha", "session_index.sqlite3")
+INDEXED_BODY_CHARS = 65536
+MAX_RESULTS = 500
+SNIPPET_TOKENS = 12
+# Columns a search term can be limited to, as "url:/login".
+SEARCH_COLUMNS = ("url", "request", "response")
+# PRAGMA user_version of the schema below; an index with another version is rebuilt.
+SCHEMA_VERSION = 2
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    id INTEGER PRIMARY KEY, path TEXT UNIQUE, size INTEGER, mtime REAL, flows INTEGER, error TEXT, indexed REAL
+);
+CREATE TABLE IF NOT EXISTS flows (
+    id INTEGER PRIMARY KEY, session INTEGER, position INTEGER, byte_offset INTEGER, byte_length INTEGER,
+    flow_id TEXT, timestamp TEXT, method TEXT, url TEXT, status INTEGER
+);
+CREATE INDEX IF NOT EXISTS flows_session ON flows (session);
+"""
+
+_decoder = json.JSONDecoder()
+_whitespace = re.compile(r"[ \t\n\r]*").match
+
+
+class SessionIndexError(Exception):
+    pass
+
+
+class SearchHit:
+    __slots__ = ("path", "position", "offset", "length", "flow_id", "timestamp", "method", "url", "status",
+                 "snippet")
+
+    def __init__(self, path, position, offset, length, flow_id, timestamp, method, url, status, snippet):
+        # Session file, the flow's index in its logger_requests and its bytes in the file.
+        self.path = path
+        self.position = position
+        self.offset = offset
+        self.length = length
+        self.flow_id = flow_id
+        self.timestamp = timestamp
+        self.method = method
+        self.url = url
+        self.status = status
+        self.snippet = snippet
+
+    @property
+    def session(self):
+        return os.path.splitext(os.path.basename(self.path))[0]
+
+
+def _message_text(first_line, data):
+    lines = [first_line]
+    lines.extend(f"{k}: {v}" for k, v in (data.get("headers") or {}).items())
+    body = data.get("body") or ""
+    if body:
+        lines.append("")
+        lines.append(body[:INDEXED_BODY_CHARS])
+    return "\n".join(lines)
+
+
+def flow_texts(item):
+    """(url, request text, response text) indexed for one exported flow dict."""
+    request = item.get("request") or {}
+    response = item.get("response") or {}
+    url = request.get("url", "")
+    request_text = _message_text(f"{request.get('method', '')} {url}", request)
+    response_text = ""
+    if response:
+        response_text = _message_text(f"{response.get('status', '')} {response.get('reason', '')}", response)
+    return url, request_text, response_text
+
+
+def session_items(raw):
+    """(offset, length, item) for each logger_requests entry of a session file's bytes.
+
+    The file is scanned as latin-1, one character per byte, so the spans
+    are byte offsets. Entries holding non-ASCII bytes are decoded again as
+    UTF-8. Raises ValueError for a file that is not valid JSON.
+    """
+    text = raw.decode("latin-1")
+    pos = _whitespace(text, 0).end()
+    if not text.startswith("{", pos):
+        # Valid JSON that is not a session holds no flows.
+        json.loads(raw)
+        return []
+    items = []
+    pos = _whitespace(text, pos + 1).end()
+    if not text.startswith("}", pos):
+        while True:
+            key, pos = _decoder.raw_decode(text, pos)
+            pos = _whitespace(text, pos).end()
+            if not isinstance(key, str) or not text.startswith(":", pos):
+                raise ValueError(f"Expecting a key and ':' at byte {pos}")
+            pos = _whitespace(text, pos + 1).end()
+            if key == "logger_requests" and text.startswith("[", pos):
+                items, pos = _array_items(text, raw, pos)
+            else:
+                _, pos = _decoder.raw_decode(text, pos)
+            pos = _whitespace(text, pos).end()
+            if not text.startswith(",", pos):
+                break
+            pos = _whitespace(text, pos + 1).end()
+    if not text.startswith("}", pos) or _whitespace(text, pos + 1).end() != len(text):
+        raise ValueError(f"Expecting ',' or '}}' at byte {pos}")
+    return items
+
+
+def _array_items(text, raw, pos):
+    items = []
+    pos = _whitespace(text, pos + 1).end()
+    if text.startswith("]", pos):
+        return items, pos + 1
+    while True:
+        start = pos
+        item, pos = _decoder.raw_decode(text, pos)
+        if not raw[start:pos].isascii():
+            item = json.loads(raw[start:pos])
+        items.append((start, pos - start, item))
+        pos = _whitespace(text, pos).end()
+        if text.startswith("]", pos):
+            return items, pos + 1
+        if not text.startswith(",", pos):
+            raise ValueError(f"Expecting ',' or ']' at byte {pos}")
+        pos = _whitespace(text, pos + 1).end()
+
+
+def fts_query(text):
+    """FTS5 query for what the user typed: every term must appear.
+
+    Terms are quoted, so punctuation in URLs and tokens is matched as a
+    phrase of the words around it; "term*" is a prefix, "url:term" limits
+    the term to one column.
+    """
+    terms = []
+    for term in text.split():
+        column = ""
+        name, sep, rest = term.partition(":")
+        if sep and name.lower() in SEARCH_COLUMNS and rest:
+            column, term = name.lower() + " : ", rest
+        prefix = term.endswith("*") and len(term) > 1
+        if prefix:
+            term = term[:-1]
+        terms.append(column + '"' + term.replace('"', '""') + '"' + ("*" if prefix else ""))
+    return " AND ".join(terms)
+
+
+def has_fts5(conn):
+    try:
+        conn.execute("CREATE VIRTUAL TABLE temp.fts5_probe USING fts5(x)")
+        conn.execute("DROP TABLE temp.fts5_probe")
+        return True
+    except sqlite3.OperationalError:
+        return False
+
+
+class SessionIndex:
+    """One connection to the index; use one instance per thread."""
+
+    def __init__(self, path=INDEX_FILE):
+        self.path = path
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        try:
+            self.conn = sqlite3.connect(path)
+            # Readers (searches) are not blocked while a sync writes.
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute("PRAGMA synchronous=NORMAL")
+            if self.conn.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+                # An index from another version is rebuilt from the session files.
+                self.conn.executescript("DROP TABLE IF EXISTS flow_text; DROP TABLE IF EXISTS flows; "
+                                        "DROP TABLE IF EXISTS sessions;")
+                self.conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+            self.conn.executescript(SCHEMA)
+            self.fts = has_fts5(self.conn)
+            if self.fts:
+                self.conn.execute("CREATE VIRTUAL TABLE IF NOT EXISTS flow_text USING fts5(url, request, response)")
+            else:
+                self.conn.execute("CREATE TABLE IF NOT EXISTS flow_text (url TEXT, request TEXT, response TEXT)")
+            self.conn.commit()
+        except sqlite3.Error as e:
+            raise SessionIndexError(f"Cannot open the session index {path}: {e}")
+
+    def close(self):
+        self.conn.close()
+
+    # --- indexing ------------------------------------------------------------
+
+    def sync(self, directory=SESSIONS_DIR, cancel_event=None, progress=None):
+        """Bring the index up to date with the .json files under directory.
+
+        progress(done, total) is called after each session read. Returns
+        counts of added, updated, removed and unreadable sessions and of
+        flows indexed. Database errors (a locked or damaged index) raise
+        SessionIndexError; sessions committed before them stay indexed.
+        """
+        try:
+            return self._sync(directory, cancel_event, progress)
+        except sqlite3.Error as e:
+            self.conn.rollback()
+            raise SessionIndexError(f"Cannot update the session index {self.path}: {e}")
+
+    def _sync(self, directory, cancel_event, progress):
+        files = {}
+        for root, _, names in os.walk(directory):
+            for name in names:
+                if name.lower().endswith(".json"):
+                    path = os.path.abspath(os.path.join(root, name))
+                    try:
+                        st = os.stat(path)
+                    except OSError:
+                        continue
+                    files[path] = (st.st_size, st.st_mtime)
+        prefix = os.path.join(os.path.abspath(directory), "")
+        known = {path: (session_id, size, mtime) for session_id, path, size, mtime in
+                 self.conn.execute("SELECT id, path, size, mtime FROM sessions")}
+        stats = {"added": 0, "updated": 0, "removed": 0, "unreadable": 0, "flows": 0, "sessions": len(files)}
+        # Sessions indexed from other folders stay searchable while their files exist.
+        for path in [p for p in known if p not in files and (p.startswith(prefix) or not os.path.exists(p))]:
+            self._remove(known.pop(path)[0])
+            stats["removed"] += 1
+        self.conn.commit()
+        changed = [path for path, stamp in sorted(files.items())
+                   if path not in known or known[path][1:] != stamp]
+        for done, path in enumerate(changed, 1):
+            if cancel_event is not None and cancel_event.is_set():
+                break
+            if path in known:
+                self._remove(known[path][0])
+                stats["updated"] += 1
+            else:
+                stats["added"] += 1
+            flows, error = self._add(path, *files[path])
+            stats["flows"] += flows
+            stats["unreadable"] += bool(error)
+            self.conn.commit()
+            if progress is not None:
+                progress(done, len(changed))
+        if stats["added"] or stats["updated"] or stats["removed"]:
+            # Fold the write-ahead log back into the database file and truncate it.
+            self.conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        return stats
+
+    def _remove(self, session_id):
+        conn = self.conn
+        conn.execute("DELETE FROM flow_text WHERE rowid IN (SELECT id FROM flows WHERE session = ?)", (session_id,))
+        conn.execute("DELETE FROM flows WHERE session = ?", (session_id,))
+        conn.execute("DELETE FROM sessions WHERE id = ?", (session_id,))
+
+    def _add(self, path, size, mtime):
+        error = ""
+        items = []
+        try:
+            with open(path, "rb") as f:
+                items = session_items(f.read())
+        except (OSError, ValueError) as e:
+            error = str(e)
+        items = [(position, offset, length, item) for position, (offset, length, item) in enumerate(items)
+                 if isinstance(item, dict) and item.get("request")]
+        conn = self.conn
+        cursor = conn.execute(
+            "INSERT INTO sessions (path, size, mtime, flows, error, indexed) VALUES (?, ?, ?, ?, ?, ?)",
+            (path, size, mtime, len(items), error, time.time()))
+        session_id = cursor.lastrowid
+        first = conn.execute("SELECT COALESCE(MAX(id), 0) + 1 FROM flows").fetchone()[0]
+        rows = []
+        texts = []
+        for row_id, (position, offset, length, item) in enumerate(items, first):
+            request = item["request"]
+            status = (item.get("response") or {}).get("status")
+            try:
+                status = int(status) if status not in (None, "") else None
+            except (TypeError, ValueError):
+                status = None
+            rows.append((row_id, session_id, position, offset, length, request.get("id", ""),
+                         request.get("timestamp", ""), request.get("method", ""), request.get("url", ""), status))
+            texts.append((row_id,) + flow_texts(item))
+        conn.executemany("INSERT INTO flows VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+        conn.executemany("INSERT INTO flow_text (rowid, url, request, response) VALUES (?, ?, ?, ?)", texts)
+        return len(items), error
+
+    # --- queries -------------------------------------------------------------
+
+    def search(self, text, limit=MAX_RESULTS):
+        """Hits for flows containing every term of text, newest sessions first."""
+        if not text.strip():
+            return []
+        if self.fts:
+            sql = (f"SELECT s.path, f.position, f.byte_offset, f.byte_length, f.flow_id, f.timestamp, f.method, "
+                   f"f.url, f.status, snippet(flow_text, -1, '[', ']', '…', {SNIPPET_TOKENS}) "
+                   f"FROM flow_text JOIN flows f ON f.id = flow_text.rowid JOIN sessions s ON s.id = f.session "
+                   f"WHERE flow_text MATCH ? ORDER BY flow_text.rowid DESC LIMIT ?")
+            args = (fts_query(text), limit)
+        else:
+            terms = [term.lower() for term in text.split()]
+            where = " AND ".join("instr(lower(t.url || ' ' || t.request || ' ' || t.response), ?) > 0"
+                                 for _ in terms)
+            sql = (f"SELECT s.path, f.position, f.byte_offset, f.byte_length, f.flow_id, f.timestamp, f.method, "
+                   f"f.url, f.status, '' "
+                   f"FROM flow_text t JOIN flows f ON f.id = t.rowid JOIN sessions s ON s.id = f.session "
+                   f"WHERE {where} ORDER BY t.rowid DESC LIMIT ?")
+            args = tuple(terms) + (limit,)
+        try:
+            return [SearchHit(*row) for row in self.conn.execute(sql, args)]
+        except sqlite3.OperationalError as e:
+            raise SessionIndexError(f"Bad search: {e}")
+
+    def stats(self):
+        sessions, flows, unreadable = self.conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(flows), 0), COALESCE(SUM(error != ''), 0) FROM sessions").fetchone()
+        size = sum(os.path.getsize(p) for p in (self.path, self.path + "-wal") if os.path.exists(p))
+        return {"sessions": sessions, "flows": flows, "unreadable": unreadable, "index_bytes": size}
+
+    def open_flow(self, hit):
+        """The Flow a hit refers to, parsed from its bytes in the session file."""
+        try:
+            with open(hit.path, "rb") as f:
+                f.seek(hit.offset)
+                item = json.loads(f.read(hit.length))
+        except OSError as e:
+            raise SessionIndexError(f"Cannot read flow {hit.position} of {hit.path}: {e}")
+        except ValueError:
+            item = None
+        if not isinstance(item, dict) or (item.get("request") or {}).get("id", "") != hit.flow_id:
+            raise SessionIndexError(f"{hit.path} has changed since it was indexed; update the index")
+        return Flow.from_dict(item)
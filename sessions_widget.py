@@ -0,0 +1,241 @@
+# sessions_widget.py
+#
+# Sessions tab: search every saved session (Export All files in the
+# sessions folder) through the persistent index in session_index.py. The
+# index is brought up to date on a background thread when the tab is first
+# shown and on "Update Index"; only new or changed files are read. A hit
+# opens its flow from the session file, which can then be added to the
+# current logger or sent to Replay without importing the whole session.
+
+import os
+import threading
+import time
+
+from PyQt5.QtWidgets import (
+    QWidget, QVBoxLayout, QHBoxLayout, QLabel, QLineEdit, QPushButton, QTableWidget, QTableWidgetItem,
+    QTextEdit, QHeaderView, QAbstractItemView, QSplitter, QFileDialog, QMessageBox
+)
+from PyQt5.QtCore import Qt, pyqtSignal
+
+from response_viewer import ResponseViewer
+from session_index import MAX_RESULTS, SESSIONS_DIR, SessionIndex, SessionIndexError
+
+RESULT_LABELS = ["Session", "Time", "Method", "URL", "Status", "Match"]
+(SESSION_COLUMN, TIME_COLUMN, METHOD_COLUMN, URL_COLUMN, STATUS_COLUMN, MATCH_COLUMN) = range(len(RESULT_LABELS))
+
+
+class SessionsWidget(QWidget):
+    sync_progress_signal = pyqtSignal(int, int)
+    sync_done_signal = pyqtSignal(object, str)
+
+    def __init__(self, open_in_logger, send_to_replay):
+        super().__init__()
+        self.open_in_logger = open_in_logger
+        self.send_to_replay = send_to_replay
+        # The UI thread's connection; syncs open their own.
+        self.index = None
+        self.hits = []
+        self.flow = None
+        self.syncing = False
+        self.synced_once = False
+        self.sync_progress_signal.connect(self.on_sync_progress)
+        self.sync_done_signal.connect(self.on_sync_done)
+        layout = QVBoxLayout(self)
+
+        folder_layout = QHBoxLayout()
+        folder_layout.addWidget(QLabel("Sessions folder:"))
+        self.folder_input = QLineEdit(SESSIONS_DIR)
+        self.folder_input.setToolTip("Session files saved with Export All (subfolders included)")
+        folder_layout.addWidget(self.folder_input, 1)
+        browse_btn = QPushButton("Browse")
+        browse_btn.clicked.connect(self.browse_folder)
+        folder_layout.addWidget(browse_btn)
+        self.sync_btn = QPushButton("Update Index")
+        self.sync_btn.clicked.connect(self.start_sync)
+        folder_layout.addWidget(self.sync_btn)
+        layout.addLayout(folder_layout)
+
+        search_layout = QHBoxLayout()
+        search_layout.addWidget(QLabel("Search:"))
+        self.search_input = QLineEdit()
+        self.search_input.setPlaceholderText('Words, URLs or tokens; every term must appear. "term*" for a prefix, '
+                                             '"url:", "request:" or "response:" to limit a term')
+        self.search_input.returnPressed.connect(self.search)
+        search_layout.addWidget(self.search_input, 1)
+        search_btn = QPushButton("Search")
+        search_btn.clicked.connect(self.search)
+        search_layout.addWidget(search_btn)
+        layout.addLayout(search_layout)
+
+        self.results_table = QTableWidget(0, len(RESULT_LABELS))
+        self.results_table.setHorizontalHeaderLabels(RESULT_LABELS)
+        header = self.results_table.horizontalHeader()
+        for col in range(len(RESULT_LABELS)):
+            header.setSectionResizeMode(col, QHeaderView.ResizeToContents)
+        header.setSectionResizeMode(URL_COLUMN, QHeaderView.Stretch)
+        header.setSectionResizeMode(MATCH_COLUMN, QHeaderView.Stretch)
+        self.results_table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.results_table.setSelectionMode(QAbstractItemView.SingleSelection)
+        self.results_table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.results_table.verticalHeader().setVisible(False)
+        self.results_table.setWordWrap(False)
+        self.results_table.currentCellChanged.connect(self.on_hit_changed)
+
+        self.request_view = QTextEdit()
+        self.request_view.setReadOnly(True)
+        self.response_viewer = ResponseViewer()
+        lower = QSplitter(Qt.Horizontal)
+        lower.addWidget(self.request_view)
+        lower.addWidget(self.response_viewer)
+        splitter = QSplitter(Qt.Vertical)
+        splitter.addWidget(self.results_table)
+        splitter.addWidget(lower)
+        splitter.setStretchFactor(0, 3)
+        splitter.setStretchFactor(1, 2)
+        layout.addWidget(splitter)
+
+        btn_layout = QHBoxLayout()
+        open_btn = QPushButton("Open in Logger")
+        open_btn.setToolTip("Add the selected flow to the current logger (nothing is cleared)")
+        open_btn.clicked.connect(self.open_selected_in_logger)
+        btn_layout.addWidget(open_btn)
+        replay_btn = QPushButton("Send to Replay")
+        replay_btn.clicked.connect(self.send_selected_to_replay)
+        btn_layout.addWidget(replay_btn)
+        layout.addLayout(btn_layout)
+
+        self.status_label = QLabel("")
+        layout.addWidget(self.status_label)
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        if not self.synced_once:
+            self.start_sync()
+
+    def _index(self):
+        if self.index is None:
+            self.index = SessionIndex()
+        return self.index
+
+    def browse_folder(self):
+        folder = QFileDialog.getExistingDirectory(self, "Sessions Folder", self.folder_input.text())
+        if folder:
+            self.folder_input.setText(folder)
+            self.start_sync()
+
+    def start_sync(self):
+        if self.syncing:
+            return
+        folder = self.folder_input.text().strip() or SESSIONS_DIR
+        self.synced_once = True
+        self.syncing = True
+        self.sync_btn.setEnabled(False)
+        self.status_label.setText(f"Checking {folder} for new or changed sessions...")
+        threading.Thread(target=self._sync, args=(folder,), daemon=True).start()
+
+    def _sync(self, folder):
+        # Background thread, with its own connection.
+        try:
+            os.makedirs(folder, exist_ok=True)
+            index = SessionIndex()
+            try:
+                start = time.perf_counter()
+                stats = index.sync(folder, progress=self.sync_progress_signal.emit)
+                stats["seconds"] = time.perf_counter() - start
+            finally:
+                index.close()
+            self.sync_done_signal.emit(stats, "")
+        except (OSError, SessionIndexError) as e:
+            self.sync_done_signal.emit(None, str(e))
+
+    def on_sync_progress(self, done, total):
+        self.status_label.setText(f"Indexing sessions: {done} of {total}")
+
+    def on_sync_done(self, stats, error):
+        self.syncing = False
+        self.sync_btn.setEnabled(True)
+        if error:
+            self.status_label.setText(f"Index update failed: {error}")
+            return
+        totals = self._index().stats()
+        changes = ", ".join(f"{stats[key]} {key}" for key in ("added", "updated", "removed", "unreadable")
+                            if stats[key])
+        self.status_label.setText(
+            f"{totals['sessions']} sessions, {totals['flows']:,} flows indexed "
+            f"({totals['index_bytes'] / 1048576:.1f} MB) | last update: {changes or 'no changes'}, "
+            f"{stats['seconds']:.1f} s"
+        )
+        if changes and self.search_input.text().strip():
+            self.search()
+
+    def search(self):
+        text = self.search_input.text().strip()
+        try:
+            start = time.perf_counter()
+            self.hits = self._index().search(text)
+            elapsed = time.perf_counter() - start
+        except SessionIndexError as e:
+            QMessageBox.warning(self, "Search Failed", str(e))
+            return
+        table = self.results_table
+        table.blockSignals(True)
+        table.setRowCount(len(self.hits))
+        for row, hit in enumerate(self.hits):
+            table.setItem(row, SESSION_COLUMN, QTableWidgetItem(hit.session))
+            table.setItem(row, TIME_COLUMN, QTableWidgetItem(hit.timestamp))
+            table.setItem(row, METHOD_COLUMN, QTableWidgetItem(hit.method))
+            table.setItem(row, URL_COLUMN, QTableWidgetItem(hit.url))
+            table.setItem(row, STATUS_COLUMN, QTableWidgetItem("" if hit.status is None else str(hit.status)))
+            table.setItem(row, MATCH_COLUMN, QTableWidgetItem(" ".join(hit.snippet.split())))
+        table.blockSignals(False)
+        self.show_flow(None)
+        sessions = len({hit.path for hit in self.hits})
+        more = f" (showing the newest {MAX_RESULTS})" if len(self.hits) >= MAX_RESULTS else ""
+        self.status_label.setText(f"{len(self.hits)} flows in {sessions} sessions{more}, "
+                                  f"{elapsed * 1000:.0f} ms")
+
+    def selected_hit(self):
+        row = self.results_table.currentRow()
+        return self.hits[row] if 0 <= row < len(self.hits) else None
+
+    def on_hit_changed(self, row, column, previous_row, previous_column):
+        if row == previous_row:
+            return
+        hit = self.selected_hit()
+        if hit is None:
+            self.show_flow(None)
+            return
+        try:
+            self.show_flow(self._index().open_flow(hit), hit)
+        except SessionIndexError as e:
+            self.show_flow(None)
+            self.request_view.setPlainText(str(e))
+
+    def show_flow(self, flow, hit=None):
+        self.flow = flow
+        if flow is None:
+            self.request_view.clear()
+            self.response_viewer.clear()
+            return
+        self.request_view.setPlainText(flow.request.text)
+        if flow.response is not None:
+            self.response_viewer.show_response(flow.response, key=("session", hit.path, hit.position))
+        else:
+            self.response_viewer.set_text("(no response)")
+
+    def open_selected_in_logger(self):
+        if self.flow is None:
+            QMessageBox.information(self, "No Selection", "Select a search result first.")
+            return
+        self.open_in_logger(self.flow)
+
+    def send_selected_to_replay(self):
+        if self.flow is None:
+            QMessageBox.information(self, "No Selection", "Select a search result first.")
+            return
+        self.send_to_replay(self.flow.request)
+
+    def close_index(self):
+        if self.index is not None:
+            self.index.close()
+            self.index = None
@@ -0,0 +1,58 @@
+# startup_timer.py
+#
+# Startup-time measurement: `python main.py --startup-timing` (or
+# ANVESHA_STARTUP_TIMING=1) prints how long each group of imports and each
+# component took to build, how many modules each pulled in, and when the
+# window was first shown. Tabs built later on first use are reported as
+# they happen. When disabled, measure() costs one perf_counter call.
+
+import contextlib
+import os
+import sys
+import time
+
+
+class StartupTimer:
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.started = time.perf_counter()
+        self.records = []
+        self.reported = False
+
+    @classmethod
+    def from_environment(cls, argv=None):
+        argv = sys.argv if argv is None else argv
+        return cls("--startup-timing" in argv or bool(os.environ.get("ANVESHA_STARTUP_TIMING")))
+
+    @contextlib.contextmanager
+    def measure(self, label):
+        if not self.enabled:
+            yield
+            return
+        modules = len(sys.modules)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self.records.append((label, elapsed, len(sys.modules) - modules))
+            if self.reported:
+                # Built after the window appeared, e.g. a tab opened for the first time.
+                print(f"[Startup] {label}: {elapsed * 1000:.1f} ms, {len(sys.modules) - modules} new modules")
+
+    def mark(self, label):
+        # A point in time since the timer was created, e.g. "window shown".
+        if self.enabled:
+            self.records.append((label, time.perf_counter() - self.started, None))
+
+    def report(self):
+        if not self.enabled or self.reported:
+            return
+        self.reported = True
+        print("[Startup] component                               ms   modules")
+        for label, seconds, modules in self.records:
+            if modules is None:
+                print(f"[Startup] {label:<36} at {seconds * 1000:7.1f}")
+            else:
+                print(f"[Startup] {label:<36} {seconds * 1000:10.1f} {modules:9d}")
+        print(f"[Startup] {len(sys.modules)} modules loaded; later tabs are reported when first opened")
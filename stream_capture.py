@@ -0,0 +1,371 @@
+# stream_capture.py
+#
+# WebSocket messages and streamed response bodies (server-sent events,
+# gRPC-web, NDJSON). The proxy addons turn mitmproxy's websocket hooks and
+# response stream callbacks into small events (dicts) that are forwarded
+# as they happen: over the IPC socket from mitmdump, or straight to the
+# sink in-process. Streamed bodies are passed through chunk by chunk, so
+# neither mitmproxy nor the addon holds the whole body.
+#
+# On the UI side StreamStore keeps one StreamConnection per WebSocket or
+# streamed response, each with a bounded MessageLog: when a connection
+# exceeds MAX_MESSAGES or MAX_LOG_BYTES its oldest messages are dropped
+# (and counted). Message payloads above body_codec's threshold are stored
+# compressed.
+#
+# The event builders only use the mitmproxy objects they are given, so the
+# addon can import this module without pulling in PyQt5 or mitmproxy.
+
+import base64
+import time
+
+from body_codec import pack, stored_size, unpack
+
+# Response content types recorded as streams instead of buffered bodies.
+STREAM_CONTENT_TYPES = (
+    ("text/event-stream", "sse"),
+    ("application/grpc-web", "grpc-web"),
+    ("application/grpc", "grpc"),
+    ("application/x-ndjson", "ndjson"),
+)
+# Per streamed response: chunks past this many bytes are counted, not recorded.
+STREAM_RECORD_LIMIT = 4 * 1024 * 1024
+MAX_MESSAGES = 5000
+MAX_LOG_BYTES = 16 * 1024 * 1024
+# Connections kept; the oldest closed ones are forgotten first.
+MAX_CONNECTIONS = 500
+PREVIEW_CHARS = 200
+
+EVENT_TYPES = ("websocket_start", "websocket_message", "websocket_end", "stream_start", "stream_chunk", "stream_end")
+
+
+def stream_kind(content_type):
+    """"sse", "grpc-web", ... for a streaming response content type, else None."""
+    content_type = (content_type or "").lower()
+    for prefix, kind in STREAM_CONTENT_TYPES:
+        if content_type.startswith(prefix):
+            return kind
+    return None
+
+
+# --- events (built in the proxy) ---------------------------------------------
+
+def _truncate(content, rules):
+    size = len(content)
+    if rules is not None:
+        content, _ = rules.truncate(content)
+    return content, size
+
+
+def websocket_start_event(flow, worker=0):
+    return {
+        "type": "websocket_start", "id": flow.id, "worker": worker, "kind": "websocket",
+        "url": flow.request.url, "timestamp": time.time(),
+    }
+
+
+def websocket_message_event(flow, rules=None):
+    """Event for the message just received; call from the websocket_message hook."""
+    messages = flow.websocket.messages
+    message = messages[-1]
+    content, size = _truncate(message.content, rules)
+    # mitmproxy keeps every message on the flow for the life of the
+    # connection; it has been forwarded here, so only the current one stays.
+    del messages[:-1]
+    return {
+        "type": "websocket_message", "id": flow.id, "timestamp": message.timestamp,
+        "from_client": message.from_client, "text": message.is_text, "content": content, "size": size,
+    }
+
+
+def websocket_end_event(flow):
+    websocket = flow.websocket
+    return {
+        "type": "websocket_end", "id": flow.id, "timestamp": websocket.timestamp_end or time.time(),
+        "close_code": websocket.close_code, "close_reason": websocket.close_reason or "",
+        "closed_by_client": websocket.closed_by_client,
+    }
+
+
+class StreamRecorder:
+    """mitmproxy response stream callback that forwards each chunk as an event.
+
+    Set as flow.response.stream in the responseheaders hook. mitmproxy calls
+    it with every chunk and once with b"" at the end of the body; chunks are
+    returned unchanged, so the client receives the stream as it arrives.
+    """
+
+    def __init__(self, flow, kind, emit, rules=None, worker=0):
+        self.flow_id = flow.id
+        self.text = kind in ("sse", "ndjson")
+        self.emit = emit
+        self.rules = rules
+        self.size = 0
+        self.recorded = 0
+        self.chunks = 0
+        self.ended = False
+        emit({
+            "type": "stream_start", "id": flow.id, "worker": worker, "kind": kind,
+            "url": flow.request.url, "timestamp": time.time(),
+        })
+
+    @property
+    def limit(self):
+        max_body = self.rules.max_body_size if self.rules is not None else 0
+        return max_body or STREAM_RECORD_LIMIT
+
+    def __call__(self, data):
+        if not data:
+            self.end()
+            return data
+        self.size += len(data)
+        self.chunks += 1
+        content = data[:max(0, self.limit - self.recorded)]
+        self.recorded += len(content)
+        self.emit({
+            "type": "stream_chunk", "id": self.flow_id, "timestamp": time.time(), "from_client": False,
+            "text": self.text, "content": content, "size": len(data),
+        })
+        return data
+
+    def end(self, error=""):
+        if self.ended:
+            return
+        self.ended = True
+        self.emit({
+            "type": "stream_end", "id": self.flow_id, "timestamp": time.time(), "size": self.size,
+            "chunks": self.chunks, "error": error,
+        })
+
+
+def event_to_ipc(event):
+    """JSON-safe copy of an event: content as UTF-8 text or base64 (as flow bodies)."""
+    content = event.get("content")
+    if content is None:
+        return event
+    data = dict(event)
+    del data["content"]
+    try:
+        data["content"] = content.decode("utf-8")
+    except UnicodeDecodeError:
+        data["content_b64"] = base64.b64encode(content).decode("ascii")
+    return data
+
+
+def event_from_ipc(data):
+    if data.get("content_b64") is not None:
+        data["content"] = base64.b64decode(data.pop("content_b64"))
+    elif isinstance(data.get("content"), str):
+        data["content"] = data["content"].encode("utf-8")
+    return data
+
+
+# --- storage (UI side) -------------------------------------------------------
+
+class StreamMessage:
+    __slots__ = ("seq", "timestamp", "from_client", "text", "_data", "size")
+
+    def __init__(self, seq, timestamp, from_client, text, data, size):
+        # Position in the connection, counting dropped messages.
+        self.seq = seq
+        self.timestamp = timestamp
+        self.from_client = from_client
+        # A WebSocket text frame, or a chunk of a text stream (SSE, NDJSON).
+        self.text = text
+        self._data = pack(data)
+        # Original size; the stored data may be truncated by the scope's body limit.
+        self.size = size
+
+    @property
+    def data(self):
+        return unpack(self._data)
+
+    @property
+    def stored_size(self):
+        return stored_size(self._data)
+
+    @property
+    def truncated(self):
+        return len(self._data) < self.size
+
+    @property
+    def direction(self):
+        return "client" if self.from_client else "server"
+
+    def preview(self, limit=PREVIEW_CHARS):
+        data = unpack(self._data, limit)
+        text = data.decode("utf-8", errors="replace") if self.text or data.isascii() else data.hex(" ")
+        return text.replace("\r", " ").replace("\n", " ")[:limit]
+
+    def matches(self, needle):
+        """needle is lower-cased UTF-8 bytes."""
+        return needle in unpack(self._data).lower()
+
+
+class MessageLog:
+    """Messages of one connection, oldest first, bounded by count and bytes.
+
+    When a bound is exceeded, about a tenth of the log is dropped from the
+    front at once, so appends stay amortized O(1).
+    """
+
+    __slots__ = ("items", "stored_bytes", "dropped", "max_messages", "max_bytes")
+
+    def __init__(self, max_messages=MAX_MESSAGES, max_bytes=MAX_LOG_BYTES):
+        self.items = []
+        self.stored_bytes = 0
+        self.dropped = 0
+        self.max_messages = max_messages
+        self.max_bytes = max_bytes
+
+    def append(self, message):
+        """Add a message; returns how many old messages were dropped to fit it."""
+        items = self.items
+        items.append(message)
+        self.stored_bytes += message.stored_size
+        if len(items) <= self.max_messages and self.stored_bytes <= self.max_bytes:
+            return 0
+        drop = min(max(len(items) - self.max_messages, len(items) // 10, 1), len(items) - 1)
+        freed = sum(m.stored_size for m in items[:drop])
+        # The newest message is always kept, even if it alone is over the byte budget.
+        while self.stored_bytes - freed > self.max_bytes and drop < len(items) - 1:
+            freed += items[drop].stored_size
+            drop += 1
+        self.stored_bytes -= freed
+        del items[:drop]
+        self.dropped += drop
+        return drop
+
+    def __len__(self):
+        return len(self.items)
+
+    def __getitem__(self, i):
+        return self.items[i]
+
+    def __iter__(self):
+        return iter(self.items)
+
+
+class StreamConnection:
+    __slots__ = ("id", "kind", "url", "worker", "started", "ended", "close_code", "close_reason",
+                 "closed_by_client", "error", "messages", "total_messages", "client_bytes", "server_bytes")
+
+    def __init__(self, conn_id, kind, url, started, worker=0):
+        self.id = conn_id
+        # "websocket", or the streamed body's kind: "sse", "grpc-web", ...
+        self.kind = kind
+        self.url = url
+        self.worker = worker
+        self.started = started
+        self.ended = None
+        self.close_code = None
+        self.close_reason = ""
+        self.closed_by_client = None
+        self.error = ""
+        self.messages = MessageLog()
+        self.total_messages = 0
+        self.client_bytes = 0
+        self.server_bytes = 0
+
+    @property
+    def is_open(self):
+        return self.ended is None
+
+    @property
+    def status_text(self):
+        if self.ended is None:
+            return "open"
+        if self.error:
+            return f"failed: {self.error}"
+        if self.kind != "websocket":
+            return "complete"
+        by = "client" if self.closed_by_client else "server"
+        code = f" {self.close_code}" if self.close_code is not None else ""
+        reason = f" {self.close_reason}" if self.close_reason else ""
+        return f"closed by {by}{code}{reason}"
+
+
+class StreamStore:
+    """Connections by id, in the order they started."""
+
+    def __init__(self, max_connections=MAX_CONNECTIONS):
+        self.connections = {}
+        self.max_connections = max_connections
+        self.events = 0
+
+    def apply(self, event):
+        """Apply one event; returns (connection, new message or None, messages dropped)."""
+        self.events += 1
+        kind = event.get("type")
+        conn = self.connections.get(event.get("id"))
+        if kind in ("websocket_start", "stream_start"):
+            if conn is None:
+                conn = self.connections[event["id"]] = StreamConnection(
+                    event["id"], event.get("kind", "stream"), event.get("url", ""),
+                    event.get("timestamp") or time.time(), event.get("worker", 0))
+                self._trim()
+            return conn, None, 0
+        if conn is None:
+            # Started before the UI was listening (or forgotten): open it now.
+            conn = self.connections[event.get("id")] = StreamConnection(
+                event.get("id"), "websocket" if kind.startswith("websocket") else "stream", "",
+                event.get("timestamp") or time.time())
+            self._trim()
+        if kind in ("websocket_message", "stream_chunk"):
+            size = event.get("size", 0)
+            message = StreamMessage(conn.total_messages, event.get("timestamp") or time.time(),
+                                    bool(event.get("from_client")), bool(event.get("text")),
+                                    event.get("content") or b"", size)
+            conn.total_messages += 1
+            if message.from_client:
+                conn.client_bytes += size
+            else:
+                conn.server_bytes += size
+            return conn, message, conn.messages.append(message)
+        if kind in ("websocket_end", "stream_end"):
+            conn.ended = event.get("timestamp") or time.time()
+            conn.close_code = event.get("close_code")
+            conn.close_reason = event.get("close_reason") or ""
+            conn.closed_by_client = event.get("closed_by_client")
+            conn.error = event.get("error") or ""
+        return conn, None, 0
+
+    def _trim(self):
+        if len(self.connections) <= self.max_connections:
+            return
+        closed = [c for c in self.connections.values() if not c.is_open]
+        victims = closed or list(self.connections.values())
+        for conn in victims[:len(self.connections) - self.max_connections]:
+            del self.connections[conn.id]
+
+    def search(self, text):
+        """{connection id: [message, ...]} for messages containing text (case-insensitive)."""
+        needle = text.lower().encode("utf-8")
+        results = {}
+        for conn in self.connections.values():
+            hits = [m for m in conn.messages if m.matches(needle)]
+            if hits:
+                results[conn.id] = hits
+        return results
+
+    def get(self, conn_id):
+        return self.connections.get(conn_id)
+
+    def clear(self):
+        self.connections = {}
+        self.events = 0
+
+    def stats(self):
+        return {
+            "connections": len(self.connections),
+            "open": sum(1 for c in self.connections.values() if c.is_open),
+            "messages": sum(len(c.messages) for c in self.connections.values()),
+            "dropped": sum(c.messages.dropped for c in self.connections.values()),
+            "stored_bytes": sum(c.messages.stored_bytes for c in self.connections.values()),
+        }
+
+    def __len__(self):
+        return len(self.connections)
+
+    def __iter__(self):
+        return iter(self.connections.values())
@@ -0,0 +1,303 @@
+# streams_widget.py
+#
+# Streams tab: WebSocket connections and streamed responses (SSE,
+# gRPC-web, NDJSON) from the StreamStore, and the messages of the selected
+# one. The message list is a model over the connection's bounded
+# MessageLog: a new message inserts one row and dropped messages remove
+# rows from the top, so a long conversation is never re-rendered. The
+# selected message opens in the response viewer (pretty JSON, hex for
+# binary frames).
+
+from datetime import datetime
+
+from PyQt5.QtWidgets import (
+    QWidget, QVBoxLayout, QHBoxLayout, QLabel, QLineEdit, QPushButton, QCheckBox, QTableWidget,
+    QTableWidgetItem, QTableView, QHeaderView, QAbstractItemView, QSplitter
+)
+from PyQt5.QtCore import Qt, QAbstractTableModel, QModelIndex, QTimer
+from PyQt5.QtGui import QColor
+
+from flow_model import HttpResponse
+from response_viewer import ResponseViewer
+
+SEARCH_DELAY_MS = 200
+CLIENT_COLOR = QColor(30, 60, 170)
+SERVER_COLOR = QColor(30, 120, 30)
+CONNECTION_LABELS = ["ID", "Kind", "URL", "Status", "Messages", "Sent", "Received", "Dropped", "Matches"]
+(ID_COLUMN, KIND_COLUMN, URL_COLUMN, STATUS_COLUMN, MESSAGES_COLUMN, SENT_COLUMN, RECEIVED_COLUMN,
+ DROPPED_COLUMN, MATCHES_COLUMN) = range(len(CONNECTION_LABELS))
+
+
+class MessageModel(QAbstractTableModel):
+    """Rows are the messages of one connection, or its search hits."""
+
+    LABELS = ("#", "Time", "Direction", "Size", "Data")
+
+    def __init__(self):
+        super().__init__()
+        self.connection = None
+        # Search hits (a list) or None for the whole log.
+        self.hits = None
+        # The log's drop count that row 0 corresponds to, and rows reported to views.
+        self.shown_dropped = 0
+        self.count = 0
+
+    def set_connection(self, connection, hits=None):
+        self.beginResetModel()
+        self.connection = connection
+        self.hits = hits
+        self.shown_dropped = connection.messages.dropped if connection is not None else 0
+        if hits is not None:
+            self.count = len(hits)
+        else:
+            self.count = len(connection.messages) if connection is not None else 0
+        self.endResetModel()
+
+    def message(self, row):
+        if not 0 <= row < self.count:
+            return None
+        if self.hits is not None:
+            return self.hits[row]
+        return self.connection.messages[row - (self.connection.messages.dropped - self.shown_dropped)]
+
+    def message_added(self, message, dropped, matched=True):
+        if self.hits is not None:
+            if matched:
+                self.beginInsertRows(QModelIndex(), self.count, self.count)
+                self.hits.append(message)
+                self.count += 1
+                self.endInsertRows()
+            return
+        if dropped:
+            self.beginRemoveRows(QModelIndex(), 0, min(dropped, self.count) - 1)
+            self.shown_dropped += dropped
+            self.count -= min(dropped, self.count)
+            self.endRemoveRows()
+        self.beginInsertRows(QModelIndex(), self.count, self.count)
+        self.count += 1
+        self.endInsertRows()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self.count
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.LABELS)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return self.LABELS[section]
+        return None
+
+    def data(self, index, role=Qt.DisplayRole):
+        message = self.message(index.row())
+        if message is None:
+            return None
+        col = index.column()
+        if role == Qt.DisplayRole:
+            if col == 0:
+                return message.seq + 1
+            if col == 1:
+                return datetime.fromtimestamp(message.timestamp).strftime("%H:%M:%S.%f")[:-3]
+            if col == 2:
+                return "client → server" if message.from_client else "server → client"
+            if col == 3:
+                return f"{message.size:,}" + (" (truncated)" if message.truncated else "")
+            return message.preview()
+        if role == Qt.ForegroundRole and col == 2:
+            return CLIENT_COLOR if message.from_client else SERVER_COLOR
+        return None
+
+
+class StreamsWidget(QWidget):
+    def __init__(self, store):
+        super().__init__()
+        self.store = store
+        # connection id -> table row
+        self.rows = {}
+        # Search text (lower-cased) and its results, {connection id: [message, ...]}
+        self.needle = ""
+        self.search_results = None
+        layout = QVBoxLayout(self)
+
+        top_layout = QHBoxLayout()
+        top_layout.addWidget(QLabel("Search:"))
+        self.search_input = QLineEdit()
+        self.search_input.setPlaceholderText("Search message contents in every connection")
+        self.search_input.textChanged.connect(lambda text: self.search_timer.start(SEARCH_DELAY_MS))
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.timeout.connect(self.apply_search)
+        top_layout.addWidget(self.search_input, 1)
+        self.follow_checkbox = QCheckBox("Follow new messages")
+        self.follow_checkbox.setChecked(True)
+        top_layout.addWidget(self.follow_checkbox)
+        clear_btn = QPushButton("Clear")
+        clear_btn.clicked.connect(self.clear_all)
+        top_layout.addWidget(clear_btn)
+        layout.addLayout(top_layout)
+
+        self.connection_table = QTableWidget(0, len(CONNECTION_LABELS))
+        self.connection_table.setHorizontalHeaderLabels(CONNECTION_LABELS)
+        header = self.connection_table.horizontalHeader()
+        for col in range(len(CONNECTION_LABELS)):
+            header.setSectionResizeMode(col, QHeaderView.ResizeToContents)
+        header.setSectionResizeMode(URL_COLUMN, QHeaderView.Stretch)
+        self.connection_table.setColumnHidden(MATCHES_COLUMN, True)
+        self.connection_table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.connection_table.setSelectionMode(QAbstractItemView.SingleSelection)
+        self.connection_table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.connection_table.verticalHeader().setVisible(False)
+        self.connection_table.currentCellChanged.connect(self.on_connection_changed)
+
+        self.model = MessageModel()
+        self.message_view = QTableView()
+        self.message_view.setModel(self.model)
+        self.message_view.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.message_view.setSelectionMode(QAbstractItemView.SingleSelection)
+        self.message_view.verticalHeader().setVisible(False)
+        # Fixed row heights: the view never measures rows it does not show.
+        self.message_view.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
+        self.message_view.setWordWrap(False)
+        self.message_view.horizontalHeader().setStretchLastSection(True)
+        self.message_view.selectionModel().currentRowChanged.connect(self.on_message_changed)
+        self.viewer = ResponseViewer()
+
+        lower = QSplitter(Qt.Horizontal)
+        lower.addWidget(self.message_view)
+        lower.addWidget(self.viewer)
+        lower.setStretchFactor(0, 3)
+        lower.setStretchFactor(1, 2)
+        splitter = QSplitter(Qt.Vertical)
+        splitter.addWidget(self.connection_table)
+        splitter.addWidget(lower)
+        splitter.setStretchFactor(0, 1)
+        splitter.setStretchFactor(1, 3)
+        layout.addWidget(splitter)
+
+        self.stats_label = QLabel("")
+        layout.addWidget(self.stats_label)
+        self.refresh(force=True)
+
+    def selected_connection(self):
+        row = self.connection_table.currentRow()
+        item = self.connection_table.item(row, ID_COLUMN) if row >= 0 else None
+        return self.store.get(item.data(Qt.UserRole)) if item is not None else None
+
+    def on_event(self, connection, message, dropped):
+        """Called on the UI thread after the store applied an event."""
+        if message is None:
+            # Opened or closed: show it now; message counts follow on refresh().
+            if self.isVisible():
+                if connection.id in self.rows:
+                    self._update_row(connection)
+                else:
+                    self.refresh()
+            return
+        matched = not self.needle or message.matches(self.needle)
+        if self.search_results is not None and matched:
+            self.search_results.setdefault(connection.id, []).append(message)
+        if connection is not self.model.connection:
+            return
+        follow = self.follow_checkbox.isChecked() and self._at_bottom()
+        self.model.message_added(message, dropped, matched)
+        if follow:
+            self.message_view.scrollToBottom()
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        self.refresh()
+
+    def _at_bottom(self):
+        bar = self.message_view.verticalScrollBar()
+        return bar.value() >= bar.maximum()
+
+    def refresh(self, force=False):
+        if not force and not self.isVisible():
+            return
+        table = self.connection_table
+        connections = [c for c in self.store
+                       if self.search_results is None or c.id in self.search_results]
+        if list(self.rows) != [c.id for c in connections]:
+            # Connections were added, forgotten or filtered: rebuild the rows.
+            selected = self.selected_connection()
+            table.blockSignals(True)
+            table.setRowCount(0)
+            self.rows = {}
+            for connection in connections:
+                row = self.rows[connection.id] = table.rowCount()
+                table.insertRow(row)
+                item = QTableWidgetItem(connection.id[:8])
+                item.setData(Qt.UserRole, connection.id)
+                table.setItem(row, ID_COLUMN, item)
+                table.setItem(row, KIND_COLUMN, QTableWidgetItem(connection.kind))
+                table.setItem(row, URL_COLUMN, QTableWidgetItem(connection.url))
+            if selected is not None and selected.id in self.rows:
+                table.setCurrentCell(self.rows[selected.id], ID_COLUMN)
+            table.blockSignals(False)
+            current = self.selected_connection()
+            if current is not self.model.connection:
+                self.show_connection(current)
+        for connection in connections:
+            self._update_row(connection)
+        stats = self.store.stats()
+        self.stats_label.setText(
+            f"{stats['connections']} connections ({stats['open']} open), {stats['messages']:,} messages kept, "
+            f"{stats['dropped']:,} dropped, {stats['stored_bytes'] / 1048576:.1f} MB stored"
+        )
+
+    def _update_row(self, connection):
+        row = self.rows.get(connection.id)
+        if row is None:
+            return
+        table = self.connection_table
+        table.setItem(row, STATUS_COLUMN, QTableWidgetItem(connection.status_text))
+        cells = ((MESSAGES_COLUMN, connection.total_messages), (SENT_COLUMN, connection.client_bytes),
+                 (RECEIVED_COLUMN, connection.server_bytes), (DROPPED_COLUMN, connection.messages.dropped))
+        if self.search_results is not None:
+            cells += ((MATCHES_COLUMN, len(self.search_results.get(connection.id, ()))),)
+        for col, value in cells:
+            item = QTableWidgetItem()
+            item.setData(Qt.DisplayRole, value)
+            table.setItem(row, col, item)
+
+    def on_connection_changed(self, row, column, previous_row, previous_column):
+        if row != previous_row:
+            self.show_connection(self.selected_connection())
+
+    def show_connection(self, connection):
+        hits = None
+        if connection is not None and self.search_results is not None:
+            hits = list(self.search_results.get(connection.id, ()))
+        self.model.set_connection(connection, hits)
+        self.viewer.clear()
+        if self.follow_checkbox.isChecked():
+            self.message_view.scrollToBottom()
+
+    def on_message_changed(self, current, previous):
+        message = self.model.message(current.row())
+        connection = self.model.connection
+        if message is None or connection is None:
+            self.viewer.clear()
+            return
+        kind = "WebSocket" if connection.kind == "websocket" else connection.kind.upper()
+        frame = "text" if message.text else "binary"
+        direction = "client → server" if message.from_client else "server → client"
+        # Shown like a response whose status line describes the message.
+        response = HttpResponse(None, f"{kind} message #{message.seq + 1}, {direction}, {frame}", [],
+                                message.data, "", message.size if message.truncated else None)
+        self.viewer.show_response(response, key=("stream", connection.id, message.seq))
+
+    def apply_search(self):
+        text = self.search_input.text().strip()
+        self.needle = text.lower().encode("utf-8")
+        self.search_results = self.store.search(text) if text else None
+        self.connection_table.setColumnHidden(MATCHES_COLUMN, self.search_results is None)
+        self.rows = {}
+        self.refresh(force=True)
+        # Same connection, now with or without the hits filter.
+        self.show_connection(self.selected_connection())
+
+    def clear_all(self):
+        self.store.clear()
+        self.search_results = {} if self.search_results is not None else None
+        self.refresh(force=True)
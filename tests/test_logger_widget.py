@@ -0,0 +1,88 @@
+# test_logger_widget.py
+#
+# LoggerWidget and its LoggerModel on an offscreen Qt: which rows the
+# search, "Collapse repeats" and "Only flows with secrets" leave visible
+# as flows arrive.
+#
+# Usage: python -m pytest tests/test_logger_widget.py
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PyQt5.QtWidgets import QApplication  # noqa: E402
+
+from flow_model import Flow, HttpRequest, HttpResponse  # noqa: E402
+from logger_widget import ID_COLUMN, LoggerWidget  # noqa: E402
+
+app = QApplication.instance() or QApplication([])
+
+
+def make_flow(flow_id, path, body):
+    return Flow(flow_id, HttpRequest("GET", f"https://api.example.com/{path}"),
+                HttpResponse(200, "OK", [("Content-Type", "text/plain")], body.encode()), 1.0)
+
+
+class LoggerViewTest(unittest.TestCase):
+    def setUp(self):
+        self.logger = LoggerWidget(lambda *a: None, lambda *a: None)
+        self.addCleanup(self.logger.deleteLater)
+
+    def shown_ids(self):
+        model = self.logger.model
+        return [model.data(model.index(row, ID_COLUMN)) for row in range(model.rowCount())]
+
+    def search(self, text):
+        self.logger.search_input.setText(text)
+        self.logger.refresh()
+
+    def test_collapsed_search_shows_last_matching_repeat(self):
+        self.logger.collapse_checkbox.setChecked(True)
+        self.logger.log_flow(make_flow("1", "items", "alpha"))
+        self.search("alpha")
+        # Same method, URL and request body: one group, but only the first repeat matches.
+        self.logger.log_flow(make_flow("2", "items", "gamma"))
+        self.logger.log_flow(make_flow("3", "items", "gamma"))
+        self.assertEqual(self.shown_ids(), ["1"])
+        self.assertEqual(self.logger.model.flow(0).id, "1")
+        self.logger.log_flow(make_flow("4", "items", "alpha again"))
+        self.assertEqual(self.shown_ids(), ["4"])
+        # Rebuilding the view (new search) agrees with the incremental updates.
+        self.search("gamma")
+        self.assertEqual(self.shown_ids(), ["3"])
+        self.search("")
+        self.assertEqual(self.shown_ids(), ["4"])
+
+    def test_flow_marked_after_logging_shows_under_secrets_filter(self):
+        self.logger.secrets_checkbox.setChecked(True)
+        for i in range(1, 4):
+            self.logger.log_flow(make_flow(str(i), f"items/{i}", "body"))
+        self.assertEqual(self.shown_ids(), [])
+        # Scan results arrive after the flows were logged, in any order.
+        self.logger.mark_secrets("3", ["AWS key in response"])
+        self.logger.mark_secrets("1", ["AWS key in response"])
+        self.assertEqual(self.shown_ids(), ["1", "3"])
+        self.logger.mark_secrets("1", ["Slack token in request"])
+        self.assertEqual(self.shown_ids(), ["1", "3"])
+
+    def test_collapsed_row_moves_to_newly_marked_repeat(self):
+        self.logger.collapse_checkbox.setChecked(True)
+        self.logger.secrets_checkbox.setChecked(True)
+        for i in range(1, 4):
+            self.logger.log_flow(make_flow(str(i), "items", "body"))
+        self.logger.mark_secrets("1", ["AWS key in response"])
+        self.assertEqual(self.shown_ids(), ["1"])
+        self.logger.mark_secrets("3", ["AWS key in response"])
+        self.assertEqual(self.shown_ids(), ["3"])
+        # An older repeat marked later does not take the row back.
+        self.logger.mark_secrets("2", ["AWS key in response"])
+        self.assertEqual(self.shown_ids(), ["3"])
+        self.logger.refresh()
+        self.assertEqual(self.shown_ids(), ["3"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,49 @@
+# test_passive_scanner.py
+#
+# A check registered at runtime in this process, as the README describes,
+# must run in the scanner's spawned worker processes.
+#
+# Usage: python -m pytest tests/test_passive_scanner.py
+
+import os
+import sys
+import threading
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import passive_checks  # noqa: E402
+from flow_model import Flow, HttpRequest, HttpResponse  # noqa: E402
+from passive_scanner import PassiveScanner  # noqa: E402
+
+WAIT = 60.0
+
+
+def check_test_marker(request, response):
+    if "test-marker" in request.url:
+        return [(passive_checks.SEVERITY_INFO, "Test marker in URL", request.url)]
+    return []
+
+
+class RegisteredCheckTest(unittest.TestCase):
+    def setUp(self):
+        passive_checks.register_check("test-marker", check_test_marker)
+        self.addCleanup(passive_checks.CHECKS.pop, "test-marker", None)
+        self.addCleanup(passive_checks.EXTERNAL_CHECKS.pop, "test-marker", None)
+        self.scanner = PassiveScanner(workers=1)
+        self.addCleanup(self.scanner.shutdown)
+
+    def test_runtime_registered_check_runs_in_workers(self):
+        flow = Flow("1", HttpRequest("GET", "https://example.com/test-marker"),
+                    HttpResponse(200, "OK", [("Content-Type", "text/plain")], b"ok"), 1.0)
+        done = threading.Event()
+        self.scanner.scan_history([flow], check_names=["test-marker"],
+                                  on_progress=lambda finished, total: done.set())
+        self.assertTrue(done.wait(WAIT), "scan did not finish")
+        self.assertEqual([(f.check, f.title) for f in self.scanner.findings.values()],
+                         [("test-marker", "Test marker in URL")])
+        self.assertEqual(self.scanner.stats()["timings"]["test-marker"]["runs"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
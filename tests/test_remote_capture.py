@@ -0,0 +1,126 @@
+# test_remote_capture.py
+#
+# A capture agent (no mitmdump) and a RemoteCaptureClient over localhost,
+# with READ_TIMEOUT and STATUS_INTERVAL shortened so an idle link can be
+# held open for several read timeouts in a second or two.
+#
+# Usage: python -m pytest tests/test_remote_capture.py
+#        (or python -m unittest discover tests)
+
+import json
+import os
+import shutil
+import socket
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import capture_agent  # noqa: E402
+import remote_capture  # noqa: E402
+from capture_agent import CaptureAgent  # noqa: E402
+from remote_capture import RemoteCaptureClient  # noqa: E402
+
+READ_TIMEOUT = 0.5
+STATUS_INTERVAL = 0.1
+WAIT = 10.0
+
+
+def addon_line(i):
+    return (json.dumps({
+        "id": f"idle-{i}", "worker": 0, "timestamp": time.time(), "method": "GET", "host": "api.example.com",
+        "url": f"https://api.example.com/items/{i}", "http_version": "HTTP/1.1", "headers": [], "body": "",
+        "response_status": 200, "response_reason": "OK", "response_http_version": "HTTP/1.1",
+        "response_headers": [], "response_body": "{}",
+    }) + "\n").encode("utf-8")
+
+
+class IdleLinkTest(unittest.TestCase):
+    def setUp(self):
+        patches = [mock.patch.object(module, name, value)
+                   for module in (remote_capture, capture_agent)
+                   for name, value in (("READ_TIMEOUT", READ_TIMEOUT), ("STATUS_INTERVAL", STATUS_INTERVAL))]
+        for patch in patches:
+            patch.start()
+        self.addCleanup(mock.patch.stopall)
+        self.tmp = tempfile.mkdtemp(prefix="anvesha-test-remote-")
+        self.addCleanup(shutil.rmtree, self.tmp, True)
+        self.received = []
+        self.agent = CaptureAgent("127.0.0.1", 0, "", os.path.join(self.tmp, "agent"),
+                                  os.path.join(self.tmp, "agent.sock"))
+        self.agent.start()
+        self.addCleanup(self.agent.stop)
+        # Called with the seq of every ACK the agent reads.
+        self.trim = mock.patch.object(self.agent.spool, "trim", wraps=self.agent.spool.trim).start()
+        self.client = RemoteCaptureClient(spool_root=os.path.join(self.tmp, "desktop"))
+        self.client.set_flow_sink(lambda flow: self.received.append(flow.id))
+        self.client.start_proxy("127.0.0.1", self.agent.port)
+        self.addCleanup(self.client.stop_proxy)
+        self.wait_for(self.client.is_running)
+
+    def wait_for(self, predicate):
+        deadline = time.monotonic() + WAIT
+        while not predicate():
+            if time.monotonic() > deadline:
+                self.fail("timed out")
+            time.sleep(0.01)
+
+    def feed(self, i):
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as conn:
+            conn.connect(self.agent.socket_path)
+            conn.sendall(addon_line(i))
+
+    def test_idle_link_outlives_read_timeout(self):
+        self.feed(0)
+        self.wait_for(lambda: self.received == ["idle-0"])
+        connection = self.agent._client
+        acks = self.trim.call_count
+        time.sleep(READ_TIMEOUT * 4)
+        # Neither side timed out: the same connection is still serving.
+        self.assertIs(self.agent._client, connection)
+        self.assertGreater(self.trim.call_count, acks, "no keepalive ACKs while idle")
+        self.assertTrue(self.client.is_running())
+        self.assertEqual(self.client.reconnects, 0)
+        self.feed(1)
+        self.wait_for(lambda: len(self.received) == 2)
+        self.assertEqual(self.received, ["idle-0", "idle-1"])
+        self.wait_for(lambda: mock.call(2) in self.trim.call_args_list)
+
+    def test_scope_frames_interleave_with_acks(self):
+        from scope_rules import ScopeRules
+        stop = threading.Event()
+
+        def send_scope():
+            while not stop.is_set():
+                self.client.set_scope_rules(ScopeRules())
+
+        def slow_send_frame(sock, kind, payload=b"", seq=0, count=0, codec=remote_capture.CODEC_NONE):
+            # Header and payload in two writes, so unserialized senders would interleave them.
+            sock.sendall(remote_capture.FRAME.pack(kind, codec, count, seq, len(payload)))
+            time.sleep(0.001)
+            sock.sendall(payload)
+
+        with mock.patch.object(capture_agent, "save_rules") as save_rules, \
+                mock.patch.object(remote_capture, "send_frame", slow_send_frame):
+            thread = threading.Thread(target=send_scope)
+            thread.start()
+            try:
+                for i in range(200):
+                    self.feed(i)
+                self.wait_for(lambda: len(self.received) == 200)
+            finally:
+                stop.set()
+                thread.join()
+            self.wait_for(lambda: mock.call(200) in self.trim.call_args_list)
+        # A frame torn by a concurrent send would have dropped the link.
+        self.assertIsNotNone(self.agent._client)
+        self.assertEqual(self.client.reconnects, 0)
+        self.assertTrue(save_rules.called)
+
+
+if __name__ == "__main__":
+    unittest.main()